@@ -20,6 +20,7 @@ import os
 
 from hashlib import sha256
 from logging import getLogger
+from threading import RLock
 
 from M2Crypto.X509 import X509Error
 
@@ -32,10 +33,12 @@ from gofer.agent.rmi import Context
 
 from pulp.common.bundle import Bundle
 from pulp.common.config import Config
+from pulp.common.profile import calculate_delta, is_delta_supported
 from pulp.agent.lib.dispatcher import Dispatcher
 from pulp.agent.lib.conduit import Conduit as HandlerConduit
 from pulp.bindings.server import PulpConnection
 from pulp.bindings.bindings import Bindings
+from pulp.bindings.exceptions import BadRequestException, ConflictException, NotFoundException
 
 log = getLogger(__name__)
 plugin = Plugin.find(__name__)
@@ -147,6 +150,72 @@ class Conduit(HandlerConduit):
         return context.cancelled()
 
 
+class UploadedProfiles:
+    """
+    The unit profiles last uploaded to the server, by content type.
+    Used to upload the changes to a profile only: an empty delta when the
+    profile is unchanged, so the server just checks that its profile is still
+    current.  Kept in memory, the first upload after the agent starts sends
+    the complete profiles.
+    """
+
+    __profiles = {}
+    __mutex = RLock()
+
+    @classmethod
+    def send(cls, bindings, consumer_id, type_id, profile):
+        """
+        Upload a profile to the server.
+        A delta is sent when the profile was uploaded before; the complete
+        profile is sent when the server rejects the delta.
+        :param bindings: The pulp bindings.
+        :type bindings: PulpBindings
+        :param consumer_id: The consumer ID.
+        :type consumer_id: str
+        :param type_id: The profile (content) type ID.
+        :type type_id: str
+        :param profile: The unit profile.
+        :return: The HTTP response.
+        :rtype: pulp.bindings.responses.Response
+        """
+        key = (consumer_id, type_id)
+        cls.__mutex.acquire()
+        try:
+            uploaded = cls.__profiles.pop(key, None)
+        finally:
+            cls.__mutex.release()
+        http = None
+        if uploaded and is_delta_supported(profile):
+            uploaded_profile, profile_hash = uploaded
+            added, removed = calculate_delta(uploaded_profile, profile)
+            try:
+                http = bindings.profile.send_delta(
+                    consumer_id, type_id, profile_hash, added, removed)
+            except (BadRequestException, ConflictException, NotFoundException):
+                log.info('profile (%s), delta rejected, sending complete profile', type_id)
+        if http is None:
+            http = bindings.profile.send(consumer_id, type_id, profile)
+        profile_hash = http.response_body.get('profile_hash')
+        if profile_hash and is_delta_supported(profile):
+            cls.__mutex.acquire()
+            try:
+                cls.__profiles[key] = (profile, profile_hash)
+            finally:
+                cls.__mutex.release()
+        return http
+
+    @classmethod
+    def clear(cls):
+        """
+        Forget the uploaded profiles.
+        """
+        cls.__mutex.acquire()
+        try:
+            cls.__profiles.clear()
+        finally:
+            cls.__mutex.release()
+
+
 # --- actions ----------------------------------------------------------------
 
 
@@ -271,6 +340,7 @@ class Consumer:
         """
         bundle = ConsumerX509Bundle()
         bundle.delete()
+        UploadedProfiles.clear()
         conduit = Conduit()
         report = dispatcher.clean(conduit)
         return report.dict()
@@ -391,6 +461,6 @@ class Profile:
             if not profile_report['succeeded']:
                 continue
             details = profile_report['details']
-            http = bindings.profile.send(consumer_id, type_id, details)
+            http = UploadedProfiles.send(bindings, consumer_id, type_id, details)
             log.debug('profile (%s), reported: %d', type_id, http.response_code)
         return report.dict()
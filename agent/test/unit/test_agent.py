@@ -109,3 +109,50 @@ class TestConduit(unittest.TestCase):
         cancelled = conduit.cancelled()
         self.assertFalse(cancelled)
         self.assertEqual(1, mock_cancelled.call_count)
+
+
+class TestUploadedProfiles(unittest.TestCase):
+
+    PROFILE = [{'name': 'zsh', 'version': '1.0'}]
+
+    def response(self, profile_hash):
+        return mock.Mock(response_code=200, response_body={'profile_hash': profile_hash})
+
+    @mock.patch('pulp.agent.lib.dispatcher.Dispatcher')
+    @mock.patch('gofer.agent.plugin.Plugin.find', return_value=MockPlugin())
+    @mock.patch('gofer.agent.logutil.getLogger', return_value=root)
+    def test_send(self, *unused):
+        from pulp.agent.gofer.pulpplugin import UploadedProfiles
+        UploadedProfiles.clear()
+        bindings = mock.Mock()
+        bindings.profile.send.return_value = self.response('hash-1')
+        bindings.profile.send_delta.return_value = self.response('hash-2')
+        # first upload is complete
+        UploadedProfiles.send(bindings, TEST_CN, 'rpm', self.PROFILE)
+        bindings.profile.send.assert_called_once_with(TEST_CN, 'rpm', self.PROFILE)
+        # unchanged
+        UploadedProfiles.send(bindings, TEST_CN, 'rpm', list(self.PROFILE))
+        bindings.profile.send_delta.assert_called_once_with(TEST_CN, 'rpm', 'hash-1', [], [])
+        # changed
+        changed = [{'name': 'zsh', 'version': '2.0'}]
+        UploadedProfiles.send(bindings, TEST_CN, 'rpm', changed)
+        bindings.profile.send_delta.assert_called_with(
+            TEST_CN, 'rpm', 'hash-2', changed, self.PROFILE)
+        self.assertEqual(bindings.profile.send.call_count, 1)
+
+    @mock.patch('pulp.agent.lib.dispatcher.Dispatcher')
+    @mock.patch('gofer.agent.plugin.Plugin.find', return_value=MockPlugin())
+    @mock.patch('gofer.agent.logutil.getLogger', return_value=root)
+    def test_send_delta_rejected(self, *unused):
+        from pulp.agent.gofer.pulpplugin import UploadedProfiles
+        from pulp.bindings.exceptions import ConflictException
+        UploadedProfiles.clear()
+        bindings = mock.Mock()
+        bindings.profile.send.return_value = self.response('hash-1')
+        bindings.profile.send_delta.side_effect = ConflictException({})
+        UploadedProfiles.send(bindings, TEST_CN, 'rpm', self.PROFILE)
+        # Test
+        http = UploadedProfiles.send(bindings, TEST_CN, 'rpm', self.PROFILE)
+        # Verify
+        self.assertEqual(bindings.profile.send.call_count, 2)
+        self.assertEqual(http.response_body['profile_hash'], 'hash-1')
@@ -182,6 +182,29 @@ class ProfilesAPI(PulpAPI):
         data = { 'content_type':content_type, 'profile':profile }
         return self.server.POST(path, data)
 
+    def send_delta(self, id, content_type, base_hash, added, removed):
+        """
+        Send the entries added to and removed from a profile, relative to the
+        profile stored by the server. The server responds with a conflict when
+        its profile hash is not base_hash, the complete profile must then be
+        sent instead.
+
+        :param id: consumer ID
+        :type  id: str
+        :param content_type: profile (content) type ID
+        :type  content_type: str
+        :param base_hash: profile_hash of the profile stored by the server
+        :type  base_hash: str
+        :param added: profile entries added
+        :type  added: list
+        :param removed: profile entries removed
+        :type  removed: list
+        """
+        path = self.BASE_PATH % id
+        delta = { 'base_hash':base_hash, 'added':added, 'removed':removed }
+        data = { 'content_type':content_type, 'delta':delta }
+        return self.server.POST(path, data)
+
 
 class ConsumerHistoryAPI(PulpAPI):
     """
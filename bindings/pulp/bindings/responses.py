@@ -79,6 +79,7 @@ class Task(object):
         "result": None,
         "progress": {},
         "response": None,
+        "revision": 0,
     }
     """
 
@@ -112,6 +113,10 @@ class Task(object):
         self.exception = response_body['exception']
         self.traceback = response_body['traceback']
 
+        # Incremented by the server whenever the state or progress changes;
+        # None when talking to servers that do not track it
+        self.revision = response_body.get('revision')
+
     def is_rejected(self):
         """
         Indicates if the response represents that the request was rejected.
@@ -12,13 +12,19 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import base64
+import httplib
 import locale
 import logging
+import select
+import socket
+import threading
+import time
 import urllib
 import oauth2 as oauth
 
 from types import NoneType
 from M2Crypto import SSL, httpslib
+from M2Crypto import threading as m2threading
 
 from pulp.bindings import exceptions
 from pulp.bindings.responses import Response, Task
@@ -26,6 +32,24 @@ from pulp.common.compat import json
 from pulp.common.util import ensure_utf_8, encode_unicode
 
 
+# -- constants ----------------------------------------------------------------
+
+# maximum number of connections kept open to the server by a keep-alive
+# connection, which is also the number of requests it makes concurrently
+DEFAULT_MAX_CONNECTIONS = 5
+
+# seconds a keep-alive connection may stay idle before it is closed rather than
+# reused; below the default KeepAliveTimeout of Apache, after which the server
+# closes it
+DEFAULT_IDLE_TIMEOUT = 4
+
+# errors raised when sending a request on a connection the server has closed
+STALE_CONNECTION_ERRORS = (httplib.BadStatusLine, socket.error, SSL.SSLError)
+
+# methods whose requests may be sent again when the response to them is lost,
+# as the server may or may not have received them
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
 # -- server connection --------------------------------------------------------
 
 class PulpConnection(object):
@@ -36,6 +60,9 @@ class PulpConnection(object):
     parameter can be used to pass in another mechanism to make the actual
     call to the server. The likely use of this is a duck-typed mock object
     for unit testing purposes.
+
+    With keep_alive, connections to the server are kept open and reused by
+    subsequent requests, see PooledHTTPSServerWrapper.
     """
 
     def __init__(self,
@@ -51,7 +78,10 @@ class PulpConnection(object):
                  oauth_secret=None,
                  oauth_user='admin',
                  cert_filename=None,
-                 server_wrapper=None):
+                 server_wrapper=None,
+                 keep_alive=False,
+                 max_connections=DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
 
         self.host = host
         self.port = port
@@ -84,6 +114,8 @@ class PulpConnection(object):
         # Server Wrapper
         if server_wrapper:
             self.server_wrapper = server_wrapper
+        elif keep_alive:
+            self.server_wrapper = PooledHTTPSServerWrapper(self, max_connections, idle_timeout)
         else:
             self.server_wrapper = HTTPSServerWrapper(self)
 
@@ -101,8 +133,8 @@ class PulpConnection(object):
     def POST(self, path, body=None, ensure_encoding=True):
         return self._request('POST', path, body=body, ensure_encoding=ensure_encoding)
 
-    def PUT(self, path, body, ensure_encoding=True):
-        return self._request('PUT', path, body=body, ensure_encoding=ensure_encoding)
+    def PUT(self, path, body, ensure_encoding=True, queries=()):
+        return self._request('PUT', path, queries, body=body, ensure_encoding=ensure_encoding)
 
     # protected request utilities ---------------------------------------------
 
@@ -253,19 +285,30 @@ class HTTPSServerWrapper(object):
 
     def request(self, method, url, body):
 
-        headers = dict(self.pulp_connection.headers)  # copy so we don't affect the calling method
+        headers = self._build_headers(method, url)
 
         # Create a new connection each time since HTTPSConnection has problems
         # reusing a connection for multiple calls (lame).
-        ssl_context = None
+        connection = self._new_connection(self._build_ssl_context())
+
+        # Request against the server
+        connection.request(method, url, body=body, headers=headers)
+
+        response = self._get_response(connection)
+
+        return self._read_response(response)
+
+    def _build_headers(self, method, url):
+        """
+        :return: the headers of a request, including the authentication headers
+        :rtype:  dict
+        """
+        headers = dict(self.pulp_connection.headers)  # copy so we don't affect the calling method
+
         if self.pulp_connection.username and self.pulp_connection.password:
             raw = ':'.join((self.pulp_connection.username, self.pulp_connection.password))
             encoded = base64.encodestring(raw)[:-1]
             headers['Authorization'] = 'Basic ' + encoded
-        elif self.pulp_connection.cert_filename:
-            ssl_context = SSL.Context('sslv3')
-            ssl_context.set_session_timeout(self.pulp_connection.timeout)
-            ssl_context.load_cert(self.pulp_connection.cert_filename)
 
         # oauth configuration
         if self.pulp_connection.oauth_key and self.pulp_connection.oauth_secret:
@@ -284,18 +327,42 @@ class HTTPSServerWrapper(object):
             headers.update(oauth_header)
             headers['pulp-user'] = self.pulp_connection.oauth_user
 
+        return headers
+
+    def _build_ssl_context(self):
+        """
+        :return: the SSL context presenting the client certificate, or None
+                 when the connection does not authenticate with a certificate
+        :rtype:  M2Crypto.SSL.Context or None
+        """
+        if self.pulp_connection.username and self.pulp_connection.password:
+            return None
+        if not self.pulp_connection.cert_filename:
+            return None
+        ssl_context = SSL.Context('sslv3')
+        ssl_context.set_session_timeout(self.pulp_connection.timeout)
+        ssl_context.load_cert(self.pulp_connection.cert_filename)
+        return ssl_context
+
+    def _new_connection(self, ssl_context):
+        """
+        :return: a new, not yet connected, connection to the server
+        :rtype:  M2Crypto.httpslib.HTTPSConnection
+        """
         # Can't pass in None, so need to decide between two signatures (also lame)
         if ssl_context is not None:
-            connection = httpslib.HTTPSConnection(
+            return httpslib.HTTPSConnection(
                 self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
         else:
-            connection = httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port)
-
-        # Request against the server
-        connection.request(method, url, body=body, headers=headers)
+            return httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port)
 
+    def _get_response(self, connection):
+        """
+        Get the response to the request sent on a connection, translating SSL
+        errors to binding exceptions.
+        """
         try:
-            response = connection.getresponse()
+            return connection.getresponse()
         except SSL.SSLError, err:
             # Translate stale login certificate to an auth exception
             if 'sslv3 alert certificate expired' == str(err):
@@ -303,6 +370,11 @@ class HTTPSServerWrapper(object):
             else:
                 raise exceptions.ConnectionException(None, str(err), None)
 
+    def _read_response(self, response):
+        """
+        :return: tuple of the response status and the deserialized body
+        :rtype:  tuple
+        """
         # Attempt to deserialize the body (should pass unless the server is busted)
         response_body = response.read()
 
@@ -311,3 +383,163 @@ class HTTPSServerWrapper(object):
         except:
             pass
         return response.status, response_body
+
+
+class PooledHTTPSServerWrapper(HTTPSServerWrapper):
+    """
+    Server wrapper keeping its connections to the server open between
+    requests, so that only the first requests pay for the TCP and TLS
+    handshakes. New connections resume the TLS session of the previous ones.
+
+    Safe for concurrent use: each request checks out a connection of its own,
+    and waits for one to be checked in when max_connections are in use.
+
+    Servers close connections that stay idle for too long. Connections idle
+    for longer than idle_timeout, or that the server has already closed, are
+    not reused. A request on a connection the server closes while it is being
+    sent is sent again on a new connection, provided it could not have been
+    received by the server (it could not be sent in full) or that receiving it
+    twice is harmless (its method is idempotent). Otherwise the failure is
+    raised as a ConnectionException.
+    """
+
+    def __init__(self, pulp_connection, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        :param pulp_connection: A pulp connection object.
+        :type pulp_connection: PulpConnection
+        :param max_connections: maximum number of connections kept open, and
+                                of requests made concurrently
+        :type max_connections: int
+        :param idle_timeout: seconds a connection may stay idle and be reused
+        :type idle_timeout: int or float
+        """
+        HTTPSServerWrapper.__init__(self, pulp_connection)
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        # the SSL context and sessions are shared by the threads
+        m2threading.init()
+        self.ssl_context = self._build_ssl_context() or SSL.Context()
+        self.__session = None
+        self.__idle = []
+        self.__available = threading.BoundedSemaphore(max_connections)
+        self.__lock = threading.Lock()
+
+    def request(self, method, url, body):
+
+        headers = self._build_headers(method, url)
+
+        self.__available.acquire()
+        try:
+            connection = self.__checkout()
+            try:
+                response = None
+                if connection.sock is not None:
+                    # an idle connection, which the server may have closed
+                    sent = False
+                    try:
+                        connection.request(method, url, body=body, headers=headers)
+                        sent = True
+                        response = connection.getresponse()
+                    except STALE_CONNECTION_ERRORS, err:
+                        if sent and method.upper() not in IDEMPOTENT_METHODS:
+                            raise exceptions.ConnectionException(None, str(err), None)
+                        self.pulp_connection.log.debug('reconnecting, stale connection: %s' % err)
+                        self._close(connection)
+                        connection = self.__connect()
+                if response is None:
+                    try:
+                        connection.request(method, url, body=body, headers=headers)
+                        response = self._get_response(connection)
+                    except (httplib.HTTPException, socket.error), err:
+                        raise exceptions.ConnectionException(None, str(err), None)
+                result = self._read_response(response)
+            except:
+                self._close(connection)
+                raise
+            self.__checkin(connection, response)
+            return result
+        finally:
+            self.__available.release()
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        self.__lock.acquire()
+        try:
+            idle = self.__idle
+            self.__idle = []
+        finally:
+            self.__lock.release()
+        for connection, idle_since in idle:
+            self._close(connection)
+
+    def _close(self, connection):
+        """
+        Close a connection. HTTPSConnection.close() leaves the socket open.
+        """
+        sock = connection.sock
+        connection.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _closed_by_server(self, connection):
+        """
+        :return: True if the server has closed an idle connection; an idle
+                 connection is readable only when the server closed it
+        :rtype:  bool
+        """
+        try:
+            readable, writable, errors = select.select([connection.sock], [], [], 0)
+        except (select.error, socket.error, ValueError):
+            return True
+        return bool(readable)
+
+    def __checkout(self):
+        """
+        :return: the most recently used idle connection, or a new connection
+        """
+        while True:
+            self.__lock.acquire()
+            try:
+                if not self.__idle:
+                    break
+                connection, idle_since = self.__idle.pop()
+            finally:
+                self.__lock.release()
+            if time.time() - idle_since < self.idle_timeout and not self._closed_by_server(connection):
+                return connection
+            self._close(connection)
+        return self.__connect()
+
+    def __checkin(self, connection, response):
+        """
+        Keep a connection open for the next request, unless the server closes it.
+        """
+        if response.will_close:
+            self._close(connection)
+            return
+        # M2Crypto sessions do not hold a reference to the OpenSSL session, the
+        # SSL connection it belongs to is kept so that it is not freed
+        session = (connection.sock, connection.get_session())
+        self.__lock.acquire()
+        try:
+            self.__session = session
+            self.__idle.append((connection, time.time()))
+        finally:
+            self.__lock.release()
+
+    def __connect(self):
+        """
+        :return: a new connection, resuming the last TLS session
+        """
+        connection = self._new_connection(self.ssl_context)
+        self.__lock.acquire()
+        try:
+            session = self.__session
+        finally:
+            self.__lock.release()
+        if session is not None:
+            connection.set_session(session[1])
+        return connection
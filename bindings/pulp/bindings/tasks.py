@@ -51,6 +51,31 @@ class TasksAPI(PulpAPI):
         response.response_body = Task(response.response_body)
         return response
 
+    def wait_for_task(self, task_id, revision, timeout):
+        """
+        Retrieves the status of the given task once its state or progress
+        has changed from the given revision. The server holds the request
+        until the task changes, completes or the timeout elapses, so the
+        returned task may be unchanged.
+
+        @param task_id: ID of the task
+        @type  task_id: str
+        @param revision: revision of the task last seen by the caller
+        @type  revision: int
+        @param timeout: maximum number of seconds the server waits for a change
+        @type  timeout: int
+
+        @return: response with a Task object in the response_body
+        @rtype:  Response
+
+        @raise NotFoundException: if there is no task with the given ID
+        """
+        path = '/v2/tasks/%s/' % task_id
+        queries = [('revision', revision), ('wait', timeout)]
+        response = self.server.GET(path, queries=queries)
+        response.response_body = Task(response.response_body)
+        return response
+
     def get_all_tasks(self, tags=()):
         """
         Retrieves all tasks in the system. If tags are specified, only tasks
@@ -15,7 +15,7 @@ import unittest
 
 import mock
 
-from pulp.bindings.consumer import ConsumerSearchAPI
+from pulp.bindings.consumer import ConsumerSearchAPI, ProfilesAPI
 
 
 class TestConsumerSearchAPI(unittest.TestCase):
@@ -24,3 +24,11 @@ class TestConsumerSearchAPI(unittest.TestCase):
         self.assertTrue(api.PATH is not None)
         self.assertTrue(len(api.PATH) > 0)
 
+
+class TestProfilesAPI(unittest.TestCase):
+    def test_send_delta(self):
+        api = ProfilesAPI(mock.MagicMock())
+        api.send_delta('consumer', 'rpm', 'hash', [{'name': 'zsh'}], [])
+        expected = {'content_type': 'rpm',
+                    'delta': {'base_hash': 'hash', 'added': [{'name': 'zsh'}], 'removed': []}}
+        api.server.POST.assert_called_once_with('/v2/consumers/consumer/profiles/', expected)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import httplib
+import socket
+import threading
+import time
+import unittest
+
+import mock
+
+from pulp.bindings import exceptions, server
+
+
+class FakeResponse(object):
+
+    def __init__(self, will_close=False):
+        self.status = 200
+        self.will_close = will_close
+
+    def read(self):
+        return '{"a": 1}'
+
+
+class FakeConnection(object):
+    """
+    Stands in for M2Crypto.httpslib.HTTPSConnection; connects on the first request.
+    """
+
+    instances = []
+
+    def __init__(self, host, port, **kwargs):
+        self.sock = None
+        self.session = None
+        self.requests = []
+        self.request_errors = []
+        self.responses = []
+        self.instances.append(self)
+
+    def request(self, method, url, body=None, headers=None):
+        if self.request_errors:
+            raise self.request_errors.pop(0)
+        if self.sock is None:
+            # the peer of the socket pair plays the server end of the connection
+            local, self.peer = socket.socketpair()
+            self.sock = mock.Mock()
+            self.sock.fileno.return_value = local.fileno()
+            self.local = local
+        self.requests.append((method, url))
+
+    def getresponse(self):
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return FakeResponse()
+
+    def get_session(self):
+        return 'session-%d' % self.instances.index(self)
+
+    def set_session(self, session):
+        self.session = session
+
+
+@mock.patch('M2Crypto.httpslib.HTTPSConnection', FakeConnection)
+class TestPooledHTTPSServerWrapper(unittest.TestCase):
+
+    def setUp(self):
+        FakeConnection.instances = []
+        self.connection = server.PulpConnection('localhost', keep_alive=True, max_connections=2)
+        self.wrapper = self.connection.server_wrapper
+
+    def test_keep_alive(self):
+        self.assertTrue(isinstance(self.wrapper, server.PooledHTTPSServerWrapper))
+        self.assertEqual(self.wrapper.max_connections, 2)
+        connection = server.PulpConnection('localhost')
+        self.assertFalse(isinstance(connection.server_wrapper, server.PooledHTTPSServerWrapper))
+
+    def test_request_reuses_connection(self):
+        self.assertEqual(self.wrapper.request('GET', '/a/', None), (200, {'a': 1}))
+        self.assertEqual(self.wrapper.request('GET', '/b/', None), (200, {'a': 1}))
+        self.assertEqual(len(FakeConnection.instances), 1)
+        self.assertEqual(FakeConnection.instances[0].requests, [('GET', '/a/'), ('GET', '/b/')])
+
+    def test_request_server_closes(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        first.responses.append(FakeResponse(will_close=True))
+        sock = first.sock
+        self.wrapper.request('GET', '/b/', None)
+        self.wrapper.request('GET', '/c/', None)
+        # closed, the third request is sent on a new connection resuming the session
+        sock.close.assert_called_once_with()
+        self.assertEqual(len(FakeConnection.instances), 2)
+        self.assertEqual(FakeConnection.instances[1].session, 'session-0')
+
+    def test_request_stale_connection(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        first.responses.append(httplib.BadStatusLine(''))
+        # Test
+        result = self.wrapper.request('PUT', '/b/', '{}')
+        # Verify
+        self.assertEqual(result, (200, {'a': 1}))
+        self.assertEqual(len(FakeConnection.instances), 2)
+        self.assertTrue(first.sock is None)
+        self.assertEqual(FakeConnection.instances[1].requests, [('PUT', '/b/')])
+        self.assertEqual(FakeConnection.instances[1].session, 'session-0')
+
+    def test_request_stale_connection_not_idempotent(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        first.responses.append(httplib.BadStatusLine(''))
+        # Test
+        self.assertRaises(exceptions.ConnectionException, self.wrapper.request, 'POST', '/b/', '{}')
+        # Verify
+        self.assertEqual(len(FakeConnection.instances), 1)
+        self.assertTrue(first.sock is None)
+
+    def test_request_stale_connection_not_sent(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        first.request_errors.append(socket.error(32, 'Broken pipe'))
+        # Test
+        result = self.wrapper.request('POST', '/b/', '{}')
+        # Verify
+        self.assertEqual(result, (200, {'a': 1}))
+        self.assertEqual(len(FakeConnection.instances), 2)
+        self.assertEqual(first.requests, [('GET', '/a/')])
+        self.assertEqual(FakeConnection.instances[1].requests, [('POST', '/b/')])
+
+    def test_request_closed_by_server(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        # the server closes the idle connection
+        first.peer.close()
+        # Test
+        result = self.wrapper.request('POST', '/b/', '{}')
+        # Verify
+        self.assertEqual(result, (200, {'a': 1}))
+        self.assertTrue(first.sock is None)
+        self.assertEqual(first.requests, [('GET', '/a/')])
+        self.assertEqual(FakeConnection.instances[1].requests, [('POST', '/b/')])
+
+    def test_request_idle_timeout(self):
+        self.wrapper.request('GET', '/a/', None)
+        first = FakeConnection.instances[0]
+        # Test
+        with mock.patch('time.time', return_value=time.time() + server.DEFAULT_IDLE_TIMEOUT):
+            self.wrapper.request('POST', '/b/', '{}')
+        # Verify
+        self.assertTrue(first.sock is None)
+        self.assertEqual(first.requests, [('GET', '/a/')])
+        self.assertEqual(FakeConnection.instances[1].requests, [('POST', '/b/')])
+
+    def test_request_connection_error(self):
+        FakeConnection.instances = []
+        with mock.patch.object(FakeConnection, 'request', side_effect=socket.error(111, 'refused')):
+            self.assertRaises(exceptions.ConnectionException, self.wrapper.request, 'GET', '/a/', None)
+
+    def test_request_new_connection_error(self):
+        FakeConnection.instances = []
+        with mock.patch.object(FakeConnection, 'getresponse', side_effect=httplib.BadStatusLine('')):
+            self.assertRaises(exceptions.ConnectionException, self.wrapper.request, 'GET', '/a/', None)
+        # not retried, not pooled
+        self.assertEqual(len(FakeConnection.instances), 1)
+        self.wrapper.request('GET', '/b/', None)
+        self.assertEqual(len(FakeConnection.instances), 2)
+
+    def test_concurrent_requests(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def getresponse(connection):
+            lock.acquire()
+            active.append(connection)
+            peak.append(len(active))
+            lock.release()
+            time.sleep(0.01)
+            lock.acquire()
+            active.remove(connection)
+            lock.release()
+            return FakeResponse()
+
+        with mock.patch.object(FakeConnection, 'getresponse', getresponse):
+            threads = [threading.Thread(target=self.wrapper.request, args=('GET', '/a/', None))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(peak), 8)
+        self.assertEqual(len(FakeConnection.instances), 2)
+
+    def test_close(self):
+        self.wrapper.request('GET', '/a/', None)
+        sock = FakeConnection.instances[0].sock
+        self.wrapper.close()
+        sock.close.assert_called_once_with()
+        self.wrapper.request('GET', '/b/', None)
+        self.assertEqual(len(FakeConnection.instances), 2)
+
+
+@mock.patch('M2Crypto.httpslib.HTTPSConnection', FakeConnection)
+class TestHTTPSServerWrapper(unittest.TestCase):
+
+    def test_request_new_connection(self):
+        FakeConnection.instances = []
+        wrapper = server.PulpConnection('localhost', username='admin', password='admin').server_wrapper
+        self.assertEqual(wrapper.request('GET', '/a/', None), (200, {'a': 1}))
+        wrapper.request('GET', '/b/', None)
+        self.assertEqual(len(FakeConnection.instances), 2)
+        self.assertTrue('Authorization' in wrapper._build_headers('GET', '/a/'))
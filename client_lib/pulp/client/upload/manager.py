@@ -19,15 +19,19 @@ client-side tracking of upload requests on the server.
 """
 
 import copy
+import hashlib
 import os
 import pickle
 import sys
+import threading
+from Queue import Queue, Empty, Full
 
 from pulp.client.lock import LockFile
 
 # -- constants ----------------------------------------------------------------
 
 DEFAULT_CHUNKSIZE = 1048576 # 1 MB per upload call
+DEFAULT_CONCURRENCY = 1 # upload calls in flight at once
 
 # -- exceptions ---------------------------------------------------------------
 
@@ -84,7 +88,8 @@ class UploadManager(object):
     on disk state files.
     """
 
-    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE):
+    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE,
+                 concurrency=DEFAULT_CONCURRENCY):
         """
         @param upload_working_dir: directory in which to store client-side files
                to track upload requests; if it doesn't exist it will be created
@@ -97,15 +102,41 @@ class UploadManager(object):
         @param chunk_size: size in bytes of data to upload on each call to the
                server
         @type  chunk_size: int
+
+        @param concurrency: number of chunks uploaded to the server at once;
+               when greater than 1, a resumed upload asks the server which
+               chunks it is missing
+        @type  concurrency: int
         """
         self.upload_working_dir = upload_working_dir
         self.bindings = bindings
         self.chunk_size = chunk_size
+        self.concurrency = concurrency
 
         # Internal state
         self.tracker_files = {}
         self.is_initialized = False
 
+    @classmethod
+    def from_context(cls, context):
+        """
+        Creates a manager configured with the upload settings of the client
+        configuration: upload_working_dir in the filesystem section and
+        upload_chunk_size and upload_concurrency in the server section. The
+        manager must still be initialized by the caller.
+
+        @param context: client context
+        @type  context: pulp.client.extensions.core.ClientContext
+
+        @rtype: UploadManager
+        """
+        upload_working_dir = context.config['filesystem']['upload_working_dir']
+        upload_working_dir = os.path.expanduser(upload_working_dir)
+        server_section = context.config['server']
+        chunk_size = int(server_section.get('upload_chunk_size', DEFAULT_CHUNKSIZE))
+        concurrency = int(server_section.get('upload_concurrency', DEFAULT_CONCURRENCY))
+        return cls(upload_working_dir, context.server, chunk_size, concurrency)
+
     def initialize(self):
         """
         Must be called prior to using the manager. This call prepares the
@@ -188,7 +219,9 @@ class UploadManager(object):
         will be invoked with the new offset in the file and the file size
         (intended to be fed into a progress indicator). As this is called
         after each upload segment call, the granularity at which it is called
-        depends on the chunk_size value for this instance.
+        depends on the chunk_size value for this instance. When chunks are
+        uploaded concurrently, the first value is the number of bytes the
+        server has received rather than an offset.
 
         The callback_func should have a signature of (int, int).
 
@@ -233,23 +266,21 @@ class UploadManager(object):
 
             source_file_size = os.path.getsize(tracker_file.source_filename)
 
-            f = open(tracker_file.source_filename, 'r')
-            while True:
-                # Load the chunk to upload
-                f.seek(tracker_file.offset)
-                data = f.read(self.chunk_size)
-                if not data:
-                    break
-
-                # Server request
-                self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data)
-
-                # Status update and callback notification
-                tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
-                tracker_file.save()
-
-                callback_func(tracker_file.offset, source_file_size)
+            # The digest of the whole file is sent with the import so the
+            # server can verify the assembled upload.
+            digest = hashlib.sha256()
 
+            f = open(tracker_file.source_filename, 'r')
+            try:
+                if self.concurrency > 1:
+                    self._upload_parallel(tracker_file, f, source_file_size, digest, callback_func)
+                else:
+                    self._upload_sequential(tracker_file, f, source_file_size, digest, callback_func)
+            finally:
+                f.close()
+
+            tracker_file.size = source_file_size
+            tracker_file.checksum = digest.hexdigest()
             tracker_file.is_finished_uploading = True
         finally:
             # Regardless of how this ends, it's no longer running, so make sure
@@ -281,8 +312,10 @@ class UploadManager(object):
         if tracker.source_filename and not tracker.is_finished_uploading:
             raise IncompleteUploadException()
 
+        # Trackers saved by earlier versions carry no size or checksum
         response = self.bindings.uploads.import_upload(upload_id, tracker.repo_id,
-                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata)
+                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata,
+                   size=getattr(tracker, 'size', None), checksum=getattr(tracker, 'checksum', None))
 
         return response
 
@@ -364,6 +397,129 @@ class UploadManager(object):
         self._uncache_tracker_file(tracker)
         tracker.delete()
 
+    # -- upload utilities -----------------------------------------------------
+
+    def _upload_sequential(self, tracker_file, f, source_file_size, digest, callback_func):
+        """
+        Uploads the chunks of the file one at a time, starting at the tracker's
+        offset.
+        """
+        upload_id = tracker_file.upload_id
+
+        # Data uploaded by an earlier call still has to be digested
+        f.seek(0)
+        remaining = tracker_file.offset
+        while remaining > 0:
+            data = f.read(min(self.chunk_size, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+
+        while True:
+            # Load the chunk to upload
+            f.seek(tracker_file.offset)
+            data = f.read(self.chunk_size)
+            if not data:
+                break
+            digest.update(data)
+
+            # Server request
+            checksum = hashlib.sha256(data).hexdigest()
+            self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data,
+                                                 checksum=checksum)
+
+            # Status update and callback notification
+            tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
+            tracker_file.save()
+
+            callback_func(tracker_file.offset, source_file_size)
+
+    def _upload_parallel(self, tracker_file, f, source_file_size, digest, callback_func):
+        """
+        Uploads the chunks of the file the server has not received yet, with
+        up to concurrency chunks in flight at once. The file is read in order
+        by the calling thread, which digests it and hands the missing chunks
+        to the uploading threads.
+
+        The tracker's offset is kept at the end of the contiguous data the
+        server has received, so the upload can also be resumed sequentially.
+        """
+        upload_id = tracker_file.upload_id
+        received = self.bindings.uploads.get_upload(upload_id).response_body['received']
+
+        chunks = Queue(self.concurrency * 2)
+        state = _ParallelUploadState()
+        state.uploaded = sum(min(end, source_file_size) - start
+                             for start, end in received if start < source_file_size)
+
+        def upload_chunks():
+            while not state.failed():
+                try:
+                    offset, data = chunks.get(timeout=0.1)
+                except Empty:
+                    if state.reading_done:
+                        return
+                    continue
+                try:
+                    checksum = hashlib.sha256(data).hexdigest()
+                    self.bindings.uploads.upload_segment(upload_id, offset, data, checksum=checksum)
+                except:
+                    state.fail(sys.exc_info())
+                    return
+                state.lock.acquire()
+                try:
+                    state.completed(offset, offset + len(data))
+                    state.uploaded += len(data)
+                    tracker_file.offset = state.contiguous
+                    tracker_file.save()
+                    if callback_func:
+                        callback_func(state.uploaded, source_file_size)
+                finally:
+                    state.lock.release()
+
+        workers = []
+        for i in range(self.concurrency):
+            worker = threading.Thread(target=upload_chunks)
+            worker.setDaemon(True)
+            worker.start()
+            workers.append(worker)
+
+        try:
+            offset = 0
+            while not state.failed():
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                digest.update(data)
+                end = offset + len(data)
+                if _is_received(received, offset, end):
+                    state.lock.acquire()
+                    try:
+                        state.completed(offset, end)
+                    finally:
+                        state.lock.release()
+                else:
+                    while not state.failed():
+                        try:
+                            chunks.put((offset, data), timeout=0.1)
+                            break
+                        except Full:
+                            continue
+                offset = end
+        finally:
+            state.reading_done = True
+            for worker in workers:
+                worker.join()
+
+        if state.failed():
+            exc_type, exc_value, exc_tb = state.error
+            raise exc_type, exc_value, exc_tb
+
+        tracker_file.offset = source_file_size
+        tracker_file.save()
+
     # -- tracker utilities ----------------------------------------------------
 
     def _tracker_filename(self, upload_id):
@@ -387,6 +543,52 @@ class UploadManager(object):
         if not self.is_initialized:
             raise ManagerUninitializedException()
 
+class _ParallelUploadState(object):
+    """
+    State shared by the threads of a parallel upload.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contiguous = 0 # end of the data received without gaps
+        self.uploaded = 0 # bytes received by the server
+        self.reading_done = False
+        self.error = None
+        # start: end of chunks received beyond the contiguous data
+        self.pending = {}
+
+    def completed(self, start, end):
+        """
+        Records that a chunk has been received by the server
+        NOTE: must be called with the lock held
+        """
+        self.pending[start] = end
+        while self.contiguous in self.pending:
+            self.contiguous = self.pending.pop(self.contiguous)
+
+    def fail(self, exc_info):
+        self.lock.acquire()
+        try:
+            if self.error is None:
+                self.error = exc_info
+        finally:
+            self.lock.release()
+
+    def failed(self):
+        return self.error is not None
+
+
+def _is_received(ranges, start, end):
+    """
+    Returns whether the given [start, end) range of the file is covered by
+    the ranges received by the server.
+    """
+    for range_start, range_end in ranges:
+        if range_start <= start and end <= range_end:
+            return True
+    return False
+
+
 class UploadTracker(object):
     """
     Client-side file to carry all information related to a single upload
@@ -412,6 +614,10 @@ class UploadTracker(object):
         self.is_running = False
         self.is_finished_uploading = False
 
+        # Whole file information, known once the upload has finished
+        self.size = None
+        self.checksum = None # SHA-256 hex digest
+
     def save(self):
         """
         Saves the current state of the tracker file. This will lock on the file
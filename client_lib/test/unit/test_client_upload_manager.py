@@ -11,9 +11,11 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
 import math
 import os
 import shutil
+import threading
 import unittest
 
 import mock
@@ -62,6 +64,38 @@ class UploadManagerTests(unittest.TestCase):
 
     # -- test cases -----------------------------------------------------------
 
+    def test_from_context(self):
+        # Setup
+        context = mock.Mock()
+        context.config = {
+            'filesystem' : {'upload_working_dir' : '~/.pulp/uploads'},
+            'server' : {'upload_chunk_size' : '100', 'upload_concurrency' : '3'},
+        }
+
+        # Test
+        manager = upload_util.UploadManager.from_context(context)
+
+        # Verify
+        self.assertEqual(os.path.expanduser('~/.pulp/uploads'), manager.upload_working_dir)
+        self.assertTrue(manager.bindings is context.server)
+        self.assertEqual(100, manager.chunk_size)
+        self.assertEqual(3, manager.concurrency)
+
+    def test_from_context_defaults(self):
+        # Setup
+        context = mock.Mock()
+        context.config = {
+            'filesystem' : {'upload_working_dir' : self.upload_working_dir},
+            'server' : {},
+        }
+
+        # Test
+        manager = upload_util.UploadManager.from_context(context)
+
+        # Verify
+        self.assertEqual(upload_util.DEFAULT_CHUNKSIZE, manager.chunk_size)
+        self.assertEqual(upload_util.DEFAULT_CONCURRENCY, manager.concurrency)
+
     def test_initialize_no_working_dir(self):
         # Setup
         self.upload_manager.upload_working_dir += '/mkdir-test'
@@ -234,6 +268,87 @@ class UploadManagerTests(unittest.TestCase):
         tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
         self.assertEqual(rpm_size, tracker.offset)
 
+    def test_upload_parallel(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.concurrency = 3
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        # The server already has the first two chunks
+        self.mock_upload_bindings.get_upload.return_value = Response(200, {'received' : [[0, 200]]})
+
+        # Mock does not record calls made from several threads reliably
+        segment_calls = []
+        segment_lock = threading.Lock()
+
+        def upload_segment(upload_id, offset, body, checksum=None):
+            segment_lock.acquire()
+            try:
+                segment_calls.append((offset, body, checksum))
+            finally:
+                segment_lock.release()
+            return Response(200, {})
+
+        self.mock_upload_bindings.upload_segment.side_effect = upload_segment
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        f = open(TEST_RPM_FILENAME, 'r')
+        rpm_data = f.read()
+        f.close()
+        num_upload_calls = int(math.ceil(float(rpm_size) / float(self.upload_manager.chunk_size))) - 2
+
+        # Only the missing chunks are sent, each with its checksum
+        self.assertEqual(num_upload_calls, len(segment_calls))
+        offsets = []
+        for offset, body, checksum in segment_calls:
+            self.assertEqual(rpm_data[offset:offset + self.upload_manager.chunk_size], body)
+            self.assertEqual(hashlib.sha256(body).hexdigest(), checksum)
+            offsets.append(offset)
+        self.assertEqual(sorted(offsets), range(200, rpm_size, self.upload_manager.chunk_size))
+
+        # Verify the callback calls
+        self.assertEqual(num_upload_calls, mock_callback.update_status.call_count)
+        self.assertEqual((rpm_size, rpm_size), mock_callback.update_status.call_args[0])
+
+        # Verify the state of the tracker
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(rpm_size, tracker.offset)
+        self.assertEqual(rpm_size, tracker.size)
+        self.assertEqual(hashlib.sha256(rpm_data).hexdigest(), tracker.checksum)
+        self.assertEqual(True, tracker.is_finished_uploading)
+        self.assertEqual(False, tracker.is_running)
+
+        # The size and checksum are sent with the import
+        self.upload_manager.import_upload(upload_id)
+        kwargs = self.mock_upload_bindings.import_upload.call_args[1]
+        self.assertEqual(kwargs, {'size' : rpm_size, 'checksum' : tracker.checksum})
+
+    def test_upload_parallel_failure(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.concurrency = 3
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        self.mock_upload_bindings.get_upload.return_value = Response(200, {'received' : []})
+        self.mock_upload_bindings.upload_segment.side_effect = NotFoundException({})
+
+        # Test
+        self.assertRaises(NotFoundException, self.upload_manager.upload, upload_id, mock.Mock())
+
+        # Verify
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(0, tracker.offset)
+        self.assertEqual(False, tracker.is_finished_uploading)
+        self.assertEqual(False, tracker.is_running)
+
     def test_upload_concurrent_upload(self):
         # Setup
         self.upload_manager.initialize()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Deltas between unit profiles, used by the agent to upload only the entries of
+a profile that changed since it was last uploaded. Only profiles that are
+lists of entries can be described by a delta; entries are compared by value.
+"""
+
+from pulp.common.compat import json
+
+
+class MissingEntries(Exception):
+    """
+    Raised when a delta removes entries that are not in the profile, meaning
+    the delta was not calculated relative to that profile.
+    """
+
+    def __init__(self, entries):
+        Exception.__init__(self, entries)
+        self.entries = entries
+
+# -- public -------------------------------------------------------------------
+
+def calculate_delta(old_profile, new_profile):
+    """
+    Calculate the entries added to and removed from a profile.
+
+    :param old_profile: the profile the delta is relative to
+    :type  old_profile: list
+    :param new_profile: the changed profile
+    :type  new_profile: list
+    :return: tuple of the added entries and the removed entries
+    :rtype:  tuple
+    """
+    remaining = _counts(old_profile)
+    added = []
+    for entry in new_profile:
+        key = _key(entry)
+        if remaining.get(key):
+            remaining[key] -= 1
+        else:
+            added.append(entry)
+    removed = []
+    for entry in old_profile:
+        key = _key(entry)
+        if remaining.get(key):
+            remaining[key] -= 1
+            removed.append(entry)
+    return added, removed
+
+
+def apply_delta(profile, added, removed):
+    """
+    Apply a delta calculated by calculate_delta() to a profile. The entries
+    kept are in the original order, followed by the added entries.
+
+    :param profile: the profile the delta is relative to
+    :type  profile: list
+    :param added: entries added to the profile
+    :type  added: list
+    :param removed: entries removed from the profile
+    :type  removed: list
+    :return: the changed profile
+    :rtype:  list
+    :raise MissingEntries: if removed entries are not in the profile
+    """
+    pending = _counts(removed)
+    changed = []
+    for entry in profile:
+        key = _key(entry)
+        if pending.get(key):
+            pending[key] -= 1
+        else:
+            changed.append(entry)
+    missing = []
+    for entry in removed:
+        key = _key(entry)
+        if pending.get(key):
+            pending[key] -= 1
+            missing.append(entry)
+    if missing:
+        raise MissingEntries(missing)
+    changed.extend(added)
+    return changed
+
+
+def is_delta_supported(profile):
+    """
+    :return: True if changes to the profile can be described by a delta
+    :rtype:  bool
+    """
+    return isinstance(profile, list)
+
+# -- private ------------------------------------------------------------------
+
+def _key(entry):
+    return json.dumps(entry, separators=(',', ':'), sort_keys=True)
+
+
+def _counts(entries):
+    counts = {}
+    for entry in entries:
+        key = _key(entry)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
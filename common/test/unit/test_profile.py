@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+from pulp.common import profile
+
+
+OLD_PROFILE = [
+    {'name': 'zsh', 'version': '4.3'},
+    {'name': 'bash', 'version': '4.1'},
+    {'name': 'vim', 'version': '7.2'},
+]
+
+NEW_PROFILE = [
+    {'name': 'zsh', 'version': '4.3'},
+    {'version': '4.2', 'name': 'bash'},
+    {'name': 'vim', 'version': '7.2'},
+    {'name': 'emacs', 'version': '23.1'},
+]
+
+
+class TestCalculateDelta(unittest.TestCase):
+
+    def test_unchanged(self):
+        added, removed = profile.calculate_delta(OLD_PROFILE, list(OLD_PROFILE))
+        self.assertEqual(added, [])
+        self.assertEqual(removed, [])
+
+    def test_changed(self):
+        added, removed = profile.calculate_delta(OLD_PROFILE, NEW_PROFILE)
+        self.assertEqual(added, [NEW_PROFILE[1], NEW_PROFILE[3]])
+        self.assertEqual(removed, [OLD_PROFILE[1]])
+
+    def test_entries_compared_by_value(self):
+        reordered_keys = [dict(reversed(e.items())) for e in OLD_PROFILE]
+        self.assertEqual(profile.calculate_delta(OLD_PROFILE, reordered_keys), ([], []))
+
+    def test_duplicate_entries(self):
+        added, removed = profile.calculate_delta(['a', 'a', 'b'], ['a', 'b', 'b'])
+        self.assertEqual(added, ['b'])
+        self.assertEqual(removed, ['a'])
+
+
+class TestApplyDelta(unittest.TestCase):
+
+    def test_apply(self):
+        added, removed = profile.calculate_delta(OLD_PROFILE, NEW_PROFILE)
+        changed = profile.apply_delta(OLD_PROFILE, added, removed)
+        self.assertEqual(changed, [OLD_PROFILE[0], OLD_PROFILE[2], NEW_PROFILE[1], NEW_PROFILE[3]])
+        self.assertEqual(profile.calculate_delta(changed, NEW_PROFILE), ([], []))
+
+    def test_missing_removed_entries(self):
+        try:
+            profile.apply_delta(['a', 'b'], ['c'], ['b', 'd'])
+            self.fail('MissingEntries not raised')
+        except profile.MissingEntries, e:
+            self.assertEqual(e.entries, ['d'])
+
+    def test_missing_duplicate_removed_entries(self):
+        try:
+            profile.apply_delta(['a'], [], ['a', 'a'])
+            self.fail('MissingEntries not raised')
+        except profile.MissingEntries, e:
+            self.assertEqual(e.entries, ['a'])
+
+    def test_is_delta_supported(self):
+        self.assertTrue(profile.is_delta_supported(OLD_PROFILE))
+        self.assertFalse(profile.is_delta_supported({'a': 1}))
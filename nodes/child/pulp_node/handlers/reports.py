@@ -9,6 +9,8 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from threading import RLock
+
 from pulp_node.reports import RepositoryReport, RepositoryProgress
 from pulp_node.error import ErrorList
 
@@ -99,6 +101,8 @@ class HandlerProgress(object):
         self.conduit = conduit
         self.state = self.PENDING
         self.progress = []
+        # repositories may be synchronized concurrently
+        self._lock = RLock()
 
     def started(self, bindings):
         """
@@ -142,18 +146,26 @@ class HandlerProgress(object):
         :param report: The update repository progress report.
         :type report: RepositoryProgress
         """
-        for i, p in enumerate(self.progress):
-            if p.repo_id == report.repo_id:
-                self.progress[i] = report
-            self._updated()
-            break
+        self._lock.acquire()
+        try:
+            for i, p in enumerate(self.progress):
+                if p.repo_id == report.repo_id:
+                    self.progress[i] = report
+                self._updated()
+                break
+        finally:
+            self._lock.release()
 
     def _updated(self):
         """
         Notification that the report has been updated.
         Reported using the conduit.
         """
-        self.conduit.update_progress(self.dict())
+        self._lock.acquire()
+        try:
+            self.conduit.update_progress(self.dict())
+        finally:
+            self._lock.release()
 
     def dict(self):
         return dict(
@@ -11,8 +11,10 @@
 
 
 from gettext import gettext as _
+from Queue import Queue, Empty
 from logging import getLogger
 from operator import itemgetter
+from threading import Thread
 
 from pulp_node import constants
 from pulp_node.handlers.model import *
@@ -147,34 +149,78 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Up to max_sync_concurrency repositories are merged and synchronized
+        in parallel; each one is handled entirely by one worker thread.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
+        concurrency = \
+            request.options.get(constants.MAX_SYNC_CONCURRENCY_KEYWORD) or \
+            constants.DEFAULT_SYNC_CONCURRENCY
+        concurrency = min(int(concurrency), len(request.bindings))
+        if concurrency <= 1:
+            for bind in request.bindings:
+                self._merge_repository(request, bind)
+            return
+        queue = Queue()
         for bind in request.bindings:
+            queue.put(bind)
+        workers = []
+        for n in range(concurrency):
+            worker = Thread(target=self._merge_worker, args=(request, queue))
+            worker.setDaemon(True)
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+
+    def _merge_worker(self, request, queue):
+        """
+        Merge repositories taken from the queue until it is empty.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param queue: A queue of consumer binding payloads.
+        :type queue: Queue
+        """
+        while True:
             try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = Repository(repo_id, details)
-                child = Repository.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = Repository(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+                bind = queue.get_nowait()
+            except Empty:
+                return
+            self._merge_repository(request, bind)
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository of a binding and synchronize it.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        repo_id = bind['repo_id']
+        try:
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = Repository(repo_id, details)
+            child = Repository.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = Repository(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
@@ -9,7 +9,15 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import os
+import shutil
+
+from tempfile import mkdtemp
+
+from pulp.server.compat import json
+
 from pulp_node import constants
+from pulp_node.manifest import UnitRef, sort_key
 
 
 class UniqueKey(object):
@@ -109,4 +117,176 @@ class UnitInventory(object):
             child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
             if parent_last_updated > child_last_updated:
                 updated.append((unit, ref))
-        return updated
\ No newline at end of file
+        return updated
+
+    def close(self):
+        """
+        Release resources held by the inventory.
+        """
+        pass
+
+
+class StreamingUnitInventory(object):
+    """
+    The unit inventory computed by merge-joining the parent and child inventory
+    of content units sorted by unit key in a single pass.  Units contained only in
+    the parent or only in the child inventory and units updated on the parent are
+    spooled to files in a temporary directory so that memory usage does not
+    depend on the number of units.  The inventory must be closed.
+    :ivar base_URL: The base URL for downloading parent units.
+    :type base_URL: str
+    :ivar tmp_dir: The directory containing the spooled units.
+    :type tmp_dir: str
+    """
+
+    def __init__(self, base_URL, parent_units, child_units, working_dir):
+        """
+        :param base_URL: The base URL for downloading parent units.
+        :param parent_units: The content units in the parent node as (unit, ref)
+            sorted by unit key.
+        :type parent_units: iterable
+        :param child_units: The content units in the child node sorted by unit key.
+        :type child_units: iterable
+        :param working_dir: The directory in which the temporary directory is created.
+        :type working_dir: str
+        """
+        self.base_URL = base_URL
+        self.tmp_dir = mkdtemp(dir=working_dir)
+        self.parent_only = _RefSpool(os.path.join(self.tmp_dir, 'parent_only'))
+        self.child_only = _UnitSpool(os.path.join(self.tmp_dir, 'child_only'))
+        self.updated = _RefSpool(os.path.join(self.tmp_dir, 'updated'))
+        try:
+            self._join(iter(parent_units), iter(child_units))
+        finally:
+            self.parent_only.close()
+            self.child_only.close()
+            self.updated.close()
+
+    def _join(self, parent_units, child_units):
+        """
+        Merge-join the parent and child units sorted by unit key.
+        :param parent_units: An iterator of (unit, ref) sorted by unit key.
+        :type parent_units: iterator
+        :param child_units: An iterator of units sorted by unit key.
+        :type child_units: iterator
+        """
+        parent = self._next_parent(parent_units)
+        child = self._next_child(child_units)
+        while parent is not None or child is not None:
+            if child is None or (parent is not None and parent[0] < child[0]):
+                self.parent_only.add(parent[2])
+                parent = self._next_parent(parent_units)
+                continue
+            if parent is None or child[0] < parent[0]:
+                self.child_only.add(child[1])
+                child = self._next_child(child_units)
+                continue
+            parent_last_updated = parent[1].get(constants.LAST_UPDATED, 0)
+            child_last_updated = child[1].get(constants.LAST_UPDATED, 0)
+            if parent_last_updated > child_last_updated:
+                self.updated.add(parent[2])
+            parent = self._next_parent(parent_units)
+            child = self._next_child(child_units)
+
+    @staticmethod
+    def _next_parent(parent_units):
+        try:
+            unit, ref = parent_units.next()
+        except StopIteration:
+            return None
+        return sort_key(unit), unit, ref
+
+    @staticmethod
+    def _next_child(child_units):
+        try:
+            unit = child_units.next()
+        except StopIteration:
+            return None
+        unit.pop('metadata', None)
+        return sort_key(unit), unit
+
+    def units_on_parent_only(self):
+        """
+        Listing of units contained in the parent inventory
+        but not contained in the child inventory.
+        :return: Iterable of (unit, ref).
+        :rtype: iterable
+        """
+        return self.parent_only
+
+    def units_on_child_only(self):
+        """
+        Listing of units contained in the child inventory
+        but not contained in the parent inventory.
+        :return: Iterable of units that need to be purged.
+        :rtype: iterable
+        """
+        return self.child_only
+
+    def updated_units(self):
+        """
+        Listing of units updated on the parent.
+        :return: Iterable of (unit, ref).
+        :rtype: iterable
+        """
+        return self.updated
+
+    def close(self):
+        """
+        Delete the spooled units.
+        """
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class _UnitSpool(object):
+    """
+    Json encoded units spooled to a file, one per line.
+    Iterated once closed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fp = open(path, 'w')
+        self.total = 0
+
+    def add(self, unit):
+        self.fp.write(json.dumps(unit))
+        self.fp.write('\n')
+        self.total += 1
+
+    def close(self):
+        self.fp.close()
+
+    def decode(self, line):
+        return json.loads(line)
+
+    def __iter__(self):
+        with open(self.path) as fp:
+            for line in fp:
+                yield self.decode(line)
+
+    def __len__(self):
+        return self.total
+
+
+class _RefSpool(_UnitSpool):
+    """
+    References to units within the (parent) units file spooled to a file.
+    Iterated as (unit, ref) once closed.
+    """
+
+    def __init__(self, path):
+        _UnitSpool.__init__(self, path)
+        self.units_path = None
+
+    def add(self, ref):
+        self.units_path = ref.path
+        self.fp.write('%d %d\n' % (ref.offset, ref.length))
+        self.total += 1
+
+    def decode(self, line):
+        offset, length = [int(n) for n in line.split()]
+        ref = UnitRef(self.units_path, offset, length)
+        unit = ref.fetch()
+        unit.pop('metadata', None)
+        return unit, ref
@@ -18,6 +18,7 @@ the strategies provided here.
 import os
 import errno
 
+from threading import RLock
 from gettext import gettext as _
 from logging import getLogger
 
@@ -28,7 +29,7 @@ from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
 from pulp_node.manifest import Manifest, RemoteManifest
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, StreamingUnitInventory
 from pulp_node.importers.download import UnitDownloadManager
 from pulp_node.error import (NodeError, GetChildUnitsError, GetParentUnitsError, AddUnitError,
     DeleteUnitError, InvalidManifestError, CaughtException)
@@ -42,6 +43,12 @@ log = getLogger(__name__)
 STRATEGY_UNSUPPORTED = _('Importer strategy "%(s)s" not supported')
 
 
+# --- constants -------------------------------------------------------------------------
+
+# the number of units added or removed with each bulk conduit call
+UNIT_BATCH_SIZE = 1000
+
+
 # --- request ---------------------------------------------------------------------------
 
 
@@ -112,8 +119,15 @@ class ImporterStrategy(object):
     """
     This object provides the transport independent content unit
     synchronization strategies used by nodes importer plugins.
+    :ivar pending: Units to be added with the next bulk conduit call.
+    :type pending: list
     """
 
+    def __init__(self):
+        self.pending = []
+        # units are added from download listener callbacks
+        self.lock = RLock()
+
     def synchronize(self, request):
         """
         Synchronize the content units associated with the specified repository.
@@ -142,7 +156,8 @@ class ImporterStrategy(object):
         """
         Add the specified unit to the child inventory using the conduit.
         The conduit will automatically associate the unit to the repository
-        to which it's pre-configured.
+        to which it's pre-configured.  Units are added in batches; the units
+        still pending are added by flush_units().
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit: The unit to be added.
@@ -154,26 +169,67 @@ class ImporterStrategy(object):
                 unit_key=unit['unit_key'],
                 metadata=unit['metadata'],
                 storage_path=unit['storage_path'])
-            request.conduit.save_unit(new_unit)
-            request.progress.unit_added(details=new_unit.storage_path)
         except Exception:
             log.exception(unit['unit_id'])
             request.summary.errors.append(AddUnitError(request.repo_id))
+            return
+        self.lock.acquire()
+        try:
+            self.pending.append(new_unit)
+            if len(self.pending) >= UNIT_BATCH_SIZE:
+                self.flush_units(request)
+        finally:
+            self.lock.release()
+
+    def flush_units(self, request):
+        """
+        Add the pending units to the child inventory with a single bulk
+        conduit call.  When the bulk call fails, the units are added one
+        at a time so that an error is reported for each unit that failed.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        """
+        self.lock.acquire()
+        try:
+            units = self.pending
+            self.pending = []
+            if not units:
+                return
+            try:
+                request.conduit.save_units(units)
+                for unit in units:
+                    request.progress.unit_added(details=unit.storage_path)
+                return
+            except Exception:
+                log.exception(request.repo_id)
+            for unit in units:
+                try:
+                    request.conduit.save_unit(unit)
+                    request.progress.unit_added(details=unit.storage_path)
+                except Exception:
+                    log.exception(unit.unit_key)
+                    request.summary.errors.append(AddUnitError(request.repo_id))
+        finally:
+            self.lock.release()
 
     # --- protected ---------------------------------------------------------------------
 
     def _unit_inventory(self, request):
         """
         Build the unit inventory.
+        When the parent units are published sorted by unit key, the child units
+        are read sorted the same way by the database and the inventory is built
+        by merge-joining both in a single pass.  The returned inventory must be
+        closed.
         :param request: A synchronization request.
         :type request: SyncRequest
         :return: The built inventory.
-        :rtype: UnitInventory
+        :rtype: UnitInventory|StreamingUnitInventory
         """
         # fetch child units
         try:
             conduit = NodesConduit()
-            child_units = conduit.get_units(request.repo_id)
+            child_units = conduit.get_units(request.repo_id, sort=True)
         except NodeError:
             raise
         except Exception:
@@ -197,8 +253,11 @@ class ImporterStrategy(object):
             fetched_manifest.fetch()
             if manifest != fetched_manifest or \
                     not manifest.is_valid() or not manifest.has_valid_units():
-                fetched_manifest.write()
-                fetched_manifest.fetch_units()
+                # apply the deltas published since the last applied manifest
+                # and fall back to fetching all of the units.
+                if not fetched_manifest.fetch_deltas(manifest):
+                    fetched_manifest.write()
+                    fetched_manifest.fetch_units()
                 manifest = fetched_manifest
             if not manifest.is_valid():
                 raise InvalidManifestError()
@@ -211,8 +270,9 @@ class ImporterStrategy(object):
         # build the inventory
         parent_units = manifest.get_units()
         base_URL = manifest.publishing_details[constants.BASE_URL]
-        inventory = UnitInventory(base_URL, parent_units, child_units)
-        return inventory
+        if not manifest.units_sorted():
+            return UnitInventory(base_URL, parent_units, child_units)
+        return StreamingUnitInventory(base_URL, parent_units, child_units, request.working_dir)
 
     def _reset_storage_path(self, unit):
         """
@@ -249,6 +309,20 @@ class ImporterStrategy(object):
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
+        try:
+            self._download_and_add_units(request, unit_inventory)
+        finally:
+            self.flush_units(request)
+
+    def _download_and_add_units(self, request, unit_inventory):
+        """
+        Add the units without files and download the files of the other
+        units, which are added by the unit download manager callback.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param unit_inventory: The inventory of both parent and child content units.
+        :type unit_inventory: UnitInventory
+        """
         download_list = []
         units = unit_inventory.units_on_parent_only()
         request.progress.begin_adding_units(len(units))
@@ -280,9 +354,12 @@ class ImporterStrategy(object):
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
-        for unit, ref in unit_inventory.updated_units():
-            unit = ref.fetch()
-            self.add_unit(request, unit)
+        try:
+            for unit, ref in unit_inventory.updated_units():
+                unit = ref.fetch()
+                self.add_unit(request, unit)
+        finally:
+            self.flush_units(request)
 
     def _path_and_destination(self, unit):
         """
@@ -321,28 +398,61 @@ class ImporterStrategy(object):
         """
         Determine the list of units contained in the child inventory
         but are not contained in the parent inventory and un-associate them.
+        The associations are removed in batches.
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
-        for unit in unit_inventory.units_on_child_only():
-            if request.cancelled():
-                return
+        units = []
+        try:
+            for unit in unit_inventory.units_on_child_only():
+                if request.cancelled():
+                    return
+                try:
+                    _unit = AssociatedUnit(
+                        type_id=unit['type_id'],
+                        unit_key=unit['unit_key'],
+                        metadata={},
+                        storage_path=None,
+                        created=None,
+                        updated=None,
+                        owner_type=unit['owner_type'],
+                        owner_id=unit['owner_id'])
+                    _unit.id = unit['unit_id']
+                except Exception:
+                    log.exception(unit['unit_id'])
+                    request.summary.errors.append(DeleteUnitError(request.repo_id))
+                    continue
+                units.append(_unit)
+                if len(units) >= UNIT_BATCH_SIZE:
+                    self._remove_units(request, units)
+                    units = []
+        finally:
+            self._remove_units(request, units)
+
+    def _remove_units(self, request, units):
+        """
+        Remove the associations of the units with a single bulk conduit call.
+        When the bulk call fails, the units are removed one at a time so that
+        an error is reported for each unit that failed.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param units: The units to be removed.
+        :type units: list
+        """
+        if not units:
+            return
+        try:
+            request.conduit.remove_units(units)
+            return
+        except Exception:
+            log.exception(request.repo_id)
+        for unit in units:
             try:
-                _unit = AssociatedUnit(
-                    type_id=unit['type_id'],
-                    unit_key=unit['unit_key'],
-                    metadata={},
-                    storage_path=None,
-                    created=None,
-                    updated=None,
-                    owner_type=unit['owner_type'],
-                    owner_id=unit['owner_id'])
-                _unit.id = unit['unit_id']
-                request.conduit.remove_unit(_unit)
+                request.conduit.remove_unit(unit)
             except Exception:
-                log.exception(unit['unit_id'])
+                log.exception(unit.id)
                 request.summary.errors.append(DeleteUnitError(request.repo_id))
 
 
@@ -367,9 +477,12 @@ class Mirror(ImporterStrategy):
         :type request: SyncRequest
         """
         unit_inventory = self._unit_inventory(request)
-        self._add_units(request, unit_inventory)
-        self._update_units(request, unit_inventory)
-        self._delete_units(request, unit_inventory)
+        try:
+            self._add_units(request, unit_inventory)
+            self._update_units(request, unit_inventory)
+            self._delete_units(request, unit_inventory)
+        finally:
+            unit_inventory.close()
 
 
 class Additive(ImporterStrategy):
@@ -390,8 +503,11 @@ class Additive(ImporterStrategy):
         :type request: SyncRequest
         """
         unit_inventory = self._unit_inventory(request)
-        self._add_units(request, unit_inventory)
-        self._update_units(request, unit_inventory)
+        try:
+            self._add_units(request, unit_inventory)
+            self._update_units(request, unit_inventory)
+        finally:
+            unit_inventory.close()
 
 
 # --- factory ---------------------------------------------------------------------------
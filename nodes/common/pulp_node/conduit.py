@@ -9,9 +9,20 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import heapq
+
+from pymongo import ASCENDING
+
 from pulp.plugins.types import database as types_db
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.config import config as pulp_conf
+from pulp.server.util import batches
+
+from pulp_node.manifest import sort_key
+
+
+# the number of units in each query sorted by the database
+SORT_BATCH_SIZE = 5000
 
 
 # --- nodes conduit  ----------------------------------------------------------
@@ -19,14 +30,18 @@ from pulp.server.config import config as pulp_conf
 
 class NodesConduit(object):
 
-    def get_units(self, repo_id):
+    def get_units(self, repo_id, sort=False):
         """
         Get all units associated with a repository.
         :param repo_id: The repository ID used to query the units.
         :type repo_id: str
+        :param sort: Get the units sorted by sort key (without metadata).
+        :type sort: bool
         :return: unit iterator
-        :rtype: UnitsIterator
+        :rtype: UnitsIterator|SortedUnitsIterator
         """
+        if sort:
+            return SortedUnitsIterator(repo_id)
         units = {}
         types = {}
         collection = RepoContentUnit.get_collection()
@@ -114,4 +129,68 @@ class UnitsIterator:
         return self
 
     def __len__(self):
-        return self.length
\ No newline at end of file
+        return self.length
+
+
+class SortedUnitsIterator:
+    """
+    Iterates the units associated with a repository sorted by sort key.
+    The units of each type are queried in batches sorted by unit key by the
+    database and the batches are merged, so that only the associations are held
+    in memory.  Only the fields needed to compare units are read, the metadata
+    is empty.
+    """
+
+    @staticmethod
+    def sorted_batch(typedef, units):
+        """
+        Query a batch of units sorted by unit key.
+        :param typedef: The type definition of the units.
+        :type typedef: dict
+        :param units: The associations of the units keyed by unit ID.
+        :type units: dict
+        :return: A generator of (sort key, unit).
+        :rtype: generator
+        """
+        key_fields = sorted(typedef['unit_key'])
+        collection = types_db.type_units_collection(typedef['id'])
+        cursor = collection.find(
+            {'_id': {'$in': units.keys()}},
+            fields=key_fields + ['_storage_path', '_last_updated'],
+            sort=[(name, ASCENDING) for name in key_fields])
+        for metadata in cursor:
+            unit = units[metadata['_id']]
+            unit = UnitsIterator.associated_unit(typedef, unit, metadata)
+            yield sort_key(unit), unit
+
+    @staticmethod
+    def get_units(repo_id):
+        typedefs = Typedef()
+        collection = RepoContentUnit.get_collection()
+        type_ids = collection.find({'repo_id': repo_id}).distinct('unit_type_id')
+        fields = ['unit_id', 'unit_type_id', 'owner_type', 'owner_id']
+        for type_id in sorted(type_ids):
+            typedef = typedefs.get(type_id)
+            query = {'repo_id': repo_id, 'unit_type_id': type_id}
+            sorted_batches = []
+            for batch in batches(collection.find(query, fields=fields), SORT_BATCH_SIZE):
+                units = {}
+                for unit in batch:
+                    units[unit['unit_id']] = unit
+                sorted_batches.append(SortedUnitsIterator.sorted_batch(typedef, units))
+            for key, unit in heapq.merge(*sorted_batches):
+                yield unit
+
+    def __init__(self, repo_id):
+        collection = RepoContentUnit.get_collection()
+        self.length = collection.find({'repo_id': repo_id}).count()
+        self.unit_generator = SortedUnitsIterator.get_units(repo_id)
+
+    def next(self):
+        return self.unit_generator.next()
+
+    def __iter__(self):
+        return self
+
+    def __len__(self):
+        return self.length
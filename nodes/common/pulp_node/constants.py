@@ -41,6 +41,7 @@ PURGE_ORPHANS_KEYWORD = 'purge_orphans'
 
 MAX_DOWNLOAD_BANDWIDTH_KEYWORD = 'max_download_bandwidth'
 MAX_DOWNLOAD_CONCURRENCY_KEYWORD = 'max_download_concurrency'
+MAX_SYNC_CONCURRENCY_KEYWORD = 'max_sync_concurrency'
 
 SKIP_CONTENT_UPDATE_KEYWORD = 'skip_content_update'
 
@@ -52,6 +53,7 @@ STORAGE_PATH = 'storage_path'
 RELATIVE_PATH = 'relative_path'
 FILE_SIZE = 'size'
 TARBALL_PATH = 'tgz_path'
+TARBALL_SIGNATURE = 'tgz_signature'
 LAST_UPDATED = 'last_updated'
 
 
@@ -64,6 +66,7 @@ STRATEGY_NOTE_KEY = '_node-update-strategy'
 # --- settings ---------------------------------------------------------------
 
 DEFAULT_DOWNLOAD_CONCURRENCY = 20
+DEFAULT_SYNC_CONCURRENCY = 1
 
 
 # --- profiling --------------------------------------------------------------
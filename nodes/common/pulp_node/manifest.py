@@ -14,11 +14,22 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+
+Each publish also produces a delta file listing the units added, removed and
+updated since the previous publish.  The manifest references the chain of
+delta files published for the most recent generations so that a child that
+applied a recent generation can bring its copy of the units file up to date
+without downloading the entire units file.
 """
 
 import os
+import re
 import gzip
 import errno
+import heapq
+import hashlib
+
+from tempfile import mkstemp
 
 from logging import getLogger
 
@@ -39,6 +50,14 @@ log = getLogger(__name__)
 MANIFEST_VERSION = 2
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
+DELTA_FILE_NAME = 'units-delta-%d.json.gz'
+DELTA_FILE_PATTERN = re.compile(r'units-delta-\d+\.json\.gz$')
+
+# the number of delta files retained in the chain
+MAX_DELTAS = 10
+
+# the number of units sorted in memory
+SORT_CHUNK_SIZE = 10000
 
 ID = 'id'
 VERSION = 'version'
@@ -48,6 +67,17 @@ UNITS = 'units'
 UNITS_PATH = 'path'
 UNITS_TOTAL = 'total'
 UNITS_SIZE = 'size'
+UNITS_SORTED = 'sorted'
+GENERATION = 'generation'
+DELTAS = 'deltas'
+DELTA_BASE = 'base'
+
+# delta file actions
+ACTION = 'action'
+UNIT = 'unit'
+ADDED = 'added'
+REMOVED = 'removed'
+UPDATED = 'updated'
 
 
 # --- utils -----------------------------------------------------------------------------
@@ -76,6 +106,68 @@ def unzip(path, destination, bfrlen=65535):
         fp_in.close()
 
 
+def read_units(path):
+    """
+    Read the json encoded units in the units file at the specified path.
+    The file is uncompressed on the fly when the path ends with .gz.
+    :param path: The path to a units file.
+    :type path: str
+    :return: A generator of units.
+    :rtype: generator
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    if path.endswith('.gz'):
+        fp = gzip.open(path)
+    else:
+        fp = open(path)
+    try:
+        while True:
+            json_unit = fp.readline()
+            if json_unit:
+                yield json.loads(json_unit)
+            else:
+                break
+    finally:
+        fp.close()
+
+
+def unit_key(unit):
+    """
+    Get a hashable key that uniquely identifies the unit.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The json encoded (type_id, unit_key).
+    :rtype: str
+    """
+    return json.dumps([unit['type_id'], unit['unit_key']], sort_keys=True)
+
+
+def sort_key(unit):
+    """
+    Get the key by which units are sorted.  Units are ordered by type_id and
+    then by the values of the unit key fields taken in the order of the field
+    names, which is also how they are sorted by the database.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: [type_id, [value, ...]]
+    :rtype: list
+    """
+    key = unit['unit_key']
+    return [unit['type_id'], [key[name] for name in sorted(key)]]
+
+
+def unit_digest(unit):
+    """
+    Get a digest of the published unit used to detect that it has been updated.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The digest.
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(unit, sort_keys=True)).digest()
+
+
 # --- manifest --------------------------------------------------------------------------
 
 
@@ -90,6 +182,12 @@ class Manifest(object):
     :type total_units: int
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar generation: The publishing generation.  Incremented on each publish.
+    :type generation: int
+    :ivar deltas: The chain of published delta files, oldest first.  Each
+        entry contains the generation, the ID of the manifest the delta is
+        applied to (base) and the path, total and size of the delta file.
+    :type deltas: list
     """
 
     def __init__(self, path, manifest_id=None):
@@ -104,6 +202,8 @@ class Manifest(object):
         self.version = MANIFEST_VERSION
         self.units = {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
         self.publishing_details = {}
+        self.generation = 0
+        self.deltas = []
         if os.path.isdir(path):
             path = pathlib.join(path, MANIFEST_FILE_NAME)
         self.path = path
@@ -118,7 +218,9 @@ class Manifest(object):
             ID: self.id,
             VERSION: self.version,
             UNITS: self.units,
-            PUBLISHING_DETAILS: self.publishing_details
+            PUBLISHING_DETAILS: self.publishing_details,
+            GENERATION: self.generation,
+            DELTAS: self.deltas,
         }
         with open(self.path, 'w+') as fp:
             json.dump(state, fp, indent=2)
@@ -138,6 +240,8 @@ class Manifest(object):
         self.version = d.get(VERSION, 0)
         self.units = d.get(UNITS, {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
         self.publishing_details = d.get(PUBLISHING_DETAILS, {})
+        self.generation = d.get(GENERATION, 0)
+        self.deltas = d.get(DELTAS, [])
 
     def get_units(self):
         """
@@ -155,14 +259,64 @@ class Manifest(object):
         else:
             return []
 
-    def units_published(self, unit_writer):
+    def units_published(self, unit_writer, sorted_units=False):
         """
         Update the manifest publishing information.
         :param unit_writer: A writer used to publish the units.
         :type unit_writer: UnitWriter
+        :param sorted_units: The units were written sorted by unit key.
+        :type sorted_units: bool
         """
         self.units[UNITS_TOTAL] = unit_writer.total_units
         self.units[UNITS_SIZE] = unit_writer.bytes_written
+        self.units[UNITS_SORTED] = sorted_units
+
+    def units_sorted(self):
+        """
+        Get whether the units in the units file are sorted by unit key.
+        :return: True if sorted.
+        :rtype: bool
+        """
+        return bool(self.units.get(UNITS_SORTED))
+
+    def delta_published(self, base_id, delta_writer):
+        """
+        Add the delta file written for this generation to the chain.
+        The oldest deltas are dropped from the chain as needed to
+        retain at most MAX_DELTAS entries.
+        :param base_id: The ID of the manifest the delta is applied to.
+        :type base_id: str
+        :param delta_writer: A writer used to publish the delta.
+        :type delta_writer: DeltaWriter
+        """
+        delta = {
+            GENERATION: self.generation,
+            DELTA_BASE: base_id,
+            PATH: os.path.basename(delta_writer.path),
+            UNITS_TOTAL: delta_writer.total_units,
+            UNITS_SIZE: delta_writer.bytes_written,
+        }
+        self.deltas.append(delta)
+        self.deltas = self.deltas[-MAX_DELTAS:]
+
+    def delta_chain(self, manifest):
+        """
+        Get the deltas needed to bring the units of the specified
+        manifest up to date with this manifest.
+        :param manifest: A previously applied manifest.
+        :type manifest: Manifest
+        :return: The list of deltas, oldest first.  None when the chain
+            does not reach back to the specified manifest.
+        :rtype: list
+        """
+        chain = [d for d in self.deltas if d[GENERATION] > manifest.generation]
+        if not chain or chain[0][DELTA_BASE] != manifest.id:
+            return None
+        generations = [d[GENERATION] for d in chain]
+        expected = range(manifest.generation + 1, self.generation + 1)
+        if generations != expected:
+            return None
+        return chain
 
     def published(self, details):
         """
@@ -292,6 +446,148 @@ class RemoteManifest(Manifest):
             report = listener.failed_reports[0]
             raise ManifestDownloadError(self.url, report.error_msg)
 
+    def fetch_deltas(self, manifest):
+        """
+        Bring the units file of a previously applied manifest up to date
+        by fetching and applying the deltas published since.  On success,
+        this manifest references the updated (uncompressed) units file and is
+        written.  Nothing is fetched when the delta chain does not reach back to
+        the applied manifest or when the deltas are larger than the units file.
+        :param manifest: The previously applied manifest.
+        :type manifest: Manifest
+        :return: True if the deltas have been applied.  Otherwise, the units
+            file must be fetched using fetch_units().
+        :rtype: bool
+        :raise IOError: on I/O errors.
+        :raise ValueError: json decoding errors
+        """
+        if manifest == self or not manifest.is_valid() or not manifest.has_valid_units():
+            return False
+        chain = self.delta_chain(manifest)
+        if chain is None:
+            log.info('delta chain broken at generation: %d', manifest.generation)
+            return False
+        if sum(d[UNITS_SIZE] for d in chain) >= self.units[UNITS_SIZE]:
+            return False
+        base_url = self.url.rsplit('/', 1)[0]
+        dir_path = os.path.dirname(self.path)
+        request_list = []
+        for delta in chain:
+            url = pathlib.join(base_url, delta[PATH])
+            destination = pathlib.join(dir_path, delta[PATH])
+            request_list.append(DownloadRequest(str(url), destination))
+        listener = AggregatingEventListener()
+        self.downloader.event_listener = listener
+        self.downloader.download(request_list)
+        try:
+            if listener.failed_reports:
+                report = listener.failed_reports[0]
+                log.info('delta download failed: %s', report.error_msg)
+                return False
+            return self._apply_deltas(manifest, [r.destination for r in request_list])
+        finally:
+            for request in request_list:
+                if os.path.exists(request.destination):
+                    os.unlink(request.destination)
+
+    def _apply_deltas(self, manifest, paths):
+        """
+        Apply the downloaded delta files to the units file of the
+        previously applied manifest.
+        :param manifest: The previously applied manifest.
+        :type manifest: Manifest
+        :param paths: The paths to the downloaded delta files, oldest first.
+        :type paths: list
+        :return: True if the updated units file matches this manifest.
+        :rtype: bool
+        """
+        # unit key: unit (None when removed)
+        changes = {}
+        for path in paths:
+            for entry in read_units(path):
+                unit = entry[UNIT]
+                if entry[ACTION] == REMOVED:
+                    changes[unit_key(unit)] = None
+                else:
+                    changes[unit_key(unit)] = unit
+        units_path = manifest.units_path()
+        destination = pathlib.join(os.path.dirname(self.path), UNITS_FILE_NAME[:-3])
+        if manifest.units_sorted():
+            units = self._merge_changes(read_units(units_path), changes)
+        else:
+            units = self._apply_changes(read_units(units_path), changes)
+        with UnitWriter(destination + '.part', compressed=False) as writer:
+            for unit in units:
+                writer.add(unit)
+        if writer.total_units != self.units[UNITS_TOTAL]:
+            log.info('delta produced: %d/%d units', writer.total_units, self.units[UNITS_TOTAL])
+            os.unlink(writer.path)
+            return False
+        os.rename(writer.path, destination)
+        if units_path != destination and os.path.exists(units_path):
+            os.unlink(units_path)
+        self.units[UNITS_PATH] = destination
+        self.units[UNITS_SIZE] = writer.bytes_written
+        self.units[UNITS_SORTED] = manifest.units_sorted()
+        self.write()
+        return True
+
+    @staticmethod
+    def _apply_changes(units, changes):
+        """
+        Apply changes to units in no particular order.
+        Units added by the changes follow the existing units.
+        :param units: An iterable of units.
+        :type units: iterable
+        :param changes: The changed units keyed by unit key (None when removed).
+        :type changes: dict
+        :return: A generator of the changed units.
+        :rtype: generator
+        """
+        for unit in units:
+            key = unit_key(unit)
+            if key in changes:
+                unit = changes.pop(key)
+                if unit is None:
+                    continue
+            yield unit
+        for unit in changes.itervalues():
+            if unit is not None:
+                yield unit
+
+    @staticmethod
+    def _merge_changes(units, changes):
+        """
+        Apply changes to units sorted by unit key, preserving the order.
+        :param units: An iterable of units sorted by unit key.
+        :type units: iterable
+        :param changes: The changed units keyed by unit key (None when removed).
+        :type changes: dict
+        :return: A generator of the changed units sorted by unit key.
+        :rtype: generator
+        """
+        ordered = []
+        for key, unit in changes.iteritems():
+            type_id, key_fields = json.loads(key)
+            ordered.append((sort_key(dict(type_id=type_id, unit_key=key_fields)), unit))
+        changes = sorted(ordered)
+        n = 0
+        for unit in units:
+            key = sort_key(unit)
+            while n < len(changes) and changes[n][0] < key:
+                if changes[n][1] is not None:
+                    yield changes[n][1]
+                n += 1
+            if n < len(changes) and changes[n][0] == key:
+                if changes[n][1] is not None:
+                    yield changes[n][1]
+                n += 1
+                continue
+            yield unit
+        for key, unit in changes[n:]:
+            if unit is not None:
+                yield unit
+
 
 class UnitWriter(object):
     """
@@ -308,17 +604,22 @@ class UnitWriter(object):
     :type bytes_written: int
     """
 
-    def __init__(self, path):
+    def __init__(self, path, compressed=True):
         """
         :param path: The absolute path to a file or directory.
             When a directory is specified, the standard file name is appended.
         :type path: str
+        :param compressed: Write a gzip compressed file.
+        :type compressed: bool
         :raise IOError: on I/O errors
         """
         if os.path.isdir(path):
             path = pathlib.join(path, UNITS_FILE_NAME)
         self.path = path
-        self.fp = gzip.open(path, 'wb')
+        if compressed:
+            self.fp = gzip.open(path, 'wb')
+        else:
+            self.fp = open(path, 'wb')
         self.total_units = 0
         self.bytes_written = 0
 
@@ -373,6 +674,161 @@ class UnitWriter(object):
         self.close()
 
 
+class DeltaWriter(UnitWriter):
+    """
+    Writes the delta between the units in a previously published units file
+    and the units being published.  Each line in the delta file is a json
+    encoded entry containing the action (added, removed or updated) and the unit.
+    Only the type_id and unit_key are written for removed units.
+    :ivar previous: The digest of each previously published unit keyed by unit key.
+    :type previous: dict
+    """
+
+    def __init__(self, path, units_path):
+        """
+        :param path: The absolute path to the delta file.
+        :type path: str
+        :param units_path: The absolute path to the previously published units file.
+        :type units_path: str
+        :raise IOError: on I/O errors
+        :raise ValueError: json decoding errors
+        """
+        self.previous = {}
+        for unit in read_units(units_path):
+            self.previous[unit_key(unit)] = unit_digest(unit)
+        UnitWriter.__init__(self, path)
+
+    def add_published(self, unit):
+        """
+        Add the published unit to the delta when it has been
+        added or updated since previously published.
+        :param unit: A published content unit.
+        :type unit: dict
+        :raise IOError: on I/O errors.
+        :raise ValueError: json encoding errors
+        """
+        digest = self.previous.pop(unit_key(unit), None)
+        if digest is None:
+            self.add({ACTION: ADDED, UNIT: unit})
+            return
+        if digest != unit_digest(unit):
+            self.add({ACTION: UPDATED, UNIT: unit})
+
+    def close(self):
+        """
+        Add the units that are no longer published then close the file.
+        This method is idempotent.
+        :return: The number of entries written.
+        :rtype: int
+        """
+        if not self.closed:
+            for key in self.previous:
+                type_id, key = json.loads(key)
+                self.add({ACTION: REMOVED, UNIT: dict(type_id=type_id, unit_key=key)})
+            self.previous = {}
+        return UnitWriter.close(self)
+
+
+class UnitSorter(object):
+    """
+    Sorts units by sort key using bounded memory.  Units are sorted in memory
+    in chunks; each sorted chunk is written to a temporary file and the chunks
+    are merged when the sorter is iterated.
+    :ivar tmp_dir: The directory in which the sorted chunks are written.
+    :type tmp_dir: str
+    :ivar chunk_size: The number of units sorted in memory.
+    :type chunk_size: int
+    :ivar total_units: Tracks the total number of units added.
+    :type total_units: int
+    """
+
+    def __init__(self, tmp_dir, chunk_size=SORT_CHUNK_SIZE):
+        """
+        :param tmp_dir: The directory in which the sorted chunks are written.
+        :type tmp_dir: str
+        :param chunk_size: The number of units sorted in memory.
+        :type chunk_size: int
+        """
+        self.tmp_dir = tmp_dir
+        self.chunk_size = chunk_size
+        self.total_units = 0
+        self.chunk = []
+        self.paths = []
+
+    def add(self, unit):
+        """
+        Add the specified unit.
+        :param unit: A content unit.
+        :type unit: dict
+        :raise IOError: on I/O errors.
+        :raise ValueError: json encoding errors
+        """
+        key = sort_key(unit)
+        # json encoding escapes tabs and newlines
+        self.chunk.append((key, '%s\t%s\n' % (json.dumps(key), json.dumps(unit))))
+        self.total_units += 1
+        if len(self.chunk) >= self.chunk_size:
+            self._write_chunk()
+
+    def close(self):
+        """
+        Delete the sorted chunks.  This method is idempotent.
+        """
+        self.chunk = []
+        for path in self.paths:
+            try:
+                os.unlink(path)
+            except OSError, e:
+                if e.errno != errno.ENOENT:
+                    raise
+        self.paths = []
+
+    def _write_chunk(self):
+        """
+        Sort the units in memory and write them to a temporary file.
+        """
+        self.chunk.sort()
+        fd, path = mkstemp(prefix='.sort-', dir=self.tmp_dir)
+        self.paths.append(path)
+        with os.fdopen(fd, 'w') as fp:
+            for key, line in self.chunk:
+                fp.write(line)
+        self.chunk = []
+
+    @staticmethod
+    def _read_chunk(fp):
+        """
+        Read a sorted chunk.
+        :param fp: An open chunk file.
+        :type fp: file
+        :return: A generator of (sort key, line).
+        :rtype: generator
+        """
+        for line in fp:
+            yield json.loads(line.split('\t', 1)[0]), line
+
+    def __iter__(self):
+        self.chunk.sort()
+        files = [open(path) for path in self.paths]
+        try:
+            chunks = [self._read_chunk(fp) for fp in files]
+            for key, line in heapq.merge(self.chunk, *chunks):
+                yield json.loads(line.split('\t', 1)[1])
+        finally:
+            for fp in files:
+                fp.close()
+
+    def __len__(self):
+        return self.total_units
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *unused):
+        self.close()
+        return False
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
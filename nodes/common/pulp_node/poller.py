@@ -39,23 +39,32 @@ class PollingFailed(Exception):
 class TaskPoller(object):
     """
     The task poller is used to poll a running task by ID.
+    Once the server has reported the task's revision, each poll waits on the
+    server for the task's state or progress to change instead of sleeping.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
     :ivar delay: The delay in seconds between each poll.
     :type delay: int
+    :ivar wait: The maximum seconds the server waits for the task to change.
+        Polls without waiting on the server when 0.
+    :type wait: int
     """
 
     DELAY = 1
+    WAIT = 5
 
-    def __init__(self, binding, delay=DELAY):
+    def __init__(self, binding, delay=DELAY, wait=WAIT):
         """
         :param binding: A pulp API binding.
         :type binding: pulp_node.handlers.model.PulpBinding
         :param delay: The delay in seconds between each poll.
         :type delay: int
+        :param wait: The maximum seconds the server waits for the task to change.
+        :type wait: int
         """
         self.binding = binding
         self.delay = delay
+        self.wait = wait
 
     def join(self, task_id, progress, cancelled):
         """
@@ -74,20 +83,25 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        revision = None
 
         while poll:
             if cancelled():
                 poll = False
                 continue
 
-            sleep(self.delay)
-
-            http = self.binding.tasks.get_task(task_id)
+            if revision is None or not self.wait:
+                # servers that do not report revisions are polled periodically
+                sleep(self.delay)
+                http = self.binding.tasks.get_task(task_id)
+            else:
+                http = self.binding.tasks.wait_for_task(task_id, revision, self.wait)
             if http.response_code != httplib.OK:
                 msg = FETCH_TASK_FAILED % {'t': task_id, 'c': http.response_code}
                 raise PollingFailed(msg)
 
             task = http.response_body
+            revision = task.revision
 
             if task.state == CALL_ERROR_STATE:
                 msg = TASK_FAILED % {'t': task_id, 's': task.state}
@@ -25,7 +25,8 @@ from pulp.client.commands.repo.cudl import ListRepositoriesCommand
 from pulp_node import constants
 from pulp_node.extension import missing_resources, node_activated, repository_enabled, ensure_node_section
 from pulp_node.extensions.admin import sync_schedules
-from pulp_node.extensions.admin.options import NODE_ID_OPTION, MAX_BANDWIDTH_OPTION, MAX_CONCURRENCY_OPTION
+from pulp_node.extensions.admin.options import (NODE_ID_OPTION, MAX_BANDWIDTH_OPTION,
+    MAX_CONCURRENCY_OPTION, MAX_SYNC_CONCURRENCY_OPTION)
 from pulp_node.extensions.admin.rendering import ProgressTracker, UpdateRenderer
 
 
@@ -492,16 +493,19 @@ class NodeUpdateCommand(PollingCommand):
         self.add_option(NODE_ID_OPTION)
         self.add_option(MAX_CONCURRENCY_OPTION)
         self.add_option(MAX_BANDWIDTH_OPTION)
+        self.add_option(MAX_SYNC_CONCURRENCY_OPTION)
         self.tracker = ProgressTracker(self.context.prompt)
 
     def run(self, **kwargs):
         node_id = kwargs[NODE_ID_OPTION.keyword]
         max_bandwidth = kwargs[MAX_BANDWIDTH_OPTION.keyword]
         max_concurrency = kwargs[MAX_CONCURRENCY_OPTION.keyword]
+        max_sync_concurrency = kwargs[MAX_SYNC_CONCURRENCY_OPTION.keyword]
         units = [dict(type_id='node', unit_key=None)]
         options = {
             constants.MAX_DOWNLOAD_BANDWIDTH_KEYWORD: max_bandwidth,
             constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD: max_concurrency,
+            constants.MAX_SYNC_CONCURRENCY_KEYWORD: max_sync_concurrency,
         }
 
         if not node_activated(self.context, node_id):
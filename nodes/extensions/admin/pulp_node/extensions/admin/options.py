@@ -26,6 +26,7 @@ from pulp.client.parsers import pulp_parse_optional_positive_int
 
 MAX_BANDWIDTH_DESC = _('maximum bandwidth used per download in bytes/sec')
 MAX_CONCURRENCY_DESC = _('maximum number of downloads permitted to run concurrently')
+MAX_SYNC_CONCURRENCY_DESC = _('maximum number of repositories synchronized concurrently')
 
 
 # --- options ----------------------------------------------------------------
@@ -39,3 +40,7 @@ MAX_BANDWIDTH_OPTION = PulpCliOption(
 MAX_CONCURRENCY_OPTION = PulpCliOption(
     '--max-downloads', MAX_CONCURRENCY_DESC, required=False,
     parse_func=pulp_parse_optional_positive_int)
+
+MAX_SYNC_CONCURRENCY_OPTION = PulpCliOption(
+    '--max-concurrent-repos', MAX_SYNC_CONCURRENCY_DESC, required=False,
+    parse_func=pulp_parse_optional_positive_int)
@@ -10,6 +10,9 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import errno
+import shutil
+import hashlib
 import tarfile
 
 from uuid import uuid4
@@ -18,12 +21,17 @@ from logging import getLogger
 
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter
+from pulp_node.manifest import (Manifest, UnitWriter, UnitSorter, DeltaWriter, read_units,
+    sort_key, MANIFEST_FILE_NAME, DELTA_FILE_NAME, DELTA_FILE_PATTERN, PATH)
 
 
 log = getLogger(__name__)
 
 
+# The names of the two trees alternately committed for a repository.
+TREE_NAMES = ('a', 'b')
+
+
 # --- utils --------------------------------------------------------
 
 def tar_path(path):
@@ -57,6 +65,68 @@ def tar_dir(dir_path, tar_path, bufsize=65535):
         tb.close()
 
 
+def dir_signature(dir_path):
+    """
+    Get a signature of the directory at the specified path used to detect
+    changes to the files it contains.  The signature is a digest of the path,
+    size and modification time of each file and directory in the tree.
+    :param dir_path: The absolute path to a directory.
+    :type dir_path: str
+    :return: The signature.
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for name in [root] + sorted(files):
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            digest.update('%s\0%d\0%d\0' % (path, st.st_size, int(st.st_mtime)))
+    return digest.hexdigest()
+
+
+def published_path(unit):
+    """
+    Get the path of the link or tarball published for the unit.
+    :param unit: A published content unit.
+    :type unit: dict
+    :return: The path relative to the repository publishing directory or None
+        when no file is associated with the unit.
+    :rtype: str
+    """
+    if not unit.get(constants.STORAGE_PATH):
+        return None
+    return unit.get(constants.TARBALL_PATH) or unit.get(constants.RELATIVE_PATH)
+
+
+def link_tree(src_dir, dst_dir, excluded=()):
+    """
+    Populate a directory with the entries of another directory tree.
+    Regular files are hard linked and symlinks are copied so that the tree
+    is reproduced without copying file content.
+    :param src_dir: The absolute path to the source directory.
+    :type src_dir: str
+    :param dst_dir: The absolute path to the target directory.
+    :type dst_dir: str
+    :param excluded: The paths relative to the source directory to be skipped.
+    :type excluded: collection
+    """
+    for root, dirs, files in os.walk(src_dir):
+        # symlinks to directories are not followed
+        names = files + [d for d in dirs if os.path.islink(os.path.join(root, d))]
+        for name in names:
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, src_dir)
+            if relative_path in excluded:
+                continue
+            target = pathlib.join(dst_dir, relative_path)
+            pathlib.mkdir(os.path.dirname(target))
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), target)
+            else:
+                os.link(path, target)
+
+
 # --- publisher ----------------------------------------------------
 
 
@@ -96,6 +166,11 @@ class FilePublisher(Publisher):
     :type tmp_dir: str
     :ivar staged: A flag indicating that publishing has been staged and needs commit.
     :type staged: bool
+    :ivar stale: The relative paths of links and tarballs in the committed
+        tree that are not carried into the new tree on commit.
+    :type stale: list
+    :ivar deltas: The names of the delta files in the published chain.
+    :type deltas: list
     """
 
     def __init__(self, publish_dir, repo_id):
@@ -109,13 +184,17 @@ class FilePublisher(Publisher):
         self.repo_id = repo_id
         self.tmp_dir = None
         self.staged = False
+        self.stale = []
+        self.deltas = []
 
     def publish(self, units):
         """
         Publish the specified units.
-        Writes the units.json file and symlinks each of the files associated
-        to the unit.storage_path.  Publishing is staged in a temporary directory and
-        must use commit() to make the publishing permanent.
+        Writes the units.json file sorted by unit key and symlinks each of the
+        files associated to the unit.storage_path.  Publishing is incremental:
+        the units are compared to the units in the committed tree and only links
+        and tarballs that have changed are staged in a temporary directory.
+        Publishing must use commit() to make the publishing permanent.
         :param units: A list of units to publish.
         :type units: iterable
         :return: The absolute path to the manifest.
@@ -123,55 +202,261 @@ class FilePublisher(Publisher):
         """
         pathlib.mkdir(self.publish_dir)
         self.tmp_dir = mkdtemp(dir=self.publish_dir)
-        with UnitWriter(self.tmp_dir) as writer:
-            for unit in units:
-                self.publish_unit(unit)
-                writer.add(unit)
+        self.stale = []
         manifest_id = str(uuid4())
         manifest = Manifest(self.tmp_dir, manifest_id)
-        manifest.units_published(writer)
+        previous = self.published_manifest()
+        delta_writer = None
+        if previous is not None:
+            manifest.generation = previous.generation + 1
+            manifest.deltas = self.retained_deltas(previous)
+            delta_path = pathlib.join(self.tmp_dir, DELTA_FILE_NAME % manifest.generation)
+            delta_writer = DeltaWriter(delta_path, previous.units_path())
+        else:
+            manifest.generation = 1
+        with UnitSorter(self.tmp_dir) as sorter:
+            for unit in units:
+                sorter.add(unit)
+            with UnitSorter(self.tmp_dir) as published_sorter:
+                published_units = self.published_units(previous, published_sorter)
+                published = self._next_published(published_units)
+                with UnitWriter(self.tmp_dir) as writer:
+                    for unit in sorter:
+                        key = sort_key(unit)
+                        while published is not None and published[0] < key:
+                            self.unpublish_unit(published[1])
+                            published = self._next_published(published_units)
+                        previous_unit = None
+                        if published is not None and published[0] == key:
+                            previous_unit = published[1]
+                            published = self._next_published(published_units)
+                        self.publish_unit(unit, previous_unit)
+                        if previous_unit is not None and \
+                                published_path(previous_unit) != published_path(unit):
+                            self.unpublish_unit(previous_unit)
+                        writer.add(unit)
+                        if delta_writer is not None:
+                            delta_writer.add_published(unit)
+                while published is not None:
+                    self.unpublish_unit(published[1])
+                    published = self._next_published(published_units)
+        if self.stale:
+            # keep paths that are still published by another unit
+            stale = set(self.stale)
+            for unit in read_units(writer.path):
+                stale.discard(published_path(unit))
+            self.stale = list(stale)
+        manifest.units_published(writer, sorted_units=True)
+        if delta_writer is not None:
+            delta_writer.close()
+            manifest.delta_published(previous.id, delta_writer)
         manifest.write()
+        self.deltas = [d[PATH] for d in manifest.deltas]
         self.staged = True
         return manifest.path
 
-    def publish_unit(self, unit):
+    def published_manifest(self):
+        """
+        Get the manifest of the currently published units.
+        :return: The published manifest or None when nothing (valid) is published.
+        :rtype: Manifest
+        """
+        path = pathlib.join(self.publish_dir, self.repo_id, MANIFEST_FILE_NAME)
+        manifest = Manifest(path)
+        try:
+            manifest.read()
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                log.exception(path)
+            return None
+        except ValueError:
+            # json decoding failed
+            log.exception(path)
+            return None
+        if not manifest.is_valid() or not manifest.has_valid_units():
+            return None
+        return manifest
+
+    def published_units(self, manifest, sorter):
+        """
+        Get the units in the committed tree sorted by unit key.
+        :param manifest: The published manifest.
+        :type manifest: Manifest
+        :param sorter: A sorter used when the published units are not sorted.
+        :type sorter: UnitSorter
+        :return: An iterator of published units sorted by unit key.
+        :rtype: iterator
+        """
+        if manifest is None:
+            return iter([])
+        units = read_units(manifest.units_path())
+        if manifest.units_sorted():
+            return units
+        for unit in units:
+            sorter.add(unit)
+        return iter(sorter)
+
+    @staticmethod
+    def _next_published(published_units):
+        try:
+            unit = published_units.next()
+        except StopIteration:
+            return None
+        return sort_key(unit), unit
+
+    def retained_deltas(self, manifest):
+        """
+        Get the chain of deltas of the published manifest that remain available
+        to children that have not yet applied the published generation.  The
+        chain is truncated at the most recent missing delta file.
+        :param manifest: The published manifest.
+        :type manifest: Manifest
+        :return: The retained chain of deltas, oldest first.
+        :rtype: list
+        """
+        dir_path = os.path.dirname(manifest.path)
+        retained = []
+        for delta in reversed(manifest.deltas):
+            path = pathlib.join(dir_path, delta[PATH])
+            if not os.path.isfile(path):
+                break
+            retained.insert(0, delta)
+        return retained
+
+    def publish_unit(self, unit, published_unit=None):
         """
         Publish the file associated with the unit into the publish directory.
+        A link or tarball is staged only when the one in the committed tree
+        is missing or out of date.  Tarballs are rebuilt only when the signature
+        of the directory has changed since it was published.
         :param unit: A content unit.
         :type unit: dict
+        :param published_unit: The same unit as published in the committed tree.
+        :type published_unit: dict
         """
         storage_path = unit.get(constants.STORAGE_PATH)
         if not storage_path:
             # not all units have associated files.
-            return unit, None
+            return
         relative_path = unit[constants.RELATIVE_PATH]
-        published_path = pathlib.join(self.tmp_dir, relative_path)
-        pathlib.mkdir(os.path.dirname(published_path))
+        published_path = pathlib.join(self.publish_dir, self.repo_id, relative_path)
         unit[constants.FILE_SIZE] = os.path.getsize(storage_path)
         if os.path.isdir(storage_path):
-            tar_dir(storage_path, tar_path(published_path))
+            signature = dir_signature(storage_path)
             unit[constants.TARBALL_PATH] = tar_path(relative_path)
+            unit[constants.TARBALL_SIGNATURE] = signature
+            if published_unit is not None and \
+                    published_unit.get(constants.TARBALL_PATH) == unit[constants.TARBALL_PATH] and \
+                    published_unit.get(constants.TARBALL_SIGNATURE) == signature and \
+                    os.path.isfile(tar_path(published_path)):
+                return
+            staged_path = pathlib.join(self.tmp_dir, relative_path)
+            pathlib.mkdir(os.path.dirname(staged_path))
+            tar_dir(storage_path, tar_path(staged_path))
         else:
-            os.symlink(storage_path, published_path)
+            if os.path.islink(published_path) and os.readlink(published_path) == storage_path:
+                return
+            staged_path = pathlib.join(self.tmp_dir, relative_path)
+            pathlib.mkdir(os.path.dirname(staged_path))
+            os.symlink(storage_path, staged_path)
+
+    def unpublish_unit(self, published_unit):
+        """
+        Schedule the removal of the link or tarball of a unit
+        in the committed tree that is no longer published.
+        :param published_unit: A unit as published in the committed tree.
+        :type published_unit: dict
+        """
+        path = published_path(published_unit)
+        if path:
+            self.stale.append(path)
+
+    def trees_dir(self):
+        """
+        Get the directory containing the committed trees of the repository.
+        The repository publishing directory is a symlink to one of them.
+        :return: The absolute path to the directory.
+        :rtype: str
+        """
+        return pathlib.join(self.publish_dir, '.%s' % self.repo_id)
 
     def commit(self):
         """
         Commit publishing.
-        Move the tmp_dir to the publish_dir.
+        A complete tree is built next to the committed tree: the entries of the
+        committed tree that are neither stale nor replaced are hard linked into it
+        and the staged links, tarballs, units, delta and manifest files are moved
+        in.  The repository publishing directory (a symlink) is then switched to
+        the new tree with a single rename.  The previously committed tree is kept
+        until the next commit so that children still fetching from it are not
+        disrupted.
         """
         if not self.staged:
             # nothing to commit
             return
         dir_path = pathlib.join(self.publish_dir, self.repo_id)
-        os.system('rm -rf %s' % dir_path)
-        os.rename(self.tmp_dir, dir_path)
+        trees_dir = self.trees_dir()
+        current = None
+        if os.path.islink(dir_path):
+            current = os.path.basename(os.readlink(dir_path))
+        if current == TREE_NAMES[0]:
+            tree_name = TREE_NAMES[1]
+        else:
+            tree_name = TREE_NAMES[0]
+        tree_path = pathlib.join(trees_dir, tree_name)
+        shutil.rmtree(tree_path, ignore_errors=True)
+        pathlib.mkdir(tree_path)
+        staged = []
+        for root, dirs, files in os.walk(self.tmp_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                staged.append(os.path.relpath(path, self.tmp_dir))
+        if os.path.isdir(dir_path):
+            excluded = set([os.path.normpath(p.lstrip('/')) for p in self.stale])
+            excluded.update(staged)
+            for name in os.listdir(dir_path):
+                if DELTA_FILE_PATTERN.match(name) and name not in self.deltas:
+                    excluded.add(name)
+            link_tree(dir_path, tree_path, excluded)
+        for relative_path in staged:
+            path = pathlib.join(tree_path, relative_path)
+            pathlib.mkdir(os.path.dirname(path))
+            os.rename(pathlib.join(self.tmp_dir, relative_path), path)
+        self._switch(dir_path, tree_name)
+        # only the (emptied) staging directories remain
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
         self.staged = False
 
+    def _switch(self, dir_path, tree_name):
+        """
+        Atomically make the repository publishing directory a symlink to
+        the named tree.  A directory published by an older version of this
+        publisher is a real directory, which is replaced.
+        :param dir_path: The absolute path to the repository publishing directory.
+        :type dir_path: str
+        :param tree_name: The name of the committed tree.
+        :type tree_name: str
+        """
+        target = os.path.join(os.path.basename(self.trees_dir()), tree_name)
+        new_path = pathlib.join(self.publish_dir, '.%s.new' % self.repo_id)
+        if os.path.lexists(new_path):
+            os.unlink(new_path)
+        os.symlink(target, new_path)
+        if os.path.isdir(dir_path) and not os.path.islink(dir_path):
+            old_path = pathlib.join(self.publish_dir, '.%s.old' % self.repo_id)
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(dir_path, old_path)
+            os.rename(new_path, dir_path)
+            shutil.rmtree(old_path)
+        else:
+            os.rename(new_path, dir_path)
+
     def unstage(self):
         """
         Un-stage publishing.
         """
-        os.system('rm -rf %s' % self.tmp_dir)
+        if self.tmp_dir:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
         self.staged = False
 
     def __enter__(self):
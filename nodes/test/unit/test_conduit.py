@@ -9,7 +9,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
-from mock import Mock
+from mock import Mock, patch
 from base import ServerTests
 from operator import itemgetter
 
@@ -122,4 +122,29 @@ class QueryTests(ServerTests):
             unit_key = u['unit_key']
             self.assertEqual(unit_key['N'], n)
             self.assertEqual(u['storage_path'], create_storage_path(unit_id))
-            n += 1
\ No newline at end of file
+            n += 1
+    def test_query_sorted(self):
+        num_units = 5
+        units_created = populate(num_units)
+        conduit = NodesConduit()
+        units = conduit.get_units(REPO_ID, sort=True)
+        self.assertEqual(len(units), len(units_created))
+        unit_list = list(units)
+        self.assertEqual(len(unit_list), len(units_created))
+        keys = [(u['type_id'], u['unit_key']['N']) for u in unit_list]
+        self.assertEqual(keys, sorted(keys))
+        for u in unit_list:
+            unit_id = u['unit_id']
+            self.assertEqual(unit_id, create_unit_id(u['type_id'], u['unit_key']['N']))
+            self.assertEqual(u['storage_path'], create_storage_path(unit_id))
+            self.assertEqual(u['metadata'], {})
+
+    @patch('pulp_node.conduit.SORT_BATCH_SIZE', 3)
+    def test_query_sorted_batches(self):
+        num_units = 5
+        units_created = populate(num_units)
+        conduit = NodesConduit()
+        unit_list = list(conduit.get_units(REPO_ID, sort=True))
+        self.assertEqual(len(unit_list), len(units_created))
+        keys = [(u['type_id'], u['unit_key']['N']) for u in unit_list]
+        self.assertEqual(keys, sorted(keys))
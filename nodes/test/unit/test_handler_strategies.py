@@ -150,6 +150,22 @@ class TestBase(TestCase):
         self.assertEqual(request.summary.errors[0].error_id, RepoSyncRestError.ERROR_ID)
         self.assertEqual(request.summary.errors[0].details['http_code'], 401)
 
+    @patch('pulp_node.handlers.model.Repository.fetch', side_effect=ValueError())
+    def test_merge_repositories_concurrent(self, *unused):
+        # Setup
+        repo_ids = ['repo_%d' % n for n in range(5)]
+        request = self.request()
+        request.bindings = [dict(repo_id=r, details={}) for r in repo_ids]
+        request.summary.setup(request.bindings)
+        request.options[constants.MAX_SYNC_CONCURRENCY_KEYWORD] = 3
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertEqual(len(request.summary.errors), len(repo_ids))
+        failed = sorted(e.details['repo_id'] for e in request.summary.errors)
+        self.assertEqual(failed, repo_ids)
+
     @patch('pulp_node.handlers.model.Repository.fetch_all', return_value=[TestRepo(123)])
     @patch('pulp_node.handlers.model.Repository.delete', side_effect=ValueError())
     def test_delete_repositories_exception(self, *unused):
@@ -24,7 +24,8 @@ from pulp.plugins.model import Unit
 from pulp.server.config import config as pulp_conf
 
 from pulp_node.importers.strategies import *
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, StreamingUnitInventory
+from pulp_node.manifest import UnitWriter, UnitIterator, UnitSorter
 from pulp_node.importers.reports import SummaryReport, ProgressListener
 from pulp_node.reports import RepositoryProgress
 from pulp_node.error import *
@@ -40,7 +41,9 @@ class TestConduit:
         ]
 
     save_unit = Mock()
+    save_units = Mock()
     remove_unit = Mock()
+    remove_units = Mock()
     set_progress = Mock()
 
 
@@ -165,16 +168,37 @@ class TestBase(TestCase):
 
     @patch('pulp_node.importers.strategies.ImporterStrategy._unit_inventory')
     @patch('test_importer_strategies.TestConduit.save_unit', ValueError())
+    @patch('test_importer_strategies.TestConduit.save_units', ValueError())
     def test_add_unit_exception(self, *unused):
         # Setup
         request = self.request()
         # Test
-        unit = dict(unit_id='abc', type_id='T', unit_key={}, metadata={})
+        unit = dict(unit_id='abc', type_id='T', unit_key={}, metadata={}, storage_path=None)
         strategy = ImporterStrategy()
         strategy.add_unit(request, unit)
+        strategy.flush_units(request)
         self.assertEqual(len(request.summary.errors), 1)
         self.assertEqual(request.summary.errors[0].error_id, AddUnitError.ERROR_ID)
 
+    @patch('pulp_node.importers.strategies.UNIT_BATCH_SIZE', 2)
+    def test_add_units_batched(self):
+        # Setup
+        request = self.request()
+        request.conduit.save_unit = Mock()
+        request.conduit.save_units = Mock()
+        units = [dict(unit_id=n, type_id='T', unit_key={'n': n}, metadata={}, storage_path=None)
+                 for n in range(3)]
+        # Test
+        strategy = ImporterStrategy()
+        for unit in units:
+            strategy.add_unit(request, unit)
+        strategy.flush_units(request)
+        # Verify
+        calls = request.conduit.save_units.call_args_list
+        self.assertEqual([[u.unit_key['n'] for u in c[0][0]] for c in calls], [[0, 1], [2]])
+        self.assertFalse(request.conduit.save_unit.called)
+        self.assertEqual(len(request.summary.errors), 0)
+
     @patch('pulp_node.importers.strategies.ImporterStrategy._unit_inventory')
     @patch('test_importer_strategies.TestConduit.remove_unit', ValueError())
     def test_delete_units_exception(self, *unused):
@@ -234,11 +258,13 @@ class TestBase(TestCase):
         unit = dict(unit_id='abc', type_id='T', unit_key={}, metadata={})
         inventory = UnitInventory(BASE_URL, [], [unit])
         request.conduit.remove_unit = Mock()
+        request.conduit.remove_units = Mock()
         # Test
         strategy = ImporterStrategy()
         strategy._delete_units(request, inventory)
         self.assertEqual(request.cancelled_call_count, 1)
-        request.conduit.remove_unit.assert_not_called()
+        self.assertFalse(request.conduit.remove_unit.called)
+        self.assertFalse(request.conduit.remove_units.called)
 
     def test_cancel_just_before_downloading(self):
         # Setup
@@ -356,3 +382,52 @@ class TestBase(TestCase):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
         self.assertRaises(StrategyUnsupported, find_strategy, '---')
+
+
+class TestStreamingInventory(TestBase):
+
+    def parent_units(self, units):
+        path = os.path.join(self.tmp_dir, 'units.json')
+        with UnitSorter(self.tmp_dir, chunk_size=2) as sorter:
+            for unit in units:
+                sorter.add(unit)
+            with UnitWriter(path, compressed=False) as writer:
+                for unit in sorter:
+                    writer.add(unit)
+        return UnitIterator(path, len(units))
+
+    def child_units(self, units, sorter):
+        for unit in units:
+            sorter.add(unit)
+        return sorter
+
+    def test_inventory(self):
+        # Setup
+        parent = [
+            dict(type_id='T', unit_key={'n': n}, last_updated=1, metadata={}) for n in range(0, 6)]
+        child = [
+            dict(type_id='T', unit_key={'n': n}, last_updated=0, metadata={}) for n in range(3, 9)]
+        child[0]['last_updated'] = 1
+        child[1]['last_updated'] = 2
+        # Test
+        with UnitSorter(self.tmp_dir, chunk_size=2) as sorter:
+            inventory = StreamingUnitInventory(
+                BASE_URL,
+                self.parent_units(parent[::-1]),
+                self.child_units(child[::-1], sorter),
+                self.tmp_dir)
+        try:
+            parent_only = [u['unit_key']['n'] for u, r in inventory.units_on_parent_only()]
+            child_only = [u['unit_key']['n'] for u in inventory.units_on_child_only()]
+            updated = [r.fetch()['unit_key']['n'] for u, r in inventory.updated_units()]
+            # Verify
+            self.assertEqual(len(inventory.units_on_parent_only()), 3)
+            self.assertEqual(parent_only, [0, 1, 2])
+            self.assertEqual(len(inventory.units_on_child_only()), 3)
+            self.assertEqual(child_only, [6, 7, 8])
+            self.assertEqual(updated, [5])
+            self.assertTrue(os.path.isdir(inventory.tmp_dir))
+        finally:
+            inventory.close()
+        self.assertFalse(os.path.exists(inventory.tmp_dir))
+        self.assertEqual(os.listdir(self.tmp_dir), ['units.json'])
@@ -131,4 +131,70 @@ class TestManifest(TestCase):
             units_in.append(unit)
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
-        self.verify(units, units_in)
\ No newline at end of file
+        self.verify(units, units_in)
+    def test_delta_writer(self):
+        # Setup
+        units = []
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={'n': i})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        writer = UnitWriter(units_path)
+        for u in units:
+            writer.add(u)
+        writer.close()
+        # Test
+        delta_path = os.path.join(self.tmp_dir, DELTA_FILE_NAME % 2)
+        writer = DeltaWriter(delta_path, units_path)
+        units[1]['updated'] = True
+        for u in units[1:]:
+            writer.add_published(u)
+        writer.add_published(dict(unit_id=100, type_id='T', unit_key={'n': 100}))
+        writer.close()
+        # Verify
+        entries = list(read_units(delta_path))
+        self.assertEqual(writer.total_units, 3)
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[0], {ACTION: UPDATED, UNIT: units[1]})
+        self.assertEqual(entries[1][ACTION], ADDED)
+        self.assertEqual(entries[1][UNIT]['unit_key'], {'n': 100})
+        self.assertEqual(entries[2], {ACTION: REMOVED, UNIT: dict(type_id='T', unit_key={'n': 0})})
+
+    def test_delta_chain(self):
+        applied = Manifest(self.tmp_dir, 'A')
+        applied.generation = 3
+        manifest = Manifest(self.tmp_dir, 'C')
+        manifest.generation = 5
+        manifest.deltas = [
+            {GENERATION: 3, DELTA_BASE: 'Z'},
+            {GENERATION: 4, DELTA_BASE: 'A'},
+            {GENERATION: 5, DELTA_BASE: 'B'},
+        ]
+        # Test
+        chain = manifest.delta_chain(applied)
+        # Verify
+        self.assertEqual([d[GENERATION] for d in chain], [4, 5])
+        # broken chain
+        applied.id = 'X'
+        self.assertEqual(manifest.delta_chain(applied), None)
+        applied.id = 'A'
+        applied.generation = 1
+        self.assertEqual(manifest.delta_chain(applied), None)
+
+    def test_sorter(self):
+        # Setup
+        units = []
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={'n': 'unit\t%d' % i})
+            units.append(unit)
+        # Test
+        with UnitSorter(self.tmp_dir, chunk_size=3) as sorter:
+            for u in reversed(units):
+                sorter.add(u)
+            sorted_units = list(sorter)
+            paths = sorter.paths
+        # Verify
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(len(sorted_units), self.NUM_UNITS)
+        self.verify(sorted_units, units)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
@@ -21,7 +21,7 @@ from nectar.config import DownloaderConfig
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import RemoteManifest
+from pulp_node.manifest import Manifest, RemoteManifest, DELTA_FILE_NAME
 
 
 class TestHttp(TestCase):
@@ -154,3 +154,191 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_publish_delta(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        conf = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(conf)
+        url = pathlib.url_join(base_url, p.manifest_path())
+        applied = RemoteManifest(url, downloader, working_dir)
+        applied.fetch()
+        applied.write()
+        applied.fetch_units()
+        applied_units = [u for u, r in applied.get_units()]
+        # test
+        units = units[1:]
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        applied_deltas = manifest.fetch_deltas(applied)
+        # verify
+        self.assertEqual(manifest.generation, 2)
+        self.assertEqual(len(manifest.deltas), 1)
+        path = pathlib.join(publish_dir, repo_id, DELTA_FILE_NAME % 2)
+        self.assertTrue(os.path.isfile(path))
+        self.assertTrue(applied_deltas)
+        self.assertTrue(manifest.has_valid_units())
+        units_in = [u for u, r in manifest.get_units()]
+        self.assertEqual(units_in, applied_units[1:])
+        stored = Manifest(working_dir)
+        stored.read()
+        self.assertEqual(stored.id, manifest.id)
+        self.assertEqual(stored.generation, 2)
+
+    def test_publish_delta_chain_broken(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        conf = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(conf)
+        url = pathlib.url_join(base_url, p.manifest_path())
+        applied = RemoteManifest(url, downloader, working_dir)
+        applied.fetch()
+        applied.write()
+        applied.fetch_units()
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        os.unlink(pathlib.join(publish_dir, repo_id, DELTA_FILE_NAME % 2))
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        # verify
+        self.assertEqual(manifest.generation, 3)
+        self.assertEqual(len(manifest.deltas), 1)
+        self.assertFalse(manifest.fetch_deltas(applied))
+
+    def test_publish_incremental(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        repo_dir = os.path.join(publish_dir, repo_id)
+        tar_path = os.path.join(repo_dir, units[0]['relative_path'] + '.TGZ')
+        link_path = os.path.join(repo_dir, units[1]['relative_path'])
+        removed_path = os.path.join(repo_dir, units[2]['relative_path'])
+        tar_inode = os.stat(tar_path).st_ino
+        link_target = os.readlink(link_path)
+        committed_tree = os.path.realpath(repo_dir)
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units[:2]])
+            p.commit()
+        # verify
+        self.assertEqual(os.stat(tar_path).st_ino, tar_inode)
+        self.assertEqual(os.readlink(link_path), link_target)
+        self.assertFalse(os.path.lexists(removed_path))
+        # the previously committed tree is left intact
+        self.assertNotEqual(os.path.realpath(repo_dir), committed_tree)
+        self.assertTrue(os.path.lexists(
+            os.path.join(committed_tree, units[2]['relative_path'])))
+        self.assertEqual(p.stale, [units[2]['relative_path']])
+        self.assertFalse(os.path.exists(p.tmp_dir))
+        manifest = Manifest(repo_dir)
+        manifest.read()
+        self.assertEqual(manifest.units['total'], 2)
+        self.assertEqual(manifest.generation, 2)
+
+    def test_commit_switches_tree(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        repo_dir = os.path.join(publish_dir, repo_id)
+        # test
+        trees = []
+        for n in range(3):
+            with HttpPublisher(base_url, virtual_host, repo_id) as p:
+                p.publish([dict(u) for u in units])
+                p.commit()
+            trees.append(os.readlink(repo_dir))
+        # verify
+        self.assertEqual(trees, ['.test_repo/a', '.test_repo/b', '.test_repo/a'])
+        manifest = Manifest(repo_dir)
+        manifest.read()
+        self.assertEqual(manifest.generation, 3)
+        self.assertEqual(sorted(os.listdir(publish_dir)), ['.test_repo', 'test_repo'])
+
+    def test_commit_replaces_directory(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        repo_dir = os.path.join(publish_dir, repo_id)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        # published by an older version: a real directory
+        tree = os.path.realpath(repo_dir)
+        os.unlink(repo_dir)
+        os.rename(tree, repo_dir)
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        # verify
+        self.assertTrue(os.path.islink(repo_dir))
+        link_path = os.path.join(repo_dir, units[1]['relative_path'])
+        self.assertEqual(os.readlink(link_path), units[1]['storage_path'])
+        manifest = Manifest(repo_dir)
+        manifest.read()
+        self.assertEqual(manifest.generation, 2)
+        self.assertEqual(sorted(os.listdir(publish_dir)), ['.test_repo', 'test_repo'])
+
+    def test_publish_tarball_changed(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        tar_path = os.path.join(publish_dir, repo_id, units[0]['relative_path'] + '.TGZ')
+        with open(os.path.join(units[0]['storage_path'], 'added.rpm'), 'w') as fp:
+            fp.write('added')
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish([dict(u) for u in units])
+            p.commit()
+        # verify
+        tb = tarfile.open(tar_path)
+        try:
+            files = sorted(tb.getnames())
+        finally:
+            tb.close()
+        self.assertEqual(len(files), self.NUM_TARED_FILES + 1)
+        self.assertTrue('added.rpm' in files)
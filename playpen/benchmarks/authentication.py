@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the cost of authenticating a request with a username and password.
+
+Reports the time per request of checking a password hashed with the original
+iterated HMAC scheme and with PBKDF2, both when the credential has to be
+verified and when it is found in the verified-credential cache. Requires a
+local mongod, the user is written to a scratch database that is dropped
+afterwards.
+
+ python authentication.py --requests 100
+"""
+
+import time
+from optparse import OptionParser
+
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
+from pulp.server.db import connection
+from pulp.server.db.model.auth import Permission, User
+from pulp.server.managers import factory as managers_factory
+from pulp.server.managers.auth import password
+
+
+LOGIN = 'benchmark-user'
+PASSWORD = 'benchmark-password'
+
+
+def legacy_password_entry():
+    password_manager = managers_factory.password_manager()
+    salt = password_manager.random_bytes(8)
+    hashed = password_manager.pbkdf_sha256(PASSWORD, salt, password.NUM_ITERATIONS)
+    return salt.encode('base64').strip() + ',' + hashed.encode('base64').strip()
+
+
+def time_requests(num_requests, password_entry, cached):
+    authentication_manager = managers_factory.authentication_manager()
+    collection = User.get_collection()
+    start = time.time()
+    for i in range(num_requests):
+        if not cached:
+            CREDENTIAL_CACHE.invalidate()
+            # keep checking the same entry; a successful check upgrades legacy entries
+            collection.update({'login': LOGIN}, {'$set': {'password': password_entry}}, safe=True)
+        login = authentication_manager.check_username_password(LOGIN, PASSWORD)
+        assert login == LOGIN
+    return (time.time() - start) / num_requests
+
+
+def run(num_requests):
+    managers_factory.user_manager().create_user(login=LOGIN, password=PASSWORD)
+    pbkdf2_entry = User.get_collection().find_one({'login': LOGIN})['password']
+
+    print 'pbkdf2 implementation: %s' % password._pbkdf2_hmac.__name__
+    print 'requests:              %d' % num_requests
+    for name, entry in (('legacy', legacy_password_entry()), ('pbkdf2', pbkdf2_entry)):
+        uncached = time_requests(num_requests, entry, False)
+        print '%s uncached:       %.6f s/request' % (name, uncached)
+    cached = time_requests(num_requests, pbkdf2_entry, True)
+    print 'cached:                %.6f s/request' % cached
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--requests', type='int', default=100,
+                      help='number of requests to authenticate')
+    parser.add_option('--db', default='pulp_benchmark',
+                      help='scratch database name')
+    (opts, args) = parser.parse_args()
+
+    connection.initialize(name=opts.db)
+    managers_factory.initialize()
+    try:
+        run(opts.requests)
+    finally:
+        User.get_collection().drop()
+        Permission.get_collection().drop()
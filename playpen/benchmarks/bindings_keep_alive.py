@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the calls per second made through the bindings with a new
+connection per call and with keep-alive connections.
+
+The calls are made against a local stand-in for the Pulp server: an HTTPS
+server answering every GET with a small JSON document, using a self-signed
+certificate generated with the openssl command in a scratch directory. Like
+Apache's MaxKeepAliveRequests, the server closes a connection after a number
+of requests, so the keep-alive connections are reopened and resume their TLS
+sessions. The TLS handshakes and the resumed TLS sessions are counted by the
+client connections.
+
+ python bindings_keep_alive.py --calls 1000 --threads 1 --threads 4 --max-requests 100
+"""
+
+import BaseHTTPServer
+import shutil
+import socket
+import SocketServer
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from optparse import OptionParser
+
+from M2Crypto import httpslib
+
+from pulp.bindings.bindings import Bindings
+from pulp.bindings.server import PulpConnection
+
+
+class Handshakes(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def add(self, resumed):
+        self.lock.acquire()
+        try:
+            self.handshakes += 1
+            self.resumed += int(bool(resumed))
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        self.handshakes = 0
+        self.resumed = 0
+
+
+HANDSHAKES = Handshakes()
+
+
+HTTPSConnection = httpslib.HTTPSConnection
+
+
+class CountingHTTPSConnection(HTTPSConnection):
+
+    def connect(self):
+        HTTPSConnection.connect(self)
+        # a resumed TLS 1.2 session keeps its master key
+        resumed = self.session is not None and \
+            master_key(self.session) == master_key(self.sock.get_session())
+        HANDSHAKES.add(resumed)
+
+
+def master_key(session):
+    for line in session.as_text().splitlines():
+        if line.strip().startswith('Master-Key:'):
+            return line
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # write each response at once, the headers are not sent in packets of their own
+    wbufsize = -1
+    body = '{"id": "benchmark-repo", "display_name": "Benchmark", "notes": {}}'
+
+    def do_GET(self):
+        self.requests = getattr(self, 'requests', 0) + 1
+        if self.requests >= self.server.max_requests:
+            self.close_connection = 1
+        self.send_response(200)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, cert_file, max_requests):
+        BaseHTTPServer.HTTPServer.__init__(self, ('localhost', 0), Handler)
+        self.max_requests = max_requests
+        # shared, so that the TLS sessions can be resumed; TLS 1.2, so that
+        # the client can tell resumed sessions
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
+        self.ssl_context.load_cert_chain(cert_file)
+
+    def get_request(self):
+        sock, address = self.socket.accept()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, address
+
+    def process_request_thread(self, request, client_address):
+        # the handshake is made in the request thread, not the accepting one
+        try:
+            request = self.ssl_context.wrap_socket(request, server_side=True)
+        except ssl.SSLError:
+            return
+        SocketServer.ThreadingMixIn.process_request_thread(self, request, client_address)
+
+    def handle_error(self, request, client_address):
+        # connections closed without a TLS shutdown by the clients
+        pass
+
+
+def certificate(scratch_dir):
+    path = '%s/server.pem' % scratch_dir
+    subprocess.check_call(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', path, '-out', path],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return path
+
+
+def run(server, num_calls, num_threads, keep_alive):
+    connection = PulpConnection('localhost', server.server_address[1], path_prefix='',
+                                username='admin', password='admin', keep_alive=keep_alive,
+                                max_connections=num_threads)
+    bindings = Bindings(connection)
+    calls_per_thread = num_calls / num_threads
+
+    def calls():
+        for i in range(calls_per_thread):
+            bindings.repo.repository('benchmark-repo')
+
+    HANDSHAKES.reset()
+    threads = [threading.Thread(target=calls) for i in range(num_threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.time() - start
+    if keep_alive:
+        connection.server_wrapper.close()
+    return calls_per_thread * num_threads / duration, HANDSHAKES.handshakes, HANDSHAKES.resumed
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--calls', type='int', default=1000,
+                      help='number of calls made in each measurement')
+    parser.add_option('--threads', type='int', action='append',
+                      help='number of threads making the calls; may be repeated')
+    parser.add_option('--max-requests', type='int', default=100,
+                      help='number of requests after which the server closes a connection')
+    (opts, args) = parser.parse_args()
+
+    httpslib.HTTPSConnection = CountingHTTPSConnection
+    scratch_dir = tempfile.mkdtemp(prefix='bindings-keep-alive-')
+    try:
+        server = Server(certificate(scratch_dir), opts.max_requests)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        for num_threads in opts.threads or [1, 4]:
+            print 'threads: %d' % num_threads
+            for keep_alive in (False, True):
+                rate, handshakes, resumed = run(server, opts.calls, num_threads, keep_alive)
+                print '  %-22s %8.1f calls/s  (%d handshakes, %d resumed)' % (
+                    keep_alive and 'keep-alive:' or 'connection per call:', rate, handshakes, resumed)
+        server.shutdown()
+    finally:
+        shutil.rmtree(scratch_dir)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the time to publish a file repository to an HTTP and an HTTPS
+hosting location as the repository grows.
+
+For each unit count (1k and 10k by default) the repository is published with
+the copying approach the file distributor used to take (a fresh build
+directory copied to every hosting location), then with the incremental
+publish: a first publish, a republish of the same units and a republish
+after a percentage of the units has been replaced. The units are not backed
+by real files, so only the cost of the published trees is measured. Everything
+is written to a scratch directory that is removed afterwards.
+
+ python file_publish.py --units 1000 --units 10000 --changed 1
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+from pulp.plugins.file.distributor import FileDistributor
+
+
+class Repository(object):
+
+    def __init__(self, working_dir):
+        self.id = 'benchmark-repo'
+        self.working_dir = working_dir
+
+
+class Unit(object):
+
+    def __init__(self, name):
+        self.unit_key = {'name': name, 'checksum': name, 'size': 1}
+        self.storage_path = os.path.join('/var/lib/pulp/content/iso', name)
+
+
+class PublishConduit(object):
+
+    def __init__(self, units):
+        self.units = units
+
+    def get_units(self):
+        return self.units
+
+    def set_progress(self, status):
+        pass
+
+    def build_success_report(self, summary, details):
+        return summary
+
+    def build_failure_report(self, summary, details):
+        raise Exception(summary['error_message'])
+
+
+class BenchmarkDistributor(FileDistributor):
+
+    def __init__(self, hosting_locations):
+        super(BenchmarkDistributor, self).__init__()
+        self.hosting_locations = hosting_locations
+
+    def get_hosting_locations(self, repo, config):
+        return self.hosting_locations
+
+
+def copying_publish(distributor, repo, units):
+    # what publish_repo did before publishes became incremental
+    build_dir = os.path.join(repo.working_dir, 'build')
+    distributor._rmtree_if_exists(build_dir)
+    os.makedirs(build_dir)
+    distributor.initialize_metadata(build_dir)
+    try:
+        for unit in units:
+            distributor._symlink_unit(build_dir, unit, distributor.get_paths_for_unit(unit))
+            distributor.publish_metadata_for_unit(unit)
+    finally:
+        distributor.finalize_metadata()
+    for location in distributor.hosting_locations:
+        distributor._rmtree_if_exists(location)
+        shutil.copytree(build_dir, location, symlinks=True)
+    distributor._rmtree_if_exists(build_dir)
+
+
+def timed(call, *args):
+    start = time.time()
+    call(*args)
+    return time.time() - start
+
+
+def run(num_units, percent_changed):
+    scratch_dir = tempfile.mkdtemp(prefix='file-publish-')
+    try:
+        locations = [os.path.join(scratch_dir, 'http', 'repo'),
+                     os.path.join(scratch_dir, 'https', 'repo')]
+        distributor = BenchmarkDistributor(locations)
+        units = [Unit('unit-%d.iso' % i) for i in range(num_units)]
+        num_changed = num_units * percent_changed / 100
+        changed_units = units[num_changed:] + \
+            [Unit('changed-%d.iso' % i) for i in range(num_changed)]
+
+        copying_repo = Repository(os.path.join(scratch_dir, 'copying'))
+        os.makedirs(copying_repo.working_dir)
+        copying = timed(copying_publish, distributor, copying_repo, units)
+        for location in locations:
+            shutil.rmtree(location)
+
+        repo = Repository(os.path.join(scratch_dir, 'incremental'))
+        os.makedirs(repo.working_dir)
+        first = timed(distributor.publish_repo, repo, PublishConduit(units), {})
+        # the second publish fills the other tree, so it is measured on its own
+        second = timed(distributor.publish_repo, repo, PublishConduit(units), {})
+        unchanged = timed(distributor.publish_repo, repo, PublishConduit(units), {})
+        changed = timed(distributor.publish_repo, repo, PublishConduit(changed_units), {})
+
+        print 'units: %d' % num_units
+        print '  copying publish:          %.3f s' % copying
+        print '  first publish:            %.3f s' % first
+        print '  second publish:           %.3f s' % second
+        print '  republish, unchanged:     %.3f s' % unchanged
+        print '  republish, %d%% changed:    %.3f s' % (percent_changed, changed)
+    finally:
+        shutil.rmtree(scratch_dir)
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--units', type='int', action='append',
+                      help='number of units in the repository; may be repeated')
+    parser.add_option('--changed', type='int', default=1,
+                      help='percentage of the units replaced before the last republish')
+    (opts, args) = parser.parse_args()
+
+    for num_units in opts.units or [1000, 10000]:
+        run(num_units, opts.changed)
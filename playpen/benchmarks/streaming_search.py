@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the peak memory and the time to first byte of a search response as
+the number of returned units grows.
+
+For each unit count (10k and 100k by default) the response body is produced
+the way the controllers used to, reading every unit into a list and encoding
+the list as a single JSON document, and then streamed in chunks as the units
+are read. Each measurement runs in its own process so that the peak resident
+set sizes can be compared. The units are generated in memory in place of a
+database cursor, so no mongod is needed.
+
+ python streaming_search.py --units 10000 --units 100000
+"""
+
+import multiprocessing
+import resource
+import time
+from optparse import OptionParser
+
+from pulp.server.compat import json, json_util
+from pulp.server.webservices.controllers.base import _json_array_chunks
+
+
+def cursor(num_units):
+    for i in range(num_units):
+        yield {'_id': 'unit-%d' % i,
+               'name': 'package-%d' % i,
+               'version': '1.0.%d' % i,
+               'checksum': '%064x' % i,
+               'description': 'benchmark unit %d ' % i * 4,
+               'repository_memberships': ['repo-1', 'repo-2']}
+
+
+def full_body(units):
+    # what the controllers did before search results were streamed
+    yield json.dumps(list(units), default=json_util.default)
+
+
+def measure(body_method, num_units, results):
+    start = time.time()
+    first_byte = None
+    size = 0
+    for chunk in body_method(cursor(num_units)):
+        if first_byte is None:
+            first_byte = time.time() - start
+        size += len(chunk)
+    total = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((first_byte, total, peak, size))
+
+
+def run(num_units):
+    print 'units: %d' % num_units
+    for name, body_method in (('full', full_body), ('streamed', _json_array_chunks)):
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=measure, args=(body_method, num_units, results))
+        process.start()
+        first_byte, total, peak, size = results.get()
+        process.join()
+        print '  %-9s first byte: %.3f s  total: %.3f s  peak rss: %d KiB  body: %d bytes' % \
+            (name, first_byte, total, peak, size)
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--units', type='int', action='append',
+                      help='number of units returned by the search; may be repeated')
+    (opts, args) = parser.parse_args()
+
+    for num_units in opts.units or [10000, 100000]:
+        run(num_units)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the enqueue-to-start latency of the dispatch task queue.
+
+Enqueues a number of tasks (10k by default) into a running TaskQueue and
+reports the latency between each task being enqueued and the task's call
+starting to execute. Requires a local mongod, the queued calls are written to
+a scratch database that is dropped afterwards.
+
+ python taskqueue_dispatch.py --tasks 10000 --threshold 9 --workers 16
+"""
+
+import threading
+import time
+from optparse import OptionParser
+
+from pulp.server.db import connection
+from pulp.server.db.model.dispatch import QueuedCall
+from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch import pickling
+from pulp.server.dispatch.call import CallRequest
+from pulp.server.dispatch.task import Task
+from pulp.server.dispatch.taskqueue import TaskQueue
+from pulp.server.managers import factory as managers_factory
+
+
+ENQUEUED = {}
+STARTED = {}
+DONE = threading.Semaphore(0)
+
+
+def call(task_number, work_time):
+    STARTED[task_number] = time.time()
+    if work_time:
+        time.sleep(work_time)
+
+
+def complete(call_request, call_report):
+    DONE.release()
+
+
+def percentile(values, fraction):
+    index = min(int(len(values) * fraction), len(values) - 1)
+    return values[index]
+
+
+def run(num_tasks, concurrency_threshold, worker_pool_size, work_time):
+    queue = TaskQueue(concurrency_threshold, worker_pool_size=worker_pool_size)
+    queue.start()
+
+    start = time.time()
+    for i in range(num_tasks):
+        call_request = CallRequest(call, [i, work_time], archive=False)
+        call_request.add_life_cycle_callback(dispatch_constants.CALL_COMPLETE_LIFE_CYCLE_CALLBACK, complete)
+        ENQUEUED[i] = time.time()
+        queue.enqueue(Task(call_request))
+    enqueue_time = time.time() - start
+
+    for i in range(num_tasks):
+        DONE.acquire()
+    total_time = time.time() - start
+
+    queue.stop(clear_queued_calls=True)
+
+    latencies = sorted(STARTED[i] - ENQUEUED[i] for i in range(num_tasks))
+
+    print 'tasks:                 %d' % num_tasks
+    print 'concurrency threshold: %d' % concurrency_threshold
+    print 'worker pool size:      %d' % queue.worker_pool_size
+    print 'enqueue time:          %.3f s' % enqueue_time
+    print 'total time:            %.3f s' % total_time
+    print 'throughput:            %.1f tasks/s' % (num_tasks / total_time)
+    print 'latency min:           %.6f s' % latencies[0]
+    print 'latency median:        %.6f s' % percentile(latencies, 0.5)
+    print 'latency 99th:          %.6f s' % percentile(latencies, 0.99)
+    print 'latency max:           %.6f s' % latencies[-1]
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--tasks', type='int', default=10000,
+                      help='number of tasks to enqueue')
+    parser.add_option('--threshold', type='int', default=9,
+                      help='task queue concurrency threshold')
+    parser.add_option('--workers', type='int', default=16,
+                      help='task queue worker pool size')
+    parser.add_option('--work-time', type='float', default=0.0,
+                      help='seconds each task sleeps for')
+    parser.add_option('--db', default='pulp_benchmark',
+                      help='scratch database name')
+    (opts, args) = parser.parse_args()
+
+    connection.initialize(name=opts.db)
+    managers_factory.initialize()
+    pickling.initialize()
+    try:
+        run(opts.tasks, opts.threshold, opts.workers, opts.work_time)
+    finally:
+        QueuedCall.get_collection().drop()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Compares associating units with a repository one at a time against the bulk
+association path.
+
+For each unit count (10k and 100k by default) the units are associated with a
+fresh repository twice: once through per-unit associate_unit_by_id calls and
+once through a single associate_all_by_ids call. The bulk run is then repeated
+against the already populated repository to measure the existence lookups on
+their own, and the units are removed again through unassociate_all_by_ids.
+Requires a local mongod, everything is written to a scratch database that is
+dropped afterwards.
+
+ python unit_association.py --units 10000 --units 100000
+"""
+
+import time
+import uuid
+from optparse import OptionParser
+
+from pulp.server.db import connection
+from pulp.server.db.model.repository import Repo, RepoContentUnit
+from pulp.server.managers import factory as managers_factory
+from pulp.server.managers.repo.unit_association import OWNER_TYPE_IMPORTER
+
+
+TYPE_ID = 'benchmark-type'
+OWNER_ID = 'benchmark-importer'
+
+
+def timed(call, *args, **kwargs):
+    start = time.time()
+    call(*args, **kwargs)
+    return time.time() - start
+
+
+def create_repo(repo_id):
+    managers_factory.repo_manager().create_repo(repo_id)
+
+
+def unit_count(repo_id):
+    repo = Repo.get_collection().find_one({'id': repo_id})
+    return repo['content_unit_counts'].get(TYPE_ID, 0)
+
+
+def per_unit(repo_id, unit_ids):
+    manager = managers_factory.repo_unit_association_manager()
+    for unit_id in unit_ids:
+        manager.associate_unit_by_id(repo_id, TYPE_ID, unit_id, OWNER_TYPE_IMPORTER, OWNER_ID)
+
+
+def bulk(repo_id, unit_ids):
+    manager = managers_factory.repo_unit_association_manager()
+    manager.associate_all_by_ids(repo_id, TYPE_ID, unit_ids, OWNER_TYPE_IMPORTER, OWNER_ID)
+
+
+def bulk_remove(repo_id, unit_ids):
+    manager = managers_factory.repo_unit_association_manager()
+    manager.unassociate_all_by_ids(repo_id, TYPE_ID, unit_ids, OWNER_TYPE_IMPORTER, OWNER_ID,
+                                   notify_plugins=False)
+
+
+def report(label, num_units, elapsed):
+    print '  %-24s %8.3f s  %10.1f units/s' % (label, elapsed, num_units / elapsed)
+
+
+def run(num_units):
+    unit_ids = [str(uuid.uuid4()) for i in range(num_units)]
+
+    print 'units: %d' % num_units
+
+    create_repo('per-unit-%d' % num_units)
+    elapsed = timed(per_unit, 'per-unit-%d' % num_units, unit_ids)
+    report('per-unit associate', num_units, elapsed)
+    assert unit_count('per-unit-%d' % num_units) == num_units
+
+    create_repo('bulk-%d' % num_units)
+    elapsed = timed(bulk, 'bulk-%d' % num_units, unit_ids)
+    report('bulk associate', num_units, elapsed)
+    assert unit_count('bulk-%d' % num_units) == num_units
+
+    elapsed = timed(bulk, 'bulk-%d' % num_units, unit_ids)
+    report('bulk re-associate', num_units, elapsed)
+    assert unit_count('bulk-%d' % num_units) == num_units
+
+    elapsed = timed(bulk_remove, 'bulk-%d' % num_units, unit_ids)
+    report('bulk unassociate', num_units, elapsed)
+    assert unit_count('bulk-%d' % num_units) == 0
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--units', type='int', action='append', dest='units',
+                      help='number of units to associate; may be specified more than once')
+    parser.add_option('--db', default='pulp_benchmark',
+                      help='scratch database name')
+    (opts, args) = parser.parse_args()
+
+    connection.initialize(name=opts.db)
+    managers_factory.initialize()
+    try:
+        for num_units in opts.units or [10000, 100000]:
+            run(num_units)
+    finally:
+        Repo.get_collection().drop()
+        RepoContentUnit.get_collection().drop()
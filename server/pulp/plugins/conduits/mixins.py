@@ -18,6 +18,7 @@ import sys
 import pulp.plugins.conduits._common as common_utils
 from pulp.plugins.model import Unit, PublishReport
 from pulp.plugins.types import database as types_db
+from pulp.server.db import resource_versions
 import pulp.server.dispatch.factory as dispatch_factory
 from pulp.server.exceptions import MissingResource
 import pulp.server.managers.factory as manager_factory
@@ -396,6 +397,8 @@ class AddUnitMixin(object):
 
         self._added_count = 0
         self._updated_count = 0
+        self._updated_type_ids = set()
+        self._units_written = False
 
         self._association_owner_id = association_owner_id
 
@@ -470,20 +473,10 @@ class AddUnitMixin(object):
         @rtype:  L{Unit}
         """
         try:
-            content_query_manager = manager_factory.content_query_manager()
-            content_manager = manager_factory.content_manager()
             association_manager = manager_factory.repo_unit_association_manager()
 
             # Save or update the unit
-            pulp_unit = common_utils.to_pulp_unit(unit)
-            try:
-                existing_unit = content_query_manager.get_content_unit_by_keys_dict(unit.type_id, unit.unit_key)
-                unit.id = existing_unit['_id']
-                content_manager.update_content_unit(unit.type_id, unit.id, pulp_unit)
-                self._updated_count += 1
-            except MissingResource:
-                unit.id = content_manager.add_content_unit(unit.type_id, None, pulp_unit)
-                self._added_count += 1
+            self._save_unit_content(unit)
 
             # Associate it with the repo
             association_manager.associate_unit_by_id(self.repo_id, unit.type_id, unit.id, self.association_owner_type, self.association_owner_id)
@@ -493,6 +486,59 @@ class AddUnitMixin(object):
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def save_units(self, units):
+        """
+        Bulk version of save_unit. Each unit is created or updated as in
+        save_unit, after which all of them are associated to the repository
+        being synchronized using batched database operations. Importers adding
+        large numbers of units should prefer this call over repeated calls to
+        save_unit.
+
+        @param units: unit objects returned from the init_unit call
+        @type  units: list of L{Unit}
+
+        @return: object references to the provided units, their state updated from the call
+        @rtype:  list of L{Unit}
+        """
+        try:
+            association_manager = manager_factory.repo_unit_association_manager()
+
+            unit_ids_by_type = {}
+            for unit in units:
+                self._save_unit_content(unit)
+                unit_ids_by_type.setdefault(unit.type_id, []).append(unit.id)
+
+            for type_id, unit_ids in unit_ids_by_type.items():
+                association_manager.associate_all_by_ids(self.repo_id, type_id, unit_ids, self.association_owner_type, self.association_owner_id)
+
+            return units
+        except Exception, e:
+            _LOG.exception(_('Content unit association failed'))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def _save_unit_content(self, unit):
+        """
+        Creates or updates Pulp's knowledge of the content unit and populates
+        the unit's id field.
+
+        @param unit: unit object returned from the init_unit call
+        @type  unit: L{Unit}
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        content_manager = manager_factory.content_manager()
+
+        pulp_unit = common_utils.to_pulp_unit(unit)
+        self._units_written = True
+        try:
+            existing_unit = content_query_manager.get_content_unit_by_keys_dict(unit.type_id, unit.unit_key)
+            unit.id = existing_unit['_id']
+            content_manager.update_content_unit(unit.type_id, unit.id, pulp_unit)
+            self._updated_count += 1
+            self._updated_type_ids.add(unit.type_id)
+        except MissingResource:
+            unit.id = content_manager.add_content_unit(unit.type_id, None, pulp_unit)
+            self._added_count += 1
+
     def link_unit(self, from_unit, to_unit, bidirectional=False):
         """
         Creates a reference between two content units. The semantics of what
@@ -513,6 +559,7 @@ class AddUnitMixin(object):
         @type  to_unit: L{Unit}
         """
         content_manager = manager_factory.content_manager()
+        self._units_written = True
 
         try:
             content_manager.link_referenced_content_units(from_unit.type_id, from_unit.id, to_unit.type_id, [to_unit.id])
@@ -523,6 +570,23 @@ class AddUnitMixin(object):
             _LOG.exception(_('Child link from parent [%s] to child [%s] failed' % (str(from_unit), str(to_unit))))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def _record_changes(self):
+        """
+        Records the changes made to the content units through this conduit.
+        Called by the server once the importer call using the conduit has
+        returned, so that the version of the units is changed once per sync
+        or upload instead of once per unit.
+
+        Units added to or removed from the repository have already been
+        accounted for in its content versions by the unit counts; units of
+        the repository updated in place have not.
+        """
+        if self._updated_type_ids:
+            repo_manager = manager_factory.repo_manager()
+            repo_manager.update_content_version(self.repo_id, sorted(self._updated_type_ids))
+        if self._units_written:
+            resource_versions.bump(resource_versions.CONTENT_UNITS)
+
 
 class StatusMixin(object):
 
@@ -29,7 +29,9 @@ its calls into this conduit:
    b. Uses the storage_path field in the returned unit to save the bits for the
       unit to disk.
    c. Calls save_unit which creates/updates Pulp's knowledge of the content unit
-      and creates an association between the unit and the repository
+      and creates an association between the unit and the repository. When
+      adding many units, save_units does the same for a list of units with
+      batched associations.
    d. If necessary, calls link_unit to establish any relationships between units.
 3. For units previously associated with the repository (known from get_units)
    that should no longer be, calls remove_unit to remove that association.
@@ -114,6 +116,29 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
             logger.exception(_('Content unit unassociation failed'))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def remove_units(self, units):
+        """
+        Bulk version of remove_unit. The associations are removed with one
+        batched operation per unit type rather than one per unit.
+
+        Units passed to this call must have their id fields set by the Pulp server.
+
+        @param units: unit objects (must have their id values set)
+        @type  units: list of L{Unit}
+        """
+
+        try:
+            unit_ids_by_type = {}
+            for unit in units:
+                unit_ids_by_type.setdefault(unit.type_id, []).append(unit.id)
+
+            for type_id, unit_ids in unit_ids_by_type.items():
+                self._association_manager.unassociate_all_by_ids(self.repo_id, type_id, unit_ids, OWNER_TYPE_IMPORTER, self.association_owner_id)
+            self._removed_count += len(units)
+        except Exception, e:
+            logger.exception(_('Content unit unassociation failed'))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def build_success_report(self, summary, details):
         """
         Creates the SyncReport instance that needs to be returned to the Pulp
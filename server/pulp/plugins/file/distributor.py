@@ -18,6 +18,7 @@ import errno
 import shutil
 import traceback
 import csv
+import json
 
 from pulp.common.plugins.progress import ProgressReport
 from pulp.common.plugins.distributor_constants import MANIFEST_FILENAME
@@ -25,6 +26,15 @@ from pulp.plugins.distributor import Distributor
 
 
 BUILD_DIRNAME = 'build'
+# Directory in the repo's working directory holding the published trees
+PUBLISH_DIRNAME = 'published'
+# A publish alternates between two trees: the tree that is not being served is brought up to
+# date and then swapped in by flipping the CURRENT_TREE_LINK symlink that the hosting locations
+# point at.
+PUBLISH_TREE_NAMES = ('a', 'b')
+CURRENT_TREE_LINK = 'current'
+# Suffix of the file next to each tree that records the symlinks published in it
+LINKS_SUFFIX = '.links'
 
 logger = logging.getLogger(__name__)
 
@@ -86,36 +96,45 @@ class FileDistributor(Distributor):
             progress_report.state = progress_report.STATE_IN_PROGRESS
             units = publish_conduit.get_units()
 
-            # Set up an empty build_dir
-            build_dir = os.path.join(repo.working_dir, BUILD_DIRNAME)
-            # Let's erase the path at build_dir so we can be sure it's a clean directory
-            self._rmtree_if_exists(build_dir)
-            os.makedirs(build_dir)
+            publish_dir = os.path.join(repo.working_dir, PUBLISH_DIRNAME)
+            tree_name = self._next_tree_name(publish_dir)
+            tree_dir = os.path.join(publish_dir, tree_name)
 
-            self.initialize_metadata(build_dir)
+            # The tree is still what was published two publishes ago, so only the difference
+            # between its links and the current units needs to be written out
+            published_links = self._read_links(tree_dir)
+            if published_links is None:
+                self._rmtree_if_exists(tree_dir)
+                os.makedirs(tree_dir)
+                published_links = {}
+            # Until the tree is brought up to date, its links file no longer describes it
+            self._remove_if_exists(tree_dir + LINKS_SUFFIX)
 
+            self.initialize_metadata(tree_dir)
+
+            links = {}
             try:
                 # process each unit
                 for unit in units:
-                    links_to_create = self.get_paths_for_unit(unit)
-                    self._symlink_unit(build_dir, unit, links_to_create)
+                    for target_path in self.get_paths_for_unit(unit):
+                        links[target_path] = unit.storage_path
                     self.publish_metadata_for_unit(unit)
             finally:
                 #Finalize the processing
                 self.finalize_metadata()
 
-            # Let's unpublish, and then republish
-            self.unpublish_repo(repo, config)
+            self._update_tree(tree_dir, published_links, links)
+            self._write_links(tree_dir, links)
 
+            # Serve the new tree from every hosting location at once
+            self._swap_current_tree(publish_dir, tree_name)
+            current_tree = os.path.join(publish_dir, CURRENT_TREE_LINK)
             hosting_locations = self.get_hosting_locations(repo, config)
             for location in hosting_locations:
-                shutil.copytree(build_dir, location, symlinks=True)
+                self._link_hosting_location(location, current_tree)
 
             self.post_repo_publish(repo, config)
 
-            # Clean up our build_dir
-            self._rmtree_if_exists(build_dir)
-
             # Report that we are done
             progress_report.state = progress_report.STATE_COMPLETE
             return progress_report.build_final_report()
@@ -141,7 +160,13 @@ class FileDistributor(Distributor):
         """
         hosting_locations = self.get_hosting_locations(repo, config)
         for location in hosting_locations:
-            self._rmtree_if_exists(location)
+            if os.path.islink(location):
+                os.remove(location)
+            else:
+                self._rmtree_if_exists(location)
+
+        # The next publish builds its tree from scratch
+        self._rmtree_if_exists(os.path.join(repo.working_dir, PUBLISH_DIRNAME))
 
     def validate_config(self, repo, config, config_conduit):
         raise NotImplementedError()
@@ -223,30 +248,179 @@ class FileDistributor(Distributor):
         :type  target_paths: list of L{str}
         """
         for target_path in target_paths:
-            #symlink_filename = os.path.join(build_dir, unit.unit_key['name'])
             symlink_filename = os.path.join(build_dir, target_path)
-            if os.path.exists(symlink_filename) or os.path.islink(symlink_filename):
-                # There's already something there with the desired symlink filename. Let's try and
-                # see if it points at the right thing. If it does, we don't need to do anything. If
-                # it does not, we should remove what's there and add the correct symlink.
-                try:
-                    existing_link_path = os.readlink(symlink_filename)
-                    if existing_link_path == unit.storage_path:
-                        # We don't need to do anything more for this unit, move on to the next one
-                        continue
-                    # The existing symlink is incorrect, so let's remove it
-                    os.remove(symlink_filename)
-                except OSError, e:
-                    # This will happen if we attempt to call readlink() on a file that wasn't a
-                    # symlink.  We should remove the file and add the symlink. There error code
-                    # should be EINVAL.  If it isn't, something else is wrong and we should raise.
-                    if e.errno != errno.EINVAL:
-                        raise e
-                    # Remove the file that's at the symlink_filename path
-                    os.remove(symlink_filename)
-            # If we've gotten here, we've removed any existing file at the symlink_filename path,
-            # so now we should recreate it.
-            os.symlink(unit.storage_path, symlink_filename)
+            self._create_symlink(unit.storage_path, symlink_filename)
+
+    def _create_symlink(self, storage_path, symlink_filename):
+        """
+        Put a symlink at symlink_filename that points to storage_path, replacing whatever is
+        already there unless it is the correct symlink.
+
+        :param storage_path:     The canonical location of the unit on disk
+        :type  storage_path:     basestring
+        :param symlink_filename: The path of the symlink to create
+        :type  symlink_filename: basestring
+        """
+        if os.path.exists(symlink_filename) or os.path.islink(symlink_filename):
+            # There's already something there with the desired symlink filename. Let's try and
+            # see if it points at the right thing. If it does, we don't need to do anything. If
+            # it does not, we should remove what's there and add the correct symlink.
+            try:
+                existing_link_path = os.readlink(symlink_filename)
+                if existing_link_path == storage_path:
+                    # We don't need to do anything more for this unit
+                    return
+                # The existing symlink is incorrect, so let's remove it
+                os.remove(symlink_filename)
+            except OSError, e:
+                # This will happen if we attempt to call readlink() on a file that wasn't a
+                # symlink.  We should remove the file and add the symlink. There error code
+                # should be EINVAL.  If it isn't, something else is wrong and we should raise.
+                if e.errno != errno.EINVAL:
+                    raise e
+                # Remove the file that's at the symlink_filename path
+                os.remove(symlink_filename)
+        # If we've gotten here, we've removed any existing file at the symlink_filename path,
+        # so now we should recreate it.
+        os.symlink(storage_path, symlink_filename)
+
+    def _next_tree_name(self, publish_dir):
+        """
+        Get the name of the tree that is not currently being served.
+
+        :param publish_dir: The directory holding the published trees
+        :type  publish_dir: basestring
+        :return: name of the tree the next publish should be written to
+        :rtype:  str
+        """
+        try:
+            current = os.readlink(os.path.join(publish_dir, CURRENT_TREE_LINK))
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return PUBLISH_TREE_NAMES[0]
+        if current == PUBLISH_TREE_NAMES[0]:
+            return PUBLISH_TREE_NAMES[1]
+        return PUBLISH_TREE_NAMES[0]
+
+    def _read_links(self, tree_dir):
+        """
+        Read the symlinks recorded as published in a tree.
+
+        :param tree_dir: The path of the tree
+        :type  tree_dir: basestring
+        :return: dict of path within the tree to the storage path it links to, or None if the
+                 contents of the tree are unknown
+        :rtype:  dict or None
+        """
+        links_filename = tree_dir + LINKS_SUFFIX
+        if not os.path.isdir(tree_dir) or not os.path.exists(links_filename):
+            return None
+        try:
+            with open(links_filename) as links_file:
+                return json.load(links_file)
+        except ValueError:
+            logger.warn(_('Ignoring corrupt publish record <%(path)s>') % {'path': links_filename})
+            return None
+
+    def _write_links(self, tree_dir, links):
+        """
+        Record the symlinks published in a tree.
+
+        :param tree_dir: The path of the tree
+        :type  tree_dir: basestring
+        :param links:    dict of path within the tree to the storage path it links to
+        :type  links:    dict
+        """
+        links_filename = tree_dir + LINKS_SUFFIX
+        with open(links_filename + '.tmp', 'w') as links_file:
+            json.dump(links, links_file)
+        os.rename(links_filename + '.tmp', links_filename)
+
+    def _update_tree(self, tree_dir, published_links, links):
+        """
+        Bring a tree's symlinks from published_links to links, touching only the symlinks that
+        were removed, added or changed.
+
+        :param tree_dir:        The path of the tree
+        :type  tree_dir:        basestring
+        :param published_links: dict of path to storage path currently in the tree
+        :type  published_links: dict
+        :param links:           dict of path to storage path the tree should contain
+        :type  links:           dict
+        """
+        for target_path in published_links:
+            if target_path not in links:
+                self._remove_if_exists(os.path.join(tree_dir, target_path))
+
+        for target_path, storage_path in links.iteritems():
+            if published_links.get(target_path) == storage_path:
+                continue
+            symlink_filename = os.path.join(tree_dir, target_path)
+            parent_dir = os.path.dirname(symlink_filename)
+            if not os.path.isdir(parent_dir):
+                os.makedirs(parent_dir)
+            self._create_symlink(storage_path, symlink_filename)
+
+    def _swap_current_tree(self, publish_dir, tree_name):
+        """
+        Atomically point the current tree symlink at the given tree.
+
+        :param publish_dir: The directory holding the published trees
+        :type  publish_dir: basestring
+        :param tree_name:   The name of the tree to serve
+        :type  tree_name:   str
+        """
+        current_link = os.path.join(publish_dir, CURRENT_TREE_LINK)
+        self._replace_with_symlink(tree_name, current_link)
+
+    def _link_hosting_location(self, location, current_tree):
+        """
+        Make a hosting location a symlink to the current tree. A location published by an older
+        version of this distributor is a copy of the tree, which is replaced.
+
+        :param location:     The path on the filesystem where the repo is hosted
+        :type  location:     basestring
+        :param current_tree: The path of the current tree symlink
+        :type  current_tree: basestring
+        """
+        if os.path.islink(location) and os.readlink(location) == current_tree:
+            return
+        parent_dir = os.path.dirname(location)
+        if not os.path.isdir(parent_dir):
+            os.makedirs(parent_dir)
+        if os.path.isdir(location) and not os.path.islink(location):
+            old_location = os.path.join(parent_dir, '.%s.old' % os.path.basename(location))
+            self._rmtree_if_exists(old_location)
+            os.rename(location, old_location)
+            self._replace_with_symlink(current_tree, location)
+            shutil.rmtree(old_location)
+        else:
+            self._replace_with_symlink(current_tree, location)
+
+    def _replace_with_symlink(self, link_target, path):
+        """
+        Atomically replace whatever file or symlink is at path with a symlink to link_target.
+
+        :param link_target: The path the symlink points to
+        :type  link_target: basestring
+        :param path:        The path of the symlink
+        :type  path:        basestring
+        """
+        new_path = os.path.join(os.path.dirname(path), '.%s.new' % os.path.basename(path))
+        self._remove_if_exists(new_path)
+        os.symlink(link_target, new_path)
+        os.rename(new_path, path)
+
+    def _remove_if_exists(self, path):
+        """
+        If the given file or symlink exists, remove it. Else, do nothing.
+
+        :param path: The path you want to remove.
+        :type  path: basestring
+        """
+        if os.path.lexists(path):
+            os.remove(path)
 
     def _rmtree_if_exists(self, path):
         """
@@ -79,6 +79,9 @@ def initialize(validate=True):
     for entry_point in plugin_entry_points:
         loading.load_plugins_from_entry_point(*entry_point)
 
+    # type metadata is looked up for each unit handled by the plugins
+    database.TYPE_CACHE.load()
+
     # post-initialization validation
     if not validate:
         return
@@ -17,11 +17,14 @@ This module covers both the ContentType collection itself as well as any
 type-specific collections that exist to suit the type needs.
 """
 
+import copy
 import logging
+import threading
 
 from pymongo import ASCENDING
 
 import pulp.server.db.connection as pulp_db
+from pulp.server.db import resource_versions
 from pulp.server.db.model.content import ContentType
 
 # -- constants ----------------------------------------------------------------
@@ -62,6 +65,126 @@ class MissingDefinitions(Exception):
     def __str__(self):
         return 'MissingDefinitions [%s]' % ', '.join(self.missing_type_ids)
 
+# -- type cache ---------------------------------------------------------------
+
+class TypeCache(object):
+    """
+    Process-wide cache of the type definitions in the database and of the
+    collections holding the units of each type, so that looking up type
+    metadata for each unit does not query the database or build a new
+    collection wrapper.
+
+    Definitions are cached once found; a type that is not cached is looked up
+    in the database, so types added by another process are still found.
+    update_database and clean invalidate the cache, which is also discarded
+    when the database connection is re-initialized.
+    """
+
+    def __init__(self):
+        # type id: definition SON
+        self.__definitions = {}
+        # type id: PulpCollection
+        self.__collections = {}
+        self.__database = None
+        # incremented on invalidation so that definitions loaded concurrently
+        # with an invalidation are not cached
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    def load(self):
+        """
+        Load all of the type definitions in the database into the cache.
+        """
+        self.__lock.acquire()
+        try:
+            self.__check_database()
+            generation = self.__generation
+        finally:
+            self.__lock.release()
+        definitions = dict((d['id'], d) for d in ContentType.get_collection().find())
+        self.__lock.acquire()
+        try:
+            self.__check_database()
+            if generation == self.__generation:
+                self.__definitions = definitions
+        finally:
+            self.__lock.release()
+
+    def definition(self, type_id):
+        """
+        @param type_id: unique type id
+        @type  type_id: str
+        @return: cached type definition, None if the type is not in the database;
+                 callers must not modify it
+        @rtype:  SON or None
+        """
+        self.__lock.acquire()
+        try:
+            self.__check_database()
+            type_def = self.__definitions.get(type_id)
+            generation = self.__generation
+        finally:
+            self.__lock.release()
+        if type_def is not None:
+            return type_def
+
+        type_def = ContentType.get_collection().find_one({'id': type_id})
+        if type_def is None:
+            return None
+        self.__lock.acquire()
+        try:
+            self.__check_database()
+            if generation == self.__generation:
+                self.__definitions[type_id] = type_def
+        finally:
+            self.__lock.release()
+        return type_def
+
+    def collection(self, type_id):
+        """
+        @param type_id: unique type id
+        @type  type_id: str
+        @return: cached database collection holding units of the given type
+        @rtype:  L{pymongo.collection.Collection}
+        """
+        self.__lock.acquire()
+        try:
+            self.__check_database()
+            collection = self.__collections.get(type_id)
+            if collection is None:
+                collection = pulp_db.get_collection(unit_collection_name(type_id), create=False)
+                self.__collections[type_id] = collection
+            return collection
+        finally:
+            self.__lock.release()
+
+    def invalidate(self):
+        """
+        Discard all cached definitions and collections.
+        """
+        self.__lock.acquire()
+        try:
+            self.__generation += 1
+            self.__definitions = {}
+            self.__collections = {}
+        finally:
+            self.__lock.release()
+
+    def __check_database(self):
+        """
+        Discard the cache if the database connection has been re-initialized
+        NOTE: must be called with the cache lock held
+        """
+        database = pulp_db.get_database()
+        if database is not self.__database:
+            self.__generation += 1
+            self.__definitions = {}
+            self.__collections = {}
+            self.__database = database
+
+
+TYPE_CACHE = TypeCache()
+
 # -- public -------------------------------------------------------------------
 
 def update_database(definitions, error_on_missing_definitions=False):
@@ -127,6 +250,9 @@ def update_database(definitions, error_on_missing_definitions=False):
             error_defs.append(type_def)
             continue
 
+    TYPE_CACHE.invalidate()
+    resource_versions.bump(resource_versions.CONTENT_TYPES)
+
     if len(error_defs) > 0:
         raise UpdateFailed(error_defs)
 
@@ -152,6 +278,9 @@ def clean():
     type_collection = ContentType.get_collection()
     type_collection.remove(safe=True)
 
+    TYPE_CACHE.invalidate()
+    resource_versions.bump(resource_versions.CONTENT_TYPES, resource_versions.CONTENT_UNITS)
+
 
 def type_units_collection(type_id):
     """
@@ -163,9 +292,7 @@ def type_units_collection(type_id):
     @return: database collection holding units of the given type
     @rtype:  L{pymongo.collection.Collection}
     """
-    collection_name = unit_collection_name(type_id)
-    collection = pulp_db.get_collection(collection_name, create=False)
-    return collection
+    return TYPE_CACHE.collection(type_id)
 
 
 def all_type_ids():
@@ -217,9 +344,8 @@ def type_definition(type_id):
     @return: corresponding type definition, None if not found
     @rtype: SON or None
     """
-    collection = ContentType.get_collection()
-    type_ = collection.find_one({'id': type_id})
-    return type_
+    type_ = TYPE_CACHE.definition(type_id)
+    return copy.deepcopy(type_)
 
 
 def unit_collection_name(type_id):
@@ -246,11 +372,10 @@ def type_units_unit_key(type_id):
              content type collection
     @rtype: list of str or None
     """
-    collection = ContentType.get_collection()
-    type_def = collection.find_one({'id': type_id})
+    type_def = TYPE_CACHE.definition(type_id)
     if type_def is None:
         return None
-    return type_def['unit_key']
+    return copy.copy(type_def['unit_key'])
 
 # -- private -----------------------------------------------------------------
 
@@ -273,6 +398,7 @@ def _create_or_update_type(type_def):
         content_type._id = existing_type['_id']
     # XXX this still causes a potential race condition when 2 users are updating the same type
     content_type_collection.save(content_type, safe=True)
+    TYPE_CACHE.invalidate()
 
 def _update_indexes(type_def, unique):
 
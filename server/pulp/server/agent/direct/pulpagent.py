@@ -20,7 +20,7 @@ from logging import getLogger
 from gofer.proxy import Agent
 
 from pulp.server.agent.context import Context, Capability
-from pulp.server.agent.direct.services import Services
+from pulp.server.agent.direct.services import Services, HeartbeatListener
 
 
 
@@ -80,6 +80,26 @@ class PulpAgent(object):
         """
         return Services.heartbeat_listener.status(uuids)
 
+    @classmethod
+    def offline(cls):
+        """
+        Get the agents that are offline.
+        Relies on heartbeat.
+        @return: The uuids of the agents whose heartbeat has expired.
+        @rtype: list
+        """
+        return HeartbeatListener.offline()
+
+    @classmethod
+    def delete_status(cls, uuid):
+        """
+        Delete the status of the agent.
+        Relies on heartbeat.
+        @param uuid: The agent uuid.
+        @type uuid: str
+        """
+        HeartbeatListener.delete(uuid)
+
     def cancel(self, task_id):
         """
         Cancel an agent request by task ID.
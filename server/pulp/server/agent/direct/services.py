@@ -12,12 +12,15 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
-from threading import RLock
+from threading import RLock, Thread, Event
 from datetime import datetime as dt
 from datetime import timedelta
 from pulp.common import dateutils
+from pulp.common.compat import json
 from pulp.server.config import config
+from pulp.server.db.model.consumer import ConsumerHeartbeat
 from pulp.server.dispatch import factory
+from pymongo.errors import DuplicateKeyError
 from gofer.messaging.broker import Broker
 from gofer.messaging import Topic
 from gofer.messaging.consumer import Consumer
@@ -68,6 +71,7 @@ class Services:
         # heartbeat
         cls.heartbeat_listener = HeartbeatListener(url)
         cls.heartbeat_listener.start()
+        heartbeat_store.start()
         log.info('AMQP heartbeat listener started')
         # asynchronous reply
         cls.reply_handler = ReplyHandler(url)
@@ -75,49 +79,239 @@ class Services:
         log.info('AMQP reply handler started')
 
 
+class HeartbeatStore:
+    """
+    Agent heartbeat status shared by all server processes.
+    Heartbeats are stored in the consumer heartbeat collection. The received
+    heartbeats are coalesced and written periodically by a flush thread: the
+    agents whose heartbeats share the same interval and details are written
+    together by a single multi-document update, and the ones not yet stored
+    are written by a single insert. The last heartbeat times stored are
+    therefore only as accurate as the flush interval.
+    @ivar flush_interval: Seconds between writes of the received heartbeats.
+        If None, the configured heartbeat_flush_interval is used.
+    @type flush_interval: float
+    """
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval
+        # uuid: (last, next, details) received and not yet written
+        self.__pending = {}
+        self.__mutex = RLock()
+        self.__stopped = Event()
+        self.__thread = None
+
+    def update(self, uuid, next, details):
+        """
+        Record a heartbeat.
+        @param uuid: The agent uuid.
+        @type uuid: str
+        @param next: Seconds until the next heartbeat is expected.
+        @type next: int
+        @param details: Additional information sent with the heartbeat.
+        @type details: dict
+        """
+        last = dt.now(dateutils.utc_tz())
+        next = last+timedelta(seconds=int(next*1.20))
+        self.__lock()
+        try:
+            self.__pending[uuid] = (last, next, details)
+        finally:
+            self.__unlock()
+
+    def flush(self):
+        """
+        Write the heartbeats received since the last flush.
+        Heartbeats that could not be written are kept for the next flush,
+        unless a newer heartbeat has been received for the agent.
+        @return: The number of agents written.
+        @rtype: int
+        """
+        self.__lock()
+        try:
+            pending = self.__pending
+            self.__pending = {}
+        finally:
+            self.__unlock()
+        if not pending:
+            return 0
+        try:
+            collection = ConsumerHeartbeat.get_collection()
+            for group in self.__groups(pending):
+                self.__write(collection, group)
+        except Exception:
+            self.__lock()
+            try:
+                for uuid, heartbeat in pending.items():
+                    self.__pending.setdefault(uuid, heartbeat)
+            finally:
+                self.__unlock()
+            raise
+        return len(pending)
+
+    def status(self, uuids=[]):
+        """
+        Get the agent heartbeat status.
+        @param uuids: An (optional) list of uuids to query.
+        @return: A dictionary of uuid: tuple (status,last-heartbeat,details)
+        """
+        collection = ConsumerHeartbeat.get_collection()
+        if uuids:
+            spec = {'_id': {'$in': list(uuids)}}
+        else:
+            spec = {}
+        found = {}
+        for heartbeat in collection.find(spec):
+            last = heartbeat['last'].replace(tzinfo=dateutils.utc_tz())
+            next = heartbeat['next'].replace(tzinfo=dateutils.utc_tz())
+            found[heartbeat['_id']] = (last, next, heartbeat['details'])
+        # heartbeats received by this process but not yet written are newer
+        self.__lock()
+        try:
+            for uuid, heartbeat in self.__pending.items():
+                if not uuids or uuid in uuids:
+                    found[uuid] = heartbeat
+        finally:
+            self.__unlock()
+        now = dt.now(dateutils.utc_tz())
+        d = {}
+        for uuid in (uuids or found.keys()):
+            last = found.get(uuid)
+            if last:
+                d[uuid] = (last[1] > now, last[0].isoformat(), last[2])
+            else:
+                d[uuid] = (False, None, {})
+        return d
+
+    def offline(self):
+        """
+        Get the agents whose heartbeat has expired.
+        @return: The uuids of the agents that are considered offline.
+        @rtype: list
+        """
+        collection = ConsumerHeartbeat.get_collection()
+        now = dt.now(dateutils.utc_tz())
+        # covered by the (next, _id) index
+        cursor = collection.find({'next': {'$lte': now}}, fields={'_id': True})
+        return [heartbeat['_id'] for heartbeat in cursor]
+
+    def delete(self, uuid):
+        """
+        Delete the heartbeat status of an agent.
+        @param uuid: The agent uuid.
+        @type uuid: str
+        """
+        self.__lock()
+        try:
+            self.__pending.pop(uuid, None)
+        finally:
+            self.__unlock()
+        collection = ConsumerHeartbeat.get_collection()
+        collection.remove({'_id': uuid}, safe=True)
+
+    def start(self):
+        """
+        Start the flush thread.
+        """
+        if self.__thread is not None:
+            return
+        self.__stopped.clear()
+        self.__thread = Thread(target=self.__run, name='HeartbeatFlush')
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop the flush thread, writing the heartbeats still pending.
+        """
+        if self.__thread is None:
+            return
+        self.__stopped.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def __run(self):
+        interval = self.flush_interval
+        if interval is None:
+            interval = config.getint('messaging', 'heartbeat_flush_interval') / 1000.0
+        while not self.__stopped.isSet():
+            self.__stopped.wait(interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception('heartbeat flush failed')
+
+    def __groups(self, pending):
+        """
+        Group the heartbeats that can be written by the same update.
+        @return: list of (last, next, details, uuids)
+        """
+        groups = {}
+        for uuid, (last, next, details) in pending.items():
+            key = (next-last, json.dumps(details, sort_keys=True))
+            group = groups.setdefault(key, [last, next, details, []])
+            if last > group[0]:
+                group[0:2] = [last, next]
+            group[3].append(uuid)
+        return groups.values()
+
+    def __write(self, collection, group):
+        last, next, details, uuids = group
+        update = {'$set': {'last': last, 'next': next, 'details': details}}
+        result = collection.update({'_id': {'$in': uuids}}, update, multi=True, safe=True)
+        if result['n'] == len(uuids):
+            return
+        stored = collection.find({'_id': {'$in': uuids}}, fields={'_id': True})
+        stored = set(heartbeat['_id'] for heartbeat in stored)
+        missing = [ConsumerHeartbeat(uuid, last, next, details)
+                   for uuid in uuids if uuid not in stored]
+        try:
+            collection.insert(missing, safe=True, continue_on_error=True)
+        except DuplicateKeyError:
+            # inserted concurrently by another process
+            collection.update({'_id': {'$in': uuids}}, update, multi=True, safe=True)
+
+    def __lock(self):
+        self.__mutex.acquire()
+
+    def __unlock(self):
+        self.__mutex.release()
+
+
+heartbeat_store = HeartbeatStore()
+
+
 class HeartbeatListener(Consumer):
     """
     Agent heartbeat listener.
     """
 
-    __status = {}
-    __mutex = RLock()
-
     @classmethod
     def status(cls, uuids=[]):
         """
         Get the agent heartbeat status.
         @param uuids: An (optional) list of uuids to query.
-        @return: A tuple (status,last-heartbeat)
+        @return: A dictionary of uuid: tuple (status,last-heartbeat,details)
         """
-        cls.__lock()
-        try:
-            now = dt.now(dateutils.utc_tz())
-            if not uuids:
-                uuids = cls.__status.keys()
-            d = {}
-            for uuid in uuids:
-                last = cls.__status.get(uuid)
-                if last:
-                    status = ( last[1] > now )
-                    heartbeat = last[0].isoformat()
-                    any = last[2]
-                else:
-                    status = False
-                    heartbeat = None
-                    any = {}
-                d[uuid] = (status, heartbeat, any)
-            return d
-        finally:
-            cls.__unlock()
+        return heartbeat_store.status(uuids)
 
     @classmethod
-    def __lock(cls):
-        cls.__mutex.acquire()
+    def offline(cls):
+        """
+        Get the agents whose heartbeat has expired.
+        @return: The uuids of the agents that are considered offline.
+        @rtype: list
+        """
+        return heartbeat_store.offline()
 
     @classmethod
-    def __unlock(cls):
-        cls.__mutex.release()
+    def delete(cls, uuid):
+        """
+        Delete the heartbeat status of an agent.
+        @param uuid: The agent uuid.
+        @type uuid: str
+        """
+        heartbeat_store.delete(uuid)
 
     def __init__(self, url):
         topic = Topic('heartbeat')
@@ -131,17 +325,10 @@ class HeartbeatListener(Consumer):
         self.ack()
 
     def __update(self, body):
-        self.__lock()
-        try:
-            log.debug(body)
-            uuid = body.pop('uuid')
-            next = body.pop('next')
-            last = dt.now(dateutils.utc_tz())
-            next = int(next*1.20)
-            next = last+timedelta(seconds=next)
-            self.__status[uuid] = (last, next, body)
-        finally:
-            self.__unlock()
+        log.debug(body)
+        uuid = body.pop('uuid')
+        next = body.pop('next')
+        heartbeat_store.update(uuid, next, body)
 
 
 class ReplyHandler(Listener):
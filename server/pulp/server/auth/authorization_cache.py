@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+In-memory cache of the information needed to authorize users, so that
+authorizing a request does not need to query the database.
+"""
+
+import threading
+import time
+
+from pulp.server import config as pulp_config
+from pulp.server.db.model.auth import Permission, User
+from pulp.server.exceptions import MissingResource
+from pulp.server.managers import factory
+
+# authorization cache class ----------------------------------------------------
+
+class AuthorizationCache(object):
+    """
+    Caches, per user login, the user, whether the user is a super user and
+    the user's permissions resolved into a trie of resource path segments.
+    A login's entry is loaded from the database on first use and reloaded
+    once it has been invalidated or is older than the ttl. The permission,
+    role and user managers invalidate the entries affected by their changes;
+    the ttl bounds how long changes made by other processes go unnoticed.
+
+    @ivar ttl: seconds an entry is used for before being reloaded; if None,
+               the server's configured authorization_cache_ttl is used
+    @type ttl: float or None
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+
+        # login: _AuthorizationEntry
+        self.__entries = {}
+        # incremented on invalidation so that entries loaded concurrently with
+        # an invalidation are not cached
+        self.__generation = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    # lookups ------------------------------------------------------------------
+
+    def user(self, login):
+        """
+        Get the user with the given login.
+        @param login: login of the user
+        @type  login: str
+        @return: the user document from the database
+        @rtype:  dict
+        @raise MissingResource: if there is no user with the login
+        """
+        return dict(self.__entry(login).user)
+
+    def is_superuser(self, login):
+        """
+        @param login: login of the user
+        @type  login: str
+        @return: True if the user is a super user, False otherwise
+        @rtype:  bool
+        @raise MissingResource: if there is no user with the login
+        """
+        return self.__entry(login).superuser
+
+    def is_authorized(self, resource, login, operation):
+        """
+        Check whether a user has been granted permission to perform an
+        operation on a resource or on any of the resource's parent paths.
+        @param resource: pulp resource path
+        @type  resource: str
+        @param login: login of the user
+        @type  login: str
+        @param operation: operation to be performed on resource
+        @type  operation: int
+        @return: True if the operation has been granted, False otherwise
+        @rtype:  bool
+        @raise MissingResource: if there is no user with the login
+        """
+        node = self.__entry(login).permissions
+        if operation in node.operations:
+            return True
+        for part in [p for p in resource.split('/') if p]:
+            node = node.children.get(part)
+            if node is None:
+                return False
+            if operation in node.operations:
+                return True
+        return False
+
+    # cache management ---------------------------------------------------------
+
+    def invalidate(self, login=None):
+        """
+        Discard cached entries, causing them to be reloaded the next time
+        they are used.
+        @param login: login of the user whose entry is discarded; if None,
+                      the entries of all users are discarded
+        @type  login: str or None
+        """
+        self.__lock.acquire()
+        try:
+            self.__generation += 1
+            if login is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(login, None)
+        finally:
+            self.__lock.release()
+
+    def statistics(self):
+        """
+        @return: number of lookups answered from the cache (hits), number of
+                 lookups that loaded an entry from the database (misses) and
+                 number of cached entries
+        @rtype:  dict
+        """
+        self.__lock.acquire()
+        try:
+            return {'hits': self.__hits, 'misses': self.__misses,
+                    'entries': len(self.__entries)}
+        finally:
+            self.__lock.release()
+
+    def __entry(self, login):
+        """
+        Get the cached entry for a login, loading it if necessary
+        """
+        ttl = self.ttl
+        if ttl is None:
+            ttl = pulp_config.config.getfloat('security', 'authorization_cache_ttl')
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.get(login)
+            if entry is not None and time.time() - entry.loaded <= ttl:
+                self.__hits += 1
+                return entry
+            self.__misses += 1
+            generation = self.__generation
+        finally:
+            self.__lock.release()
+        # load outside of the lock so that lookups for other logins don't wait
+        # on the database
+        entry = _load_entry(login)
+        self.__lock.acquire()
+        try:
+            if generation == self.__generation:
+                self.__entries[login] = entry
+        finally:
+            self.__lock.release()
+        return entry
+
+
+class _AuthorizationEntry(object):
+    """
+    Cached authorization information of a user.
+    """
+
+    def __init__(self, user, superuser, permissions):
+        self.user = user
+        self.superuser = superuser
+        self.permissions = permissions
+        self.loaded = time.time()
+
+
+class _PermissionNode(object):
+    """
+    Node of a permission trie; holds the operations granted on the resource
+    path leading to it.
+    """
+
+    def __init__(self):
+        self.operations = set()
+        # path segment: _PermissionNode
+        self.children = {}
+
+
+def _load_entry(login):
+    """
+    Load the authorization information of a user from the database.
+    @param login: login of the user
+    @type  login: str
+    @rtype: L{_AuthorizationEntry}
+    @raise MissingResource: if there is no user with the login
+    """
+    user = User.get_collection().find_one({'login' : login})
+    if user is None:
+        raise MissingResource(login)
+    superuser = factory.role_manager().super_user_role in user['roles']
+
+    root = _PermissionNode()
+    users_field = 'users.%s' % login
+    for permission in Permission.get_collection().find({users_field : {'$exists' : True}},
+                                                       fields=['resource', users_field]):
+        node = root
+        for part in [p for p in permission['resource'].split('/') if p]:
+            node = node.children.setdefault(part, _PermissionNode())
+        node.operations.update(permission['users'].get(login, []))
+
+    return _AuthorizationEntry(user, superuser, root)
+
+# process-wide authorization cache ---------------------------------------------
+
+AUTHORIZATION_CACHE = AuthorizationCache()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+In-memory cache of successfully verified credentials, so that repeated
+requests with the same password or certificate do not pay for hashing the
+password or verifying the certificate again.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from pulp.server import config as pulp_config
+from pulp.server.compat import OrderedDict
+
+# credential cache class -------------------------------------------------------
+
+class CredentialCache(object):
+    """
+    Bounded cache of credentials that were verified successfully, mapping
+    each credential to the identity (user login or consumer id) it was
+    verified for. Credentials are never stored: entries are keyed by an HMAC
+    of the credential computed with a random key generated for each cache,
+    so the digests cannot be used to guess credentials offline.
+
+    Entries expire after the ttl; when the cache is full the least recently
+    used entry is discarded. The user and consumer managers invalidate the
+    entries of an identity when its password changes or it is deleted.
+
+    @ivar ttl: seconds an entry is used for; if None, the server's configured
+               credential_cache_ttl is used
+    @type ttl: float or None
+    @ivar max_entries: maximum number of cached entries; if None, the server's
+                       configured credential_cache_size is used
+    @type max_entries: int or None
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.__key = os.urandom(32)
+        # digest: (identity, expiration time); in least recently used order
+        self.__entries = OrderedDict()
+        # identity: set of digests
+        self.__identities = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    def digest(self, *credential):
+        """
+        Compute the key under which a credential is cached.
+        @param credential: parts of the credential, for instance the kind of
+                           credential, the login and the password
+        @type  credential: str
+        @return: cache key
+        @rtype:  str
+        """
+        parts = []
+        for part in credential:
+            if isinstance(part, unicode):
+                part = part.encode('utf-8')
+            # length prefixed so that the parts cannot run into each other
+            parts.append('%d:%s' % (len(part), part))
+        return hmac.new(self.__key, ''.join(parts), hashlib.sha256).digest()
+
+    def get(self, digest):
+        """
+        Get the identity a credential was verified for.
+        @param digest: cache key computed by digest()
+        @type  digest: str
+        @return: the identity, or None if the credential is not cached
+        @rtype:  str or None
+        """
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.pop(digest, None)
+            if entry is None:
+                self.__misses += 1
+                return None
+            identity, expiration = entry
+            if time.time() > expiration:
+                self.__remove_identity_digest(identity, digest)
+                self.__misses += 1
+                return None
+            # re-insert to mark the entry as the most recently used
+            self.__entries[digest] = entry
+            self.__hits += 1
+            return identity
+        finally:
+            self.__lock.release()
+
+    def put(self, digest, identity):
+        """
+        Cache a successfully verified credential.
+        @param digest: cache key computed by digest()
+        @type  digest: str
+        @param identity: user login or consumer id the credential was verified for
+        @type  identity: str
+        """
+        ttl = self.ttl
+        if ttl is None:
+            ttl = pulp_config.config.getfloat('security', 'credential_cache_ttl')
+        max_entries = self.max_entries
+        if max_entries is None:
+            max_entries = pulp_config.config.getint('security', 'credential_cache_size')
+        if ttl <= 0 or max_entries <= 0:
+            return
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.pop(digest, None)
+            if entry is not None:
+                self.__remove_identity_digest(entry[0], digest)
+            while len(self.__entries) >= max_entries:
+                old_digest, (old_identity, expiration) = self.__entries.popitem(last=False)
+                self.__remove_identity_digest(old_identity, old_digest)
+            self.__entries[digest] = (identity, time.time() + ttl)
+            self.__identities.setdefault(identity, set()).add(digest)
+        finally:
+            self.__lock.release()
+
+    def invalidate(self, identity=None):
+        """
+        Discard cached credentials.
+        @param identity: user login or consumer id whose credentials are
+                         discarded; if None, all credentials are discarded
+        @type  identity: str or None
+        """
+        self.__lock.acquire()
+        try:
+            if identity is None:
+                self.__entries.clear()
+                self.__identities.clear()
+                return
+            for digest in self.__identities.pop(identity, ()):
+                self.__entries.pop(digest, None)
+        finally:
+            self.__lock.release()
+
+    def statistics(self):
+        """
+        @return: number of credentials found in the cache (hits), number not
+                 found (misses) and number of cached entries
+        @rtype:  dict
+        """
+        self.__lock.acquire()
+        try:
+            return {'hits': self.__hits, 'misses': self.__misses,
+                    'entries': len(self.__entries)}
+        finally:
+            self.__lock.release()
+
+    def __remove_identity_digest(self, identity, digest):
+        """
+        Remove a digest from the index of an identity's digests
+        NOTE: must be called with the cache lock held
+        """
+        digests = self.__identities.get(identity)
+        if digests is None:
+            return
+        digests.discard(digest)
+        if not digests:
+            del self.__identities[identity]
+
+# process-wide credential cache ------------------------------------------------
+
+CREDENTIAL_CACHE = CredentialCache()
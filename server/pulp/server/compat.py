@@ -35,6 +35,118 @@ else:
 
 digestmod = _digestmod
 
+
+try:
+    from collections import OrderedDict as _OrderedDict
+except ImportError:
+    # python 2.6 does not have an ordered dictionary
+    _MISSING = object()
+
+    class _OrderedDict(dict):
+        # dictionary that remembers insertion order, kept as a circular doubly
+        # linked list of [previous, next, key] links with a sentinel root
+        # http://code.activestate.com/recipes/576693/
+
+        def __init__(self, *args, **kwargs):
+            dict.__init__(self)
+            self.__root = root = []
+            root[:] = [root, root, None]
+            self.__map = {}
+            self.update(*args, **kwargs)
+
+        def __setitem__(self, key, value):
+            if key not in self:
+                root = self.__root
+                last = root[0]
+                last[1] = root[0] = self.__map[key] = [last, root, key]
+            dict.__setitem__(self, key, value)
+
+        def __delitem__(self, key):
+            dict.__delitem__(self, key)
+            previous, next, key = self.__map.pop(key)
+            previous[1] = next
+            next[0] = previous
+
+        def __iter__(self):
+            root = self.__root
+            current = root[1]
+            while current is not root:
+                yield current[2]
+                current = current[1]
+
+        def __reversed__(self):
+            root = self.__root
+            current = root[0]
+            while current is not root:
+                yield current[2]
+                current = current[0]
+
+        def __repr__(self):
+            return '%s(%r)' % (self.__class__.__name__, self.items())
+
+        def clear(self):
+            root = self.__root
+            root[:] = [root, root, None]
+            self.__map.clear()
+            dict.clear(self)
+
+        def update(self, *args, **kwargs):
+            for other in args + (kwargs,):
+                if hasattr(other, 'keys'):
+                    for key in other.keys():
+                        self[key] = other[key]
+                else:
+                    for key, value in other:
+                        self[key] = value
+
+        def setdefault(self, key, default=None):
+            if key not in self:
+                self[key] = default
+            return self[key]
+
+        def pop(self, key, default=_MISSING):
+            if key in self:
+                value = self[key]
+                del self[key]
+                return value
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+
+        def popitem(self, last=True):
+            if not self:
+                raise KeyError('dictionary is empty')
+            if last:
+                key = reversed(self).next()
+            else:
+                key = iter(self).next()
+            return key, self.pop(key)
+
+        def keys(self):
+            return list(self)
+
+        def values(self):
+            return [self[key] for key in self]
+
+        def items(self):
+            return [(key, self[key]) for key in self]
+
+        def iterkeys(self):
+            return iter(self)
+
+        def itervalues(self):
+            for key in self:
+                yield self[key]
+
+        def iteritems(self):
+            for key in self:
+                yield (key, self[key])
+
+        def copy(self):
+            return self.__class__(self)
+
+OrderedDict = _OrderedDict
+
 # pymongo imports --------------------------------------------------------------
 
 try:
@@ -21,6 +21,9 @@ config = None # ConfigParser.SafeConfigParser instance
 
 # to guarantee that a section and/or setting exists, add a default value here
 _default_values = {
+    'applicability': {
+        'processes': '0',
+    },
     'consumer_history': {
         'lifetime': '180', # in days
     },
@@ -68,6 +71,16 @@ _default_values = {
         'uninstall_timeout': '10:600',
         'bind_timeout': '2592000:600',
         'unbind_timeout': '2592000:600',
+        'heartbeat_flush_interval': '500',
+    },
+    'notifications': {
+        'delivery_workers': '4',
+        'max_pending': '1000',
+        'enqueue_timeout': '5',
+        'max_attempts': '3',
+        'retry_delay': '30',
+        'connection_idle_timeout': '60',
+        'listener_cache_ttl': '30',
     },
     'scheduler': {
         'dispatch_interval': '30',
@@ -79,6 +92,9 @@ _default_values = {
         'user_cert_expiration': '7',
         'consumer_cert_expiration': '3650',
         'serial_number_path': '/var/lib/pulp/sn.dat',
+        'authorization_cache_ttl': '30',
+        'credential_cache_ttl': '300',
+        'credential_cache_size': '10000',
     },
     'server': {
         'server_name': socket.gethostname(),
@@ -86,15 +102,20 @@ _default_values = {
         'default_password': 'admin',
         'debugging_mode': 'false',
         'storage_dir': '/var/lib/pulp/',
+        'response_cache_size': '1000',
+        'response_cache_max_body': '1048576',
     },
     'tasks': {
         'concurrency_threshold': '9',
         'dispatch_interval': '0.5',
+        'worker_pool_size': '16',
         'archived_call_lifetime': '48',
         'consumer_content_weight': '0',
         'create_weight': '0',
         'publish_weight': '1',
         'sync_weight': '2',
+        'max_wait': '30',
+        'max_waiters': '4',
     },
 }
 
@@ -180,7 +180,7 @@ class PulpCollection(Collection):
                           'insert', 'save', 'update', 'remove', 'drop', 'find', 'find_one', 'count',
                           'create_index', 'ensure_index', 'drop_index', 'drop_indexes', 'reindex',
                           'index_information', 'options', 'group', 'rename', 'distinct', 'map_reduce',
-                          'inline_map_reduce', 'find_and_modify')
+                          'inline_map_reduce', 'find_and_modify', 'aggregate')
 
     def __init__(self, database, name, create=False, retries=0, **kwargs):
         super(PulpCollection, self).__init__(database, name, create=create, **kwargs)
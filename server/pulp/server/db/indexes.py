@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Management of the indexes defined by the unique_indices and search_indices of
+the data models. The indexes are created by pulp-manage-db and, for the data
+models whose index definitions changed since, once at server startup, instead
+of each time a collection is used.
+
+The index definitions last created for each collection are recorded in the
+database, so that a server started after an upgrade only creates the indexes
+that changed.
+"""
+
+import logging
+import pkgutil
+from gettext import gettext as _
+
+from pulp.server.db import connection
+from pulp.server.db import model as model_package
+from pulp.server.db.model.base import Model
+
+# -- constants ----------------------------------------------------------------
+
+# collection recording the index definitions last created for each collection
+INDEX_VERSIONS_COLLECTION = 'model_index_versions'
+
+_LOG = logging.getLogger(__name__)
+
+# -- public -------------------------------------------------------------------
+
+def model_collections():
+    """
+    Find the data models associated with a document collection. All of the
+    modules in the pulp.server.db.model package are imported, data models
+    defined elsewhere are included if their module has been imported.
+
+    @return: dict of collection name to list of data model classes
+    @rtype:  dict
+    """
+    for importer, module_name, is_package in pkgutil.iter_modules(model_package.__path__):
+        __import__('%s.%s' % (model_package.__name__, module_name))
+
+    collections = {}
+    pending = [Model]
+    while pending:
+        model_class = pending.pop()
+        for subclass in model_class.__subclasses__():
+            pending.append(subclass)
+            if subclass.collection_name is not None:
+                models = collections.setdefault(subclass.collection_name, [])
+                if subclass not in models:
+                    models.append(subclass)
+    return collections
+
+
+def ensure_indexes(force=False):
+    """
+    Create the indexes of the data models whose index definitions changed
+    since their indexes were last created.
+
+    @param force: if True, ensure the indexes of every data model; the
+                  definitions are still only recorded when they changed
+    @type  force: bool
+    @return: names of the collections whose indexes were ensured
+    @rtype:  list of str
+    """
+    versions = connection.get_collection(INDEX_VERSIONS_COLLECTION)
+    recorded = dict((v['_id'], v['indexes']) for v in versions.find())
+
+    ensured = []
+    for collection_name, models in sorted(model_collections().items()):
+        indexes = _index_definitions(models)
+        changed = recorded.get(collection_name) != indexes
+        if not changed and not force:
+            continue
+        _LOG.debug('Ensuring indexes on collection [%s]' % collection_name)
+        for model_class in models:
+            model_class.ensure_indexes()
+        if changed:
+            versions.save({'_id': collection_name, 'indexes': indexes}, safe=True)
+        ensured.append(collection_name)
+    return ensured
+
+
+def index_report():
+    """
+    Compare the indexes in the database with the indexes defined by the data
+    models.
+
+    @return: dict of collection name to a dict with the 'missing' indexes (as
+             lists of field names, with a '(unique)' suffix for unique indexes)
+             and the 'extraneous' index names, for each collection whose
+             indexes differ from the definitions
+    @rtype:  dict
+    """
+    report = {}
+    for collection_name, models in sorted(model_collections().items()):
+        expected = set()
+        for model_class in models:
+            for key, unique in model_class.index_specs():
+                expected.add((_normalize_key(key), unique))
+
+        existing = {}
+        for index_name, info in models[0].get_collection().index_information().items():
+            if index_name == '_id_':
+                continue
+            existing[(_normalize_key(info['key']), bool(info.get('unique', False)))] = index_name
+
+        missing = [_describe_index(key, unique) for key, unique in sorted(expected)
+                   if (key, unique) not in existing]
+        extraneous = sorted(name for spec, name in existing.items() if spec not in expected)
+        if missing or extraneous:
+            report[collection_name] = {'missing': missing, 'extraneous': extraneous}
+    return report
+
+
+def log_index_report():
+    """
+    Log a warning for each collection whose indexes differ from the data
+    model definitions.
+
+    @return: the index report, see index_report()
+    @rtype:  dict
+    """
+    report = index_report()
+    for collection_name, differences in sorted(report.items()):
+        _LOG.warn(_('Collection [%(c)s] is missing indexes [%(m)s] and has extraneous indexes [%(e)s]') %
+                  {'c': collection_name, 'm': '; '.join(differences['missing']),
+                   'e': ', '.join(differences['extraneous'])})
+    return report
+
+# -- private ------------------------------------------------------------------
+
+def _index_definitions(models):
+    """
+    @return: the index definitions of the data models of a collection, in the
+             form they are recorded in the database
+    @rtype:  list of dict
+    """
+    definitions = []
+    for model_class in models:
+        for key, unique in model_class.index_specs():
+            definitions.append({'key': [[field, direction] for field, direction in key],
+                                'unique': unique})
+    return definitions
+
+
+def _normalize_key(key):
+    """
+    @return: hashable form of an index key, which is a list of (field,
+             direction) pairs as defined by a data model or returned by
+             index_information
+    @rtype:  tuple
+    """
+    return tuple((field, int(direction)) for field, direction in key)
+
+
+def _describe_index(key, unique):
+    """
+    @return: human readable description of an index
+    @rtype:  str
+    """
+    description = ', '.join(field for field, direction in key)
+    if unique:
+        description += ' (unique)'
+    return description
@@ -16,7 +16,7 @@ import os
 import sys
 
 from pulp.plugins.loader.api import load_content_types
-from pulp.server.db import connection
+from pulp.server.db import connection, indexes, resource_versions
 from pulp.server.db.migrate import models
 from pulp.server import config
 
@@ -115,8 +115,8 @@ def main():
 
 def _auto_manage_db(options):
     """
-    Find and apply all available database migrations, and install or update all available content
-    types.
+    Find and apply all available database migrations, ensure the indexes of the data models, and
+    install or update all available content types.
 
     :param options: The command line parameters from the user.
     """
@@ -124,10 +124,25 @@ def _auto_manage_db(options):
     print message
     logger.info(message)
     migrate_database(options)
+    # migrations may rewrite any document; responses cached by running servers
+    # and clients must not be used any more
+    resource_versions.bump_all()
     message = _('Database migrations complete.')
     print message
     logger.info(message)
 
+    message = _('Ensuring database indexes.')
+    print message
+    logger.info(message)
+    indexes.ensure_indexes(force=True)
+    for collection_name, differences in sorted(indexes.log_index_report().items()):
+        if differences['extraneous']:
+            message = _('Collection %(c)s has indexes that are no longer defined: %(e)s')
+            print message % {'c': collection_name, 'e': ', '.join(differences['extraneous'])}
+    message = _('Database indexes ensured.')
+    print message
+    logger.info(message)
+
     message = _('Loading content types.')
     print message
     logger.info(message)
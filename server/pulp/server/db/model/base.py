@@ -12,7 +12,7 @@
 from pymongo import DESCENDING
 
 from pulp.server.compat import ObjectId
-from pulp.server.db.connection import get_collection
+from pulp.server.db.connection import get_collection, get_database
 
 
 class Model(dict):
@@ -77,31 +77,38 @@ class Model(dict):
     # database collection methods ---------------------------------------------
 
     @classmethod
-    def _get_collection_from_db(cls):
-        # ensure the indices in the document collection
-        def _ensure_indices(collection, indices, unique):
+    def index_specs(cls):
+        """
+        Get the indexes defined by the unique_indices and search_indices of
+        this data model.
+        @rtype: list of tuple
+        @return: (key, unique) for each index, where key is a list of
+                 (field, direction) tuples
+        """
+        specs = []
+        for indices, unique in ((cls.unique_indices, True), (cls.search_indices, False)):
             # indices are either tuples or strings,
             # tuples are 'unique together' if unique is True
             for index in indices:
                 if isinstance(index, basestring):
                     index = (index,)
-                # we're using descending ordering for the arbitrary case,
-                # if you need a particular ordering, override the
-                # _get_collection_from_db method
-                collection.ensure_index([(i, DESCENDING) for i in index],
-                                        unique=unique, background=True)
-        # create the collection and ensure the unique and other indices
-        collection = get_collection(cls.collection_name)
-        _ensure_indices(collection, cls.unique_indices, True)
-        _ensure_indices(collection, cls.search_indices, False)
-        return collection
+                # we're using descending ordering for the arbitrary case
+                specs.append(([(i, DESCENDING) for i in index], unique))
+        return specs
 
     @classmethod
-    def _get_cached_collection(cls):
-        try:
-            return cls.__collection
-        except AttributeError:
-            return None
+    def ensure_indexes(cls):
+        """
+        Create the indexes defined by this data model in its document
+        collection. This is done by the index management step run by
+        pulp-manage-db and at server startup, see pulp.server.db.indexes,
+        and not each time the collection is used.
+        """
+        if cls.collection_name is None:
+            return
+        collection = cls.get_collection()
+        for key, unique in cls.index_specs():
+            collection.ensure_index(key, unique=unique, background=True)
 
     @classmethod
     def get_collection(cls):
@@ -115,5 +122,13 @@ class Model(dict):
         # collection_name
         if cls.collection_name is None:
             return None
-        # removed cached connections to handle AutoReconnect exception
-        return cls._get_collection_from_db()
+        # the collection is cached for each model class, and re-created when
+        # the database connection is re-initialized; operations failing with
+        # AutoReconnect are retried by the collection itself, so a cached
+        # collection survives the connection to the database being lost
+        database = get_database()
+        cached = cls.__dict__.get('_cached_collection')
+        if cached is None or cached[0] is not database:
+            cached = (database, get_collection(cls.collection_name))
+            cls._cached_collection = cached
+        return cached[1]
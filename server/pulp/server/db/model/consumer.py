@@ -148,7 +148,8 @@ class RepoProfileApplicability(Model):
         ('profile_hash', 'repo_id'),
     )
 
-    def __init__(self, profile_hash, repo_id, profile, applicability, _id=None, **kwargs):
+    def __init__(self, profile_hash, repo_id, profile, applicability, _id=None,
+                 content_versions=None, **kwargs):
         """
         Construct a RepoProfileApplicability object.
 
@@ -163,6 +164,9 @@ class RepoProfileApplicability(Model):
         :type  applicability: dict
         :param _id:           The MongoDB ID for this object, if it exists in the database
         :type  _id:           bson.objectid.ObjectId
+        :param content_versions: The repository's content versions, keyed by content type ID, of
+                              the types the applicability data was calculated from
+        :type  content_versions: dict
         :param kwargs:        unused, but collected to allow instantiation from Mongo query results
         :type  kwargs:        dict
         """
@@ -172,6 +176,7 @@ class RepoProfileApplicability(Model):
         self.repo_id = repo_id
         self.profile = profile
         self.applicability = applicability
+        self.content_versions = content_versions
         self._id = _id
 
         # The superclass puts an unnecessary (and confusingly named) id attribute on this model.
@@ -192,7 +197,8 @@ class RepoProfileApplicability(Model):
         # If this object's _id attribute is not None, then it represents an existing DB object.
         # Else, we need to create an object with this object's attributes
         new_document = {'profile_hash': self.profile_hash, 'repo_id': self.repo_id,
-                        'profile': self.profile, 'applicability': self.applicability}
+                        'profile': self.profile, 'applicability': self.applicability,
+                        'content_versions': self.content_versions}
         if self._id is not None:
             self.get_collection().update({'_id': self._id}, new_document, safe=True)
         else:
@@ -308,6 +314,35 @@ class ConsumerHistoryEvent(Model):
         now = datetime.datetime.now(dateutils.utc_tz())
         self.timestamp = dateutils.format_iso8601_datetime(now)
 
+class ConsumerHeartbeat(Model):
+    """
+    Represents the last heartbeat received from a consumer's agent. The
+    document is identified by the agent's uuid, which is the consumer id.
+
+    @ivar last: when the last heartbeat was received
+    @type last: datetime.datetime
+
+    @ivar next: when the agent is considered offline, unless another heartbeat
+                is received before
+    @type next: datetime.datetime
+
+    @ivar details: additional information sent with the heartbeat
+    @type details: dict
+    """
+    collection_name = 'consumer_heartbeats'
+    unique_indices = ()
+    # covers the query for the agents whose heartbeat has expired
+    search_indices = (('next', '_id'),)
+
+    def __init__(self, uuid, last, next, details):
+        super(ConsumerHeartbeat, self).__init__()
+
+        self._id = uuid
+        self.id = uuid
+        self.last = last
+        self.next = next
+        self.details = details
+
 class ConsumerGroup(Model):
     """
     Represents a group of consumers.
@@ -45,6 +45,14 @@ class Repo(Model):
                               unit may be associated multiple times.
     @type content_unit_count: int
 
+    @ivar content_versions: per content type counter, incremented each time the
+                            units of that type associated with this repo change
+    @type content_versions: dict
+
+    @ivar content_version: incremented each time any of the units associated
+                           with this repo change
+    @type content_version: int
+
     @ivar metadata: arbitrary data that describes the contents of the repo;
                     the values may change as the contents of the repo change,
                     either set by the user or by an importer or distributor
@@ -63,6 +71,8 @@ class Repo(Model):
         self.notes = notes or {}
         self.scratchpad = {} # default to dict in hopes the plugins will just add/remove from it
         self.content_unit_counts = content_unit_counts or {}
+        self.content_versions = {}
+        self.content_version = 0
 
         # Timeline
         # TODO: figure out how to track repo modified states
@@ -56,7 +56,9 @@ class CollectionsReaper(object):
         self.__lock.acquire()
 
         while True:
-            self.__condition.wait(timeout=self.reap_interval)
+            # stop() may have been called before this thread got the lock
+            if not self.__exit:
+                self.__condition.wait(timeout=self.reap_interval)
             if self.__exit:
                 if self.__lock is not None:
                     self.__lock.release()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Versions of the resources served by the REST API. The managers change the
+version of a resource once each operation has written the documents it is
+built from, so that the web services can tell whether a response built from
+the resource has changed without building it again.
+
+Each repository has a version of its own, so that writes to one repository do
+not change the responses built from the others, in addition to the version of
+the repositories as a whole used by the repository list.
+
+Versions are stored in the database so that every server process sees the
+writes made by the others. A version is an opaque token, not a counter, so
+that versions are never reused, even when the database is recreated.
+"""
+
+from bson.objectid import ObjectId
+
+from pulp.server.db import connection
+
+# -- constants ----------------------------------------------------------------
+
+# collection recording the current version of each resource
+RESOURCE_VERSIONS_COLLECTION = 'resource_versions'
+
+# repositories, including their importers and distributors
+REPOSITORIES = 'repositories'
+
+# prefix of the resource of a single repository
+REPOSITORY_PREFIX = REPOSITORIES + ':'
+
+# content type definitions
+CONTENT_TYPES = 'content_types'
+
+# content units of every type
+CONTENT_UNITS = 'content_units'
+
+ALL_RESOURCES = (REPOSITORIES, CONTENT_TYPES, CONTENT_UNITS)
+
+# -- public -------------------------------------------------------------------
+
+def bump(*resources):
+    """
+    Change the versions of resources. Must be called after the write to the
+    resource documents, never before, otherwise a response built from the
+    old documents could be cached under the new version.
+
+    @param resources: names of the resources that were written
+    @type  resources: str
+    """
+    collection = connection.get_collection(RESOURCE_VERSIONS_COLLECTION)
+    for resource in resources:
+        collection.update({'_id': resource}, {'$set': {'version': str(ObjectId())}},
+                          upsert=True, safe=True)
+
+
+def bump_repository(repo_id):
+    """
+    Change the versions of a repository and of the repositories as a whole.
+    Must be called after the write, as with bump.
+
+    @param repo_id: identifies the repository that was written
+    @type  repo_id: str
+    """
+    bump(REPOSITORIES, repository(repo_id))
+
+
+def bump_all():
+    """
+    Change the versions of every resource, including the resources of the
+    individual repositories, for instance after the database has been
+    migrated.
+    """
+    collection = connection.get_collection(RESOURCE_VERSIONS_COLLECTION)
+    collection.update({}, {'$set': {'version': str(ObjectId())}}, multi=True, safe=True)
+    bump(*ALL_RESOURCES)
+
+
+def repository(repo_id):
+    """
+    @param repo_id: identifies a repository
+    @type  repo_id: str
+    @return: name of the resource of a single repository
+    @rtype:  str
+    """
+    return REPOSITORY_PREFIX + repo_id
+
+
+def get_versions(resources):
+    """
+    Get the current versions of resources.
+
+    @param resources: names of the resources
+    @type  resources: list or tuple of str
+    @return: version of each resource, in the same order; None for the
+             resources that have never been written
+    @rtype:  list
+    """
+    collection = connection.get_collection(RESOURCE_VERSIONS_COLLECTION)
+    found = dict((v['_id'], v['version'])
+                 for v in collection.find({'_id': {'$in': list(resources)}}))
+    return [found.get(resource) for resource in resources]
@@ -14,6 +14,8 @@
 import itertools
 import logging
 import pickle
+import threading
+import time
 import traceback
 import uuid
 from gettext import gettext as _
@@ -311,8 +313,13 @@ class CallReport(object):
     @type start_time: datetime.datetime
     @ivar finish_time: time the call in the call request completed
     @type finish_time: datetime.datetime
+    @ivar revision: incremented every time the state or progress changes
+    @type revision: int
     """
 
+    # fields whose changes increment the revision and wake up waiters
+    _revised_fields = ('state', 'progress')
+
     @classmethod
     def from_call_request(cls, call_request):
         """
@@ -360,6 +367,10 @@ class CallReport(object):
         assert isinstance(traceback, (NoneType, TracebackType))
         assert isinstance(serialize_result, bool)
 
+        # notified whenever the state or progress of this call report changes
+        self._changed = threading.Condition(threading.Lock())
+        self.revision = 0
+
         self.call_request_id = call_request_id
         self.call_request_group_id = call_request_group_id
         self.call_request_tags = call_request_tags or []
@@ -382,6 +393,43 @@ class CallReport(object):
         self.start_time = None
         self.finish_time = None
 
+    def __setattr__(self, name, value):
+        if name not in self._revised_fields:
+            object.__setattr__(self, name, value)
+            return
+        self._changed.acquire()
+        try:
+            object.__setattr__(self, name, value)
+            object.__setattr__(self, 'revision', getattr(self, 'revision', 0) + 1)
+            self._changed.notify_all()
+        finally:
+            self._changed.release()
+
+    def wait_for_change(self, revision, timeout):
+        """
+        Block until the state or progress of the call changes.
+        Returns immediately if the report's revision differs from the given
+        revision or the call is already complete.
+        @param revision: revision of the report last seen by the caller
+        @type  revision: int
+        @param timeout: maximum number of seconds to wait
+        @type  timeout: float
+        @return: True if the report changed, False if the wait timed out
+        @rtype:  bool
+        """
+        deadline = time.time() + timeout
+        self._changed.acquire()
+        try:
+            while self.revision == revision and \
+                    self.state not in dispatch_constants.CALL_COMPLETE_STATES:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+        finally:
+            self._changed.release()
+
     def serialize(self):
         """
         Serialize the call report for either the wire or storage in the db.
@@ -395,7 +443,7 @@ class CallReport(object):
 
         for field in ('call_request_id', 'call_request_group_id', 'call_request_tags',
                       'schedule_id', 'principal_login', 'response', 'reasons',
-                      'state', 'progress', 'dependency_failures'):
+                      'state', 'progress', 'dependency_failures', 'revision'):
             data[field] = getattr(self, field)
 
         # legacy fields
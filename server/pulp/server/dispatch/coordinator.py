@@ -26,6 +26,7 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import exceptions as dispatch_exceptions
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch.call import CallRequest
+from pulp.server.dispatch.locktable import RESOURCE_LOCK_TABLE
 from pulp.server.dispatch.task import AsyncTask, Task
 from pulp.server.exceptions import OperationTimedOut
 from pulp.server.util import subdict, TopologicalSortError, topological_sort
@@ -63,6 +64,7 @@ class Coordinator(object):
         """
         # drop all previous knowledge of previous calls
         self.call_resource_collection.remove(safe=True)
+        RESOURCE_LOCK_TABLE.rebuild(self.call_resource_collection)
 
         # re-start interrupted tasks
         queued_call_collection = QueuedCall.get_collection()
@@ -248,6 +250,7 @@ class Coordinator(object):
 
             if call_resource_list:
                 self.call_resource_collection.insert(call_resource_list, safe=True)
+                RESOURCE_LOCK_TABLE.acquire(call_resource_list)
 
             for task in task_list:
                 task_queue.enqueue(task)
@@ -326,6 +329,9 @@ class Coordinator(object):
         * a list of blocking "reasons" in the form of TaskResource instances
         * a list of task resources corresponding to the given resources
 
+        Conflicts are looked up in the in-process resource lock table, which
+        mirrors the call_resources collection, so no database query is made.
+
         @param resources: dictionary of resources and their proposed operations
         @type  resources: dict
         @return: tuple of objects described above
@@ -348,33 +354,41 @@ class Coordinator(object):
         rejecting_call_requests = set()
         rejecting_reasons = []
 
+        # (resource type, resource id, operation) of the reasons already found
+        seen_reasons = set()
+
         call_resources = resource_dict_to_call_resources(resources)
-        or_query = filter_dicts(call_resources, ('resource_type', 'resource_id'))
-        cursor = self.call_resource_collection.find({'$or': or_query})
 
-        for call_resource in cursor:
-            proposed_operation = resources[call_resource['resource_type']][call_resource['resource_id']]
-            queued_operation = call_resource['operation']
+        for call_resource in call_resources:
+            resource_type = call_resource['resource_type']
+            resource_id = call_resource['resource_id']
+            proposed_operation = call_resource['operation']
 
-            postponing_operations = get_postponing_operations(proposed_operation)
+            held_operations = RESOURCE_LOCK_TABLE.held_operations(resource_type, resource_id)
+            if not held_operations:
+                continue
 
-            if queued_operation in postponing_operations:
-                postponing_call_requests.add(call_resource['call_request_id'])
-                reason = filter_dicts([call_resource], ('resource_type', 'resource_id'))[0]
-                reason['operation'] = queued_operation
+            postponing_operations = _POSTPONING_OPERATIONS[proposed_operation]
+            rejecting_operations = _REJECTING_OPERATIONS[proposed_operation]
 
-                if reason not in postponing_reasons:
-                    postponing_reasons.append(reason)
+            for call_request_id, queued_operation in held_operations:
 
-            rejecting_operations = get_rejecting_operations(proposed_operation)
+                if queued_operation in postponing_operations:
+                    call_requests, reasons = postponing_call_requests, postponing_reasons
+                elif queued_operation in rejecting_operations:
+                    call_requests, reasons = rejecting_call_requests, rejecting_reasons
+                else:
+                    continue
 
-            if queued_operation in rejecting_operations:
-                rejecting_call_requests.add(call_resource['call_request_id'])
-                reason = filter_dicts([call_resource], ('resource_type', 'resource_id'))[0]
-                reason['operation'] = queued_operation
+                call_requests.add(call_request_id)
 
-                if reason not in rejecting_reasons:
-                    rejecting_reasons.append(reason)
+                reason_key = (resource_type, resource_id, queued_operation)
+                if reason_key in seen_reasons:
+                    continue
+                seen_reasons.add(reason_key)
+                reasons.append({'resource_type': resource_type,
+                                'resource_id': resource_id,
+                                'operation': queued_operation})
 
         if rejecting_call_requests:
             return dispatch_constants.CALL_REJECTED_RESPONSE, rejecting_call_requests, rejecting_reasons, call_resources
@@ -606,6 +620,12 @@ def resource_dict_to_call_resources(resource_dict):
             call_resources.append(call_resource)
     return call_resources
 
+# operations that postpone or reject each proposed operation, computed once
+_POSTPONING_OPERATIONS = dict((op, tuple(get_postponing_operations(op)))
+                              for op in dispatch_constants.RESOURCE_OPERATIONS_MATRIX)
+_REJECTING_OPERATIONS = dict((op, tuple(get_rejecting_operations(op)))
+                             for op in dispatch_constants.RESOURCE_OPERATIONS_MATRIX)
+
 # call run utility functions ---------------------------------------------------
 
 def set_call_request_id_on_call_resources(call_request_id, call_resources):
@@ -692,6 +712,7 @@ def coordinator_dequeue_callback(call_request, call_report):
     @param call_report: call report for the call
     @type  call_report: L{call.CallReport} instance
     """
+    RESOURCE_LOCK_TABLE.release(call_request.id)
     collection = CallResource.get_collection()
     collection.remove({'call_request_id': call_request.id}, safe=True)
 
@@ -46,7 +46,9 @@ def _initialize_task_queue():
     from pulp.server.dispatch.taskqueue import TaskQueue
     concurrency_threshold = pulp_config.config.getint('tasks', 'concurrency_threshold')
     dispatch_interval = pulp_config.config.getfloat('tasks', 'dispatch_interval')
-    _TASK_QUEUE = TaskQueue(concurrency_threshold, dispatch_interval)
+    worker_pool_size = pulp_config.config.getint('tasks', 'worker_pool_size')
+    _TASK_QUEUE = TaskQueue(concurrency_threshold, dispatch_interval,
+                            worker_pool_size=worker_pool_size)
     _TASK_QUEUE.start()
 
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import threading
+
+# resource lock table class ----------------------------------------------------
+
+class ResourceLockTable(object):
+    """
+    In-process index of the operations queued call requests hold on resources.
+    Mirrors the call_resources collection so that the coordinator can detect
+    conflicting operations without querying the database. The collection
+    remains the source of truth and the table can be rebuilt from it.
+
+    The table is organized as:
+    {resource_type: {resource_id: {call_request_id: operation}}}
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__resources = {}
+        # call request id: list of (resource type, resource id) tuples
+        self.__call_requests = {}
+
+    def acquire(self, call_resources):
+        """
+        Record the operations held by call requests on resources.
+        @param call_resources: call resources with the call_request_id set
+        @type  call_resources: iterable of L{CallResource} instances or dicts
+        """
+        self.__lock.acquire()
+        try:
+            for call_resource in call_resources:
+                call_request_id = call_resource['call_request_id']
+                resource_type = call_resource['resource_type']
+                resource_id = call_resource['resource_id']
+                resource_ids = self.__resources.setdefault(resource_type, {})
+                resource_ids.setdefault(resource_id, {})[call_request_id] = call_resource['operation']
+                self.__call_requests.setdefault(call_request_id, []).append((resource_type, resource_id))
+        finally:
+            self.__lock.release()
+
+    def release(self, call_request_id):
+        """
+        Remove all of the operations held by a call request.
+        @param call_request_id: call request id
+        @type  call_request_id: str
+        """
+        self.__lock.acquire()
+        try:
+            for resource_type, resource_id in self.__call_requests.pop(call_request_id, ()):
+                resource_ids = self.__resources.get(resource_type)
+                if resource_ids is None:
+                    continue
+                held = resource_ids.get(resource_id)
+                if held is None:
+                    continue
+                held.pop(call_request_id, None)
+                if held:
+                    continue
+                resource_ids.pop(resource_id)
+                if not resource_ids:
+                    self.__resources.pop(resource_type)
+        finally:
+            self.__lock.release()
+
+    def held_operations(self, resource_type, resource_id):
+        """
+        Get the operations held on a resource.
+        @param resource_type: resource type
+        @type  resource_type: str
+        @param resource_id: resource id
+        @type  resource_id: str
+        @return: (possibly empty) list of (call request id, operation) tuples
+        @rtype:  list
+        """
+        self.__lock.acquire()
+        try:
+            return self.__resources.get(resource_type, {}).get(resource_id, {}).items()
+        finally:
+            self.__lock.release()
+
+    def clear(self):
+        """
+        Remove all of the operations held on all resources.
+        """
+        self.__lock.acquire()
+        try:
+            self.__resources.clear()
+            self.__call_requests.clear()
+        finally:
+            self.__lock.release()
+
+    def rebuild(self, call_resource_collection):
+        """
+        Replace the contents of the table with the call resources persisted in
+        the database.
+        @param call_resource_collection: call_resources collection
+        @type  call_resource_collection: L{pymongo.collection.Collection}
+        """
+        self.__lock.acquire()
+        try:
+            self.clear()
+            self.acquire(call_resource_collection.find())
+        finally:
+            self.__lock.release()
+
+# process-wide resource lock table ---------------------------------------------
+
+RESOURCE_LOCK_TABLE = ResourceLockTable()
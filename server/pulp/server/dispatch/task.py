@@ -95,9 +95,12 @@ class Task(object):
 
         self._complete(dispatch_constants.CALL_SKIPPED_STATE)
 
-    def run(self):
+    def run(self, worker_pool=None):
         """
-        Public wrapper to kick off the call in the call_request in a new thread.
+        Public wrapper to kick off the call in the call_request in another thread.
+        @param worker_pool: pool of reusable worker threads to run the call in,
+                            if None, the call is run in a new thread
+        @type  worker_pool: L{pulp.server.dispatch.workerpool.WorkerPool} or None
         """
         assert self.call_report.state in dispatch_constants.CALL_READY_STATES
 
@@ -105,11 +108,14 @@ class Task(object):
         # task queue lock and doesn't occur in another thread
         self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
 
-        task_thread = threading.Thread(target=self._run)
-        task_thread.start()
+        if worker_pool is None:
+            task_thread = threading.Thread(target=self._run)
+            task_thread.start()
+        else:
+            worker_pool.submit(self._run)
 
         # I'm fairly certain these will always be called *before* the context
-        # switch to the task_thread
+        # switch to the task_thread or worker thread
         self.call_life_cycle_callbacks(dispatch_constants.CALL_RUN_LIFE_CYCLE_CALLBACK)
 
     def _run(self):
@@ -11,6 +11,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import heapq
 import itertools
 import logging
 import sys
@@ -20,8 +21,10 @@ from datetime import datetime, timedelta
 from gettext import gettext as _
 
 from pulp.common import dateutils
+from pulp.server.compat import OrderedDict
 from pulp.server.db.model.dispatch import QueuedCall
 from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch.workerpool import WorkerPool
 from pulp.server.util import subdict
 
 
@@ -34,35 +37,57 @@ class TaskQueue(object):
     TaskQueue class
     Manager and dispatcher of concurrent, asynchronous task execution
 
+    The queue keeps an index of the waiting tasks that are ready to run (i.e.
+    have no outstanding dependencies), bucketed by weight, that is maintained
+    as tasks are enqueued, unblocked and completed. The dispatcher thread is
+    woken on those state changes instead of polling, and ready tasks are run
+    on a bounded pool of reusable worker threads.
+
     @ivar concurrency_threshold: measurement of total allowed concurrency
     @type concurrency_threshold: int
-    @ivar dispatch_interval: time, in seconds, between checks for ready tasks
+    @ivar dispatch_interval: deprecated, the dispatcher no longer polls for
+                             ready tasks but is woken on task state changes
     @type dispatch_interval: float
     @ivar completed_task_cache_life: time, in seconds, to cache completed tasks
     @type completed_task_cache_life: float
+    @ivar worker_pool_size: maximum number of worker threads that run tasks
+    @type worker_pool_size: int
     """
 
     def __init__(self,
                  concurrency_threshold,
                  dispatch_interval=0.5,
-                 completed_task_cache_life=20.0):
+                 completed_task_cache_life=20.0,
+                 worker_pool_size=None):
 
         self.concurrency_threshold = concurrency_threshold
         self.dispatch_interval = dispatch_interval
         self.completed_task_cache_life = timedelta(seconds=completed_task_cache_life)
+        # the pool must be able to run at least a full concurrency threshold of
+        # weighted tasks, weight 0 tasks queue for a worker beyond that
+        self.worker_pool_size = max(worker_pool_size or 0, concurrency_threshold, 1)
 
         self.queued_call_collection = QueuedCall.get_collection()
 
-        self.__waiting_tasks = []
-        self.__running_tasks = []
+        # call request id: task, in enqueue order
+        self.__waiting_tasks = OrderedDict()
+        # weight: {call request id: (ready sequence number, task)}, in ready order
+        self.__ready_tasks = {}
+        # blocking call request id: set of blocked call request ids
+        self.__blocked_tasks = {}
+        # call request id: task
+        self.__running_tasks = OrderedDict()
         self.__completed_tasks = []
 
+        self.__ready_sequence = itertools.count()
         self.__running_weight = 0
+        self.__dispatch_pending = False
         self.__exit = False
 
         self.__lock = threading.RLock()
         self.__condition = threading.Condition(self.__lock)
         self.__dispatcher = None
+        self.__worker_pool = WorkerPool(self.worker_pool_size, 'task-worker')
 
     # task dispatch methods ----------------------------------------------------
 
@@ -73,11 +98,15 @@ class TaskQueue(object):
         self.__lock.acquire()
         while True:
             try:
-                self.__condition.wait(timeout=self.dispatch_interval)
+                # NOTE no timeout: a timed wait is a sleep/poll loop, the
+                # dispatcher is notified of every relevant task state change
+                while not (self.__dispatch_pending or self.__exit):
+                    self.__condition.wait()
                 if self.__exit:
                     if self.__lock is not None:
                         self.__lock.release()
                     return
+                self.__dispatch_pending = False
                 ready_tasks = self._get_ready_tasks()
                 for task in ready_tasks:
                     self._run_ready_task(task)
@@ -86,53 +115,100 @@ class TaskQueue(object):
                 msg = _('Exception in task queue dispatcher thread:\n%(e)s')
                 _LOG.critical(msg % {'e': traceback.format_exception(*sys.exc_info())})
 
+    def _signal_dispatcher(self):
+        """
+        Wake the dispatcher thread to look for ready tasks.
+        NOTE: must be called with the task queue lock held
+        """
+        self.__dispatch_pending = True
+        self.__condition.notify()
+
     def _get_ready_tasks(self):
         """
         Algorithm at the heart of the task dispatcher. Gets the tasks that are
         ready to run (i.e. not blocked) within the limits of the available
-        concurrency threshold and returns them. Note that this algorithm checks
-        all the tasks as some may have a weight of 0.
+        concurrency threshold and returns them, in the order they became ready.
+        The ready tasks are merged across the weight buckets and, as the
+        available weight only decreases, a bucket is dropped as soon as its
+        weight no longer fits. Buckets with a weight of 0 always fit.
         """
         self.__lock.acquire()
         try:
             tasks = []
             available_weight = self.concurrency_threshold - self.__running_weight
-            for task in self.__waiting_tasks:
-                if task.call_request.dependencies:
+            heap = []
+            for weight, bucket in self.__ready_tasks.items():
+                if weight > available_weight or not bucket:
                     continue
-                if task.call_request.weight > available_weight:
+                iterator = bucket.itervalues()
+                sequence, task = iterator.next()
+                heap.append((sequence, weight, task, iterator))
+            heapq.heapify(heap)
+            while heap:
+                sequence, weight, task, iterator = heap[0]
+                if weight > available_weight:
+                    heapq.heappop(heap)
                     continue
-                available_weight -= task.call_request.weight
+                available_weight -= weight
                 tasks.append(task)
+                try:
+                    sequence, task = iterator.next()
+                except StopIteration:
+                    heapq.heappop(heap)
+                else:
+                    heapq.heapreplace(heap, (sequence, weight, task, iterator))
             return tasks
         finally:
             self.__lock.release()
 
     def _run_ready_task(self, task):
         """
-        Run a ready task in a new thread
+        Run a ready task on the worker pool
         """
         self.__lock.acquire()
         try:
-            self.__waiting_tasks.remove(task)
-            self.__running_tasks.append(task)
+            self.__waiting_tasks.pop(task.call_request.id, None)
+            self._remove_ready_task(task)
+            self.__running_tasks[task.call_request.id] = task
             self.__running_weight += task.call_request.weight
-            task.run()
+            task.run(self.__worker_pool)
         finally:
             self.__lock.release()
 
+    def _add_ready_task(self, task):
+        """
+        Add a waiting task without dependencies to the ready task index.
+        NOTE: must be called with the task queue lock held
+        """
+        bucket = self.__ready_tasks.setdefault(task.call_request.weight, OrderedDict())
+        bucket[task.call_request.id] = (self.__ready_sequence.next(), task)
+        self._signal_dispatcher()
+
+    def _remove_ready_task(self, task):
+        """
+        Remove a task from the ready task index, if it is there.
+        NOTE: must be called with the task queue lock held
+        """
+        bucket = self.__ready_tasks.get(task.call_request.weight)
+        if bucket is None:
+            return
+        bucket.pop(task.call_request.id, None)
+        if not bucket:
+            self.__ready_tasks.pop(task.call_request.weight)
+
     def _purge_completed_task_cache(self):
         """
         Purge expired tasks from the completed tasks cache.
         """
         expired_cutoff = datetime.now(dateutils.utc_tz()) - self.completed_task_cache_life
-        index = 0 # index of the first non-expired cached task
+        index = len(self.__completed_tasks) # index of the first non-expired cached task
         # the tasks stored in the cache are in ascending order of finish time
         for i, task in enumerate(self.__completed_tasks):
             if task.call_report.finish_time > expired_cutoff:
                 index = i
                 break
-        self.__completed_tasks = self.__completed_tasks[index:]
+        if index:
+            self.__completed_tasks = self.__completed_tasks[index:]
 
     # queue control methods ----------------------------------------------------
 
@@ -161,6 +237,8 @@ class TaskQueue(object):
         self.__lock.release()
         self.__dispatcher.join()
         self.__dispatcher = None
+        # running tasks are allowed to finish in the background
+        self.__worker_pool.shutdown(wait=False)
         if clear_queued_calls:
             self.queued_call_collection.remove(safe=True)
 
@@ -205,9 +283,13 @@ class TaskQueue(object):
             self.queued_call_collection.save(queued_call, safe=True)
             task.complete_callback = self._complete
             self._validate_call_request_dependencies(task)
-            self.__waiting_tasks.append(task)
+            self.__waiting_tasks[task.call_request.id] = task
+            if task.call_request.dependencies:
+                for call_request_id in task.call_request.dependencies:
+                    self.__blocked_tasks.setdefault(call_request_id, set()).add(task.call_request.id)
+            else:
+                self._add_ready_task(task)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_ENQUEUE_LIFE_CYCLE_CALLBACK)
-            self.__condition.notify()
         finally:
             self.__lock.release()
 
@@ -222,10 +304,10 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             valid_call_request_dependency_ids = []
-            for potential_blocking_task in itertools.chain(self.__running_tasks, self.__waiting_tasks):
-                if potential_blocking_task.call_request.id not in task.call_request.dependencies:
+            for call_request_id in task.call_request.dependencies:
+                if call_request_id not in self.__running_tasks and call_request_id not in self.__waiting_tasks:
                     continue
-                valid_call_request_dependency_ids.append(potential_blocking_task.call_request.id)
+                valid_call_request_dependency_ids.append(call_request_id)
             # DANGER this ignores valid call complete states of dependencies!!
             task.call_request.dependencies = subdict(task.call_request.dependencies, valid_call_request_dependency_ids)
         finally:
@@ -243,10 +325,9 @@ class TaskQueue(object):
             task.complete_callback = None
             self.queued_call_collection.remove({'_id': task.queued_call_id}, safe=True)
             task.queued_call_id = None
-            if task in self.__waiting_tasks:
-                self.__waiting_tasks.remove(task)
-            if task in self.__running_tasks:
-                self.__running_tasks.remove(task)
+            self.__waiting_tasks.pop(task.call_request.id, None)
+            self.__running_tasks.pop(task.call_request.id, None)
+            self._remove_ready_task(task)
             self._unblock_tasks(task)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_DEQUEUE_LIFE_CYCLE_CALLBACK)
         finally:
@@ -260,7 +341,12 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for potentially_blocked_task in self.__waiting_tasks[:]:
+            for blocked_task_id in self.__blocked_tasks.pop(task.call_request.id, ()):
+
+                potentially_blocked_task = self.__waiting_tasks.get(blocked_task_id)
+
+                if potentially_blocked_task is None:
+                    continue
 
                 if task.call_request.id not in potentially_blocked_task.call_request.dependencies:
                     continue
@@ -274,6 +360,8 @@ class TaskQueue(object):
                 else:
                     # remove the task from the blocking_tasks dict
                     potentially_blocked_task.call_request.dependencies.pop(task.call_request.id)
+                    if not potentially_blocked_task.call_request.dependencies:
+                        self._add_ready_task(potentially_blocked_task)
 
         finally:
             self.__lock.release()
@@ -289,17 +377,20 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             # only decrement the running weight if the task was running
-            if task in self.__running_tasks:
+            if task.call_request.id in self.__running_tasks:
                 self.__running_weight -= task.call_request.weight
+                # freed concurrency may allow waiting ready tasks to run
+                self._signal_dispatcher()
             self.dequeue(task)
             self.__completed_tasks.append(task)
+            self._purge_completed_task_cache()
         finally:
             self.__lock.release()
 
     def skip(self, task):
         self.__lock.acquire()
         try:
-            if task not in self.__waiting_tasks:
+            if task.call_request.id not in self.__waiting_tasks:
                 return
             return task.skip()
         finally:
@@ -329,9 +420,10 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
+            task = self.__running_tasks.get(call_request_id) or self.__waiting_tasks.get(call_request_id)
+            if task is not None:
+                return task
+            for task in self.__completed_tasks:
                 if task.call_request.id != call_request_id:
                     continue
                 return task
@@ -351,8 +443,8 @@ class TaskQueue(object):
         try:
             tasks = []
             for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
+                                        self.__running_tasks.itervalues(),
+                                        self.__waiting_tasks.itervalues()):
                 for tag in tags:
                     if tag not in task.call_request.tags:
                         break
@@ -370,7 +462,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return self.__waiting_tasks[:]
+            return self.__waiting_tasks.values()
         finally:
             self.__lock.release()
 
@@ -382,7 +474,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return self.__running_tasks[:]
+            return self.__running_tasks.values()
         finally:
             self.__lock.release()
 
@@ -394,8 +486,8 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return itertools.chain(self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+            return itertools.chain(self.__running_tasks.values(),
+                                   self.__waiting_tasks.values())
         finally:
             self.__lock.release()
 
@@ -420,7 +512,7 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             return itertools.chain(self.__completed_tasks[:],
-                                   self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+                                   self.__running_tasks.values(),
+                                   self.__waiting_tasks.values())
         finally:
             self.__lock.release()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import itertools
+import logging
+import sys
+import threading
+import traceback
+from collections import deque
+from gettext import gettext as _
+
+
+_LOG = logging.getLogger(__name__)
+
+# worker pool class ------------------------------------------------------------
+
+class WorkerPool(object):
+    """
+    Bounded pool of reusable worker threads.
+    Worker threads are created lazily, up to max_workers, only when a unit of
+    work is submitted and no idle worker is available to pick it up. Work
+    submitted while all workers are busy is queued and run in FIFO order.
+
+    @ivar max_workers: maximum number of worker threads
+    @type max_workers: int
+    @ivar name: name used as a prefix for the worker thread names
+    @type name: str
+    """
+
+    def __init__(self, max_workers, name='worker'):
+        assert max_workers > 0
+
+        self.max_workers = max_workers
+        self.name = name
+
+        self.__work = deque()
+        self.__workers = []
+        self.__worker_numbers = itertools.count()
+        self.__idle_workers = 0
+        self.__exit = False
+
+        self.__lock = threading.Lock()
+        self.__condition = threading.Condition(self.__lock)
+
+    # worker thread ------------------------------------------------------------
+
+    def __work_loop(self):
+        """
+        Worker thread loop
+        """
+        self.__lock.acquire()
+        try:
+            while True:
+                while not self.__work and not self.__exit:
+                    self.__idle_workers += 1
+                    self.__condition.wait()
+                    self.__idle_workers -= 1
+                if not self.__work:
+                    self.__workers.remove(threading.current_thread())
+                    return
+                call, args, kwargs = self.__work.popleft()
+                self.__lock.release()
+                try:
+                    call(*args, **kwargs)
+                except:
+                    msg = _('Exception in worker pool thread:\n%(e)s')
+                    _LOG.critical(msg % {'e': traceback.format_exception(*sys.exc_info())})
+                finally:
+                    self.__lock.acquire()
+        finally:
+            self.__lock.release()
+
+    def __start_worker(self):
+        """
+        Start a new worker thread
+        NOTE: must be called with the pool lock held
+        """
+        worker = threading.Thread(target=self.__work_loop,
+                                  name='%s-%d' % (self.name, self.__worker_numbers.next()))
+        worker.setDaemon(True)
+        self.__workers.append(worker)
+        worker.start()
+
+    # pool api -----------------------------------------------------------------
+
+    def submit(self, call, *args, **kwargs):
+        """
+        Submit a unit of work to be run by one of the pool's worker threads.
+        @param call: callable to run
+        @type  call: callable
+        @param args: positional arguments for the call
+        @param kwargs: key word arguments for the call
+        """
+        self.__lock.acquire()
+        try:
+            self.__exit = False # needed for re-use after shutdown
+            self.__work.append((call, args, kwargs))
+            if self.__idle_workers < len(self.__work) and len(self.__workers) < self.max_workers:
+                self.__start_worker()
+            self.__condition.notify()
+        finally:
+            self.__lock.release()
+
+    def shutdown(self, wait=True):
+        """
+        Stop all of the pool's worker threads once the queued work has been
+        run. Work submitted after shutdown restarts the pool.
+        @param wait: if True, wait for the worker threads to exit
+        @type  wait: bool
+        """
+        self.__lock.acquire()
+        try:
+            self.__exit = True
+            self.__condition.notifyAll()
+            workers = self.__workers[:]
+        finally:
+            self.__lock.release()
+        if not wait:
+            return
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join()
+
+    # pool query methods -------------------------------------------------------
+
+    def worker_count(self):
+        """
+        @return: number of live worker threads
+        @rtype:  int
+        """
+        self.__lock.acquire()
+        try:
+            return len(self.__workers)
+        finally:
+            self.__lock.release()
+
+    def queued_count(self):
+        """
+        @return: number of units of work waiting for a worker thread
+        @rtype:  int
+        """
+        self.__lock.acquire()
+        try:
+            return len(self.__work)
+        finally:
+            self.__lock.release()
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Asynchronous delivery of event notifications.
+
+Notifiers that contact remote services (http, email) hand their deliveries
+to a process-wide pool of worker threads instead of starting a thread per
+notification. The number of notifications waiting to be delivered is bounded:
+once the bound is reached, firing an event blocks for a short while for room
+to free up and the notification is rejected if none does. Deliveries that
+raise an exception are put on a retry queue and attempted again after a
+delay, up to a maximum number of attempts.
+
+Connections to notifier endpoints are kept open between deliveries in a
+ConnectionPool so that bursts of notifications reuse them.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from gettext import gettext as _
+
+from pulp.server import config as pulp_config
+from pulp.server.dispatch.workerpool import WorkerPool
+
+_LOG = logging.getLogger(__name__)
+
+# notification delivery pool class ---------------------------------------------
+
+class NotificationDeliveryPool(object):
+    """
+    Delivers notifications using a bounded pool of worker threads, retrying
+    failed deliveries.
+
+    @ivar max_workers: maximum number of delivery threads
+    @type max_workers: int
+    @ivar max_pending: maximum number of notifications queued, being delivered
+                       or waiting to be retried
+    @type max_pending: int
+    @ivar enqueue_timeout: seconds to wait for room when the pool is full
+    @type enqueue_timeout: float
+    @ivar max_attempts: maximum number of times a notification is attempted
+    @type max_attempts: int
+    @ivar retry_delay: seconds to wait before retrying a failed notification
+    @type retry_delay: float
+    """
+
+    def __init__(self, max_workers, max_pending, enqueue_timeout, max_attempts, retry_delay):
+        assert max_pending > 0
+        assert max_attempts > 0
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.__workers = WorkerPool(max_workers, name='notifier')
+        self.__pending = 0
+        # heap of (retry time, sequence number, notification) tuples
+        self.__retries = []
+        self.__sequence = 0
+        self.__retry_thread = None
+        self.__exit = False
+        self.__counters = {'queued': 0, 'delivered': 0, 'retried': 0,
+                           'failed': 0, 'rejected': 0}
+
+        self.__lock = threading.Lock()
+        self.__room = threading.Condition(self.__lock)
+        self.__retry_condition = threading.Condition(self.__lock)
+
+    # delivery -----------------------------------------------------------------
+
+    def deliver(self, description, call, *args, **kwargs):
+        """
+        Queue a notification to be delivered by one of the pool's threads.
+        If the pool is full, wait up to enqueue_timeout seconds for room.
+        @param description: describes the notification in log messages
+        @type  description: str
+        @param call: callable that delivers the notification; raising an
+                     exception will cause the delivery to be retried
+        @type  call: callable
+        @param args: positional arguments for the call
+        @param kwargs: key word arguments for the call
+        @return: True if the notification was queued, False if it was rejected
+        @rtype:  bool
+        """
+        deadline = time.time() + self.enqueue_timeout
+        self.__lock.acquire()
+        try:
+            while self.__pending >= self.max_pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.__counters['rejected'] += 1
+                    msg = _('Notification delivery queue is full; dropping %(d)s notification')
+                    _LOG.error(msg % {'d': description})
+                    return False
+                self.__room.wait(remaining)
+            self.__pending += 1
+            self.__counters['queued'] += 1
+        finally:
+            self.__lock.release()
+        notification = _Notification(description, call, args, kwargs)
+        self.__workers.submit(self.__attempt, notification)
+        return True
+
+    def __attempt(self, notification):
+        """
+        Attempt the delivery of a notification
+        """
+        notification.attempts += 1
+        try:
+            notification.call(*notification.args, **notification.kwargs)
+        except Exception:
+            if notification.attempts < self.max_attempts:
+                msg = _('Delivery of %(d)s notification failed; retrying in %(s)s seconds')
+                _LOG.warn(msg % {'d': notification.description, 's': self.retry_delay},
+                          exc_info=True)
+                self.__schedule_retry(notification)
+                return
+            msg = _('Delivery of %(d)s notification failed after %(n)d attempts')
+            _LOG.exception(msg % {'d': notification.description, 'n': notification.attempts})
+            self.__finish('failed')
+        else:
+            self.__finish('delivered')
+
+    def __finish(self, outcome):
+        """
+        Record the outcome of a notification and make room for another one
+        """
+        self.__lock.acquire()
+        try:
+            self.__counters[outcome] += 1
+            self.__pending -= 1
+            self.__room.notify()
+        finally:
+            self.__lock.release()
+
+    # retries ------------------------------------------------------------------
+
+    def __schedule_retry(self, notification):
+        """
+        Put a failed notification on the retry queue
+        """
+        self.__lock.acquire()
+        try:
+            self.__counters['retried'] += 1
+            self.__sequence += 1
+            heapq.heappush(self.__retries,
+                           (time.time() + self.retry_delay, self.__sequence, notification))
+            if self.__retry_thread is None:
+                self.__exit = False
+                self.__retry_thread = threading.Thread(target=self.__retry_loop,
+                                                       name='notifier-retry')
+                self.__retry_thread.setDaemon(True)
+                self.__retry_thread.start()
+            self.__retry_condition.notify()
+        finally:
+            self.__lock.release()
+
+    def __retry_loop(self):
+        """
+        Retry thread loop; hands notifications back to the workers when their
+        retry time has come
+        """
+        self.__lock.acquire()
+        try:
+            while not self.__exit:
+                if not self.__retries:
+                    self.__retry_condition.wait()
+                    continue
+                retry_time, sequence, notification = self.__retries[0]
+                remaining = retry_time - time.time()
+                if remaining > 0:
+                    self.__retry_condition.wait(remaining)
+                    continue
+                heapq.heappop(self.__retries)
+                self.__workers.submit(self.__attempt, notification)
+        finally:
+            self.__retry_thread = None
+            self.__lock.release()
+
+    # pool management ----------------------------------------------------------
+
+    def shutdown(self):
+        """
+        Stop the pool's threads once the queued notifications have been
+        attempted. Notifications waiting to be retried are dropped.
+        """
+        self.__lock.acquire()
+        try:
+            self.__exit = True
+            dropped = len(self.__retries)
+            self.__counters['failed'] += dropped
+            self.__pending -= dropped
+            self.__retries = []
+            self.__retry_condition.notify()
+        finally:
+            self.__lock.release()
+        self.__workers.shutdown()
+
+    def counters(self):
+        """
+        @return: number of notifications queued, delivered, retried, failed
+                 after all attempts and rejected because the pool was full;
+                 and the number currently pending delivery
+        @rtype:  dict
+        """
+        self.__lock.acquire()
+        try:
+            counters = dict(self.__counters)
+            counters['pending'] = self.__pending
+            return counters
+        finally:
+            self.__lock.release()
+
+
+class _Notification(object):
+    """
+    A notification waiting to be delivered.
+    """
+
+    def __init__(self, description, call, args, kwargs):
+        self.description = description
+        self.call = call
+        self.args = args
+        self.kwargs = kwargs
+        self.attempts = 0
+
+# connection pool class --------------------------------------------------------
+
+class ConnectionPool(object):
+    """
+    Keeps connections to notifier endpoints open between deliveries.
+    Connections are checked out for exclusive use by one delivery and checked
+    back in when the delivery has finished with them. Connections that have
+    been idle for longer than the idle timeout are closed instead of reused.
+
+    @ivar close: closes a connection
+    @type close: callable
+    @ivar idle_timeout: seconds an idle connection is kept open; if None, the
+                        server's configured connection_idle_timeout is used
+    @type idle_timeout: float or None
+    """
+
+    def __init__(self, close, idle_timeout=None):
+        self.close = close
+        self.idle_timeout = idle_timeout
+
+        # endpoint: list of (checked in time, connection) tuples
+        self.__idle = {}
+        self.__lock = threading.Lock()
+
+    def checkout(self, endpoint, create):
+        """
+        Get an open connection to an endpoint, or a new one if there are none.
+        @param endpoint: hashable identifying the endpoint
+        @param create: creates a new connection to the endpoint
+        @type  create: callable
+        @return: (connection, True if the connection was reused) tuple
+        @rtype:  tuple
+        """
+        idle_timeout = self.idle_timeout
+        if idle_timeout is None:
+            idle_timeout = pulp_config.config.getfloat('notifications', 'connection_idle_timeout')
+        expired = []
+        connection = None
+        self.__lock.acquire()
+        try:
+            idle = self.__idle.get(endpoint, [])
+            now = time.time()
+            while idle:
+                checked_in, candidate = idle.pop()
+                if now - checked_in <= idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+        finally:
+            self.__lock.release()
+        for candidate in expired:
+            self.discard(candidate)
+        if connection is not None:
+            return connection, True
+        return create(), False
+
+    def checkin(self, endpoint, connection):
+        """
+        Return a connection that can be reused to the pool.
+        @param endpoint: hashable identifying the endpoint
+        @param connection: connection checked out for the endpoint
+        """
+        self.__lock.acquire()
+        try:
+            self.__idle.setdefault(endpoint, []).append((time.time(), connection))
+        finally:
+            self.__lock.release()
+
+    def discard(self, connection):
+        """
+        Close a connection that will not be reused.
+        @param connection: checked out connection
+        """
+        try:
+            self.close(connection)
+        except Exception:
+            _LOG.debug(_('Error closing notifier connection'), exc_info=True)
+
+    def clear(self):
+        """
+        Close all of the idle connections.
+        """
+        self.__lock.acquire()
+        try:
+            idle = self.__idle
+            self.__idle = {}
+        finally:
+            self.__lock.release()
+        for connections in idle.values():
+            for checked_in, connection in connections:
+                self.discard(connection)
+
+# process-wide delivery pool ---------------------------------------------------
+
+_DELIVERY_POOL = None
+_DELIVERY_POOL_LOCK = threading.Lock()
+
+
+def get_delivery_pool():
+    """
+    Get the process-wide notification delivery pool, creating it from the
+    server configuration the first time it is used.
+    @return: notification delivery pool
+    @rtype:  L{NotificationDeliveryPool}
+    """
+    global _DELIVERY_POOL
+    _DELIVERY_POOL_LOCK.acquire()
+    try:
+        if _DELIVERY_POOL is None:
+            config = pulp_config.config
+            _DELIVERY_POOL = NotificationDeliveryPool(
+                config.getint('notifications', 'delivery_workers'),
+                config.getint('notifications', 'max_pending'),
+                config.getfloat('notifications', 'enqueue_timeout'),
+                config.getint('notifications', 'max_attempts'),
+                config.getfloat('notifications', 'retry_delay'))
+        return _DELIVERY_POOL
+    finally:
+        _DELIVERY_POOL_LOCK.release()
+
+
+def deliver(description, call, *args, **kwargs):
+    """
+    Queue a notification on the process-wide delivery pool.
+    See L{NotificationDeliveryPool.deliver}
+    """
+    return get_delivery_pool().deliver(description, call, *args, **kwargs)
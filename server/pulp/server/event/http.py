@@ -25,9 +25,10 @@ Eventually this should be enhanced to support authentication credentials as well
 import base64
 import httplib
 import logging
-import threading
+import socket
 
 from pulp.server.compat import json
+from pulp.server.event import delivery
 
 # -- constants ----------------------------------------------------------------
 
@@ -38,7 +39,7 @@ LOG = logging.getLogger(__name__)
 # -- framework hook -----------------------------------------------------------
 
 def handle_event(notifier_config, event):
-    # fire the actual http push function off in a separate thread to keep
+    # hand the actual http push off to the notification delivery pool to keep
     # pulp from blocking or deadlocking due to the tasking subsystem
 
     data = event.data()
@@ -47,12 +48,22 @@ def handle_event(notifier_config, event):
 
     body = json.dumps(data)
 
-    thread = threading.Thread(target=_send_post, args=[notifier_config, body])
-    thread.setDaemon(True)
-    thread.start()
+    delivery.deliver(TYPE_ID, _send_post, notifier_config, body)
 
 # -- private ------------------------------------------------------------------
 
+# connections kept open between posts, keyed by (scheme, server)
+_CONNECTIONS = delivery.ConnectionPool(lambda connection: connection.close())
+
+
+class ServerError(Exception):
+    """
+    Raised when the server responds to a post with an error status; causes
+    the post to be retried.
+    """
+    pass
+
+
 def _send_post(notifier_config, body):
 
     # Basic headers
@@ -72,20 +83,44 @@ def _send_post(notifier_config, body):
         LOG.warn('Improperly configured post_sync_url: %(u)s' % {'u': url})
         return
 
-    connection = _create_connection(scheme, server)
-
     # Process authentication
     if 'username' in notifier_config and 'password' in notifier_config:
         raw = ':'.join((notifier_config['username'], notifier_config['password']))
         encoded = base64.encodestring(raw)[:-1]
         headers['Authorization'] = 'Basic ' + encoded
 
-    connection.request('POST', '/' + path, body=body, headers=headers)
-    response = connection.getresponse()
+    endpoint = (scheme, server)
+    connection, reused = _CONNECTIONS.checkout(endpoint,
+                                               lambda: _create_connection(scheme, server))
+    try:
+        try:
+            response = _post(connection, path, body, headers)
+        except (httplib.HTTPException, socket.error):
+            if not reused:
+                raise
+            # the server closed the kept open connection; try a new one
+            _CONNECTIONS.discard(connection)
+            connection = _create_connection(scheme, server)
+            response = _post(connection, path, body, headers)
+        # the response must be read completely before the connection is reused
+        response_body = response.read()
+    except:
+        _CONNECTIONS.discard(connection)
+        raise
+
+    if response.will_close:
+        _CONNECTIONS.discard(connection)
+    else:
+        _CONNECTIONS.checkin(endpoint, connection)
+
     if response.status != httplib.OK:
-        error_msg = response.read()
-        LOG.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
-    connection.close()
+        LOG.warn('Error response from HTTP notifier: %(e)s' % {'e': response_body})
+        if response.status >= httplib.INTERNAL_SERVER_ERROR:
+            raise ServerError(response.status)
+
+def _post(connection, path, body, headers):
+    connection.request('POST', '/' + path, body=body, headers=headers)
+    return connection.getresponse()
 
 def _create_connection(scheme, server):
     if scheme.startswith('https'):
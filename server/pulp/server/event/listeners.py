@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+In-memory index of the configured event listeners by event type, so that
+firing an event does not need to query the database.
+"""
+
+import threading
+import time
+
+from pulp.server import config as pulp_config
+from pulp.server.db.model.event import EventListener
+
+# listener index class ---------------------------------------------------------
+
+class ListenerIndex(object):
+    """
+    Caches the event listeners in the database, indexed by the event types
+    they listen for. The index is loaded from the database on first use, and
+    reloaded once it has been invalidated or is older than the ttl. The event
+    listener manager invalidates it whenever a listener is created, updated
+    or deleted; the ttl bounds how long changes made by other processes go
+    unnoticed.
+
+    @ivar ttl: seconds the index is used for before being reloaded; if None,
+               the server's configured listener_cache_ttl is used
+    @type ttl: float or None
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+
+        # event type: list of listeners; '*' holds the listeners for all types
+        self.__index = None
+        self.__loaded = 0
+        self.__lock = threading.Lock()
+
+    def listeners(self, event_type):
+        """
+        Get the listeners that should be notified of an event.
+        @param event_type: type of the event
+        @type  event_type: str
+        @return: list of event listener documents from the database
+        @rtype:  list
+        """
+        index = self.__current_index()
+        listeners = []
+        # a listener registered for both the event type and '*' is notified once
+        seen = set()
+        for listener in index.get(event_type, []) + index.get('*', []):
+            if listener['_id'] in seen:
+                continue
+            seen.add(listener['_id'])
+            listeners.append(listener)
+        return listeners
+
+    def invalidate(self):
+        """
+        Discard the index, causing it to be reloaded the next time it is used.
+        """
+        self.__lock.acquire()
+        try:
+            self.__index = None
+        finally:
+            self.__lock.release()
+
+    def __current_index(self):
+        """
+        Get the index, reloading it from the database if necessary
+        """
+        ttl = self.ttl
+        if ttl is None:
+            ttl = pulp_config.config.getfloat('notifications', 'listener_cache_ttl')
+        self.__lock.acquire()
+        try:
+            if self.__index is None or time.time() - self.__loaded > ttl:
+                self.__index = _load_index()
+                self.__loaded = time.time()
+            return self.__index
+        finally:
+            self.__lock.release()
+
+
+def _load_index():
+    """
+    Build the index from the event listeners in the database.
+    @return: dict of event type to list of listeners
+    @rtype:  dict
+    """
+    index = {}
+    for listener in EventListener.get_collection().find():
+        event_types = listener['event_types']
+        if isinstance(event_types, basestring):
+            event_types = [event_types]
+        for event_type in set(event_types):
+            index.setdefault(event_type, []).append(listener)
+    return index
+
+# process-wide listener index --------------------------------------------------
+
+LISTENER_INDEX = ListenerIndex()
@@ -13,7 +13,7 @@
 
 import logging
 import smtplib
-import threading
+import socket
 
 try:
     from email.mime.text import MIMEText
@@ -23,10 +23,14 @@ except ImportError:
 
 from pulp.server.compat import json
 from pulp.server.config import config
+from pulp.server.event import delivery
 
 TYPE_ID = 'email'
 logger = logging.getLogger(__name__)
 
+# SMTP connections kept open between messages, keyed by (host, port)
+_CONNECTIONS = delivery.ConnectionPool(lambda connection: connection.quit())
+
 def handle_event(notifier_config, event):
     """
     If email is enabled in the server settings, sends an email to each recipient
@@ -48,13 +52,12 @@ def handle_event(notifier_config, event):
     addresses = notifier_config['addresses']
 
     for address in addresses:
-        thread = threading.Thread(target=_send_email, args=(subject, body, address))
-        thread.daemon = True
-        thread.start()
+        delivery.deliver(TYPE_ID, _send_email, subject, body, address)
 
 def _send_email(subject, body, to_address):
     """
-    Send a text email to one recipient
+    Send a text email to one recipient. Failures to connect to the MTA are
+    raised so that the delivery is retried; other errors are logged.
 
     :param subject: email subject
     :type  subject: basestring
@@ -74,17 +77,31 @@ def _send_email(subject, body, to_address):
     message['From'] = from_address
     message['To'] = to_address
 
+    endpoint = (host, port)
     try:
-        connection = smtplib.SMTP(host=host, port=port)
-    except smtplib.SMTPConnectError:
+        connection, reused = _CONNECTIONS.checkout(
+            endpoint, lambda: smtplib.SMTP(host=host, port=port))
+    except (smtplib.SMTPConnectError, socket.error):
         logger.exception('SMTP connection failed to %s on %s' % (host, port))
-        return
+        raise
 
     try:
-        connection.sendmail(from_address, to_address, message.as_string())
+        try:
+            connection.sendmail(from_address, to_address, message.as_string())
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # the MTA closed the kept open connection; try a new one
+            _CONNECTIONS.discard(connection)
+            connection = smtplib.SMTP(host=host, port=port)
+            connection.sendmail(from_address, to_address, message.as_string())
+    except (smtplib.SMTPServerDisconnected, socket.error):
+        logger.exception('SMTP connection lost to %s on %s' % (host, port))
+        _CONNECTIONS.discard(connection)
+        raise
     except smtplib.SMTPException, e:
         try:
             logger.exception('Error sending mail.')
         except AttributeError:
             logger.error('SMTP error while sending mail')
-    connection.quit()
+    _CONNECTIONS.checkin(endpoint, connection)
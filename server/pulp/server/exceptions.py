@@ -103,6 +103,29 @@ class ConflictingOperation(PulpExecutionException):
         return {'reasons': self.reasons}
 
 
+class ChangedResource(PulpExecutionException):
+    """
+    Base class for exceptions raised when a request is based on a version of
+    a resource that is no longer current.
+    """
+    http_status_code = httplib.CONFLICT
+
+    def __init__(self, **resources):
+        """
+        @param resources: keyword arguments of resource_type=resource_id
+        """
+        PulpExecutionException.__init__(self, resources)
+        self.resources = resources
+
+    def __str__(self):
+        resources_str = ', '.join('%s=%s' % (k, v) for k, v in self.resources.items())
+        msg = _('Changed resource(s): %(r)s') % {'r': resources_str}
+        return msg.encode('utf-8')
+
+    def data_dict(self):
+        return {'resources': self.resources}
+
+
 class OperationTimedOut(PulpExecutionException):
     """
     Base class for exceptions raised when an operation cannot be completed
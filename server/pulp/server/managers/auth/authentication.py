@@ -13,9 +13,11 @@ import logging
 
 import oauth2
 
+from pulp.server.db.model.auth import User
 from pulp.server.db.model.consumer import Consumer
 from pulp.server.managers import factory
 from pulp.server.auth import ldap_connection
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
 from pulp.server.config import config
 from pulp.server.exceptions import PulpException
 
@@ -60,9 +62,17 @@ class AuthenticationManager(object):
             return None
     
         if password is not None:
-            if not factory.password_manager().check_password(user['password'], password):
+            password_manager = factory.password_manager()
+            if not password_manager.check_password(user['password'], password):
                 _LOG.debug('Password for user [%s] was incorrect' % username)
                 return None
+            if password_manager.needs_rehash(user['password']):
+                # upgrade the entry to the current hashing scheme; only if it was not
+                # changed concurrently
+                User.get_collection().update(
+                    {'login' : username, 'password' : user['password']},
+                    {'$set' : {'password' : password_manager.hash_password(password)}},
+                    safe=True)
     
         return user
     
@@ -109,12 +119,22 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: user login corresponding to the credentials
         """
+        digest = None
+        if password is not None:
+            digest = CREDENTIAL_CACHE.digest('password', username, password)
+            login = CREDENTIAL_CACHE.get(digest)
+            if login is not None:
+                return login
+
         user = self._check_username_password_local(username, password)
         if user is None and config.getboolean('ldap', 'enabled'):
             user = self._check_username_password_ldap(username, password)
-        if user is not None:
-            return user['login']
-        return None
+        if user is None:
+            return None
+
+        if digest is not None:
+            CREDENTIAL_CACHE.put(digest, user['login'])
+        return user['login']
 
     # -- ssl cert authentication ---------------------------------------------------
     
@@ -129,6 +149,11 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: user login corresponding to the credentials
         """
+        digest = CREDENTIAL_CACHE.digest('user_cert', cert_pem)
+        login = CREDENTIAL_CACHE.get(digest)
+        if login is not None:
+            return login
+
         cert = factory.certificate_manager(content=cert_pem)
         subject = cert.subject()
         encoded_user = subject.get('CN', None)
@@ -147,7 +172,10 @@ class AuthenticationManager(object):
         except PulpException:
             return None
     
-        return self.check_username_password(username)
+        login = self.check_username_password(username)
+        if login is not None:
+            CREDENTIAL_CACHE.put(digest, login)
+        return login
     
     def check_consumer_cert(self, cert_pem):
         """
@@ -160,6 +188,11 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: id of a consumer corresponding to the credentials
         """
+        digest = CREDENTIAL_CACHE.digest('consumer_cert', cert_pem)
+        consumerid = CREDENTIAL_CACHE.get(digest)
+        if consumerid is not None:
+            return consumerid
+
         cert = factory.certificate_manager(content=cert_pem)
         subject = cert.subject()
         consumerid = subject.get('CN', None)
@@ -173,6 +206,7 @@ class AuthenticationManager(object):
                        consumerid)
             return None
     
+        CREDENTIAL_CACHE.put(digest, consumerid)
         return consumerid
     
     # oauth authentication --------------------------------------------------------
@@ -17,6 +17,7 @@ Password Manager
 Functions taken from stackoverflow.com : http://tinyurl.com/2f6gx7s
 """
 
+import hashlib
 import random
 from hmac import HMAC
 
@@ -26,34 +27,112 @@ from pulp.server.compat import digestmod
 
 NUM_ITERATIONS = 5000
 
+# prefix of password entries hashed with standard PBKDF2-HMAC-SHA256; entries
+# without it use the original iterated HMAC scheme of pbkdf_sha256
+PBKDF2_PREFIX = '$pbkdf2-sha256$'
+
+# PBKDF2 entries are only written when hashlib provides the C implementation
+# of pbkdf2_hmac; without it, the original scheme is faster and still written
+PBKDF2_NATIVE = hasattr(hashlib, 'pbkdf2_hmac')
+
 # -- classes ------------------------------------------------------------------
 
 class PasswordManager(object):
     """
     Performs password related functions.
+
+    Passwords are hashed with PBKDF2-HMAC-SHA256 when the python version
+    provides the C implementation in hashlib, and with the original scheme of
+    pbkdf_sha256 otherwise. Entries in either format are checked.
     """
     
     def random_bytes(self, num_bytes):
         return "".join(chr(random.randrange(256)) for i in xrange(num_bytes))
 
     def pbkdf_sha256(self, password, salt, iterations):
+        if isinstance(password, unicode):
+            password = password.encode('utf-8')
         result = password
         for i in xrange(iterations):
             result = HMAC(result, salt, digestmod).digest() # use HMAC to apply the salt
         return result
 
+    def pbkdf2_sha256(self, password, salt, iterations):
+        if isinstance(password, unicode):
+            password = password.encode('utf-8')
+        return _pbkdf2_hmac('sha256', password, salt, iterations)
+
     def hash_password(self, plain_password):
         salt = self.random_bytes(8) # 64 bits
-        hashed_password = self.pbkdf_sha256(str(plain_password), salt, NUM_ITERATIONS)
-        # return the salt and hashed password, encoded in base64 and split with ","
-        return salt.encode("base64").strip() + "," + hashed_password.encode("base64").strip()
+        if not PBKDF2_NATIVE:
+            hashed_password = self.pbkdf_sha256(plain_password, salt, NUM_ITERATIONS)
+            # return the salt and hashed password, encoded in base64 and split with ","
+            return salt.encode("base64").strip() + "," + hashed_password.encode("base64").strip()
+        hashed_password = self.pbkdf2_sha256(plain_password, salt, NUM_ITERATIONS)
+        # return the iterations, salt and hashed password, the latter two encoded in base64,
+        # all split with "$"
+        return '%s%d$%s$%s' % (PBKDF2_PREFIX, NUM_ITERATIONS, salt.encode("base64").strip(),
+                               hashed_password.encode("base64").strip())
 
     def check_password(self, saved_password_entry, plain_password):
-        salt, hashed_password = saved_password_entry.split(",")
-        salt = salt.decode("base64")
-        hashed_password = hashed_password.decode("base64")
-        pbkdbf = self.pbkdf_sha256(plain_password, salt, NUM_ITERATIONS)
-        return hashed_password == pbkdbf
-    
+        if saved_password_entry.startswith(PBKDF2_PREFIX):
+            iterations, salt, hashed_password = \
+                saved_password_entry[len(PBKDF2_PREFIX):].split("$")
+            pbkdbf = self.pbkdf2_sha256(plain_password, salt.decode("base64"), int(iterations))
+        else:
+            salt, hashed_password = saved_password_entry.split(",")
+            pbkdbf = self.pbkdf_sha256(plain_password, salt.decode("base64"), NUM_ITERATIONS)
+        return _compare_digest(hashed_password.decode("base64"), pbkdbf)
+
+    def needs_rehash(self, saved_password_entry):
+        """
+        Returns True if the password entry was not hashed with the current
+        scheme and iterations, and should be replaced by hashing the password
+        again the next time it is checked successfully. Entries are never
+        rehashed when PBKDF2 entries are not written.
+        """
+        if not PBKDF2_NATIVE:
+            return False
+        return not saved_password_entry.startswith('%s%d$' % (PBKDF2_PREFIX, NUM_ITERATIONS))
+
+# -- utilities ----------------------------------------------------------------
+
+def _pure_pbkdf2_hmac(hash_name, password, salt, iterations):
+    """
+    Python implementation of PBKDF2-HMAC producing a single block of output,
+    for python versions whose hashlib does not provide pbkdf2_hmac.
+    """
+    mac = HMAC(password, None, getattr(hashlib, hash_name))
+
+    def prf(data):
+        h = mac.copy()
+        h.update(data)
+        return h.digest()
+
+    u = prf(salt + '\x00\x00\x00\x01')
+    result = [ord(c) for c in u]
+    for i in xrange(iterations - 1):
+        u = prf(u)
+        result = [r ^ ord(c) for r, c in zip(result, u)]
+    return ''.join(chr(r) for r in result)
+
+
+def _pure_compare_digest(a, b):
+    """
+    Compares two strings in time independent of the position of the first
+    difference, for python versions without hmac.compare_digest.
+    """
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a, b):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
 
+_pbkdf2_hmac = getattr(hashlib, 'pbkdf2_hmac', _pure_pbkdf2_hmac)
 
+try:
+    from hmac import compare_digest as _compare_digest
+except ImportError:
+    _compare_digest = _pure_compare_digest
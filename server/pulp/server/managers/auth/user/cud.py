@@ -22,6 +22,8 @@ import logging
 import re
 
 from pulp.server import config
+from pulp.server.auth.authorization_cache import AUTHORIZATION_CACHE
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
 from pulp.server.db.model.auth import User
 from pulp.server.exceptions import PulpDataException, DuplicateResource, InvalidValue, MissingResource
 from pulp.server.managers import factory
@@ -87,6 +89,7 @@ class UserManager(object):
         # Creation
         create_me = User(login=login, password=hashed_password, name=name, roles=roles)
         User.get_collection().save(create_me, safe=True)
+        AUTHORIZATION_CACHE.invalidate(login)
         
         # Grant permissions
         permission_manager = factory.permission_manager()
@@ -155,6 +158,9 @@ class UserManager(object):
             raise InvalidValue(invalid_values)
 
         User.get_collection().save(user, safe=True)
+        AUTHORIZATION_CACHE.invalidate(login)
+        if 'password' in delta:
+            CREDENTIAL_CACHE.invalidate(login)
 
         # Retrieve the user to return the SON object
         updated = User.get_collection().find_one({'login' : login})
@@ -192,6 +198,8 @@ class UserManager(object):
         permission_manager.revoke_all_permissions_from_user(login)
         
         User.get_collection().remove({'login' : login}, safe=True)
+        AUTHORIZATION_CACHE.invalidate(login)
+        CREDENTIAL_CACHE.invalidate(login)
 
 
     def ensure_admin(self):
@@ -18,7 +18,8 @@ Contains users query classes
 from gettext import gettext as _
 from logging import getLogger
 
-from pulp.server.db.model.auth import User, Permission, Role
+from pulp.server.auth.authorization_cache import AUTHORIZATION_CACHE
+from pulp.server.db.model.auth import User, Role
 from pulp.server.exceptions import PulpDataException, MissingResource
 from pulp.server.managers import factory
 
@@ -111,12 +112,7 @@ class UserQueryManager(object):
         @rtype: bool
         @return: True if the user is a super user, False otherwise
         """
-        user = User.get_collection().find_one({'login' : login})
-        if user is None:
-            raise MissingResource(login)
-
-        role_manager = factory.role_manager()
-        return role_manager.super_user_role in user['roles']
+        return AUTHORIZATION_CACHE.is_superuser(login)
 
 
     def is_authorized(self, resource, login, operation):
@@ -136,23 +132,25 @@ class UserQueryManager(object):
         @return: True if the user is authorized for the operation on the resource,
                  False otherwise
         """
-        if self.is_superuser(login):
-            return True
+        return (AUTHORIZATION_CACHE.is_superuser(login) or
+                AUTHORIZATION_CACHE.is_authorized(resource, login, operation))
 
-        permission_query_manager = factory.permission_query_manager()
 
-        parts = [p for p in resource.split('/') if p]
-        while parts:
-            current_resource = '/%s/' % '/'.join(parts)
-            permission = permission_query_manager.find_by_resource(current_resource)
-            if permission is not None:
-                if operation in permission['users'].get(login, []):
-                    return True
-            parts = parts[:-1]
+    def find_authorized_user(self, login):
+        """
+        Returns the user with the given login from the authorization cache.
+        Used to set the principal of authorized requests without querying the
+        database again.
 
-        permission = Permission.get_collection().find_one({'resource' : '/'})
-        return (permission is not None and
-                operation in permission['users'].get(login, []))
+        @type login: str
+        @param login: login of the user
+
+        @rtype: dict
+        @return: serialized data describing the user
+
+        @raise MissingResource: if there is no user with the login
+        """
+        return AUTHORIZATION_CACHE.user(login)
 
 
     def is_last_super_user(self, login):
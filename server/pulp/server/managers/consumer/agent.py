@@ -55,9 +55,18 @@ class AgentManager(object):
         """
         manager = managers.consumer_manager()
         consumer = manager.get_consumer(consumer_id)
+        PulpAgent.delete_status(consumer_id)
         agent = PulpAgent(consumer)
         agent.consumer.unregistered()
 
+    def offline(self):
+        """
+        Get the consumers whose agent is offline.
+        :return: The IDs of the consumers whose agent heartbeat has expired.
+        :rtype: list
+        """
+        return PulpAgent.offline()
+
     def bind(self, consumer_id, repo_id, distributor_id, options):
         """
         Request the agent to perform the specified bind. This method will be called
@@ -17,22 +17,34 @@ Contains content applicability management classes
 
 from gettext import gettext as _
 from logging import getLogger
+import multiprocessing
+import time
 
 from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
+from pulp.server import config as pulp_config
+from pulp.server.db import connection as db_connection
 from pulp.server.db.model.consumer import Bind, RepoProfileApplicability, UnitProfile
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.repository import Repo
 from pulp.server.managers import factory as managers
 from pulp.server.managers.consumer.query import ConsumerQueryManager
+from pulp.server.util import batches
 
 _LOG = getLogger(__name__)
 
+# maximum number of applicability documents whose unit profiles are looked up in a single query
+APPLICABILITY_BATCH_SIZE = 1000
+
 
 class ApplicabilityRegenerationManager(object):
 
+    def __init__(self):
+        # (profiler, cfg) tuples keyed by content type
+        self._profilers = {}
+
     def regenerate_applicability_for_consumers(self, consumer_criteria):
         """
         Regenerate and save applicability data for given updated consumers.
@@ -97,47 +109,132 @@ class ApplicabilityRegenerationManager(object):
                     for unit_profile_tuple in consumer_unit_profiles_map[consumer_id]:
                         repo_profile_hashes.add((repo_id, unit_profile_tuple))
 
-        # Iterate through each tuple in repo_profile_hashes set and regenerate applicability, 
-        # if it doesn't exist. These are all guaranteed to be unique tuples because of the logic 
-        # used to create maps and sets above, eliminating multiple unnecessary queries 
-        # to check for existing applicability for same profiles.
-        manager = managers.applicability_regeneration_manager()
+        # Fetch the (repo_id, profile_hash) pairs that already have applicability with a single
+        # query, rather than checking each pair individually.
+        existing_applicabilities = set()
+        if repo_profile_hashes:
+            query_params = {'repo_id': {'$in': list(set(r for r, p in repo_profile_hashes))},
+                            'profile_hash': {'$in': profile_hash_profile_id_map.keys()}}
+            for applicability in RepoProfileApplicability.get_collection().find(
+                    query_params, fields=['repo_id', 'profile_hash']):
+                existing_applicabilities.add((applicability['repo_id'], applicability['profile_hash']))
+
+        # Regenerate applicability for each tuple in repo_profile_hashes set, if it doesn't
+        # exist. These are all guaranteed to be unique tuples because of the logic used to
+        # create maps and sets above, eliminating multiple unnecessary calculations for
+        # same profiles.
+        regenerations = []
         for repo_id, (profile_hash, content_type) in repo_profile_hashes:
-            # Check if applicability for given profile_hash and repo_id already exists
-            if self._is_existing_applicability(repo_id, profile_hash):
+            if (repo_id, profile_hash) in existing_applicabilities:
                 continue
-            # If applicability does not exist, generate applicability data for given profile 
-            # and repo id.
             profile_id = profile_hash_profile_id_map[profile_hash]
-            manager.regenerate_applicability(profile_hash, content_type, profile_id, repo_id)
+            regenerations.append((profile_hash, content_type, profile_id, repo_id, None))
+
+        run = _RegenerationRun(self.__profiler, self._get_existing_repo_content_types)
+        try:
+            run.regenerate(regenerations)
+        finally:
+            run.close()
+        run.log_metrics(_('consumer applicability regeneration'))
 
-    def regenerate_applicability_for_repos(self, repo_criteria=None):
+    def regenerate_applicability_for_repos(self, repo_criteria=None, incremental=True):
         """
         Regenerate and save applicability data affected by given updated repositories.
 
+        In incremental mode, repositories whose content has not changed since
+        their applicability was last regenerated are skipped entirely, and
+        applicability data is only regenerated for profiles whose profiler
+        handles a content type that changed in the repository since that data
+        was calculated.
+
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: pulp.server.db.model.criteria.Criteria
+        :param incremental: if False, regenerate all applicability data for the repositories
+        :type incremental: bool
         """
         repo_query_manager = managers.repo_query_manager()
 
         # Process repo criteria
-        repo_criteria.fields = ['id']
-        repo_ids = [r['id'] for r in repo_query_manager.find_by_criteria(repo_criteria)]
-
-        for repo_id in repo_ids:
-            # Find all existing applicabilities for given repo_id
-            existing_applicabilities = RepoProfileApplicability.get_collection().find({'repo_id':repo_id})
-            for existing_applicability in existing_applicabilities:
-                # Convert cursor to RepoProfileApplicability object
-                existing_applicability = RepoProfileApplicability(**dict(existing_applicability))
-                profile_hash = existing_applicability['profile_hash']
-                unit_profile = UnitProfile.get_collection().find_one({'profile_hash': profile_hash},
-                                                                     fields=['id','content_type'])
-                # Regenerate applicability data for given unit_profile and repo id
-                self.regenerate_applicability(profile_hash, unit_profile['content_type'],
-                                              unit_profile['id'],
-                                              repo_id,
-                                              existing_applicability)
+        repo_criteria.fields = ['id', 'content_version', 'content_versions',
+                                'applicability_content_version']
+        repos = list(repo_query_manager.find_by_criteria(repo_criteria))
+
+        run = _RegenerationRun(self.__profiler, self._get_existing_repo_content_types)
+        try:
+            for repo in repos:
+                self._regenerate_applicability_for_repo(run, repo, incremental)
+        finally:
+            run.close()
+        run.log_metrics(_('repository applicability regeneration'))
+
+    def _regenerate_applicability_for_repo(self, run, repo, incremental):
+        """
+        Regenerate and save the applicability data of a single repository.
+
+        :param run:         The regeneration run to regenerate the applicability with
+        :type  run:         _RegenerationRun
+        :param repo:        The repository document, with at least the id and content version
+                            fields
+        :type  repo:        dict
+        :param incremental: if False, regenerate all applicability data for the repository
+        :type  incremental: bool
+        """
+        repo_id = repo['id']
+        content_version = repo.get('content_version', 0)
+        if incremental and repo.get('applicability_content_version') == content_version:
+            return
+
+        # Only the small fields needed to decide what to regenerate are loaded up front; the
+        # list is read in full so the cursor does not stay open while regenerating
+        applicability_collection = RepoProfileApplicability.get_collection()
+        existing_applicabilities = list(applicability_collection.find(
+            {'repo_id': repo_id}, fields=['profile_hash', 'content_versions']))
+
+        for applicability_batch in batches(existing_applicabilities, APPLICABILITY_BATCH_SIZE):
+            # Look up a unit profile for each profile hash in the batch with a single query
+            profile_hashes = [a['profile_hash'] for a in applicability_batch]
+            unit_profiles = UnitProfile.get_collection().find(
+                {'profile_hash': {'$in': profile_hashes}},
+                fields=['profile_hash', 'id', 'content_type'])
+            profile_hash_unit_profile_map = dict((p['profile_hash'], p) for p in unit_profiles)
+
+            outdated_applicabilities = []
+            for existing_applicability in applicability_batch:
+                unit_profile = profile_hash_unit_profile_map.get(existing_applicability['profile_hash'])
+                if unit_profile is None:
+                    # orphaned; see RepoProfileApplicabilityManager.remove_orphans
+                    continue
+
+                if incremental:
+                    profiler, profiler_cfg = self.__profiler(unit_profile['content_type'])
+                    content_versions = _repo_content_versions(repo, profiler.metadata()['types'])
+                    if existing_applicability.get('content_versions') == content_versions:
+                        continue
+
+                outdated_applicabilities.append((existing_applicability['_id'], unit_profile))
+
+            # Load the complete applicability documents, including the profiles, only for the
+            # ones that need to be regenerated
+            applicability_ids = [a[0] for a in outdated_applicabilities]
+            full_applicabilities = dict(
+                (a['_id'], RepoProfileApplicability(**dict(a)))
+                for a in applicability_collection.find({'_id': {'$in': applicability_ids}}))
+
+            regenerations = []
+            for applicability_id, unit_profile in outdated_applicabilities:
+                existing_applicability = full_applicabilities.get(applicability_id)
+                if existing_applicability is None:
+                    continue
+                regenerations.append((existing_applicability.profile_hash,
+                                      unit_profile['content_type'], unit_profile['id'],
+                                      repo_id, existing_applicability))
+            run.regenerate(regenerations)
+
+        # Record the content version the applicability was regenerated against. Changes made
+        # while regenerating increment the version, so they will not be skipped next time.
+        Repo.get_collection().update({'id': repo_id},
+                                     {'$set': {'applicability_content_version': content_version}},
+                                     safe=True)
 
     def regenerate_applicability(self, profile_hash, content_type, profile_id,
                                  bound_repo_id, existing_applicability=None):
@@ -161,49 +258,10 @@ class ApplicabilityRegenerationManager(object):
         :param existing_applicability: existing RepoProfileApplicability object to be replaced
         :type existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
         """
-        profiler_conduit = ProfilerConduit()
-        # Get the profiler for content_type of given unit_profile
-        profiler, profiler_cfg = self.__profiler(content_type)
-
-        # Check if the profiler supports applicability, else return
-        if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
-            # If base class calculate_applicable_units method is called, 
-            # skip applicability regeneration
-            return
-
-        # Find out which content types have unit counts greater than zero in the bound repo
-        repo_content_types = self._get_existing_repo_content_types(bound_repo_id)
-        # Get the intersection of existing types in the repo and the types that the profiler handles.
-        # If the intersection is not empty, regenerate applicability
-        if ( set(repo_content_types) & set(profiler.metadata()['types']) ):
-            # Get the actual profile for existing_applicability or lookup using profile_id
-            if existing_applicability:
-                profile = existing_applicability.profile
-            else:
-                unit_profile = UnitProfile.get_collection().find_one({'id': profile_id},
-                                                                     fields=['profile'])
-                profile = unit_profile['profile']
-            call_config = PluginCallConfiguration(plugin_config=profiler_cfg, repo_plugin_config=None)
-            try:
-                applicability = profiler.calculate_applicable_units(profile,
-                                                                    bound_repo_id,
-                                                                    call_config,
-                                                                    profiler_conduit)
-            except NotImplementedError:
-                _LOG.debug("Profiler for content type [%s] does not support applicability" 
-                           % content_type)
-                return
-
-            if existing_applicability:
-                # Update existing applicability object
-                existing_applicability.applicability = applicability
-                existing_applicability.save()
-            else:
-                # Create a new RepoProfileApplicability object and save it in the db
-                RepoProfileApplicability.objects.create(profile_hash,
-                                                        bound_repo_id,
-                                                        unit_profile['profile'],
-                                                        applicability)
+        run = _RegenerationRun(self.__profiler, self._get_existing_repo_content_types,
+                               processes=0)
+        run.regenerate([(profile_hash, content_type, profile_id, bound_repo_id,
+                         existing_applicability)])
 
     def _get_existing_repo_content_types(self, repo_id):
         """
@@ -222,26 +280,11 @@ class ApplicabilityRegenerationManager(object):
                     repo_content_types_with_non_zero_unit_count.append(content_type)
         return repo_content_types_with_non_zero_unit_count
 
-    def _is_existing_applicability(self, repo_id, profile_hash):
-        """
-        Check if applicability for given repo and profle hash is already calculated.
-        
-        :param repo_id:      repo id
-        :type repo_id:       basestring
-        :param profile_hash: unit profile hash
-        :type profile_hash:  basestring
-        :return:             true if applicability exists, false otherwise
-        :type:               boolean
-        """
-        query_params = {'repo_id': repo_id, 'profile_hash': profile_hash}
-        if RepoProfileApplicability.get_collection().find_one(query_params, fields=['_id']):
-            return True
-        return False
-
     def __profiler(self, type_id):
         """
         Find the profiler.
         Returns the Profiler base class when not matched.
+        Profilers are cached per content type for the life of the manager.
 
         :param type_id: The content type ID.
         :type type_id: str
@@ -249,12 +292,193 @@ class ApplicabilityRegenerationManager(object):
         :return: (profiler, cfg)
         :rtype: tuple
         """
-        try:
-            plugin, cfg = plugin_api.get_profiler_by_type(type_id)
-        except plugin_exceptions.PluginNotFound:
-            plugin = Profiler()
-            cfg = {}
-        return plugin, cfg
+        if type_id not in self._profilers:
+            self._profilers[type_id] = _find_profiler(type_id)
+        return self._profilers[type_id]
+
+
+class _RegenerationRun(object):
+    """
+    Regenerates the applicability data for batches of (profile, repository) pairs. The
+    profiler calculations are fanned out to a pool of worker processes when one is
+    configured, while all other database reads and writes stay in the calling process.
+    Counts of what was calculated during the run are kept for reporting.
+    """
+
+    def __init__(self, profiler_lookup, repo_content_types_lookup, processes=None):
+        """
+        :param profiler_lookup:           Returns the (profiler, cfg) tuple for a content type
+        :type  profiler_lookup:           callable
+        :param repo_content_types_lookup: Returns the content types with units in a repository
+        :type  repo_content_types_lookup: callable
+        :param processes:                 Number of worker processes; 0 calculates in this
+                                          process. Defaults to the configured value.
+        :type  processes:                 int or None
+        """
+        if processes is None:
+            processes = pulp_config.config.getint('applicability', 'processes')
+        self.processes = processes
+        self.profiler_lookup = profiler_lookup
+        self.repo_content_types_lookup = repo_content_types_lookup
+
+        self.repo_content_types = {}
+        self.repo_content_versions = {}
+        self.pool = None
+
+        self.started = time.time()
+        self.calculated = 0
+        self.skipped = 0
+
+    def regenerate(self, regenerations):
+        """
+        Regenerate and save the applicability data for the given (profile, repository) pairs.
+
+        :param regenerations: (profile_hash, content_type, profile_id, repo_id,
+                              existing_applicability) tuples; existing_applicability is None
+                              when there is no applicability data to replace
+        :type  regenerations: list
+        """
+        calculations = []
+        profiles_to_load = set()
+
+        for profile_hash, content_type, profile_id, repo_id, existing_applicability in regenerations:
+            profiler, profiler_cfg = self.profiler_lookup(content_type)
+
+            # Check if the profiler supports applicability, else skip
+            if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
+                self.skipped += 1
+                continue
+
+            # Get the intersection of existing types in the repo and the types that the profiler
+            # handles. If the intersection is not empty, regenerate applicability
+            profiler_types = profiler.metadata()['types']
+            if not set(self._repo_content_types(repo_id)) & set(profiler_types):
+                self.skipped += 1
+                continue
+
+            if existing_applicability is None:
+                profiles_to_load.add(profile_id)
+
+            # Read the content versions before calculating, so that changes made to the repo
+            # while calculating cause the applicability to be regenerated again
+            content_versions = _repo_content_versions(self._repo_content_versions(repo_id),
+                                                      profiler_types)
+            calculations.append((profile_hash, content_type, profile_id, repo_id,
+                                 existing_applicability, content_versions))
+
+        # Get the actual profiles for new applicability with a single query
+        profiles = {}
+        if profiles_to_load:
+            for unit_profile in UnitProfile.get_collection().find(
+                    {'id': {'$in': list(profiles_to_load)}}, fields=['id', 'profile']):
+                profiles[unit_profile['id']] = unit_profile['profile']
+
+        pending = []
+        for profile_hash, content_type, profile_id, repo_id, existing_applicability, \
+                content_versions in calculations:
+            if existing_applicability is not None:
+                profile = existing_applicability.profile
+            elif profile_id in profiles:
+                profile = profiles[profile_id]
+            else:
+                # the unit profile was removed since the regeneration was requested
+                self.skipped += 1
+                continue
+            result = self._calculate(content_type, profile, repo_id)
+            pending.append((result, profile_hash, repo_id, profile, existing_applicability,
+                            content_versions))
+
+        for result, profile_hash, repo_id, profile, existing_applicability, \
+                content_versions in pending:
+            applicability = result.get()
+            if applicability is None:
+                # the profiler does not support applicability
+                self.skipped += 1
+                continue
+            self.calculated += 1
+
+            if existing_applicability:
+                # Update existing applicability object
+                existing_applicability.applicability = applicability
+                existing_applicability.content_versions = content_versions
+                existing_applicability.save()
+            else:
+                # Create a new RepoProfileApplicability object and save it in the db
+                RepoProfileApplicability.objects.create(profile_hash,
+                                                        repo_id,
+                                                        profile,
+                                                        applicability,
+                                                        content_versions)
+
+    def close(self):
+        """
+        Stop the run's worker processes, if any were started.
+        """
+        if self.pool is None:
+            return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+
+    def log_metrics(self, description):
+        """
+        Log the throughput of the run.
+
+        :param description: Describes the kind of regeneration the run performed
+        :type  description: basestring
+        """
+        elapsed = time.time() - self.started
+        rate = self.calculated / elapsed if elapsed > 0 else 0.0
+        msg = _('%(d)s: calculated %(c)d applicabilities and skipped %(s)d in %(e).3f seconds '
+                '(%(r).1f/s) using %(p)d worker processes')
+        _LOG.info(msg % {'d': description, 'c': self.calculated, 's': self.skipped,
+                         'e': elapsed, 'r': rate, 'p': self.processes})
+
+    def _calculate(self, content_type, profile, repo_id):
+        """
+        Start calculating the applicability of a profile against a repository.
+
+        :return: object whose get() method returns the applicability, or None if the profiler
+                 does not support applicability
+        :rtype:  multiprocessing.pool.AsyncResult or _CalculatedResult
+        """
+        if self.processes <= 0:
+            profiler, profiler_cfg = self.profiler_lookup(content_type)
+            return _CalculatedResult(
+                _calculate_applicable_units(profiler, profiler_cfg, content_type, profile, repo_id))
+
+        if self.pool is None:
+            # the workers need a database connection of their own as sockets cannot be shared
+            # across processes
+            self.pool = multiprocessing.Pool(self.processes,
+                                             initializer=_initialize_worker,
+                                             initargs=(db_connection.get_database().name,))
+        return self.pool.apply_async(_calculate_applicable_units_in_worker,
+                                     (content_type, profile, repo_id))
+
+    def _repo_content_types(self, repo_id):
+        if repo_id not in self.repo_content_types:
+            self.repo_content_types[repo_id] = self.repo_content_types_lookup(repo_id)
+        return self.repo_content_types[repo_id]
+
+    def _repo_content_versions(self, repo_id):
+        if repo_id not in self.repo_content_versions:
+            repo = Repo.get_collection().find_one({'id': repo_id}, fields=['content_versions'])
+            self.repo_content_versions[repo_id] = repo or {}
+        return self.repo_content_versions[repo_id]
+
+
+class _CalculatedResult(object):
+    """
+    Applicability calculated in the calling process, with the same get() method as the results
+    of calculations submitted to the worker pool.
+    """
+
+    def __init__(self, applicability):
+        self.applicability = applicability
+
+    def get(self):
+        return self.applicability
 
 
 class DoesNotExist(Exception):
@@ -277,7 +501,7 @@ class RepoProfileApplicabilityManager(object):
     """
     This class is useful for querying for RepoProfileApplicability objects in the database.
     """
-    def create(self, profile_hash, repo_id, profile, applicability):
+    def create(self, profile_hash, repo_id, profile, applicability, content_versions=None):
         """
         Create and return a RepoProfileApplicability object.
 
@@ -291,12 +515,15 @@ class RepoProfileApplicabilityManager(object):
         :param applicability: A dictionary structure mapping unit type IDs to lists of applicable
                               Unit IDs.
         :type  applicability: dict
+        :param content_versions: The repository's content versions, keyed by content type ID, of
+                              the types the applicability data was calculated from
+        :type  content_versions: dict
         :return:              A new RepoProfileApplicability object
         :rtype:               pulp.server.db.model.consumer.RepoProfileApplicability
         """
         applicability = RepoProfileApplicability(
             profile_hash=profile_hash, repo_id=repo_id, profile=profile,
-            applicability=applicability)
+            applicability=applicability, content_versions=content_versions)
         applicability.save()
         return applicability
 
@@ -376,6 +603,84 @@ class RepoProfileApplicabilityManager(object):
 RepoProfileApplicability.objects = RepoProfileApplicabilityManager()
 
 
+def _find_profiler(type_id):
+    """
+    Find the profiler.
+    Returns the Profiler base class when not matched.
+
+    :param type_id: The content type ID.
+    :type type_id: str
+
+    :return: (profiler, cfg)
+    :rtype: tuple
+    """
+    try:
+        plugin, cfg = plugin_api.get_profiler_by_type(type_id)
+    except plugin_exceptions.PluginNotFound:
+        plugin = Profiler()
+        cfg = {}
+    return plugin, cfg
+
+
+def _calculate_applicable_units(profiler, profiler_cfg, content_type, profile, repo_id):
+    """
+    Calculate the applicability of a profile against a repository.
+
+    :return: The applicability data, or None if the profiler does not support applicability
+    :rtype:  dict or None
+    """
+    call_config = PluginCallConfiguration(plugin_config=profiler_cfg, repo_plugin_config=None)
+    try:
+        return profiler.calculate_applicable_units(profile, repo_id, call_config,
+                                                   ProfilerConduit())
+    except NotImplementedError:
+        _LOG.debug("Profiler for content type [%s] does not support applicability"
+                   % content_type)
+        return None
+
+
+# profilers used by a worker process, keyed by content type
+_WORKER_PROFILERS = {}
+
+
+def _initialize_worker(database_name):
+    """
+    Initialize an applicability worker process.
+
+    :param database_name: The name of the database the parent process is connected to
+    :type  database_name: basestring
+    """
+    db_connection.initialize(name=database_name)
+
+
+def _calculate_applicable_units_in_worker(content_type, profile, repo_id):
+    """
+    Calculate the applicability of a profile against a repository in a worker process.
+
+    :return: The applicability data, or None if the profiler does not support applicability
+    :rtype:  dict or None
+    """
+    if content_type not in _WORKER_PROFILERS:
+        _WORKER_PROFILERS[content_type] = _find_profiler(content_type)
+    profiler, profiler_cfg = _WORKER_PROFILERS[content_type]
+    return _calculate_applicable_units(profiler, profiler_cfg, content_type, profile, repo_id)
+
+
+def _repo_content_versions(repo, content_types):
+    """
+    Return the content versions of the given content types in the given repo document.
+
+    :param repo:          The repository document
+    :type  repo:          dict
+    :param content_types: The content type ids to return the versions of
+    :type  content_types: list
+    :return:              The content versions keyed by content type id
+    :rtype:               dict
+    """
+    repo_content_versions = repo.get('content_versions') or {}
+    return dict((t, repo_content_versions.get(t, 0)) for t in content_types)
+
+
 def retrieve_consumer_applicability(consumer_criteria, content_types=None):
     """
     Query content applicability for consumers matched by a given consumer_criteria, optionally
@@ -22,6 +22,7 @@ import re
 
 from pulp.server import config
 from pulp.common.bundle import Bundle
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
 
 from pulp.server.db.model.consumer import Consumer
 from pulp.server.managers import factory
@@ -138,6 +139,9 @@ class ConsumerManager(object):
                 'consumer [%s]' % consumer_id)
             raise PulpExecutionException("database-error"), None, sys.exc_info()[2]
 
+        # The consumer's certificate must no longer authenticate
+        CREDENTIAL_CACHE.invalidate(consumer_id)
+
         # remove the consumer from any groups it was a member of
         group_manager = factory.consumer_group_manager()
         group_manager.remove_consumer_from_groups(consumer_id)
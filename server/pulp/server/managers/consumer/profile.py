@@ -15,10 +15,11 @@
 Contains profile management classes
 """
 
+from pulp.common import profile as profile_delta
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
 from pulp.server.db.model.consumer import UnitProfile
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import ChangedResource, InvalidValue, MissingResource
 from pulp.server.managers import factory
 from logging import getLogger
 
@@ -48,6 +49,7 @@ class ProfileManager(object):
         """
         Update a unit profile.
         Created if not already exists.
+        The profile is not saved when its hash is unchanged.
         @param consumer_id: uniquely identifies the consumer.
         @type consumer_id: str
         @param content_type: The profile (content) type ID.
@@ -67,15 +69,55 @@ class ProfileManager(object):
 
         try:
             p = self.get_profile(consumer_id, content_type)
+            profile_hash = UnitProfile.calculate_hash(profile)
+            if p['profile_hash'] == profile_hash:
+                # unchanged, and so is the applicability computed from it
+                return p
             p['profile'] = profile
             # We store the profile's hash anytime the profile gets altered
-            p['profile_hash'] = UnitProfile.calculate_hash(profile)
+            p['profile_hash'] = profile_hash
         except MissingResource:
             p = UnitProfile(consumer_id, content_type, profile)
         collection = UnitProfile.get_collection()
         collection.save(p, safe=True)
         return p
 
+    def update_delta(self, consumer_id, content_type, base_hash, added=(), removed=()):
+        """
+        Update a unit profile with the entries added to and removed from it
+        since it was last updated. An empty delta only checks that the stored
+        profile is current.
+        @param consumer_id: uniquely identifies the consumer.
+        @type consumer_id: str
+        @param content_type: The profile (content) type ID.
+        @type content_type: str
+        @param base_hash: The hash of the stored profile the delta is relative to.
+        @type base_hash: str
+        @param added: The profile entries added.
+        @type added: list
+        @param removed: The profile entries removed.
+        @type removed: list
+        @return: The updated profile.
+        @rtype: dict
+        @raise MissingResource when the profile is not found.
+        @raise ChangedResource when the stored profile hash is not base_hash,
+            or entries removed by the delta are not in the stored profile;
+            the complete profile must be updated instead.
+        @raise InvalidValue when the stored profile cannot be updated by a delta.
+        """
+        p = self.get_profile(consumer_id, content_type)
+        if p['profile_hash'] != base_hash:
+            raise ChangedResource(profile_hash=base_hash)
+        if not added and not removed:
+            return p
+        if not profile_delta.is_delta_supported(p['profile']):
+            raise InvalidValue(['delta'])
+        try:
+            profile = profile_delta.apply_delta(p['profile'], added, removed)
+        except profile_delta.MissingEntries:
+            raise ChangedResource(profile_hash=base_hash)
+        return self.update(consumer_id, content_type, profile)
+
     def delete(self, consumer_id, content_type):
         """
         Delete a profile by consumer and content type.
@@ -20,6 +20,11 @@ from pulp.server.exceptions import InvalidValue
 class ContentManager(object):
     """
     Create, update and delete operations for content in pulp.
+
+    These are called for every unit a sync or upload writes, so they do not
+    change the version of the content units in
+    pulp.server.db.resource_versions; the operation making the calls changes
+    it once it has finished.
     """
 
     def add_content_unit(self, content_type, unit_id, unit_metadata):
@@ -11,8 +11,10 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import errno
 import logging
 import os
+import Queue
 import re
 import shutil
 from gettext import gettext as _
@@ -21,11 +23,21 @@ from pulp.plugins.types import database as content_types_db
 from pulp.server import config as pulp_config
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import connection as db_connection
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.dispatch import context as dispatch_context
+from pulp.server.dispatch.workerpool import WorkerPool
+from pulp.server.util import batches
 
 
 _LOG = logging.getLogger(__name__)
 
+# maximum number of content unit ids in a single query or delete
+ORPHAN_BATCH_SIZE = 1000
+
+# number of threads used to delete orphaned files from storage
+ORPHAN_FILE_DELETE_WORKERS = 8
+
 
 class OrphanManager(object):
 
@@ -107,17 +119,51 @@ class OrphanManager(object):
 
         fields = fields if fields is not None else ['_id']
         content_units_collection = content_types_db.type_units_collection(content_type_id)
-        repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        # the associated unit ids are read once, up front, instead of issuing
+        # one query per content unit
+        associated_unit_ids = self._associated_unit_ids(content_type_id)
 
-            repo_content_units_cursor = repo_content_units_collection.find({'unit_id': content_unit['_id']})
+        for content_unit in content_units_collection.find({}, fields=fields):
 
-            if repo_content_units_cursor.count() > 0:
+            if content_unit['_id'] in associated_unit_ids:
                 continue
 
             yield content_unit
 
+    def generate_orphans_by_ids(self, content_type_id, content_unit_ids, fields=None):
+        """
+        Return an generator of the orphaned content units of the given content
+        type among the given content unit ids.
+
+        If fields is not specified, only the `_id` field will be present.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param content_unit_ids: ids of the content units to consider
+        :type content_unit_ids: iterable
+        :param fields: list of fields to include in each content unit
+        :type fields: list or None
+        :return: generator of orphaned content units for the given content type and ids
+        :rtype: generator
+        """
+
+        fields = fields if fields is not None else ['_id']
+        content_units_collection = content_types_db.type_units_collection(content_type_id)
+        repo_content_units_collection = RepoContentUnit.get_collection()
+
+        for content_unit_id_batch in batches(set(content_unit_ids), ORPHAN_BATCH_SIZE):
+
+            spec = {'unit_id': {'$in': content_unit_id_batch}}
+            associated_unit_ids = set(u['unit_id'] for u in repo_content_units_collection.find(spec, fields=['unit_id']))
+
+            for content_unit in content_units_collection.find({'_id': {'$in': content_unit_id_batch}}, fields=fields):
+
+                if content_unit['_id'] in associated_unit_ids:
+                    continue
+
+                yield content_unit
+
     def generate_orphans_by_type_with_unit_keys(self, content_type_id):
         """
         Return an generator of all orphaned content units of the given content type.
@@ -151,11 +197,7 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in self.generate_orphans_by_type(content_type_id):
-
-            if content_unit['_id'] != content_unit_id:
-                continue
-
+        for content_unit in self.generate_orphans_by_ids(content_type_id, [content_unit_id]):
             return content_unit
 
         raise pulp_exceptions.MissingResource(content_type=content_type_id, content_unit=content_unit_id)
@@ -214,6 +256,8 @@ class OrphanManager(object):
         the specific orphaned content units that may be deleted.
 
         NOTE: this method deletes the content unit's bits from disk, if applicable.
+        If any of the files cannot be deleted, the first error is raised once
+        all of the units have been deleted.
         NOTE: `flush` should not be set to False unless you know what you're doing
 
         :param content_type_id: id of the content type
@@ -225,23 +269,82 @@ class OrphanManager(object):
         """
 
         content_units_collection = content_types_db.type_units_collection(content_type_id)
-
-        for content_unit in self.generate_orphans_by_type(content_type_id, fields=['_id', '_storage_path']):
-
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
-                continue
-
-            content_units_collection.remove(content_unit['_id'], safe=False)
-
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                self.delete_orphaned_file(storage_path)
+        fields = ['_id', '_storage_path']
+
+        if content_unit_ids is None:
+            orphans = self.generate_orphans_by_type(content_type_id, fields)
+        else:
+            orphans = self.generate_orphans_by_ids(content_type_id, content_unit_ids, fields)
+
+        # the files are deleted from storage by a pool of threads while the
+        # database deletes continue; progress is reported from this thread as
+        # the dispatch context is thread-local
+        progress = {'content_type_id': content_type_id,
+                    'units_deleted': 0,
+                    'files_deleted': 0,
+                    'files_total': 0}
+        deleted_files = Queue.Queue()
+        file_errors = []
+        file_pool = WorkerPool(ORPHAN_FILE_DELETE_WORKERS, name='orphan-file-delete')
+
+        def _delete_file(path):
+            try:
+                self.delete_orphaned_file(path)
+                deleted_files.put(None)
+            except Exception, e:
+                _LOG.exception(_('Error deleting orphaned file: %(p)s') % {'p': path})
+                deleted_files.put(e)
+
+        try:
+            for batch in batches(orphans, ORPHAN_BATCH_SIZE):
+
+                content_units_collection.remove({'_id': {'$in': [u['_id'] for u in batch]}}, safe=False)
+                progress['units_deleted'] += len(batch)
+
+                for content_unit in batch:
+                    storage_path = content_unit.get('_storage_path', None)
+                    if storage_path is not None:
+                        file_pool.submit(_delete_file, storage_path)
+                        progress['files_total'] += 1
+
+                _collect_deleted_files(deleted_files, progress, file_errors, block=False)
+
+            _collect_deleted_files(deleted_files, progress, file_errors, block=True)
+
+        finally:
+            file_pool.shutdown(wait=False)
 
         # this forces the database to flush any cached changes to the disk
         # in the background; for example: the unsafe deletes in the loop above
         if flush:
             db_connection.flush_database()
 
+        # sent on the same connection as the deletes, so it is applied after them
+        if progress['units_deleted']:
+            resource_versions.bump(resource_versions.CONTENT_UNITS)
+
+        # the units are deleted even if some of their files could not be
+        if file_errors:
+            raise file_errors[0]
+
+    # orphan detection utilities -----------------------------------------------
+
+    def _associated_unit_ids(self, content_type_id):
+        """
+        Get the ids of all content units of the given content type that are
+        associated with at least one repository.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :return: set of associated content unit ids
+        :rtype: set
+        """
+        # streamed from a cursor instead of using distinct, as the result of
+        # distinct is bound by the maximum document size
+        repo_content_units_collection = RepoContentUnit.get_collection()
+        cursor = repo_content_units_collection.find({'unit_type_id': content_type_id}, fields=['unit_id'])
+        return set(u['unit_id'] for u in cursor)
+
     # physical bits utility ----------------------------------------------------
 
     def delete_orphaned_file(self, path):
@@ -274,10 +377,44 @@ class OrphanManager(object):
             path = os.path.dirname(path)
             if root_content_regex.match(path):
                 break
-            contents = os.listdir(path)
-            if contents:
-                break
-            if not os.access(path, os.W_OK):
+            # other threads may be removing the same parent directories
+            try:
+                contents = os.listdir(path)
+                if contents:
+                    break
+                if not os.access(path, os.W_OK):
+                    break
+                os.rmdir(path)
+            except OSError, e:
+                if e.errno not in (errno.ENOENT, errno.ENOTEMPTY):
+                    raise
                 break
-            os.rmdir(path)
 
+# utility functions ------------------------------------------------------------
+
+def _collect_deleted_files(deleted_files, progress, errors, block):
+    """
+    Count the orphaned files whose deletion has finished and report the
+    progress of the orphan delete.
+
+    :param deleted_files: queue the outcome of each deletion is put on; None
+                          for success or the exception raised
+    :type deleted_files: Queue.Queue
+    :param progress: orphan delete progress report
+    :type progress: dict
+    :param errors: list the exceptions raised by deletions are added to
+    :type errors: list
+    :param block: if True, wait until all of the files have been deleted
+    :type block: bool
+    """
+    while progress['files_deleted'] < progress['files_total']:
+        try:
+            error = deleted_files.get(block)
+        except Queue.Empty:
+            break
+        progress['files_deleted'] += 1
+        if error is not None:
+            errors.append(error)
+        if block:
+            dispatch_context.CONTEXT.report_progress(progress.copy())
+    dispatch_context.CONTEXT.report_progress(progress.copy())
@@ -11,9 +11,12 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
 import logging
 import os
 import sys
+import threading
+from gettext import gettext as _
 from uuid import uuid4
 
 from pulp.plugins.conduits.upload import UploadConduit
@@ -21,6 +24,7 @@ from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.loader import exceptions as plugin_exceptions
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.server import config as pulp_config
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.exceptions import PulpDataException, MissingResource, PulpExecutionException, PulpException
 import pulp.server.managers.factory as manager_factory
@@ -29,6 +33,12 @@ import pulp.server.managers.repo._common as repo_common_utils
 
 logger = logging.getLogger(__name__)
 
+# suffix of the file that records the segments received for an upload
+SEGMENTS_SUFFIX = '.segments'
+
+# size of the blocks read when digesting uploaded data from disk
+DIGEST_BLOCK_SIZE = 1048576
+
 
 class ContentUploadManager(object):
 
@@ -60,15 +70,23 @@ class ContentUploadManager(object):
         f = open(file_path, 'w')
         f.close()
 
+        # Segments may arrive out of order and concurrently, so the ranges
+        # received are recorded to allow a resumed upload to only send the
+        # missing ones.
+        f = open(self._segments_file_path(upload_id), 'w')
+        f.close()
+
         return upload_id
 
-    def save_data(self, upload_id, offset, data):
+    def save_data(self, upload_id, offset, data, checksum=None):
         """
         Saves bits into the given upload request starting at an offset value.
         The initialize_upload method should be called prior to this method
         to retrieve the upload_id value and perform any steps necessary before
         bits can be saved.
 
+        Segments may be saved in any order and concurrently with each other.
+
         @param upload_id: upload request ID
         @type  upload_id: str
 
@@ -77,6 +95,13 @@ class ContentUploadManager(object):
 
         @param data: content to write to the file
         @type  data: str
+
+        @param checksum: optional SHA-256 hex digest of data; if specified, the
+               data is rejected when it does not match
+        @type  checksum: str
+
+        @raise MissingResource: if the upload request does not exist
+        @raise PulpDataException: if the data does not match the checksum
         """
 
         file_path = self._upload_file_path(upload_id)
@@ -85,11 +110,101 @@ class ContentUploadManager(object):
         if not os.path.exists(file_path):
             raise MissingResource(upload_request=upload_id)
 
+        if checksum is not None and hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise PulpDataException(_('Checksum mismatch for the data uploaded at offset %(o)s') %
+                                    {'o': offset})
+
         f = open(file_path, 'r+')
         f.seek(offset)
         f.write(data)
         f.close()
 
+        # Record the segment only once its data is on disk, single appends
+        # from concurrent requests don't interleave
+        segments_path = self._segments_file_path(upload_id)
+        if os.path.exists(segments_path):
+            fd = os.open(segments_path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, '%d %d\n' % (offset, len(data)))
+            finally:
+                os.close(fd)
+
+        UPLOAD_DIGESTS.update(upload_id, file_path, offset, data,
+                              lambda: self.received_ranges(upload_id))
+
+    def received_ranges(self, upload_id):
+        """
+        Returns the ranges of the uploaded file that have been received, in
+        order and with adjacent or overlapping ranges merged.
+
+        @param upload_id: upload request ID
+        @type  upload_id: str
+
+        @return: list of [start, end) offset pairs
+        @rtype:  list
+
+        @raise MissingResource: if the upload request does not exist
+        """
+        file_path = self._upload_file_path(upload_id)
+        if not os.path.exists(file_path):
+            raise MissingResource(upload_request=upload_id)
+
+        segments_path = self._segments_file_path(upload_id)
+        if not os.path.exists(segments_path):
+            # initialized before segments were recorded; always written in order
+            size = os.path.getsize(file_path)
+            return size and [[0, size]] or []
+
+        segments = []
+        f = open(segments_path)
+        try:
+            for line in f:
+                fields = line.split()
+                # a line may be incomplete while it is being appended
+                if len(fields) == 2 and line.endswith('\n'):
+                    offset, length = int(fields[0]), int(fields[1])
+                    segments.append((offset, offset + length))
+        finally:
+            f.close()
+
+        ranges = []
+        for start, end in sorted(segments):
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    def verify_upload(self, upload_id, size, checksum=None):
+        """
+        Verifies that an upload has received all of the data of a file of the
+        given size and, optionally, that the data matches the file's digest.
+        The digest is maintained as segments arrive, so in the usual case
+        only data received out of order or by other processes is read back.
+
+        @param upload_id: upload request ID
+        @type  upload_id: str
+
+        @param size: size in bytes of the uploaded file
+        @type  size: int
+
+        @param checksum: SHA-256 hex digest of the whole file
+        @type  checksum: str
+
+        @raise MissingResource: if the upload request does not exist
+        @raise PulpDataException: if data is missing or does not match the checksum
+        """
+        ranges = self.received_ranges(upload_id)
+        if size and not (ranges and ranges[0][0] == 0 and ranges[0][1] >= size):
+            missing = size - sum(min(end, size) - start for start, end in ranges if start < size)
+            raise PulpDataException(_('Upload is incomplete: %(m)s of %(s)s bytes missing') %
+                                    {'m': missing, 's': size})
+        if checksum is None:
+            return
+        digest = UPLOAD_DIGESTS.hexdigest(upload_id, self._upload_file_path(upload_id), size)
+        if digest != checksum.lower():
+            raise PulpDataException(_('Checksum mismatch for upload %(u)s') % {'u': upload_id})
+
     def delete_upload(self, upload_id):
         """
         Deletes all files associated with the given upload request. If the
@@ -103,6 +218,10 @@ class ContentUploadManager(object):
         file_path = self._upload_file_path(upload_id)
         if os.path.exists(file_path):
             os.remove(file_path)
+        segments_path = self._segments_file_path(upload_id)
+        if os.path.exists(segments_path):
+            os.remove(segments_path)
+        UPLOAD_DIGESTS.discard(upload_id)
 
     def read_upload(self, upload_id):
         """
@@ -136,7 +255,7 @@ class ContentUploadManager(object):
         @rtype:  list
         """
         upload_dir = self._upload_storage_dir()
-        upload_ids = os.listdir(upload_dir)
+        upload_ids = [f for f in os.listdir(upload_dir) if not f.endswith(SEGMENTS_SUFFIX)]
         return upload_ids
 
     def is_valid_upload(self, repo_id, unit_type_id):
@@ -167,7 +286,8 @@ class ContentUploadManager(object):
 
         return True
 
-    def import_uploaded_unit(self, repo_id, unit_type_id, unit_key, unit_metadata, upload_id):
+    def import_uploaded_unit(self, repo_id, unit_type_id, unit_key, unit_metadata, upload_id,
+                             size=None, checksum=None):
         """
         Called to trigger the importer's handling of an uploaded unit. This
         should not be called until the bits have finished uploading. The
@@ -189,6 +309,11 @@ class ContentUploadManager(object):
         :type  unit_metadata: dict
         :param upload_id:     upload being imported
         :type  upload_id:     str
+        :param size:          optional size of the uploaded file; if specified, the import is
+                              refused unless all of the file's data has been received
+        :type  size:          int
+        :param checksum:      optional SHA-256 hex digest of the uploaded file, verified with size
+        :type  checksum:      str
         :return:              A SyncReport indicating the success or failure of the upload
         :rtype:               pulp.plugins.model.SyncReport
         """
@@ -196,6 +321,9 @@ class ContentUploadManager(object):
         # If it doesn't raise an exception, it's good to go
         self.is_valid_upload(repo_id, unit_type_id)
 
+        if size is not None:
+            self.verify_upload(upload_id, size, checksum)
+
         repo_query_manager = manager_factory.repo_query_manager()
         importer_manager = manager_factory.repo_importer_manager()
 
@@ -233,6 +361,10 @@ class ContentUploadManager(object):
             msg = msg % {'r': repo_id}
             logger.exception(msg)
             raise PulpExecutionException(e), None, sys.exc_info()[2]
+        finally:
+            # the importer may have written units before failing
+            conduit._record_changes()
+            resource_versions.bump_repository(repo_id)
 
         # TODO: Add support for tracking the report as a history entry on the repo
 
@@ -250,6 +382,19 @@ class ContentUploadManager(object):
         path = os.path.join(upload_storage_dir, upload_id)
         return path
 
+    def _segments_file_path(self, upload_id):
+        """
+        Returns the full path to the file recording the segments received for
+        the given upload, one "offset length" line per segment.
+
+        @param upload_id: identifies the upload in question
+        @type  upload_id: str
+
+        @return: full path on the server's filesystem
+        @rtype:  str
+        """
+        return self._upload_file_path(upload_id) + SEGMENTS_SUFFIX
+
     def _upload_storage_dir(self):
         """
         Calculates the location of the directory into which to store uploaded
@@ -267,3 +412,104 @@ class ContentUploadManager(object):
             os.makedirs(upload_storage_dir)
 
         return upload_storage_dir
+
+
+class UploadDigests(object):
+    """
+    SHA-256 digests of the uploads in progress, advanced as the data at the
+    end of each digest arrives, so that verifying an upload does not need to
+    read the whole file back. Segments that arrive ahead of the digest are
+    read back from disk once the gap before them has been filled.
+
+    Each process keeps its own digests; data received by other processes is
+    read back when the upload is verified.
+    """
+
+    def __init__(self):
+        # upload_id: [offset digested up to, sha256]
+        self.__digests = {}
+        self.__lock = threading.Lock()
+
+    def update(self, upload_id, file_path, offset, data, received_ranges):
+        """
+        Advance the digest of an upload with a segment that was just saved.
+        @param upload_id: upload request ID
+        @type  upload_id: str
+        @param file_path: path of the uploaded file
+        @type  file_path: str
+        @param offset: offset at which the segment was saved
+        @type  offset: int
+        @param data: data of the segment
+        @type  data: str
+        @param received_ranges: returns the ranges of the upload received so far
+        @type  received_ranges: callable
+        """
+        self.__lock.acquire()
+        try:
+            entry = self.__digests.setdefault(upload_id, [0, hashlib.sha256()])
+            end = offset + len(data)
+            if offset > entry[0] or end <= entry[0]:
+                return
+            entry[1].update(data[entry[0] - offset:])
+            entry[0] = end
+            # catch up on segments that arrived ahead of this one
+            ranges = received_ranges()
+            if ranges and ranges[0][0] == 0 and ranges[0][1] > entry[0]:
+                self.__digest_file(entry, file_path, ranges[0][1])
+        finally:
+            self.__lock.release()
+
+    def hexdigest(self, upload_id, file_path, size):
+        """
+        Get the digest of the first size bytes of an upload, reading any data
+        not digested yet from disk.
+        @param upload_id: upload request ID
+        @type  upload_id: str
+        @param file_path: path of the uploaded file
+        @type  file_path: str
+        @param size: number of bytes to digest
+        @type  size: int
+        @return: SHA-256 hex digest
+        @rtype:  str
+        """
+        self.__lock.acquire()
+        try:
+            entry = self.__digests.get(upload_id)
+            if entry is None or entry[0] > size:
+                entry = [0, hashlib.sha256()]
+            entry = [entry[0], entry[1].copy()]
+            self.__digest_file(entry, file_path, size)
+            return entry[1].hexdigest()
+        finally:
+            self.__lock.release()
+
+    def discard(self, upload_id):
+        """
+        Discard the digest of an upload.
+        @param upload_id: upload request ID
+        @type  upload_id: str
+        """
+        self.__lock.acquire()
+        try:
+            self.__digests.pop(upload_id, None)
+        finally:
+            self.__lock.release()
+
+    def __digest_file(self, entry, file_path, end):
+        """
+        Advance a digest entry with the data of a file up to the end offset
+        """
+        f = open(file_path)
+        try:
+            f.seek(entry[0])
+            while entry[0] < end:
+                data = f.read(min(DIGEST_BLOCK_SIZE, end - entry[0]))
+                if not data:
+                    break
+                entry[1].update(data)
+                entry[0] += len(data)
+        finally:
+            f.close()
+
+
+UPLOAD_DIGESTS = UploadDigests()
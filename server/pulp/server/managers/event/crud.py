@@ -22,6 +22,7 @@ from pulp.server.db.model.event import EventListener
 from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.event import notifiers
 from pulp.server.event.data import ALL_EVENT_TYPES
+from pulp.server.event.listeners import LISTENER_INDEX
 
 # -- manager -----------------------------------------------------------------
 
@@ -70,6 +71,7 @@ class EventListenerManager(object):
         el = EventListener(notifier_type_id, notifier_config, event_types)
         collection = EventListener.get_collection()
         created_id = collection.save(el, safe=True)
+        LISTENER_INDEX.invalidate()
         created = collection.find_one(created_id)
 
         return created
@@ -116,6 +118,7 @@ class EventListenerManager(object):
         self.get(event_listener_id) # check for MissingResource
 
         collection.remove({'_id' : ObjectId(event_listener_id)})
+        LISTENER_INDEX.invalidate()
 
     def update(self, event_listener_id, notifier_config=None, event_types=None):
         """
@@ -166,6 +169,7 @@ class EventListenerManager(object):
 
         # Update the database
         collection.save(existing, safe=True)
+        LISTENER_INDEX.invalidate()
 
         # Reload to return
         existing = collection.find_one({'_id' : ObjectId(event_listener_id)})
@@ -20,8 +20,8 @@ in a consistent event format for that type.
 
 import logging
 
-from pulp.server.db.model.event import EventListener
 from pulp.server.event import notifiers
+from pulp.server.event.listeners import LISTENER_INDEX
 from pulp.server.event import data as e
 from pulp.server.managers import factory
 
@@ -79,8 +79,7 @@ class EventFireManager(object):
         @type  event: pulp.server.event.data.Event
         """
         # Determine which listeners should be notified
-        listeners = list(EventListener.get_collection().find(
-            {'$or': ({'event_types' : event.event_type}, {'event_types' : '*'})}))
+        listeners = LISTENER_INDEX.listeners(event.event_type)
 
         # For each listener, retrieve the notifier and invoke it. Be sure that
         # an exception from a notifier is logged but does not interrupt the
@@ -18,21 +18,28 @@ or distributor configuration.
 """
 
 from gettext import gettext as _
+import glob
 import logging
 import os
+import Queue
 import re
 import shutil
 import sys
+import uuid
 
 import pymongo
 
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import Repo, RepoDistributor, RepoImporter, RepoContentUnit, RepoSyncResult, RepoPublishResult
+from pulp.server.dispatch import context as dispatch_context
 from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.dispatch.workerpool import WorkerPool
 import pulp.server.managers.factory as manager_factory
 import pulp.server.managers.repo._common as common_utils
 from pulp.server.exceptions import DuplicateResource, InvalidValue, MissingResource, \
     PulpExecutionException, MultipleOperationsPostponed
 from pulp.server.itineraries.repository import distributor_update_itinerary
+from pulp.server.util import batches
 from pulp.server.webservices import execution
 
 # -- constants ----------------------------------------------------------------
@@ -40,6 +47,12 @@ from pulp.server.webservices import execution
 _REPO_ID_REGEX = re.compile(r'^[.\-_A-Za-z0-9]+$') # letters, numbers, underscore, hyphen
 _DISTRIBUTOR_ID_REGEX = _REPO_ID_REGEX # for now, use the same constraints
 
+# maximum number of documents removed by a single delete when deleting a repo
+REPO_DELETE_BATCH_SIZE = 1000
+
+# number of threads used to remove a deleted repo's directory trees
+REPO_DELETE_FILE_WORKERS = 4
+
 _LOG = logging.getLogger(__name__)
 
 # -- classes ------------------------------------------------------------------
@@ -87,6 +100,7 @@ class RepoManager(object):
         # Creation
         create_me = Repo(repo_id, display_name, description, notes)
         Repo.get_collection().save(create_me, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         # Retrieve the repo to return the SON object
         created = Repo.get_collection().find_one({'id' : repo_id})
@@ -190,6 +204,14 @@ class RepoManager(object):
         Deletes the given repository, optionally requesting the associated
         importer clean up any content in the repository.
 
+        The repository working directory is moved aside and removed by a pool of threads while its content unit
+        associations and history are removed from the database in batches, so
+        no single database operation holds the database for long. Progress is
+        reported through the dispatch context. The repository document itself
+        is removed last, so a delete that is interrupted can be run again; the
+        working directories moved aside by an interrupted delete are removed
+        along with the current one.
+
         :param repo_id: identifies the repo being deleted
         :type  repo_id: str
 
@@ -211,6 +233,13 @@ class RepoManager(object):
         # will have to look at the server logs for more information.
         error_tuples = [] # tuple of failed step and exception arguments
 
+        progress = {'repo_id' : repo_id,
+                    'step' : 'plugins',
+                    'associations_removed' : 0,
+                    'directories_removed' : 0,
+                    'directories_total' : 0}
+        dispatch_context.CONTEXT.report_progress(progress.copy())
+
         # Remove any scheduled activities
         scheduler = dispatch_factory.scheduler()
 
@@ -245,19 +274,42 @@ class RepoManager(object):
                 _LOG.exception('Error received removing distributor [%s] from repo [%s]' % (repo_distributor['id'], repo_id))
                 error_tuples.append( (_('Distributor Delete Error'), e.args))
 
-        # Delete the repository working directory
+        # Delete the repository working directory; it is renamed first so that
+        # a repository re-created with the same id gets a new one right away
         repo_working_dir = common_utils.repository_working_dir(repo_id, mkdir=False)
-        if os.path.exists(repo_working_dir):
+        removed_dirs = Queue.Queue()
+        dir_errors = []
+        file_pool = WorkerPool(REPO_DELETE_FILE_WORKERS, name='repo-delete')
+
+        def _remove_tree(path):
             try:
-                shutil.rmtree(repo_working_dir)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.unlink(path)
+                removed_dirs.put(None)
             except Exception, e:
-                _LOG.exception('Error while deleting repo working dir [%s] for repo [%s]' % (repo_working_dir, repo_id))
-                error_tuples.append( (_('Filesystem Cleanup Error'), e.args))
+                _LOG.exception('Error while deleting [%s] from the working dir of repo [%s]' % (path, repo_id))
+                removed_dirs.put(e)
 
-        # Database Updates
+        doomed_dir = None
         try:
-            Repo.get_collection().remove({'id' : repo_id}, safe=True)
+            # working dirs left behind by a delete of this repo that was interrupted
+            for leftover_dir in glob.glob('%s.deleted-*' % repo_working_dir):
+                file_pool.submit(_remove_tree, leftover_dir)
+                progress['directories_total'] += 1
+            if os.path.exists(repo_working_dir):
+                doomed_dir = '%s.deleted-%s' % (repo_working_dir, uuid.uuid4())
+                os.rename(repo_working_dir, doomed_dir)
+                for name in os.listdir(doomed_dir):
+                    file_pool.submit(_remove_tree, os.path.join(doomed_dir, name))
+                    progress['directories_total'] += 1
+        except Exception, e:
+            _LOG.exception('Error while deleting repo working dir [%s] for repo [%s]' % (repo_working_dir, repo_id))
+            error_tuples.append( (_('Filesystem Cleanup Error'), e.args))
 
+        # Database Updates
+        try:
             # Remove all importers and distributors from the repo
             # This is likely already done by the calls to other methods in
             #   this manager, but in case those failed we still want to attempt
@@ -265,18 +317,39 @@ class RepoManager(object):
             RepoDistributor.get_collection().remove({'repo_id' : repo_id}, safe=True)
             RepoImporter.get_collection().remove({'repo_id' : repo_id}, safe=True)
 
-            RepoSyncResult.get_collection().remove({'repo_id' : repo_id}, safe=True)
-            RepoPublishResult.get_collection().remove({'repo_id' : repo_id}, safe=True)
+            # Remove the history and all associations from the repo in batches
+            for collection in (RepoSyncResult.get_collection(), RepoPublishResult.get_collection()):
+                for removed in _remove_in_batches(collection, {'repo_id' : repo_id}):
+                    _collect_removed_dirs(removed_dirs, progress, dir_errors, block=False)
 
-            # Remove all associations from the repo
-            RepoContentUnit.get_collection().remove({'repo_id' : repo_id}, safe=True)
+            progress['step'] = 'associations'
+            for removed in _remove_in_batches(RepoContentUnit.get_collection(), {'repo_id' : repo_id}):
+                progress['associations_removed'] += removed
+                _collect_removed_dirs(removed_dirs, progress, dir_errors, block=False)
+
+            # remove the repo from any groups it was a member of
+            group_manager = manager_factory.repo_group_manager()
+            group_manager.remove_repo_from_groups(repo_id)
+
+            Repo.get_collection().remove({'id' : repo_id}, safe=True)
         except Exception, e:
             _LOG.exception('Error updating one or more database collections while removing repo [%s]' % repo_id)
             error_tuples.append( (_('Database Removal Error'), e.args))
+        resource_versions.bump_repository(repo_id)
 
-        # remove the repo from any groups it was a member of
-        group_manager = manager_factory.repo_group_manager()
-        group_manager.remove_repo_from_groups(repo_id)
+        # Wait for the filesystem cleanup
+        progress['step'] = 'filesystem'
+        try:
+            _collect_removed_dirs(removed_dirs, progress, dir_errors, block=True)
+            if dir_errors:
+                error_tuples.append( (_('Filesystem Cleanup Error'), dir_errors[0].args))
+            elif doomed_dir is not None:
+                os.rmdir(doomed_dir)
+        except Exception, e:
+            _LOG.exception('Error while deleting repo working dir [%s] for repo [%s]' % (repo_working_dir, repo_id))
+            error_tuples.append( (_('Filesystem Cleanup Error'), e.args))
+        finally:
+            file_pool.shutdown(wait=False)
 
         if len(error_tuples) > 0:
             raise PulpExecutionException(error_tuples)
@@ -333,6 +406,7 @@ class RepoManager(object):
             repo['notes'] = existing_notes
 
         repo_coll.save(repo, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         return repo
 
@@ -346,6 +420,10 @@ class RepoManager(object):
 
         {'rpm': 12, 'srpm': 3}
 
+        The version of the repository is not changed, as this is called for
+        every unit associated or unassociated; the operation making the calls
+        changes it once it has finished.
+
         :param repo_id: identifies the repo
         :type  repo_id: str
 
@@ -356,7 +434,9 @@ class RepoManager(object):
         :type  delta: int
         """
         spec = {'id' : repo_id}
-        operation = {'$inc' : {'content_unit_counts.%s' % unit_type_id: delta}}
+        increments = _content_version_increments([unit_type_id])
+        increments['content_unit_counts.%s' % unit_type_id] = delta
+        operation = {'$inc' : increments}
         repo_coll = Repo.get_collection()
 
         if delta:
@@ -366,6 +446,40 @@ class RepoManager(object):
                 message = 'There was a problem updating repository %s' % repo_id
                 raise PulpExecutionException(message), None, sys.exc_info()[2]
 
+    @staticmethod
+    def update_content_version(repo_id, unit_type_ids):
+        """
+        Records that the units of the given types associated with the repo
+        have changed without the unit counts changing, for instance when the
+        units themselves have been updated by a sync. Each repo has an
+        attribute 'content_versions', a dict where keys are content type IDs
+        and values are incremented each time units of that type change, and
+        an attribute 'content_version' incremented each time any unit changes.
+        Applicability regeneration uses these to skip unchanged repositories.
+
+        Changes to the unit counts made through update_unit_count already
+        update the content versions.
+
+        :param repo_id: identifies the repo
+        :type  repo_id: str
+
+        :param unit_type_ids: identifies the unit types that changed
+        :type  unit_type_ids: list
+        """
+        if not unit_type_ids:
+            return
+
+        spec = {'id' : repo_id}
+        operation = {'$inc' : _content_version_increments(unit_type_ids)}
+        repo_coll = Repo.get_collection()
+
+        try:
+            repo_coll.update(spec, operation, safe=True)
+        except pymongo.errors.OperationFailure:
+            message = 'There was a problem updating repository %s' % repo_id
+            raise PulpExecutionException(message), None, sys.exc_info()[2]
+        resource_versions.bump_repository(repo_id)
+
     def update_repo_and_plugins(self, repo_id, repo_delta, importer_config,
                                 distributor_configs):
         """
@@ -477,6 +591,7 @@ class RepoManager(object):
         result = collection.update({'id': repo_id}, {'$set': {'scratchpad': scratchpad}}, safe=True)
         if result['n'] == 0:
             raise MissingResource(repo_id=repo_id)
+        resource_versions.bump_repository(repo_id)
 
     def update_repo_scratchpad(self, repo_id, scratchpad):
         """
@@ -499,46 +614,140 @@ class RepoManager(object):
         result = collection.update({'id': repo_id}, {'$set': properties}, safe=True)
         if result['n'] == 0:
             raise MissingResource(repo_id=repo_id)
+        resource_versions.bump_repository(repo_id)
 
     @staticmethod
-    def rebuild_content_unit_counts(repo_ids=None):
+    def rebuild_content_unit_counts(repo_ids=None, verify=False):
         """
-        WARNING: This might take a long time, and it should not be used unless
-        absolutely necessary. Not responsible for melted servers.
+        Recalculates the content unit counts for each content type of the
+        given repositories, which defaults to ALL repositories.
 
-        This will iterate through the given repositories, which defaults to ALL
-        repositories, and recalculate the content unit counts for each content
-        type.
+        The associations are counted in a single aggregation over the
+        association collection, grouped by repository and content type, and
+        only the repositories whose stored counts differ from the actual
+        counts are updated. The content versions of the types whose counts
+        changed are bumped along with the counts. In verify mode nothing is
+        updated and the drift is only reported.
 
         This method is called from platform migration 0004, so consult that
         migration before changing this method.
 
         :param repo_ids:    list of repository IDs. DEFAULTS TO ALL REPO IDs!!!
         :type  repo_ids:    list
+        :param verify:      if True, report the drift without updating any repository
+        :type  verify:      bool
+        :return:            dict of repo ID to a dict with the 'stored' and 'actual' counts
+                            for each repository whose stored counts were wrong
+        :rtype:             dict
         """
         association_collection = RepoContentUnit.get_collection()
         repo_collection = Repo.get_collection()
 
-        # default to all repos if none were specified
-        if not repo_ids:
-            repo_ids = [repo['id'] for repo in repo_collection.find(fields=['id'])]
+        repo_spec = {}
+        pipeline = []
+        if repo_ids:
+            repo_spec = {'id': {'$in': list(repo_ids)}}
+            pipeline.append({'$match': {'repo_id': {'$in': list(repo_ids)}}})
+        pipeline.append({'$group': {'_id': {'repo_id': '$repo_id', 'unit_type_id': '$unit_type_id'},
+                                    'count': {'$sum': 1}}})
+
+        # repo_id: {unit_type_id: count}
+        actual_counts = {}
+        for result in association_collection.aggregate(pipeline)['result']:
+            group = result['_id']
+            actual_counts.setdefault(group['repo_id'], {})[group['unit_type_id']] = result['count']
+
+        drift = {}
+        repo_count = 0
+        for repo in repo_collection.find(repo_spec, fields=['id', 'content_unit_counts']):
+            repo_count += 1
+            repo_id = repo['id']
+            # types with no units may or may not have a zero count stored
+            stored = dict((t, c) for t, c in (repo.get('content_unit_counts') or {}).items() if c)
+            actual = actual_counts.get(repo_id, {})
+            if stored == actual:
+                continue
+
+            drift[repo_id] = {'stored': stored, 'actual': actual}
+            if verify:
+                continue
 
-        _LOG.info('regenerating content unit counts for %d repositories' % len(repo_ids))
-
-        for repo_id in repo_ids:
             _LOG.debug('regenerating content unit count for repository "%s"' % repo_id)
-            counts = {}
-            cursor = association_collection.find({'repo_id':repo_id})
-            type_ids = cursor.distinct('unit_type_id')
-            cursor.close()
-            for type_id in type_ids:
-                spec = {'repo_id': repo_id, 'unit_type_id': type_id}
-                counts[type_id] = association_collection.find(spec).count()
-            repo_collection.update({'id': repo_id}, {'$set':{'content_unit_counts': counts}}, safe=True)
+            changed_type_ids = [t for t in set(stored) | set(actual) if stored.get(t) != actual.get(t)]
+            operation = {'$set': {'content_unit_counts': actual},
+                         '$inc': _content_version_increments(changed_type_ids)}
+            repo_collection.update({'id': repo_id}, operation, safe=True)
+
+        if verify:
+            _LOG.info('content unit counts of %d of %d repositories are wrong' % (len(drift), repo_count))
+        else:
+            _LOG.info('regenerated content unit counts of %d of %d repositories' % (len(drift), repo_count))
+            if drift:
+                resource_versions.bump(resource_versions.REPOSITORIES,
+                                       *[resource_versions.repository(r) for r in drift])
+
+        return drift
 
 
 # -- functions ----------------------------------------------------------------
 
+def _remove_in_batches(collection, spec):
+    """
+    Remove the documents matching a spec from a collection, at most
+    REPO_DELETE_BATCH_SIZE documents per remove, so that the removal does
+    not hold the database for long.
+
+    :param collection: collection to remove the documents from
+    :type  collection: pymongo.collection.Collection
+    :param spec: query matching the documents to remove
+    :type  spec: dict
+    :return: generator of the number of documents removed by each batch
+    :rtype:  generator
+    """
+    ids = (document['_id'] for document in collection.find(spec, fields=['_id']))
+    for batch in batches(ids, REPO_DELETE_BATCH_SIZE):
+        collection.remove({'_id' : {'$in' : batch}}, safe=True)
+        yield len(batch)
+
+
+def _collect_removed_dirs(removed_dirs, progress, errors, block):
+    """
+    Count the directory trees whose removal has finished and report the
+    progress of the repo delete.
+
+    :param removed_dirs: queue the outcome of each removal is put on; None
+                         for success or the exception raised
+    :type  removed_dirs: Queue.Queue
+    :param progress: repo delete progress report
+    :type  progress: dict
+    :param errors: list the exceptions raised by removals are added to
+    :type  errors: list
+    :param block: if True, wait until all of the trees have been removed
+    :type  block: bool
+    """
+    while progress['directories_removed'] < progress['directories_total']:
+        try:
+            error = removed_dirs.get(block)
+        except Queue.Empty:
+            break
+        progress['directories_removed'] += 1
+        if error is not None:
+            errors.append(error)
+        if block:
+            dispatch_context.CONTEXT.report_progress(progress.copy())
+    dispatch_context.CONTEXT.report_progress(progress.copy())
+
+
+def _content_version_increments(unit_type_ids):
+    """
+    :return: $inc operation fields that bump the content versions of the given
+             unit types, and the overall content version, of a repo
+    :rtype:  dict
+    """
+    increments = dict(('content_versions.%s' % t, 1) for t in unit_type_ids)
+    increments['content_version'] = 1
+    return increments
+
 def is_repo_id_valid(repo_id):
     """
     :return: true if the repo ID is valid; false otherwise
@@ -16,6 +16,7 @@ import re
 import sys
 import uuid
 
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import Repo, RepoDistributor
 from pulp.plugins.conduits.repo_config import RepoConfigConduit
 from pulp.plugins.config import PluginCallConfiguration
@@ -197,6 +198,7 @@ class RepoDistributorManager(object):
         # Database Update
         distributor = RepoDistributor(repo_id, distributor_id, distributor_type_id, clean_config, auto_publish)
         distributor_coll.save(distributor, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         return distributor
 
@@ -239,6 +241,7 @@ class RepoDistributorManager(object):
 
         # Update the database to reflect the removal
         distributor_coll.remove({'_id': repo_distributor['_id']}, safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def update_distributor_config(self, repo_id, distributor_id, distributor_config, auto_publish=None):
         """
@@ -329,6 +332,7 @@ class RepoDistributorManager(object):
         # If we got this far, the new config is valid, so update the database
         repo_distributor['config'] = merged_config
         distributor_coll.save(repo_distributor, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         return repo_distributor
 
@@ -426,6 +430,7 @@ class RepoDistributorManager(object):
         # Update
         repo_distributor['scratchpad'] = contents
         distributor_coll.save(repo_distributor, safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def add_publish_schedule(self, repo_id, distributor_id, schedule_id):
         """
@@ -443,6 +448,7 @@ class RepoDistributorManager(object):
         collection.update({'_id': distributor['_id']},
                           {'$push': {'scheduled_publishes': schedule_id}},
                           safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def remove_publish_schedule(self, repo_id, distributor_id, schedule_id):
         """
@@ -460,6 +466,7 @@ class RepoDistributorManager(object):
         collection.update({'_id': distributor['_id']},
                           {'$pull': {'scheduled_publishes': schedule_id}},
                           safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def list_publish_schedules(self, repo_id, distributor_id):
         """
@@ -14,6 +14,7 @@
 import logging
 import sys
 
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import Repo, RepoImporter
 from pulp.server.db.model.dispatch import ScheduledCall
 from pulp.plugins.loader import api as plugin_api
@@ -173,6 +174,7 @@ class RepoImporterManager(object):
 
         importer = RepoImporter(repo_id, importer_id, importer_type_id, clean_config)
         importer_coll.save(importer, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         return importer
 
@@ -213,6 +215,7 @@ class RepoImporterManager(object):
 
         # Update the database to reflect the removal
         importer_coll.remove({'repo_id' : repo_id}, safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def update_importer_config(self, repo_id, importer_config):
         """
@@ -288,6 +291,7 @@ class RepoImporterManager(object):
         # If we got this far, the new config is valid, so update the database
         repo_importer['config'] = merged_config
         importer_coll.save(repo_importer, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         return repo_importer
 
@@ -338,6 +342,7 @@ class RepoImporterManager(object):
         # Update
         repo_importer['scratchpad'] = contents
         importer_coll.save(repo_importer, safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def add_sync_schedule(self, repo_id, schedule_id):
         """
@@ -355,6 +360,7 @@ class RepoImporterManager(object):
         collection.update({'_id': importer['_id']},
                           {'$push': {'scheduled_syncs': schedule_id}},
                           safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def remove_sync_schedule(self, repo_id, schedule_id):
         """
@@ -372,6 +378,7 @@ class RepoImporterManager(object):
         collection.update({'_id': importer['_id']},
                           {'$pull': {'scheduled_syncs': schedule_id}},
                           safe=True)
+        resource_versions.bump_repository(repo_id)
 
     def list_sync_schedules(self, repo_id):
         """
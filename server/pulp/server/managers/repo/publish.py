@@ -30,6 +30,7 @@ from pulp.plugins.loader import exceptions as plugin_exceptions
 from pulp.plugins.model import PublishReport
 from pulp.plugins.conduits.repo_publish import RepoPublishConduit
 from pulp.plugins.config import PluginCallConfiguration
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import Repo, RepoDistributor, RepoPublishResult
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.exceptions import MissingResource, PulpExecutionException, InvalidValue
@@ -131,6 +132,7 @@ class RepoPublishManager(object):
             repo_distributor = distributor_coll.find_one({'repo_id' : repo_id, 'id' : distributor_id})
             repo_distributor['last_publish'] = publish_end_timestamp
             distributor_coll.save(repo_distributor, safe=True)
+            resource_versions.bump_repository(repo_id)
 
             # Add a publish history entry for the run
             result = RepoPublishResult.error_result(repo_id, repo_distributor['id'], repo_distributor['distributor_type_id'],
@@ -146,6 +148,7 @@ class RepoPublishManager(object):
         repo_distributor = distributor_coll.find_one({'repo_id' : repo_id, 'id' : distributor_id})
         repo_distributor['last_publish'] = _now_timestamp()
         distributor_coll.save(repo_distributor, safe=True)
+        resource_versions.bump_repository(repo_id)
 
         # Add a publish entry
         if publish_report is not None and isinstance(publish_report, PublishReport):
@@ -33,6 +33,7 @@ from pulp.plugins.conduits.repo_sync import RepoSyncConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.model import SyncReport
 from pulp.server import config as pulp_config
+from pulp.server.db import resource_versions
 from pulp.server.db.model.repository import Repo, RepoContentUnit, RepoImporter, RepoSyncResult
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.exceptions import MissingResource, PulpExecutionException, InvalidValue
@@ -197,8 +198,10 @@ class RepoSyncManager(object):
         finally:
             # Do an update instead of a save in case the importer has changed the scratchpad
             importer_coll.update({'repo_id': repo_id}, {'$set': {'last_sync': sync_end_timestamp}}, safe=True)
+            resource_versions.bump_repository(repo_id)
             # Add a sync history entry for this run
             sync_result_coll.save(result, safe=True)
+            conduit._record_changes()
 
         return result
 
@@ -25,11 +25,13 @@ from pulp.plugins.conduits.unit_import import ImportUnitConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api
 import pulp.plugins.types.database as types_db
+from pulp.server.db import resource_versions
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
 import pulp.server.managers.factory as manager_factory
 import pulp.server.exceptions as exceptions
 import pulp.server.managers.repo._common as common_utils
+from pulp.server.util import batches
 
 # -- constants ----------------------------------------------------------------
 
@@ -56,6 +58,9 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Maximum number of unit IDs in a single bulk association query or insert
+ASSOCIATION_BATCH_SIZE = 1000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationManager(object):
@@ -104,6 +109,10 @@ class RepoUnitAssociationManager(object):
                                   defaults to True
         @type  update_unit_count: bool
 
+        The version of the repository is not changed by this call, as it is
+        made for every unit an importer saves; the operation running the
+        importer changes it once the importer has returned.
+
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
@@ -139,6 +148,11 @@ class RepoUnitAssociationManager(object):
 
         See associate_unit_by_id for semantics.
 
+        Existing associations are looked up and new ones are inserted in batches
+        of ASSOCIATION_BATCH_SIZE units, and the repository's unit count is
+        updated once at the end, so this should be preferred over repeated
+        calls to associate_unit_by_id when associating many units.
+
         @param repo_id: identifies the repo
         @type  repo_id: str
 
@@ -159,20 +173,47 @@ class RepoUnitAssociationManager(object):
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
+        if owner_type not in _OWNER_TYPES:
+            raise exceptions.InvalidValue(['owner_type'])
 
+        collection = RepoContentUnit.get_collection()
         unique_count = 0
-        for unit_id in unit_id_list:
-            if not self.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, owner_type, owner_id, False)
+
+        for unit_id_batch in batches(_unique(unit_id_list), ASSOCIATION_BATCH_SIZE):
+
+            # One query per batch determines both which units are already
+            # associated with the repo at all (they don't change the unit
+            # count) and which already have this owner's association (they
+            # don't need to be inserted again).
+            spec = {'repo_id' : repo_id,
+                    'unit_type_id' : unit_type_id,
+                    'unit_id' : {'$in' : unit_id_batch}}
+            fields = ['unit_id', 'owner_type', 'owner_id']
+
+            associated_unit_ids = set()
+            owned_unit_ids = set()
+            for association in collection.find(spec, fields=fields):
+                associated_unit_ids.add(association['unit_id'])
+                if association['owner_type'] == owner_type and association['owner_id'] == owner_id:
+                    owned_unit_ids.add(association['unit_id'])
+
+            new_associations = [RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type, owner_id)
+                                for unit_id in unit_id_batch if unit_id not in owned_unit_ids]
+            if new_associations:
+                try:
+                    collection.insert(new_associations, safe=True, continue_on_error=True)
+                except pymongo.errors.DuplicateKeyError:
+                    # A concurrent call created some of the same associations
+                    # in the meantime; the rest of the batch was still inserted.
+                    pass
+
+            unique_count += len([u for u in unit_id_batch if u not in associated_unit_ids])
 
         # update the count of associated units on the repo object
         if unique_count:
             manager_factory.repo_manager().update_unit_count(
                 repo_id, unit_type_id, unique_count)
+            resource_versions.bump_repository(repo_id)
 
     def associate_from_repo(self, source_repo_id, dest_repo_id, criteria=None, import_config_override=None):
         """
@@ -188,7 +229,8 @@ class RepoUnitAssociationManager(object):
         Pulp does not actually perform the associations as part of this call.
         The unit list is determined and passed to the destination repository's
         importer. It is the job of the importer to make the associate calls
-        back into Pulp where applicable.
+        back into Pulp where applicable, preferably through the conduit's bulk
+        associate_units call.
 
         If criteria is None, the effect of this call is to copy the source
         repository's associations into the destination repository.
@@ -280,6 +322,10 @@ class RepoUnitAssociationManager(object):
             _LOG.exception('Exception from importer [%s] while importing units into repository [%s]' %
                            (dest_repo_importer['importer_type_id'], dest_repo_id))
             raise exceptions.PulpExecutionException(), None, sys.exc_info()[2]
+        finally:
+            # the importer may have written units before failing
+            conduit._record_changes()
+            resource_versions.bump_repository(dest_repo_id)
 
     def unassociate_unit_by_id(self, repo_id, unit_type_id, unit_id, owner_type, owner_id, notify_plugins=True):
         """
@@ -376,6 +422,7 @@ class RepoUnitAssociationManager(object):
 
         collection = RepoContentUnit.get_collection()
         repo_manager = manager_factory.repo_manager()
+        counts_changed = False
 
         for unit_type_id, unit_ids in unit_map.items():
             spec = {'repo_id': repo_id,
@@ -385,12 +432,25 @@ class RepoUnitAssociationManager(object):
                     'owner_id': owner_id}
             collection.remove(spec, safe=True)
 
-            unique_count = sum(1 for unit_id in unit_ids
-                               if not self.association_exists(repo_id, unit_id, unit_type_id))
+            # Units that are still associated through another owner do not
+            # change the unit count
+            still_associated = set()
+            for unit_id_batch in batches(_unique(unit_ids), ASSOCIATION_BATCH_SIZE):
+                spec = {'repo_id': repo_id,
+                        'unit_type_id': unit_type_id,
+                        'unit_id': {'$in': unit_id_batch}}
+                for association in collection.find(spec, fields=['unit_id']):
+                    still_associated.add(association['unit_id'])
+
+            unique_count = len(set(unit_ids) - still_associated)
             if not unique_count:
                 continue
 
             repo_manager.update_unit_count(repo_id, unit_type_id, -unique_count)
+            counts_changed = True
+
+        if counts_changed:
+            resource_versions.bump_repository(repo_id)
 
         # Convert the units into transfer units. This happens regardless of whether or not
         # the plugin will be notified as it's used to generate the return result,
@@ -468,6 +528,19 @@ def create_transfer_units(associate_units, associated_unit_type_ids):
 
     return transfer_units
 
+def _unique(unit_ids):
+    """
+    Removes duplicate unit IDs, preserving the order of the first occurrences.
+    """
+    seen = set()
+    unique_ids = []
+    for unit_id in unit_ids:
+        if unit_id in seen:
+            continue
+        seen.add(unit_id)
+        unique_ids.append(unit_id)
+    return unique_ids
+
 def remove_from_importer(repo_id, transfer_units):
 
     # Retrieve the repo from the database and convert to the transfer repo
@@ -15,14 +15,17 @@
 Contains the manager class for performing queries for repo-unit associations.
 """
 
+import base64
 import copy
 import logging
 
 import pymongo
 
 from pulp.plugins.types import database as types_db
+from pulp.server.compat import json, json_util
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.exceptions import InvalidValue
 
 # -- constants ----------------------------------------------------------------
 
@@ -42,6 +45,13 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Page size used by the keyset pagination methods when no limit is specified
+DEFAULT_PAGE_SIZE = 1000
+
+# Sort used by the keyset pagination methods when no association sort is
+# specified; this matches the (unit_type_id, created) index
+_DEFAULT_PAGE_SORT = [('unit_type_id', SORT_ASCENDING), ('created', SORT_ASCENDING)]
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationQueryManager(object):
@@ -289,6 +299,153 @@ class RepoUnitAssociationQueryManager(object):
 
         return self.get_units(repo_id, criteria, as_generator)
 
+    def get_units_page(self, repo_id, criteria=None, page_token=None):
+        """
+        Get a single page of the units associated with the repository using
+        keyset (seek) pagination.
+
+        Instead of skipping over the preceding results, each page resumes
+        directly after the last association of the previous page, as
+        identified by the opaque page token. Only one page worth of
+        associations and units is ever loaded, and no count queries are made,
+        so retrieving a page deep into a large repository costs the same as
+        retrieving the first one.
+
+        Units are ordered by the association sort in the criteria, by
+        unit_type_id and created if none is given, with the association's
+        database id as the final tie breaker. Sorting on unit fields and skip
+        are not supported in this mode. The criteria limit is used as the page
+        size, defaulting to DEFAULT_PAGE_SIZE.
+
+        A page may contain fewer units than the page size when unit filters
+        are specified. The returned token is None once the last page has been
+        reached.
+
+        :param repo_id: identifies the repository
+        :type  repo_id: str
+
+        :param criteria: if specified will drive the query
+        :type  criteria: UnitAssociationCriteria
+
+        :param page_token: token returned with the previous page; None for the
+                           first page
+        :type  page_token: str or None
+
+        :return: tuple of the list of units in the page and the token for the
+                 next page
+        :rtype:  tuple
+        :raise InvalidValue: if the criteria or the page token are not valid
+                             for keyset pagination
+        """
+
+        criteria = criteria or UnitAssociationCriteria()
+
+        if criteria.skip:
+            raise InvalidValue(['skip'])
+        if criteria.unit_sort:
+            raise InvalidValue(['unit_sort'])
+
+        page_size = criteria.limit or DEFAULT_PAGE_SIZE
+        sort = self._page_sort(criteria)
+        page_key = self._decode_page_token(page_token, sort)
+
+        spec = criteria.association_filters.copy()
+        spec['repo_id'] = repo_id
+        if criteria.type_ids:
+            spec['unit_type_id'] = {'$in': criteria.type_ids}
+
+        fields = criteria.association_fields
+        if fields is not None:
+            fields = list(fields)
+            fields.extend(f for f, d in sort if f not in fields)
+
+        collection = RepoContentUnit.get_collection()
+
+        units = []
+        exhausted = False
+
+        # Unit filters may remove associations from a batch, so keep seeking
+        # until the page is full or the associations run out.
+        while len(units) < page_size:
+
+            batch_spec = spec
+            if page_key is not None:
+                batch_spec = {'$and': [spec, self._page_key_spec(sort, page_key)]}
+
+            batch_size = page_size - len(units)
+            cursor = collection.find(batch_spec, fields=fields)
+            associations = list(cursor.sort(sort).limit(batch_size))
+
+            if associations:
+                page_key = [associations[-1][f] for f, d in sort]
+
+            if len(associations) < batch_size:
+                exhausted = True
+
+            if criteria.remove_duplicates:
+                associations = self._first_associations(spec, sort, associations)
+
+            units.extend(self._associations_with_units(criteria, associations))
+
+            if exhausted:
+                break
+
+        if exhausted:
+            return units, None
+
+        return units, self._encode_page_token(page_key)
+
+    def get_units_across_types_page(self, repo_id, criteria=None, page_token=None):
+        """
+        Keyset paginated version of get_units_across_types. See get_units_page
+        for the pagination semantics.
+
+        :param repo_id: identifies the repository
+        :type  repo_id: str
+
+        :param criteria: if specified will drive the query
+        :type  criteria: UnitAssociationCriteria
+
+        :param page_token: token returned with the previous page; None for the
+                           first page
+        :type  page_token: str or None
+
+        :return: tuple of the list of units in the page and the token for the
+                 next page
+        :rtype:  tuple
+        """
+
+        return self.get_units_page(repo_id, criteria, page_token)
+
+    def get_units_by_type_page(self, repo_id, type_id, criteria=None, page_token=None):
+        """
+        Keyset paginated version of get_units_by_type. See get_units_page for
+        the pagination semantics; unlike get_units_by_type, sorting on unit
+        fields is not supported.
+
+        :param repo_id: identifies the repository
+        :type  repo_id: str
+
+        :param type_id: limits returned units to the given type
+        :type  type_id: str
+
+        :param criteria: if specified will drive the query
+        :type  criteria: UnitAssociationCriteria
+
+        :param page_token: token returned with the previous page; None for the
+                           first page
+        :type  page_token: str or None
+
+        :return: tuple of the list of units in the page and the token for the
+                 next page
+        :rtype:  tuple
+        """
+
+        criteria = criteria or UnitAssociationCriteria()
+        criteria.type_ids = [type_id]
+
+        return self.get_units_page(repo_id, criteria, page_token)
+
     @staticmethod
     def unit_type_ids_for_repo(repo_id):
         """
@@ -398,6 +555,163 @@ class RepoUnitAssociationQueryManager(object):
 
             generated_elements += 1
 
+    # -- keyset pagination methods ---------------------------------------------
+
+    @staticmethod
+    def _page_sort(criteria):
+        """
+        Build the total ordering used to paginate the unit associations: the
+        association sort, or the default, with the association id appended.
+
+        :type criteria: UnitAssociationCriteria
+        :rtype: list
+        """
+
+        sort = list(criteria.association_sort or _DEFAULT_PAGE_SORT)
+        if '_id' not in [f for f, d in sort]:
+            sort.append(('_id', SORT_ASCENDING))
+        return sort
+
+    @staticmethod
+    def _page_key_spec(sort, page_key):
+        """
+        Build the mongo spec that matches the associations ordered after the
+        given page key.
+
+        For a sort of [a, b, _id] and a key of (1, 2, 3) this is:
+        {'$or': [{a: {$gt: 1}}, {a: 1, b: {$gt: 2}}, {a: 1, b: 2, _id: {$gt: 3}}]}
+
+        :type sort: list
+        :type page_key: list
+        :rtype: dict
+        """
+
+        clauses = []
+
+        for i, (field, direction) in enumerate(sort):
+            clause = dict((f, v) for (f, d), v in zip(sort[:i], page_key[:i]))
+            operator = direction == SORT_DESCENDING and '$lt' or '$gt'
+            clause[field] = {operator: page_key[i]}
+            clauses.append(clause)
+
+        return {'$or': clauses}
+
+    @staticmethod
+    def _encode_page_token(page_key):
+        """
+        Encode the sort values of the last association in a page into an opaque
+        page token.
+
+        :type page_key: list
+        :rtype: str
+        """
+
+        return base64.urlsafe_b64encode(json.dumps(page_key, default=json_util.default))
+
+    @staticmethod
+    def _decode_page_token(page_token, sort):
+        """
+        Decode a page token into the sort values of the last association of the
+        previous page.
+
+        :type page_token: str or None
+        :type sort: list
+        :rtype: list or None
+        :raise InvalidValue: if the token is malformed or doesn't match the sort
+        """
+
+        if page_token is None:
+            return None
+
+        try:
+            page_key = json.loads(base64.urlsafe_b64decode(str(page_token)),
+                                  object_hook=json_util.object_hook)
+        except (TypeError, ValueError):
+            raise InvalidValue(['page_token'])
+
+        if not isinstance(page_key, list) or len(page_key) != len(sort):
+            raise InvalidValue(['page_token'])
+
+        return page_key
+
+    @staticmethod
+    def _first_associations(spec, sort, associations):
+        """
+        Remove the associations that are not the first association, in sort
+        order, of their unit with the repository.
+
+        All of the matching associations of the units in the batch are looked
+        up in one query, so that duplicates are removed consistently across
+        pages.
+
+        :type spec: dict
+        :type sort: list
+        :type associations: list
+        :rtype: list
+        """
+
+        if not associations:
+            return associations
+
+        duplicates_spec = spec.copy()
+        duplicates_spec['unit_id'] = {'$in': list(set(a['unit_id'] for a in associations))}
+
+        collection = RepoContentUnit.get_collection()
+        cursor = collection.find(duplicates_spec, fields=['unit_type_id', 'unit_id'])
+
+        first_association_ids = set()
+        seen_unit_ids = set()
+
+        for association in cursor.sort(sort):
+            unit_id = (association['unit_type_id'], association['unit_id'])
+            if unit_id in seen_unit_ids:
+                continue
+            seen_unit_ids.add(unit_id)
+            first_association_ids.add(association['_id'])
+
+        return [a for a in associations if a['_id'] in first_association_ids]
+
+    @staticmethod
+    def _associations_with_units(criteria, associations):
+        """
+        Look up the units for a batch of associations, one query per unit type,
+        and return the associations, in order, with the units as metadata.
+        Associations whose units do not match the unit filters are dropped.
+
+        :type criteria: UnitAssociationCriteria
+        :type associations: list
+        :rtype: list
+        """
+
+        unit_ids_by_type = {}
+        for association in associations:
+            unit_ids_by_type.setdefault(association['unit_type_id'], set()).add(association['unit_id'])
+
+        fields = copy.copy(criteria.unit_fields)
+        if fields is not None and '_content_type_id' not in fields:
+            fields.append('_content_type_id')
+
+        units_by_id = {}
+
+        for unit_type_id, unit_ids in unit_ids_by_type.items():
+            spec = criteria.unit_filters.copy()
+            spec['_id'] = {'$in': list(unit_ids)}
+
+            collection = types_db.type_units_collection(unit_type_id)
+            for unit in collection.find(spec, fields=fields):
+                units_by_id[(unit_type_id, unit['_id'])] = unit
+
+        associations_with_units = []
+
+        for association in associations:
+            unit = units_by_id.get((association['unit_type_id'], association['unit_id']))
+            if unit is None:
+                continue
+            association['metadata'] = unit
+            associations_with_units.append(association)
+
+        return associations_with_units
+
     # -- associated units methods ----------------------------------------------
 
     @staticmethod
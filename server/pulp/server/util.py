@@ -14,6 +14,7 @@
 # XXX this is not a dumping grounds for any random code. It is a place to put
 # paradigm-changing code that allows you to get unique or more efficient behaviors
 
+import itertools
 from gettext import gettext as _
 
 from pulp.server.exceptions import PulpExecutionException
@@ -154,6 +155,27 @@ def topological_sort(graph):
 
     return sorted_vertices
 
+# batches ----------------------------------------------------------------------
+
+def batches(items, batch_size):
+    """
+    Split an iterable into consecutive lists of at most batch_size items.
+    The items are consumed lazily, so a database cursor can be split without
+    loading all of its documents.
+    @param items: items to split
+    @type  items: iterable
+    @param batch_size: maximum number of items in a batch
+    @type  batch_size: int
+    @return: generator of lists of items
+    @rtype:  generator
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
 # legacy delta -----------------------------------------------------------------
 
 class Delta(dict):
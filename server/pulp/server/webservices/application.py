@@ -43,7 +43,7 @@ from pulp.plugins.loader import api as plugin_api
 from pulp.server.agent.direct.services import Services as AgentServices
 
 from pulp.plugins.loader import api as plugin_api
-from pulp.server.db import reaper
+from pulp.server.db import indexes, reaper
 from pulp.server.debugging import StacktraceDumper
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.managers import factory as manager_factory
@@ -112,6 +112,11 @@ def _initialize_pulp():
         msg += 'Run pulp-manage-db and restart the application.'
         raise InitializationException(msg), None, sys.exc_info()[2]
 
+    # Create the indexes whose definitions changed since pulp-manage-db last
+    # ran; the collections are used without ensuring their indexes afterwards
+    indexes.ensure_indexes()
+    indexes.log_index_report()
+
     # Load plugins and resolve against types. This is also a likely candidate
     # for causing the server to fail to start.
     try:
@@ -25,6 +25,9 @@ from pulp.server.webservices import http, serialization
 
 _log = logging.getLogger(__name__)
 
+# number of items serialized into each chunk of a streamed response
+STREAM_CHUNK_ITEMS = 100
+
 
 class JSONController(object):
     """
@@ -136,6 +139,15 @@ class JSONController(object):
         http.header('Content-Length', len(body))
         return body
 
+    def _output_stream(self, items):
+        """
+        JSON encode an iterable of items as a JSON array that is sent to the
+        client in chunks as the items are produced, instead of serializing the
+        whole array into memory to set the Content-Length
+        """
+        http.header('Content-Type', 'application/json')
+        return _json_array_chunks(items)
+
     def _error_dict(self, msg, code=None):
         """
         Standardized error returns
@@ -157,6 +169,32 @@ class JSONController(object):
         http.status_ok()
         return self._output(data)
 
+    def ok_stream(self, items):
+        """
+        Return an ok response whose body is streamed to the client.
+        The first chunk, including the first items, is produced before the
+        response status is sent, so errors in querying the items are still
+        reported as errors; errors after that truncate the response.
+        @type items: iterable
+        @param items: items, such as a database cursor or a generator, to be
+                      returned as a JSON array in the body of the response
+        @return: generator of JSON encoded chunks of the response
+        """
+        http.status_ok()
+        return self._output_stream(items)
+
+    def ok_encoded(self, body):
+        """
+        Return an ok response with an already JSON encoded body.
+        @type body: str
+        @param body: JSON encoded body of the response
+        @return: JSON encoded response
+        """
+        http.status_ok()
+        http.header('Content-Type', 'application/json')
+        http.header('Content-Length', len(body))
+        return body
+
     def created(self, location, data):
         """
         Return a created response.
@@ -186,6 +224,14 @@ class JSONController(object):
         http.status_no_content()
         return self._output(None)
 
+    def not_modified(self):
+        """
+        Return a not modified response, which has no body
+        @return: empty response
+        """
+        http.status_not_modified()
+        return ''
+
     def partial_content(self, data):
         '''
         Returns a partial content response. Typically, the returned data should
@@ -269,3 +315,26 @@ class JSONController(object):
         """
         http.status_not_implemented()
         return self._output(msg)
+
+
+def _json_array_chunks(items, chunk_items=STREAM_CHUNK_ITEMS):
+    """
+    Serialize items into chunks of a JSON array.
+    @type items: iterable
+    @param items: items to serialize
+    @type chunk_items: int
+    @param chunk_items: number of items serialized into each chunk
+    @return: generator of JSON encoded chunks
+    """
+    chunk = ['[']
+    count = 0
+    for item in items:
+        if count:
+            chunk.append(',')
+        chunk.append(json.dumps(item, default=json_util.default))
+        count += 1
+        if count % chunk_items == 0:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(']')
+    yield ''.join(chunk)
@@ -84,7 +84,13 @@ class Consumers(JSONController):
     def GET(self):
         params = web.input()
         manager = managers.consumer_query_manager()
-        consumers = expand_consumers(params, manager.find_all())
+        if params.get('offline', False):
+            # only the consumers whose agent heartbeat has expired
+            offline = managers.consumer_agent_manager().offline()
+            consumers = manager.find_by_id_list(offline)
+        else:
+            consumers = manager.find_all()
+        consumers = expand_consumers(params, consumers)
         for c in consumers:
             href = serialization.link.child_link_obj(c['id'])
             c.update(href)
@@ -462,15 +468,22 @@ class Profiles(JSONController):
     def POST(self, consumer_id):
         """
         Associate a profile with a consumer by content type ID.
+        Instead of the profile, the body may contain a delta relative to the
+        stored profile: {base_hash:<str>, added:<list>, removed:<list>}.
         @param consumer_id: A consumer ID.
         @type consumer_id: str
         @return: The created model object:
             {consumer_id:<str>, content_type:<str>, profile:<dict>}
+            The profile is omitted when a delta was sent.
         @rtype: dict
         """
         body = self.params()
         content_type = body.get('content_type')
         profile = body.get('profile')
+        delta = body.get('delta')
+
+        if delta is not None:
+            return self._update_delta(consumer_id, content_type, delta)
 
         manager = managers.consumer_profile_manager()
         tags = [resource_tag(dispatch_constants.RESOURCE_CONSUMER_TYPE, consumer_id),
@@ -494,6 +507,47 @@ class Profiles(JSONController):
 
         return self.created(link['_href'], consumer)
 
+    def _update_delta(self, consumer_id, content_type, delta):
+        """
+        Update a profile with the delta sent by the consumer.
+        @param consumer_id: A consumer ID.
+        @type consumer_id: str
+        @param content_type: A content unit type ID.
+        @type content_type: str
+        @param delta: {base_hash:<str>, added:<list>, removed:<list>}
+        @type delta: dict
+        @return: The updated model object, without the profile.
+        @rtype: dict
+        """
+        if not isinstance(delta, dict) or 'base_hash' not in delta:
+            raise InvalidValue(['delta'])
+
+        manager = managers.consumer_profile_manager()
+        tags = [resource_tag(dispatch_constants.RESOURCE_CONSUMER_TYPE, consumer_id),
+                resource_tag(dispatch_constants.RESOURCE_CONTENT_UNIT_TYPE, content_type),
+                action_tag('profile_update')]
+
+        call_request = CallRequest(manager.update_delta,
+                                   [consumer_id, content_type, delta['base_hash']],
+                                   {'added': delta.get('added', []),
+                                    'removed': delta.get('removed', [])},
+                                   tags=tags,
+                                   weight=0,
+                                   kwarg_blacklist=['added', 'removed'])
+        call_request.reads_resource(dispatch_constants.RESOURCE_CONSUMER_TYPE, consumer_id)
+
+        call_report = CallReport.from_call_request(call_request)
+        call_report.serialize_result = False
+
+        profile = execution.execute_sync(call_request, call_report)
+        # the consumer has the profile already, sending it back would defeat the delta
+        profile = dict(profile)
+        profile.pop('profile', None)
+        link = serialization.link.child_link_obj(consumer_id, content_type)
+        profile.update(link)
+
+        return self.ok(profile)
+
 
 class Profile(JSONController):
     """
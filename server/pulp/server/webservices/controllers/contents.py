@@ -17,6 +17,7 @@ import web
 
 from pulp.common.tags import action_tag, resource_tag
 from pulp.server.auth.authorization import CREATE, READ, UPDATE, DELETE, EXECUTE
+from pulp.server.db import resource_versions
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch.call import CallRequest
@@ -24,7 +25,7 @@ from pulp.server.exceptions import MissingResource, InvalidValue
 from pulp.server.managers import factory
 from pulp.server.webservices import execution, serialization
 from pulp.server.webservices.controllers.base import JSONController
-from pulp.server.webservices.controllers.decorators import auth_required
+from pulp.server.webservices.controllers.decorators import auth_required, conditional
 
 from pulp.server.webservices.controllers.search import SearchController
 
@@ -32,6 +33,7 @@ from pulp.server.webservices.controllers.search import SearchController
 class ContentTypesCollection(JSONController):
 
     @auth_required(READ)
+    @conditional(resource_versions.CONTENT_TYPES)
     def GET(self):
         """
         List the available content types.
@@ -49,6 +51,7 @@ class ContentTypesCollection(JSONController):
 class ContentTypeResource(JSONController):
 
     @auth_required(READ)
+    @conditional(resource_versions.CONTENT_TYPES)
     def GET(self, type_id):
         """
         Return information about a content type.
@@ -75,6 +78,7 @@ class ContentUnitsCollection(JSONController):
         return unit
 
     @auth_required(READ)
+    @conditional(resource_versions.CONTENT_TYPES, resource_versions.CONTENT_UNITS)
     def GET(self, type_id):
         """
         List all the available content units.
@@ -159,10 +163,14 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',))
+        include_repos = web.input().get('include_repos')
+        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',),
+                                                     as_generator=not include_repos)
+        if not include_repos:
+            return self.ok_stream(ContentUnitsCollection.process_unit(unit) for unit in raw_units)
+
         units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if web.input().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+        self._add_repo_memberships(units, type_id)
 
         return self.ok(units)
 
@@ -179,10 +187,13 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_post()
+        include_repos = self.params().get('include_repos')
+        raw_units = self._get_query_results_from_post(as_generator=not include_repos)
+        if not include_repos:
+            return self.ok_stream(ContentUnitsCollection.process_unit(unit) for unit in raw_units)
+
         units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if self.params().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+        self._add_repo_memberships(units, type_id)
 
         return self.ok(units)
 
@@ -190,6 +201,7 @@ class ContentUnitsSearch(SearchController):
 class ContentUnitResource(JSONController):
 
     @auth_required(READ)
+    @conditional(resource_versions.CONTENT_TYPES, resource_versions.CONTENT_UNITS)
     def GET(self, type_id, unit_id):
         """
         Return information about a content unit.
@@ -230,8 +242,16 @@ class UploadsCollection(JSONController):
 class UploadResource(JSONController):
 
     # Scope:  Resource
+    # GET:    Retrieve the ranges of the file received so far
     # DELETE: Delete an uploaded file
 
+    @auth_required(READ)
+    def GET(self, upload_id):
+        upload_manager = factory.content_upload_manager()
+        received = upload_manager.received_ranges(upload_id)
+
+        return self.ok({'upload_id' : upload_id, 'received' : received})
+
     @auth_required(DELETE)
     def DELETE(self, upload_id):
         upload_manager = factory.content_upload_manager()
@@ -256,9 +276,12 @@ class UploadSegmentResource(JSONController):
         except ValueError:
             raise InvalidValue(['offset'])
 
+        # Optional SHA-256 of the segment, verified before it is saved
+        checksum = self.filters(['checksum']).get('checksum', [None])[0]
+
         upload_manager = factory.content_upload_manager()
         data = self.data()
-        upload_manager.save_data(upload_id, offset, data)
+        upload_manager.save_data(upload_id, offset, data, checksum)
 
         return self.ok(None)
 
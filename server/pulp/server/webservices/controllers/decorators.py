@@ -20,13 +20,17 @@ that certain other methods will exist.
 import httplib
 import logging
 
+import web
+
 from pulp.common import auth_utils
 from pulp.server.config import config
 from pulp.server.compat import wraps
+from pulp.server.db import resource_versions
 from pulp.server.exceptions import PulpException
 from pulp.server.managers import factory
 from pulp.server.managers.auth.permission.cud import PermissionManager
 from pulp.server.webservices import http
+from pulp.server.webservices.response_cache import RESPONSE_CACHE
 
 # -- constants ----------------------------------------------------------------
 
@@ -218,7 +222,7 @@ def auth_required(operation=None, super_user_only=False):
                     else:
                         raise AuthenticationFailed(auth_utils.CODE_PERMISSION)
                 elif user_query_manager.is_authorized(http.resource_path(), userid, operation):
-                    user = user_query_manager.find_by_login(userid)
+                    user = user_query_manager.find_authorized_user(userid)
                     principal_manager.set_principal(user)
                 else:
                     raise AuthenticationFailed(auth_utils.CODE_PERMISSION)
@@ -230,3 +234,59 @@ def auth_required(operation=None, super_user_only=False):
 
         return _auth_decorator
     return _auth_required
+
+
+def conditional(*resources):
+    """
+    Controller method wrapper for GET methods whose response is built only
+    from the given resources. The response is given an ETag computed from the
+    current versions of the resources and the request path, a request whose
+    If-None-Match header lists that ETag gets a not modified response, and
+    the response body is cached so that it is not built again until one of
+    the resources is written.
+
+    It must be applied below auth_required, so that authorization is checked
+    before any cached response is returned.
+
+    A resource may also be given as a function, such as
+    pulp.server.db.resource_versions.repository, which is called with the
+    first argument of the method, i.e. the first parameter of the URL, to get
+    the name of the resource.
+
+    :type resources: str or callable
+    :param resources: names of the resources, as defined in
+                      pulp.server.db.resource_versions
+    """
+    def _conditional(method):
+        """
+        Closure method for decorator.
+        """
+        @wraps(method)
+        def _conditional_decorator(self, *args, **kwargs):
+            names = [r(args[0]) if callable(r) else r for r in resources]
+            versions = resource_versions.get_versions(names)
+            etag = RESPONSE_CACHE.entity_tag(names, versions,
+                                             web.ctx.homepath + web.ctx.fullpath)
+
+            if etag in http.if_none_match():
+                http.header('ETag', etag)
+                return self.not_modified()
+
+            body = RESPONSE_CACHE.get(etag)
+            if body is not None:
+                http.header('ETag', etag)
+                return self.ok_encoded(body)
+
+            value = method(self, *args, **kwargs)
+            # errors are neither tagged nor cached
+            if not web.ctx.status.startswith('200'):
+                return value
+            http.header('ETag', etag)
+            if isinstance(value, basestring):
+                RESPONSE_CACHE.put(etag, value)
+                return value
+            # streamed response, cached once it has been sent completely
+            return RESPONSE_CACHE.put_chunks(etag, value)
+
+        return _conditional_decorator
+    return _conditional
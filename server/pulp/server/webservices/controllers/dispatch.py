@@ -12,15 +12,18 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import httplib
+import sys
+import threading
 from gettext import gettext as _
 
 import web
 
+from pulp.server import config as pulp_config
 from pulp.server.auth import authorization
 from pulp.server.db.model.dispatch import QueuedCall
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch import history as dispatch_history
-from pulp.server.exceptions import MissingResource, PulpExecutionException
+from pulp.server.exceptions import InvalidValue, MissingResource, PulpExecutionException
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
@@ -59,6 +62,42 @@ class TaskGroupCancelNotImplemented(PulpExecutionException):
     def __str__(self):
         return _('Cancel Not Implemented for TaskGroup: %(id)s') % {'id': self.args[0]}
 
+# long poll waiters ------------------------------------------------------------
+
+# A long poll holds one of the threads of the WSGI daemon process (threads=8 in
+# pulp_apache_*.conf) for up to max_wait seconds. The number of requests waiting
+# at once is capped by max_waiters, which must stay below the thread count so
+# the waiters cannot starve every other request; a request over the cap returns
+# the current report at once and the client polls again.
+
+_WAITERS_LOCK = threading.Lock()
+_waiters = 0
+
+
+def _acquire_waiter():
+    """
+    @return: True if the request may wait, False if max_waiters are waiting
+    @rtype:  bool
+    """
+    global _waiters
+    _WAITERS_LOCK.acquire()
+    try:
+        if _waiters >= pulp_config.config.getint('tasks', 'max_waiters'):
+            return False
+        _waiters += 1
+        return True
+    finally:
+        _WAITERS_LOCK.release()
+
+
+def _release_waiter():
+    global _waiters
+    _WAITERS_LOCK.acquire()
+    try:
+        _waiters -= 1
+    finally:
+        _WAITERS_LOCK.release()
+
 # task controllers -------------------------------------------------------------
 
 class TaskCollection(JSONController):
@@ -80,11 +119,34 @@ class TaskResource(JSONController):
 
     @auth_required(authorization.READ)
     def GET(self, call_request_id):
+        # long poll: wait=<seconds> holds the request until the task's state or
+        # progress changes from revision=<revision> (default: the current one)
+        filters = self.filters(['wait', 'revision'])
+        try:
+            wait = float(filters.get('wait', [0])[0])
+        except ValueError:
+            raise InvalidValue(['wait']), None, sys.exc_info()[2]
+        try:
+            revision = filters.get('revision')
+            if revision is not None:
+                revision = int(revision[0])
+        except ValueError:
+            raise InvalidValue(['revision']), None, sys.exc_info()[2]
+        wait = min(wait, pulp_config.config.getfloat('tasks', 'max_wait'))
+
         link = serialization.link.link_obj('/pulp/api/v2/tasks/%s/' % call_request_id)
         coordinator = dispatch_factory.coordinator()
         call_reports = coordinator.find_call_reports(call_request_id=call_request_id)
         if call_reports:
-            serialized_call_report = call_reports[0].serialize()
+            call_report = call_reports[0]
+            if wait > 0 and _acquire_waiter():
+                try:
+                    if revision is None:
+                        revision = call_report.revision
+                    call_report.wait_for_change(revision, wait)
+                finally:
+                    _release_waiter()
+            serialized_call_report = call_report.serialize()
             serialized_call_report.update(link)
             return self.ok(serialized_call_report)
         archived_calls = dispatch_history.find_archived_calls(call_request_id=call_request_id)
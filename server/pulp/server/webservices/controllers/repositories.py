@@ -24,6 +24,7 @@ from pulp.common.tags import action_tag, resource_tag
 from pulp.common import constants
 from pulp.server import config as pulp_config
 from pulp.server.auth.authorization import CREATE, READ, DELETE, EXECUTE, UPDATE
+from pulp.server.db import resource_versions
 from pulp.server.db.model.criteria import UnitAssociationCriteria, Criteria
 from pulp.server.db.model.repository import RepoContentUnit, Repo
 from pulp.server.dispatch import constants as dispatch_constants, factory as dispatch_factory
@@ -32,7 +33,7 @@ from pulp.server.itineraries.repo import (sync_with_auto_publish_itinerary, publ
 from pulp.server.webservices import execution
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
-from pulp.server.webservices.controllers.decorators import auth_required
+from pulp.server.webservices.controllers.decorators import auth_required, conditional
 from pulp.server.webservices.controllers.search import SearchController
 import pulp.server.exceptions as exceptions
 import pulp.server.managers.factory as manager_factory
@@ -115,14 +116,31 @@ class RepoCollection(JSONController):
                 'distributors', manager_factory.repo_distributor_manager(), repos)
 
         for repo in repos:
-            repo.update(serialization.link.search_safe_link_obj(repo['id']))
-            # Remove internally used scratchpad from repo details
-            if 'scratchpad' in repo:
-                del repo['scratchpad']
+            RepoCollection._process_repo(repo)
 
         return repos
 
+    @staticmethod
+    def _process_repo(repo):
+        """
+        Apply the standard processing that does not depend on related objects
+        to a repository being returned to a client, so that it can be applied
+        as the repositories are streamed to the client.
+
+        @param repo: repository
+        @type  repo: dict
+
+        @return the same repository, modified in-place
+        @rtype  dict
+        """
+        repo.update(serialization.link.search_safe_link_obj(repo['id']))
+        # Remove internally used scratchpad from repo details
+        if 'scratchpad' in repo:
+            del repo['scratchpad']
+        return repo
+
     @auth_required(READ)
+    @conditional(resource_versions.REPOSITORIES)
     def GET(self):
         """
         Looks for query parameters 'importers' and 'distributors', and will add
@@ -131,17 +149,20 @@ class RepoCollection(JSONController):
         'distributors'.
         """
         query_params = web.input()
-        all_repos = list(Repo.get_collection().find(projection={'scratchpad' : 0}))
+        cursor = Repo.get_collection().find(projection={'scratchpad' : 0})
 
         if query_params.get('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
 
-        self._process_repos(
-            all_repos,
-            query_params.get('importers', False),
-            query_params.get('distributors', False)
-        )
+        importers = query_params.get('importers', False)
+        distributors = query_params.get('distributors', False)
+
+        # Without related objects to merge, the repos are streamed to the client
+        if not importers and not distributors:
+            return self.ok_stream(self._process_repo(repo) for repo in cursor)
+
+        all_repos = self._process_repos(list(cursor), importers, distributors)
 
         # Return the repos or an empty list; either way it's a 200
         return self.ok(all_repos)
@@ -196,14 +217,18 @@ class RepoSearch(SearchController):
         if query_params.pop('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
+        importers = query_params.pop('importers', False)
+        distributors = query_params.pop('distributors', False)
+
+        if not importers and not distributors:
+            items = self._get_query_results_from_get(
+                ('details', 'importers', 'distributors'), as_generator=True)
+            return self.ok_stream(RepoCollection._process_repo(repo) for repo in items)
+
         items = self._get_query_results_from_get(
             ('details', 'importers', 'distributors'))
 
-        RepoCollection._process_repos(
-            items,
-            query_params.pop('importers', False),
-            query_params.pop('distributors', False)
-        )
+        RepoCollection._process_repos(items, importers, distributors)
         return self.ok(items)
 
     @auth_required(READ)
@@ -213,13 +238,16 @@ class RepoSearch(SearchController):
         'criteria' which has a data structure that can be turned into a
         Criteria instance.
         """
+        importers = self.params().get('importers', False)
+        distributors = self.params().get('distributors', False)
+
+        if not importers and not distributors:
+            items = self._get_query_results_from_post(as_generator=True)
+            return self.ok_stream(RepoCollection._process_repo(repo) for repo in items)
+
         items = self._get_query_results_from_post()
 
-        RepoCollection._process_repos(
-            items,
-            self.params().get('importers', False),
-            self.params().get('distributors', False)
-        )
+        RepoCollection._process_repos(items, importers, distributors)
         return self.ok(items)
 
 
@@ -231,6 +259,7 @@ class RepoResource(JSONController):
     # PUT:     Repository Update
 
     @auth_required(READ)
+    @conditional(resource_versions.repository)
     def GET(self, id):
         """
         Looks for query parameters 'importers' and 'distributors', and will add
@@ -298,6 +327,7 @@ class RepoImporters(JSONController):
     # POST:   Set Importer
 
     @auth_required(READ)
+    @conditional(resource_versions.repository)
     def GET(self, repo_id):
         importer_manager = manager_factory.repo_importer_manager()
 
@@ -343,6 +373,7 @@ class RepoImporter(JSONController):
     # PUT:    Update Importer Config
 
     @auth_required(READ)
+    @conditional(resource_versions.repository)
     def GET(self, repo_id, importer_id):
 
         # importer_id is there to meet the REST requirement, so leave it there
@@ -535,6 +566,7 @@ class RepoDistributors(JSONController):
     # POST:   Add Distributor
 
     @auth_required(READ)
+    @conditional(resource_versions.repository)
     def GET(self, repo_id):
         distributor_manager = manager_factory.repo_distributor_manager()
 
@@ -580,6 +612,7 @@ class RepoDistributor(JSONController):
     # PUT:    Update Distributor Config
 
     @auth_required(READ)
+    @conditional(resource_versions.repository)
     def GET(self, repo_id, distributor_id):
         distributor_manager = manager_factory.repo_distributor_manager()
 
@@ -980,6 +1013,15 @@ class RepoImportUpload(JSONController):
         unit_type_id = params['unit_type_id']
         unit_key = params['unit_key']
         unit_metadata = params.pop('unit_metadata', None)
+        # Optional size and SHA-256 of the uploaded file, verified before importing
+        size = params.get('size', None)
+        checksum = params.get('checksum', None)
+
+        if size is not None:
+            try:
+                size = int(size)
+            except (TypeError, ValueError):
+                raise exceptions.InvalidValue(['size']), None, sys.exc_info()[2]
 
         # Coordinator configuration
         tags = [resource_tag(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id),
@@ -988,6 +1030,7 @@ class RepoImportUpload(JSONController):
         upload_manager = manager_factory.content_upload_manager()
         call_request = CallRequest(upload_manager.import_uploaded_unit,
             [repo_id, unit_type_id, unit_key, unit_metadata, upload_id],
+            {'size': size, 'checksum': checksum},
             tags=tags, archive=True)
         call_request.updates_resource(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id)
 
@@ -1057,13 +1100,29 @@ class RepoUnitAdvancedSearch(JSONController):
 
         # Data lookup
         manager = manager_factory.repo_unit_association_query_manager()
+
+        # The presence of the page token, null for the first page, selects
+        # keyset pagination; the response then includes the next page token
+        if 'page_token' in params:
+            page_token = params['page_token']
+            if criteria.type_ids is not None and len(criteria.type_ids) == 1:
+                type_id = criteria.type_ids[0]
+                units, next_page_token = manager.get_units_by_type_page(repo_id, type_id, criteria=criteria,
+                                                                        page_token=page_token)
+            else:
+                units, next_page_token = manager.get_units_across_types_page(repo_id, criteria=criteria,
+                                                                             page_token=page_token)
+            return self.ok({'units': units, 'next_page_token': next_page_token})
+
         if criteria.type_ids is not None and len(criteria.type_ids) == 1:
             type_id = criteria.type_ids[0]
-            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
+            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria,
+                                              as_generator=True)
         else:
-            units = manager.get_units_across_types(repo_id, criteria=criteria)
+            units = manager.get_units_across_types(repo_id, criteria=criteria,
+                                                   as_generator=True)
 
-        return self.ok(units)
+        return self.ok_stream(units)
 
 class ContentApplicabilityRegeneration(JSONController):
     """
@@ -1076,7 +1135,7 @@ class ContentApplicabilityRegeneration(JSONController):
         Creates an async task to regenerate content applicability data for given updated
         repositories.
 
-        body {repo_criteria:<dict>}
+        body {repo_criteria:<dict>, incremental:<bool>}
         """
         body = self.params()
         repo_criteria = body.get('repo_criteria', None)
@@ -1086,11 +1145,15 @@ class ContentApplicabilityRegeneration(JSONController):
             repo_criteria = Criteria.from_client_input(repo_criteria)
         except:
             raise exceptions.InvalidValue('repo_criteria')
+        incremental = body.get('incremental', True)
+        if not isinstance(incremental, bool):
+            raise exceptions.InvalidValue('incremental')
 
         manager = manager_factory.applicability_regeneration_manager()
         regeneration_tag = action_tag('applicability_regeneration')
         call_request = CallRequest(manager.regenerate_applicability_for_repos,
                                    [repo_criteria],
+                                   {'incremental': incremental},
                                    tags=[regeneration_tag])
         # allow only one applicability regeneration task at a time
         call_request.updates_resource(dispatch_constants.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE,
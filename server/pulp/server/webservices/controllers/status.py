@@ -13,11 +13,18 @@
 
 """
 Unauthenticated status API so that other can make sure we're up (to no good).
+The cache statistics and notification delivery counters reveal server
+activity and require authentication.
 """
 
 import web
 
+from pulp.server.auth.authorization import READ
+from pulp.server.auth.authorization_cache import AUTHORIZATION_CACHE
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
+from pulp.server.event import delivery
 from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices.controllers.decorators import auth_required
 
 # status controller ------------------------------------------------------------
 
@@ -27,8 +34,19 @@ class StatusController(JSONController):
         status_data = {'api_version': '2'}
         return self.ok(status_data)
 
+
+class CacheStatisticsController(JSONController):
+
+    @auth_required(READ)
+    def GET(self):
+        statistics = {'authorization_cache': AUTHORIZATION_CACHE.statistics(),
+                      'credential_cache': CREDENTIAL_CACHE.statistics(),
+                      'notification_delivery': delivery.get_delivery_pool().counters()}
+        return self.ok(statistics)
+
 # web.py application -----------------------------------------------------------
 
-URLS = ('/', StatusController)
+URLS = ('/', StatusController,
+        '/caches/', CacheStatisticsController)
 
 application = web.application(URLS, globals())
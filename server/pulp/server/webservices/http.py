@@ -54,6 +54,26 @@ def request_method():
     return request_info('REQUEST_METHOD')
 
 
+def if_none_match():
+    """
+    Get the entity tags listed in the request's If-None-Match header.
+    @return: the quoted entity tags, including weak tags without their W/
+             prefix, or ['*'] to match any entity tag
+    @rtype:  list of str
+    """
+    header_value = request_info('HTTP_IF_NONE_MATCH')
+    if not header_value:
+        return []
+    tags = []
+    for tag in header_value.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+
 def request_url():
     """
     Rebuild the full request url from the request information.
@@ -328,6 +348,13 @@ def status_no_content():
     _status(httplib.NO_CONTENT)
 
 
+def status_not_modified():
+    """
+    Set response code to not modified
+    """
+    _status(httplib.NOT_MODIFIED)
+
+
 def status_accepted():
     """
     Set response code to accepted
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+In-memory cache of the bodies of GET responses built from resources whose
+versions are tracked in pulp.server.db.resource_versions, so that clients
+polling unchanged resources do not pay for querying and serializing them
+again.
+"""
+
+import hashlib
+import threading
+
+from pulp.server import config as pulp_config
+from pulp.server.compat import OrderedDict
+
+# response cache class ---------------------------------------------------------
+
+class ResponseCache(object):
+    """
+    Bounded cache of response bodies keyed by their entity tag. The entity
+    tag of a response is computed from the versions of the resources it is
+    built from and the request path and query, so a cached body is never
+    stale: any write to the resources changes the tag under which the
+    response is looked up. Bodies cached for old versions are discarded as
+    the least recently used entries.
+
+    @ivar max_entries: maximum number of cached bodies; if None, the server's
+                       configured response_cache_size is used
+    @type max_entries: int or None
+    @ivar max_body_size: bodies larger than this many bytes are not cached;
+                         if None, the server's configured
+                         response_cache_max_body is used
+    @type max_body_size: int or None
+    """
+
+    def __init__(self, max_entries=None, max_body_size=None):
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+
+        # entity tag: body; in least recently used order
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def entity_tag(resources, versions, path):
+        """
+        Compute the entity tag of a response.
+        @param resources: names of the resources the response is built from
+        @type  resources: list or tuple of str
+        @param versions: current versions of the resources
+        @type  versions: list
+        @param path: request path, including the query string
+        @type  path: str
+        @return: quoted entity tag, suitable for the ETag header
+        @rtype:  str
+        """
+        digest = hashlib.sha1()
+        for part in zip(resources, versions):
+            digest.update('%s=%s;' % part)
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        digest.update(path)
+        return '"%s"' % digest.hexdigest()
+
+    def get(self, etag):
+        """
+        Get a cached response body.
+        @param etag: entity tag computed by entity_tag()
+        @type  etag: str
+        @return: the body, or None if it is not cached
+        @rtype:  str or None
+        """
+        self.__lock.acquire()
+        try:
+            body = self.__entries.pop(etag, None)
+            if body is None:
+                self.__misses += 1
+                return None
+            # re-insert to mark the entry as the most recently used
+            self.__entries[etag] = body
+            self.__hits += 1
+            return body
+        finally:
+            self.__lock.release()
+
+    def put(self, etag, body):
+        """
+        Cache a response body, unless it is larger than the maximum body size.
+        @param etag: entity tag computed by entity_tag()
+        @type  etag: str
+        @param body: response body
+        @type  body: str
+        """
+        max_entries = self._max_entries()
+        if max_entries <= 0 or len(body) > self._max_body_size():
+            return
+        self.__lock.acquire()
+        try:
+            self.__entries.pop(etag, None)
+            while len(self.__entries) >= max_entries:
+                self.__entries.popitem(last=False)
+            self.__entries[etag] = body
+        finally:
+            self.__lock.release()
+
+    def put_chunks(self, etag, chunks):
+        """
+        Pass through the chunks of a streamed response body, caching the body
+        once it has been completely sent unless it is larger than the maximum
+        body size.
+        @param etag: entity tag computed by entity_tag()
+        @type  etag: str
+        @param chunks: chunks of the response body
+        @type  chunks: iterable of str
+        @return: generator of the same chunks
+        """
+        max_body_size = self._max_body_size()
+        body = []
+        if self._max_entries() <= 0:
+            body = None
+        size = 0
+        for chunk in chunks:
+            if body is not None:
+                size += len(chunk)
+                if size > max_body_size:
+                    body = None
+                else:
+                    body.append(chunk)
+            yield chunk
+        if body is not None:
+            self.put(etag, ''.join(body))
+
+    def clear(self):
+        """
+        Discard all cached bodies.
+        """
+        self.__lock.acquire()
+        try:
+            self.__entries.clear()
+        finally:
+            self.__lock.release()
+
+    def statistics(self):
+        """
+        @return: number of responses found in the cache (hits), number not
+                 found (misses) and number of cached entries
+        @rtype:  dict
+        """
+        self.__lock.acquire()
+        try:
+            return {'hits': self.__hits, 'misses': self.__misses,
+                    'entries': len(self.__entries)}
+        finally:
+            self.__lock.release()
+
+    def _max_entries(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return pulp_config.config.getint('server', 'response_cache_size')
+
+    def _max_body_size(self):
+        if self.max_body_size is not None:
+            return self.max_body_size
+        return pulp_config.config.getint('server', 'response_cache_max_body')
+
+# process-wide response cache --------------------------------------------------
+
+RESPONSE_CACHE = ResponseCache()
@@ -20,7 +20,9 @@ import web
 
 from pulp.common.compat import json
 from pulp.server import config
-from pulp.server.db import connection
+from pulp.server.auth.authorization_cache import AUTHORIZATION_CACHE
+from pulp.server.auth.credential_cache import CREDENTIAL_CACHE
+from pulp.server.db import connection, indexes
 from pulp.server.db.model.auth import User
 from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import factory as dispatch_factory
@@ -28,6 +30,7 @@ from pulp.server.logs import start_logging, stop_logging
 from pulp.server.managers.auth.cert.cert_generator import SerialNumber
 from pulp.server.managers import factory as manager_factory
 from pulp.server.webservices import http
+from pulp.server.webservices.response_cache import RESPONSE_CACHE
 from pulp.server.webservices.middleware.exception import ExceptionHandlerMiddleware
 from pulp.server.webservices.middleware.postponed import PostponedOperationMiddleware
 
@@ -64,10 +67,14 @@ class PulpServerTests(unittest.TestCase):
     def setUpClass(cls):
         PulpServerTests.CONFIG = load_test_config()
         connection.initialize()
+        indexes.ensure_indexes(force=True)
         manager_factory.initialize()
 
     def setUp(self):
         super(PulpServerTests, self).setUp()
+        AUTHORIZATION_CACHE.invalidate()
+        CREDENTIAL_CACHE.invalidate()
+        RESPONSE_CACHE.clear()
         self._mocks = {}
         self.config = PulpServerTests.CONFIG # shadow for simplicity
         self.clean()
@@ -24,7 +24,8 @@ from mock import Mock, MagicMock, patch
 
 from pulp.common.plugins.distributor_constants import MANIFEST_FILENAME
 from pulp.devel.mock_distributor import get_publish_conduit
-from pulp.plugins.file.distributor import FileDistributor, FilePublishProgressReport, BUILD_DIRNAME
+from pulp.plugins.file.distributor import (FileDistributor, FilePublishProgressReport, BUILD_DIRNAME,
+                                           PUBLISH_DIRNAME, CURRENT_TREE_LINK, LINKS_SUFFIX)
 from pulp.plugins.model import Repository, Unit
 
 
@@ -161,6 +162,79 @@ class FileDistributorTest(unittest.TestCase):
         # Ensure the old rpm is no longer included
         self.assertFalse(os.path.islink(target_file))
 
+    def test_republish_writes_only_changes(self):
+        """
+        Publishing alternates between two trees, so a republish only writes the symlinks that
+        differ from the tree published two publishes ago.
+        """
+        distributor = self.create_distributor_with_mocked_api_calls()
+        units = []
+        for i in range(5):
+            unit = copy.deepcopy(self.unit)
+            unit.unit_key['name'] = 'unit-%d.rpm' % i
+            units.append(unit)
+        distributor.publish_repo(self.repo, get_publish_conduit(existing_units=units), {})
+        distributor.publish_repo(self.repo, get_publish_conduit(existing_units=units), {})
+
+        changed = copy.deepcopy(self.unit)
+        changed.unit_key['name'] = 'new.rpm'
+        units = units[1:] + [changed]
+        with patch('os.symlink', side_effect=os.symlink) as symlink:
+            distributor.publish_repo(self.repo, get_publish_conduit(existing_units=units), {})
+
+        # one for the new unit and one to swap the current tree
+        self.assertEqual(symlink.call_count, 2)
+        self.assertTrue(os.path.islink(os.path.join(self.target_dir, 'new.rpm')))
+        self.assertFalse(os.path.lexists(os.path.join(self.target_dir, 'unit-0.rpm')))
+        self.assertEqual(len(os.listdir(self.target_dir)), 6)
+
+    def test_publish_links_hosting_locations_to_current_tree(self):
+        distributor = self.create_distributor_with_mocked_api_calls()
+        other_target_dir = os.path.join(self.temp_dir, 'other', 'target')
+        distributor.get_hosting_locations.return_value = [self.target_dir, other_target_dir]
+
+        distributor.publish_repo(self.repo, self.publish_conduit, {})
+
+        current_tree = os.path.join(self.temp_dir, PUBLISH_DIRNAME, CURRENT_TREE_LINK)
+        for location in (self.target_dir, other_target_dir):
+            self.assertEqual(os.readlink(location), current_tree)
+            self.assertTrue(os.path.islink(os.path.join(location, SAMPLE_RPM)))
+
+    def test_publish_replaces_copied_hosting_location(self):
+        """
+        Locations published by the copying implementation are directories, and must be replaced.
+        """
+        os.makedirs(self.target_dir)
+        stale_file = os.path.join(self.target_dir, 'stale.rpm')
+        with open(stale_file, 'w') as stale:
+            stale.write('stale')
+        distributor = self.create_distributor_with_mocked_api_calls()
+
+        distributor.publish_repo(self.repo, self.publish_conduit, {})
+
+        self.assertTrue(os.path.islink(self.target_dir))
+        self.assertFalse(os.path.exists(stale_file))
+        self.assertTrue(os.path.islink(os.path.join(self.target_dir, SAMPLE_RPM)))
+
+    def test_publish_rebuilds_tree_without_links_record(self):
+        """
+        A tree whose links file is missing, for instance because a publish failed while updating
+        it, is rebuilt from scratch.
+        """
+        distributor = self.create_distributor_with_mocked_api_calls()
+        distributor.publish_repo(self.repo, self.publish_conduit, {})
+        distributor.publish_repo(self.repo, self.publish_conduit, {})
+        tree_dir = os.path.join(self.temp_dir, PUBLISH_DIRNAME, 'a')
+        os.symlink('/some/weird/path', os.path.join(tree_dir, 'junk.rpm'))
+        os.remove(tree_dir + LINKS_SUFFIX)
+
+        distributor.publish_repo(self.repo, self.publish_conduit, {})
+
+        self.assertEqual(os.path.realpath(self.target_dir), os.path.realpath(tree_dir))
+        self.assertFalse(os.path.lexists(os.path.join(tree_dir, 'junk.rpm')))
+        self.assertTrue(os.path.islink(os.path.join(tree_dir, SAMPLE_RPM)))
+        self.assertTrue(os.path.exists(tree_dir + LINKS_SUFFIX))
+
     def test_distributor_removed_calls_unpublish(self):
         distributor = self.create_distributor_with_mocked_api_calls()
         distributor.unpublish_repo = Mock()
@@ -172,7 +246,8 @@ class FileDistributorTest(unittest.TestCase):
         distributor.publish_repo(self.repo, self.publish_conduit, {})
         self.assertTrue(os.path.exists(self.target_dir))
         distributor.unpublish_repo(self.repo, {})
-        self.assertFalse(os.path.exists(self.target_dir))
+        self.assertFalse(os.path.lexists(self.target_dir))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, PUBLISH_DIRNAME)))
 
     def test__rmtree_if_exists(self):
         """
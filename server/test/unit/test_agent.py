@@ -21,7 +21,8 @@ from gofer.messaging import Envelope
 from pulp.devel import mock_agent
 from pulp.server.agent.hub.pulpagent import PulpAgent as RestAgent
 from pulp.server.agent.direct.pulpagent import PulpAgent as DirectAgent
-from pulp.server.agent.direct.services import HeartbeatListener
+from pulp.server.agent.direct.services import HeartbeatListener, HeartbeatStore
+from pulp.server.db.model.consumer import ConsumerHeartbeat
 
 
 REPO_ID = 'repo_1'
@@ -141,6 +142,89 @@ class TestAgent(base.PulpServerTests):
         mock_agent.Admin.cancel.assert_called_once_with(criteria=criteria)
 
 
+class TestHeartbeatStore(base.PulpServerTests):
+
+    def tearDown(self):
+        base.PulpServerTests.tearDown(self)
+        ConsumerHeartbeat.get_collection().remove(safe=True)
+
+    def test_flush(self):
+        # Setup
+        store = HeartbeatStore()
+        store.update('A', 10, {})
+        store.update('B', 10, {})
+        store.update('A', 10, {})
+        store.update('C', 20, {'x': 1})
+        # Test
+        flushed = store.flush()
+        # Verify
+        self.assertEqual(flushed, 3)
+        self.assertEqual(store.flush(), 0)
+        collection = ConsumerHeartbeat.get_collection()
+        self.assertEqual(collection.find().count(), 3)
+        self.assertEqual(collection.find_one({'_id': 'C'})['details'], {'x': 1})
+        # written again by update
+        store.update('A', 10, {'y': 2})
+        store.update('D', 10, {'y': 2})
+        self.assertEqual(store.flush(), 2)
+        self.assertEqual(collection.find().count(), 4)
+        self.assertEqual(collection.find_one({'_id': 'A'})['details'], {'y': 2})
+
+    def test_status_shared(self):
+        # Setup
+        HeartbeatStore().update('A', 10, {})
+        store = HeartbeatStore()
+        store.update('A', 10, {'x': 1})
+        store.flush()
+        # Test
+        result = HeartbeatStore().status(['A', 'B'])
+        # Verify
+        self.assertEqual(len(result), 2)
+        alive, last_heartbeat, details = result['A']
+        self.assertTrue(alive)
+        self.assertTrue(isinstance(last_heartbeat, basestring))
+        self.assertEqual(details, {'x': 1})
+        self.assertEqual(result['B'], (False, None, {}))
+        self.assertEqual(HeartbeatStore().status().keys(), ['A'])
+
+    def test_offline(self):
+        # Setup
+        store = HeartbeatStore()
+        store.update('A', 10, {})
+        store.update('B', -10, {})
+        store.flush()
+        # Test
+        offline = store.offline()
+        # Verify
+        self.assertEqual(offline, ['B'])
+        self.assertFalse(store.status(['B'])['B'][0])
+
+    def test_delete(self):
+        # Setup
+        store = HeartbeatStore()
+        store.update('A', 10, {})
+        store.update('B', 10, {})
+        store.flush()
+        store.update('A', 10, {})
+        # Test
+        store.delete('A')
+        # Verify
+        self.assertEqual(store.flush(), 0)
+        self.assertEqual(store.status(['A'])['A'], (False, None, {}))
+        self.assertTrue(store.status(['B'])['B'][0])
+
+    def test_flush_failed(self):
+        # Setup
+        store = HeartbeatStore()
+        store.update('A', 10, {})
+        # Test
+        with patch.object(ConsumerHeartbeat, 'get_collection', side_effect=ValueError()):
+            self.assertRaises(ValueError, store.flush)
+        # Verify
+        self.assertEqual(store.flush(), 1)
+        self.assertEqual(ConsumerHeartbeat.get_collection().find().count(), 1)
+
+
 class TestRestAgent(base.PulpServerTests):
 
     def setUp(self):
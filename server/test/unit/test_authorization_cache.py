@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import base
+import mock
+
+from pulp.server.auth import authorization
+from pulp.server.auth.authorization_cache import AuthorizationCache, AUTHORIZATION_CACHE
+from pulp.server.db.model.auth import Permission, Role, User
+from pulp.server.exceptions import MissingResource
+from pulp.server.managers import factory as manager_factory
+
+
+class AuthorizationCacheTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(AuthorizationCacheTests, self).setUp()
+
+        self.user_manager = manager_factory.user_manager()
+        self.role_manager = manager_factory.role_manager()
+        self.permission_manager = manager_factory.permission_manager()
+        self.role_manager.ensure_super_user_role()
+
+        self.user = self.user_manager.create_user(login='cache-user', password='password')
+        self.cache = AuthorizationCache(ttl=60)
+
+    def clean(self):
+        base.PulpServerTests.clean(self)
+        User.get_collection().remove()
+        Role.get_collection().remove()
+        Permission.get_collection().remove()
+
+    def test_is_authorized(self):
+        self.permission_manager.grant('/v2/repositories/', 'cache-user', [authorization.READ])
+
+        self.assertTrue(self.cache.is_authorized('/v2/repositories/', 'cache-user',
+                                                 authorization.READ))
+        self.assertTrue(self.cache.is_authorized('/v2/repositories/repo-1/', 'cache-user',
+                                                 authorization.READ))
+        self.assertFalse(self.cache.is_authorized('/v2/repositories/repo-1/', 'cache-user',
+                                                  authorization.UPDATE))
+        self.assertFalse(self.cache.is_authorized('/v2/consumers/', 'cache-user',
+                                                  authorization.READ))
+        self.assertFalse(self.cache.is_authorized('/v2/', 'cache-user', authorization.READ))
+
+    def test_is_authorized_root(self):
+        self.permission_manager.grant('/', 'cache-user', [authorization.DELETE])
+
+        self.assertTrue(self.cache.is_authorized('/v2/repositories/', 'cache-user',
+                                                 authorization.DELETE))
+
+    def test_is_superuser(self):
+        self.assertFalse(self.cache.is_superuser('cache-user'))
+        self.assertRaises(MissingResource, self.cache.is_superuser, 'missing-user')
+
+    def test_user(self):
+        user = self.cache.user('cache-user')
+        self.assertEqual(user['login'], 'cache-user')
+
+    def test_statistics(self):
+        self.cache.is_superuser('cache-user')
+        self.cache.is_authorized('/v2/', 'cache-user', authorization.READ)
+        self.cache.is_authorized('/v2/', 'cache-user', authorization.READ)
+
+        self.assertEqual(self.cache.statistics(), {'hits': 2, 'misses': 1, 'entries': 1})
+
+    def test_cached(self):
+        self.cache.is_superuser('cache-user')
+
+        with mock.patch('pulp.server.db.model.auth.User.get_collection') as mock_get:
+            self.cache.is_superuser('cache-user')
+            self.cache.is_authorized('/v2/', 'cache-user', authorization.READ)
+
+        self.assertEqual(0, mock_get.call_count)
+
+    def test_ttl(self):
+        self.cache.ttl = 0
+        self.cache.is_superuser('cache-user')
+        self.cache.is_superuser('cache-user')
+
+        self.assertEqual(self.cache.statistics()['misses'], 2)
+
+    def test_invalidate(self):
+        self.cache.is_superuser('cache-user')
+        self.cache.invalidate('other-user')
+        self.assertEqual(self.cache.statistics()['entries'], 1)
+        self.cache.invalidate('cache-user')
+        self.assertEqual(self.cache.statistics()['entries'], 0)
+
+
+class AuthorizationCacheInvalidationTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(AuthorizationCacheInvalidationTests, self).setUp()
+
+        self.user_manager = manager_factory.user_manager()
+        self.user_query_manager = manager_factory.user_query_manager()
+        self.role_manager = manager_factory.role_manager()
+        self.permission_manager = manager_factory.permission_manager()
+        self.role_manager.ensure_super_user_role()
+
+        self.user_manager.create_user(login='cache-user', password='password')
+
+    def clean(self):
+        base.PulpServerTests.clean(self)
+        User.get_collection().remove()
+        Role.get_collection().remove()
+        Permission.get_collection().remove()
+
+    def test_grant_revoke(self):
+        resource = '/v2/repositories/'
+        self.assertFalse(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                               authorization.READ))
+
+        self.permission_manager.grant(resource, 'cache-user', [authorization.READ])
+        self.assertTrue(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                              authorization.READ))
+
+        self.permission_manager.revoke(resource, 'cache-user', [authorization.READ])
+        self.assertFalse(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                               authorization.READ))
+
+    def test_role_permissions(self):
+        resource = '/v2/consumers/'
+        role = self.role_manager.create_role('cache-role')
+        self.role_manager.add_permissions_to_role(role['id'], resource, [authorization.UPDATE])
+        self.assertFalse(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                               authorization.UPDATE))
+
+        self.role_manager.add_user_to_role(role['id'], 'cache-user')
+        self.assertTrue(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                              authorization.UPDATE))
+
+        self.role_manager.delete_role(role['id'])
+        self.assertFalse(self.user_query_manager.is_authorized(resource, 'cache-user',
+                                                               authorization.UPDATE))
+
+    def test_super_user_role(self):
+        self.assertFalse(self.user_query_manager.is_superuser('cache-user'))
+
+        self.role_manager.add_user_to_role(self.role_manager.super_user_role, 'cache-user')
+        self.assertTrue(self.user_query_manager.is_superuser('cache-user'))
+        self.assertTrue(self.user_query_manager.is_authorized('/v2/', 'cache-user',
+                                                              authorization.DELETE))
+
+    def test_delete_user(self):
+        self.assertFalse(self.user_query_manager.is_superuser('cache-user'))
+
+        self.user_manager.delete_user('cache-user')
+        self.assertRaises(MissingResource, self.user_query_manager.is_superuser, 'cache-user')
+        self.assertEqual(AUTHORIZATION_CACHE.statistics()['entries'], 0)
@@ -465,6 +465,39 @@ class AddUnitMixinTests(unittest.TestCase):
         self.assertEqual(1, self.mixin._updated_count)
         self.assertEqual(saved.id, 'existing')
 
+    @mock.patch('pulp.server.db.resource_versions.bump')
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_content_version')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_unit_by_id')
+    def test_record_changes(self, mock_associate, mock_add, mock_update, mock_get, mock_path,
+                            mock_content_version, mock_bump):
+        # Setup
+        mock_get.side_effect = [{'_id' : 'existing'}, {'_id' : 'other'}, MissingResource()]
+        for type_id in ('t2', 't1', 't1'):
+            self.mixin.save_unit(self.mixin.init_unit(type_id, {'k' : 'v'}, {}, None))
+        self.assertEqual(0, mock_content_version.call_count)
+        self.assertEqual(0, mock_bump.call_count)
+
+        # Test
+        self.mixin._record_changes()
+
+        # Verify
+        mock_content_version.assert_called_once_with(self.repo_id, ['t1', 't2'])
+        mock_bump.assert_called_once_with('content_units')
+
+    @mock.patch('pulp.server.db.resource_versions.bump')
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_content_version')
+    def test_record_changes_nothing_written(self, mock_content_version, mock_bump):
+        # Test
+        self.mixin._record_changes()
+
+        # Verify
+        self.assertEqual(0, mock_content_version.call_count)
+        self.assertEqual(0, mock_bump.call_count)
+
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
     @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
@@ -477,6 +510,43 @@ class AddUnitMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.save_unit, None)
 
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_save_units(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
+        # Setup
+        units = [self.mixin.init_unit('t', {'k' : 'v1'}, {}, '/bar'),
+                 self.mixin.init_unit('t', {'k' : 'v2'}, {}, '/bar'),
+                 self.mixin.init_unit('s', {'k' : 'v3'}, {}, '/bar')]
+        mock_get.side_effect = [{'_id' : 'existing'}, MissingResource(), MissingResource()]
+        mock_add.side_effect = ['new-1', 'new-2']
+
+        # Test
+        saved = self.mixin.save_units(units)
+
+        # Verify
+        self.assertEqual(saved, units)
+        self.assertEqual(1, mock_update.call_count)
+        self.assertEqual(2, mock_add.call_count)
+        self.assertEqual(2, self.mixin._added_count)
+        self.assertEqual(1, self.mixin._updated_count)
+        self.assertEqual([u.id for u in units], ['existing', 'new-1', 'new-2'])
+
+        self.assertEqual(2, mock_associate.call_count)
+        calls = sorted(c[0] for c in mock_associate.call_args_list)
+        self.assertEqual(calls[0], (self.repo_id, 's', ['new-2'], self.association_owner_type, self.association_owner_id))
+        self.assertEqual(calls[1], (self.repo_id, 't', ['existing', 'new-1'], self.association_owner_type, self.association_owner_id))
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    def test_save_units_with_error(self, mock_get):
+        # Setup
+        mock_get.side_effect = Exception()
+
+        # Test
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.save_units, [None])
+
     @mock.patch('pulp.server.managers.content.cud.ContentManager.link_referenced_content_units')
     def test_link_unit(self, mock_link):
         # Setup
@@ -17,9 +17,10 @@ import base
 from pulp.devel import mock_agent
 from pulp.devel import mock_plugins
 from pulp.plugins.loader import api as plugin_api
+from pulp.server.agent.direct.services import HeartbeatStore
 from pulp.server.compat import ObjectId
-from pulp.server.db.model.consumer import (Consumer, Bind, RepoProfileApplicability,
-                                           UnitProfile)
+from pulp.server.db.model.consumer import (Consumer, Bind, ConsumerHeartbeat,
+                                           RepoProfileApplicability, UnitProfile)
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.dispatch import ScheduledCall
 from pulp.server.db.model.repository import Repo, RepoDistributor
@@ -242,6 +243,7 @@ class ConsumersTest(base.PulpWebserviceTests):
         Repo.get_collection().remove()
         RepoDistributor.get_collection().remove()
         Bind.get_collection().remove()
+        ConsumerHeartbeat.get_collection().remove()
         plugin_api._create_manager()
         mock_plugins.install()
         mock_agent.install()
@@ -252,6 +254,7 @@ class ConsumersTest(base.PulpWebserviceTests):
         Repo.get_collection().remove()
         RepoDistributor.get_collection().remove()
         Bind.get_collection().remove()
+        ConsumerHeartbeat.get_collection().remove()
         mock_plugins.reset()
 
     def populate(self, bindings=False):
@@ -335,6 +338,22 @@ class ConsumersTest(base.PulpWebserviceTests):
         self.assertEqual(200, status)
         self.validate(body, True)
 
+    def test_get_offline(self):
+        """
+        Tests retrieving the list of consumers whose agent is offline.
+        """
+        # Setup
+        self.populate()
+        store = HeartbeatStore()
+        store.update(self.CONSUMER_IDS[0], 10, {})
+        store.update(self.CONSUMER_IDS[1], -10, {})
+        store.flush()
+        # Test
+        status, body = self.get('/v2/consumers/?offline=1')
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual([c['id'] for c in body], [self.CONSUMER_IDS[1]])
+
     def test_get_no_consumers(self):
         """
         Tests that an empty list is returned when no consumers are present.
@@ -822,6 +841,46 @@ class TestProfiles(base.PulpWebserviceTests):
         for key in ('consumer_id', 'content_type', 'profile'):
             self.assertEqual(body[key], profile[key])
 
+    def test_post_delta(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        p = manager.create(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1])
+        # Test
+        path = '/v2/consumers/%s/profiles/' % self.CONSUMER_ID
+        delta = dict(base_hash=p['profile_hash'], added=[self.PROFILE_2], removed=[])
+        status, body = self.post(path, dict(content_type=self.TYPE_1, delta=delta))
+        # Verify
+        self.assertEqual(status, 200)
+        self.assertEqual(body['content_type'], self.TYPE_1)
+        self.assertFalse('profile' in body)
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], [self.PROFILE_1, self.PROFILE_2])
+        self.assertEqual(body['profile_hash'], profile['profile_hash'])
+
+    def test_post_delta_changed(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.create(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1])
+        # Test
+        path = '/v2/consumers/%s/profiles/' % self.CONSUMER_ID
+        delta = dict(base_hash='stale', added=[self.PROFILE_2], removed=[])
+        status, body = self.post(path, dict(content_type=self.TYPE_1, delta=delta))
+        # Verify
+        self.assertEqual(status, 409)
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], [self.PROFILE_1])
+
+    def test_post_delta_invalid(self):
+        # Setup
+        self.populate()
+        # Test
+        path = '/v2/consumers/%s/profiles/' % self.CONSUMER_ID
+        status, body = self.post(path, dict(content_type=self.TYPE_1, delta=[]))
+        # Verify
+        self.assertEqual(status, 400)
+
     def test_put(self):
         # Setup
         self.populate()
@@ -14,7 +14,8 @@
 
 import base
 
-from pulp.server.db.model.consumer import Consumer, ConsumerHistoryEvent
+from pulp.server.agent.direct.services import heartbeat_store
+from pulp.server.db.model.consumer import Consumer, ConsumerHeartbeat, ConsumerHistoryEvent
 import pulp.server.managers.consumer.cud as consumer_manager
 import pulp.server.managers.consumer.history as history_manager
 import pulp.server.exceptions as exceptions
@@ -37,6 +38,7 @@ class ConsumerManagerTests(base.PulpAsyncServerTests):
         base.PulpServerTests.clean(self)
 
         Consumer.get_collection().remove()
+        ConsumerHeartbeat.get_collection().remove()
 
     def test_create(self):
         """
@@ -142,6 +144,8 @@ class ConsumerManagerTests(base.PulpAsyncServerTests):
         # Setup
         consumer_id = 'doomed'
         self.manager.register(consumer_id)
+        heartbeat_store.update(consumer_id, 10, {})
+        heartbeat_store.flush()
 
         # Test
         self.manager.unregister(consumer_id)
@@ -149,6 +153,7 @@ class ConsumerManagerTests(base.PulpAsyncServerTests):
         # Verify
         consumers = list(Consumer.get_collection().find({'id' : consumer_id}))
         self.assertEqual(0, len(consumers))
+        self.assertEqual(None, ConsumerHeartbeat.get_collection().find_one({'_id' : consumer_id}))
 
     def test_delete_consumer_no_consumer(self):
         """
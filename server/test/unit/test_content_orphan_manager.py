@@ -10,6 +10,7 @@
 # PURPOSE. You should have received a copy of GPLv2 along with this software;
 # if not, see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import errno
 import os
 import random
 import shutil
@@ -18,12 +19,15 @@ import tempfile
 import traceback
 from pprint import pformat
 
+import mock
+
 import base
 
 from pulp.server import exceptions as pulp_exceptions
 from pulp.plugins.types import database as content_type_db
 from pulp.plugins.types.model import TypeDefinition
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.dispatch import context as dispatch_context
 from pulp.server.managers import factory as manager_factory
 from pulp.server.managers.content.orphan import OrphanManager
 
@@ -261,4 +265,66 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(len(orphans), 0)
         self.assertEqual(self.number_of_files_in_content_root(), 0)
 
+    def test_delete_by_id_associated_using_generators(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit_2)
+
+        json_objs = [{'content_type_id': u['_content_type_id'], 'unit_id': u['_id']}
+                     for u in (unit_1, unit_2)]
+        self.orphan_manager.delete_orphans_by_id(json_objs)
+
+        self.assertFalse(os.path.exists(unit_1['_storage_path']))
+        self.assertTrue(os.path.exists(unit_2['_storage_path']))
+        content_units_collection = content_type_db.type_units_collection(PHONY_TYPE_1.id)
+        self.assertEqual(content_units_collection.find().count(), 1)
+
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_BATCH_SIZE', 2)
+    def test_delete_in_batches_using_generators(self):
+        gen_buttload_of_content_units(PHONY_TYPE_1.id, self.content_root, 5)
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+        self.assertEqual(self.number_of_files_in_content_root(), 6)
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
 
+        self.assertEqual(self.number_of_files_in_content_root(), 1)
+        self.assertEqual(self.orphan_manager.orphans_count_by_type(PHONY_TYPE_1.id), 0)
+
+    def test_delete_progress_using_generators(self):
+        gen_buttload_of_content_units(PHONY_TYPE_1.id, self.content_root, 3)
+
+        with mock.patch.object(dispatch_context.CONTEXT, 'report_progress') as mock_report:
+            self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+
+        final_progress = mock_report.call_args[0][0]
+        self.assertEqual(final_progress, {'content_type_id': PHONY_TYPE_1.id,
+                                          'units_deleted': 3,
+                                          'files_deleted': 3,
+                                          'files_total': 3})
+
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_BATCH_SIZE', 2)
+    def test_delete_file_error_using_generators(self):
+        gen_buttload_of_content_units(PHONY_TYPE_1.id, self.content_root, 5)
+        orphans = self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_1.id, ['_storage_path'])
+        failed_path = orphans.next()['_storage_path']
+        error = OSError(errno.EACCES, 'Permission denied')
+        delete_orphaned_file = self.orphan_manager.delete_orphaned_file
+
+        def _delete_orphaned_file(path):
+            if path == failed_path:
+                raise error
+            delete_orphaned_file(path)
+
+        with mock.patch.object(self.orphan_manager, 'delete_orphaned_file',
+                               side_effect=_delete_orphaned_file) as mock_delete:
+            try:
+                self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+                self.fail('Exception expected')
+            except OSError, e:
+                self.assertTrue(e is error)
+
+        # the remaining units and files are deleted before the error is raised
+        self.assertEqual(mock_delete.call_count, 5)
+        self.assertEqual(self.number_of_files_in_content_root(), 1)
+        self.assertEqual(self.orphan_manager.orphans_count_by_type(PHONY_TYPE_1.id), 0)
@@ -11,6 +11,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
 import os
 import shutil
 
@@ -229,6 +230,25 @@ class UploadResourceTests(BaseUploadTest):
         upload_file = self.upload_manager._upload_file_path(upload_id)
         self.assertTrue(not os.path.exists(upload_file))
 
+    def test_get(self):
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 4, 'efgh')
+
+        # Test
+        status, body = self.get('/v2/content/uploads/%s/' % upload_id)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(body, {'upload_id' : upload_id, 'received' : [[4, 8]]})
+
+    def test_get_invalid_upload(self):
+        # Test
+        status, body = self.get('/v2/content/uploads/foo/')
+
+        # Verify
+        self.assertEqual(404, status)
+
 class UploadSegmentResourceTests(BaseUploadTest):
 
     def test_put(self):
@@ -275,6 +295,23 @@ class UploadSegmentResourceTests(BaseUploadTest):
         # Verify
         self.assertEqual(400, status)
 
+    def test_put_checksum(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = hashlib.sha256('string data').hexdigest()
+
+        url = '/v2/content/uploads/%s/0/?checksum=%s' % (upload_id, checksum)
+        status, body = self.put(url, 'string data', serialize_json=False)
+        self.assertEqual(200, status)
+
+        url = '/v2/content/uploads/%s/11/?checksum=%s' % (upload_id, checksum)
+        status, body = self.put(url, 'other data', serialize_json=False)
+
+        # Verify
+        self.assertEqual(400, status)
+        self.assertEqual(self.upload_manager.read_upload(upload_id), 'string data')
+
     def test_put_invalid_upload(self):
 
         # Test
@@ -307,3 +344,27 @@ class ImportUnitTests(BaseUploadTest):
 
         # Verify
         self.assertEqual(200, status)
+
+    def test_post_incomplete(self):
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'string')
+
+        repo_manager = manager_factory.repo_manager()
+        repo_manager.create_repo('repo-upload')
+        importer_manager = manager_factory.repo_importer_manager()
+        importer_manager.set_importer('repo-upload', 'dummy-importer', {})
+
+        # Test
+        body = {
+            'upload_id' : upload_id,
+            'unit_type_id' : 'dummy-type',
+            'unit_key' : {'name' : 'foo'},
+            'unit_metadata' : {'stuff' : 'bar'},
+            'size' : len('string data'),
+            'checksum' : hashlib.sha256('string data').hexdigest(),
+        }
+        status, body = self.post('/v2/repositories/repo-upload/actions/import_upload/', body)
+
+        # Verify
+        self.assertEqual(400, status)
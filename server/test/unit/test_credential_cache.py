@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import base
+import mock
+
+from pulp.server.auth.credential_cache import CredentialCache, CREDENTIAL_CACHE
+from pulp.server.db.model.auth import User
+from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.auth import password
+
+
+class CredentialCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CredentialCache(ttl=60, max_entries=2)
+
+    def test_digest(self):
+        self.assertEqual(self.cache.digest('password', 'user', 'secret'),
+                         self.cache.digest('password', 'user', 'secret'))
+        self.assertNotEqual(self.cache.digest('password', 'user', 'secret'),
+                            self.cache.digest('password', 'user', 'other'))
+        self.assertNotEqual(self.cache.digest('password', 'ab', 'c'),
+                            self.cache.digest('password', 'a', 'bc'))
+        self.assertNotEqual(self.cache.digest('secret'),
+                            CredentialCache().digest('secret'))
+
+    def test_get_put(self):
+        digest = self.cache.digest('secret')
+        self.assertEqual(self.cache.get(digest), None)
+        self.cache.put(digest, 'user')
+        self.assertEqual(self.cache.get(digest), 'user')
+        self.assertEqual(self.cache.statistics(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+    def test_expired(self):
+        self.cache.ttl = 0.01
+        digest = self.cache.digest('secret')
+        self.cache.put(digest, 'user')
+        with mock.patch('time.time', return_value=2 ** 32):
+            self.assertEqual(self.cache.get(digest), None)
+        self.assertEqual(self.cache.statistics()['entries'], 0)
+
+    def test_disabled(self):
+        self.cache.ttl = 0
+        digest = self.cache.digest('secret')
+        self.cache.put(digest, 'user')
+        self.assertEqual(self.cache.get(digest), None)
+
+    def test_bounded(self):
+        digests = [self.cache.digest(str(i)) for i in range(3)]
+        self.cache.put(digests[0], 'user-0')
+        self.cache.put(digests[1], 'user-1')
+        # make the first entry the most recently used
+        self.cache.get(digests[0])
+        self.cache.put(digests[2], 'user-2')
+
+        self.assertEqual(self.cache.get(digests[0]), 'user-0')
+        self.assertEqual(self.cache.get(digests[1]), None)
+        self.assertEqual(self.cache.get(digests[2]), 'user-2')
+
+    def test_invalidate(self):
+        self.cache.put(self.cache.digest('1'), 'user-1')
+        self.cache.put(self.cache.digest('2'), 'user-2')
+        self.cache.invalidate('user-1')
+        self.assertEqual(self.cache.get(self.cache.digest('1')), None)
+        self.assertEqual(self.cache.get(self.cache.digest('2')), 'user-2')
+        self.cache.invalidate()
+        self.assertEqual(self.cache.statistics()['entries'], 0)
+
+
+class CredentialCacheAuthenticationTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(CredentialCacheAuthenticationTests, self).setUp()
+        self.user_manager = manager_factory.user_manager()
+        self.authentication_manager = manager_factory.authentication_manager()
+        self.user_manager.create_user(login='cache-user', password='secret')
+
+    def clean(self):
+        base.PulpServerTests.clean(self)
+        User.get_collection().remove()
+
+    def test_password_cached(self):
+        self.assertEqual(self.authentication_manager.check_username_password('cache-user', 'secret'),
+                         'cache-user')
+
+        with mock.patch('pulp.server.managers.auth.password.PasswordManager.check_password') as check:
+            login = self.authentication_manager.check_username_password('cache-user', 'secret')
+
+        self.assertEqual(login, 'cache-user')
+        self.assertEqual(check.call_count, 0)
+
+    def test_wrong_password_not_cached(self):
+        self.assertEqual(self.authentication_manager.check_username_password('cache-user', 'wrong'),
+                         None)
+        self.assertEqual(CREDENTIAL_CACHE.statistics()['entries'], 0)
+
+    def test_password_change(self):
+        self.authentication_manager.check_username_password('cache-user', 'secret')
+
+        self.user_manager.update_user('cache-user', {'password': 'changed'})
+
+        self.assertEqual(self.authentication_manager.check_username_password('cache-user', 'secret'),
+                         None)
+        self.assertEqual(self.authentication_manager.check_username_password('cache-user', 'changed'),
+                         'cache-user')
+
+    def test_delete_user(self):
+        self.authentication_manager.check_username_password('cache-user', 'secret')
+
+        self.user_manager.delete_user('cache-user')
+
+        self.assertEqual(self.authentication_manager.check_username_password('cache-user', 'secret'),
+                         None)
+
+    @mock.patch('pulp.server.managers.auth.password.PBKDF2_NATIVE', True)
+    def test_legacy_password_rehashed(self):
+        password_manager = manager_factory.password_manager()
+        salt = password_manager.random_bytes(8)
+        hashed = password_manager.pbkdf_sha256('legacy', salt, password.NUM_ITERATIONS)
+        entry = salt.encode('base64').strip() + ',' + hashed.encode('base64').strip()
+        User.get_collection().update({'login': 'cache-user'}, {'$set': {'password': entry}},
+                                     safe=True)
+
+        login = self.authentication_manager.check_username_password('cache-user', 'legacy')
+
+        self.assertEqual(login, 'cache-user')
+        user = User.get_collection().find_one({'login': 'cache-user'})
+        self.assertTrue(user['password'].startswith(password.PBKDF2_PREFIX))
+        self.assertTrue(password_manager.check_password(user['password'], 'legacy'))
+
+    @mock.patch('pulp.server.managers.auth.password.PBKDF2_NATIVE', False)
+    def test_legacy_password_not_rehashed(self):
+        password_manager = manager_factory.password_manager()
+        salt = password_manager.random_bytes(8)
+        hashed = password_manager.pbkdf_sha256('legacy', salt, password.NUM_ITERATIONS)
+        entry = salt.encode('base64').strip() + ',' + hashed.encode('base64').strip()
+        User.get_collection().update({'login': 'cache-user'}, {'$set': {'password': entry}},
+                                     safe=True)
+
+        login = self.authentication_manager.check_username_password('cache-user', 'legacy')
+
+        self.assertEqual(login, 'cache-user')
+        user = User.get_collection().find_one({'login': 'cache-user'})
+        self.assertEqual(user['password'], entry)
@@ -11,6 +11,9 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import threading
+import time
+
 import base
 
 from pulp.server.dispatch import constants as dispatch_constants
@@ -143,3 +146,49 @@ class CallRequestTests(base.PulpServerTests):
             call_report = CallReport()
         except Exception, e:
             self.fail(e.message)
+
+    def test_call_report_revision(self):
+        call_report = CallReport()
+        revision = call_report.revision
+        call_report.progress = {'step': 1}
+        self.assertEqual(call_report.revision, revision + 1)
+        call_report.state = dispatch_constants.CALL_RUNNING_STATE
+        self.assertEqual(call_report.revision, revision + 2)
+        call_report.response = dispatch_constants.CALL_ACCEPTED_RESPONSE
+        self.assertEqual(call_report.revision, revision + 2)
+        self.assertEqual(call_report.serialize()['revision'], revision + 2)
+
+    def test_call_report_wait_for_change(self):
+        call_report = CallReport(state=dispatch_constants.CALL_RUNNING_STATE)
+        revision = call_report.revision
+        self.assertTrue(call_report.wait_for_change(revision - 1, 0))
+        self.assertFalse(call_report.wait_for_change(revision, 0.01))
+
+        def update():
+            time.sleep(0.05)
+            call_report.progress = {'step': 1}
+
+        thread = threading.Thread(target=update)
+        thread.start()
+        start = time.time()
+        self.assertTrue(call_report.wait_for_change(revision, 5))
+        self.assertTrue(time.time() - start < 5)
+        thread.join()
+
+    def test_call_report_wait_for_change_other_report(self):
+        call_report = CallReport(state=dispatch_constants.CALL_RUNNING_STATE)
+        other_report = CallReport(state=dispatch_constants.CALL_RUNNING_STATE)
+        self.assertFalse(call_report._changed is other_report._changed)
+
+        def update():
+            time.sleep(0.05)
+            other_report.progress = {'step': 1}
+
+        thread = threading.Thread(target=update)
+        thread.start()
+        self.assertFalse(call_report.wait_for_change(call_report.revision, 0.2))
+        thread.join()
+
+    def test_call_report_wait_for_change_complete(self):
+        call_report = CallReport(state=dispatch_constants.CALL_FINISHED_STATE)
+        self.assertTrue(call_report.wait_for_change(call_report.revision, 5))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the License
+# (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied, including the
+# implied warranties of MERCHANTABILITY, NON-INFRINGEMENT, or FITNESS FOR A
+# PARTICULAR PURPOSE.
+# You should have received a copy of GPLv2 along with this software; if not,
+# see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+
+import mock
+
+import base
+from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.dispatch.call import CallReport
+from pulp.server.webservices.controllers import dispatch as dispatch_controller
+
+
+class TaskResourceTests(base.PulpWebserviceTests):
+
+    def setUp(self):
+        super(TaskResourceTests, self).setUp()
+        self.call_report = CallReport(call_request_id='task-1')
+        self.call_report.wait_for_change = mock.Mock(return_value=False)
+        self.patcher = mock.patch.object(dispatch_factory.coordinator(), 'find_call_reports',
+                                         return_value=[self.call_report])
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        super(TaskResourceTests, self).tearDown()
+
+    def test_get_wait(self):
+
+        status, body = self.get('/v2/tasks/task-1/?wait=5&revision=3')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['call_request_id'], 'task-1')
+        self.call_report.wait_for_change.assert_called_once_with(3, 5.0)
+        self.assertEqual(dispatch_controller._waiters, 0)
+
+    @mock.patch.object(dispatch_controller, '_waiters', 4)
+    def test_get_wait_max_waiters(self):
+
+        status, body = self.get('/v2/tasks/task-1/?wait=5')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['call_request_id'], 'task-1')
+        self.assertFalse(self.call_report.wait_for_change.called)
+        self.assertEqual(dispatch_controller._waiters, 4)
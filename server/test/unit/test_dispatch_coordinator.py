@@ -25,6 +25,7 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import call
 from pulp.server.dispatch import coordinator
 from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.dispatch.locktable import RESOURCE_LOCK_TABLE
 from pulp.server.dispatch.task import Task
 from pulp.server.exceptions import OperationTimedOut
 from pulp.server.util import CycleExists, topological_sort
@@ -57,6 +58,7 @@ class CoordinatorTests(base.PulpServerTests):
         self._task_queue_factory = None
         self.collection.drop()
         self.collection = None
+        RESOURCE_LOCK_TABLE.clear()
         QueuedCall.get_collection().drop()
         ArchivedCall.get_collection().drop()
 
@@ -193,6 +195,11 @@ class ConflictingOperationsTests(base.PulpServerTests):
 
 class CoordinatorCollisionDetectionTests(CoordinatorTests):
 
+    def insert_call_resources(self, call_resources):
+        # the resource lock table is rebuilt from the persisted call resources
+        self.collection.insert(call_resources, safe=True)
+        RESOURCE_LOCK_TABLE.rebuild(self.collection)
+
     def test_no_conflicts(self):
         task_id = 'existing_task'
         cds_id = 'my_cds'
@@ -206,7 +213,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
 
         call_resources = coordinator.resource_dict_to_call_resources(resources)
         coordinator.set_call_request_id_on_call_resources(task_id, call_resources)
-        self.collection.insert(call_resources, safe=True)
+        self.insert_call_resources(call_resources)
 
         response, blockers, reasons, call_resources = self.coordinator._find_conflicts(resources)
 
@@ -229,7 +236,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         }
         existing_task_resources = coordinator.resource_dict_to_call_resources(existing_resources)
         coordinator.set_call_request_id_on_call_resources(task_id, existing_task_resources)
-        self.collection.insert(existing_task_resources, safe=True)
+        self.insert_call_resources(existing_task_resources)
 
         # delete on content unit is postponed by read
 
@@ -276,8 +283,8 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         task_2_resources = coordinator.resource_dict_to_call_resources(bind_2_resources)
         coordinator.set_call_request_id_on_call_resources(call_2_id, task_2_resources)
 
-        self.collection.insert(task_1_resources, safe=True)
-        self.collection.insert(task_2_resources, safe=True)
+        self.insert_call_resources(task_1_resources)
+        self.insert_call_resources(task_2_resources)
 
         # deleting the repository should be postponed by both binds
 
@@ -305,7 +312,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         }
         deletion_task_resources = coordinator.resource_dict_to_call_resources(deletion_resources)
         coordinator.set_call_request_id_on_call_resources(task_id, deletion_task_resources)
-        self.collection.insert(deletion_task_resources, safe=True)
+        self.insert_call_resources(deletion_task_resources)
 
         # a cds sync should be rejected by the deletion
 
@@ -324,6 +331,68 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         self.assertTrue(task_id in blockers)
         self.assertTrue(reasons)
 
+    def test_duplicate_reasons(self):
+        repo_id = 'my_repo'
+        existing_resources = {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {
+                repo_id: dispatch_constants.RESOURCE_READ_OPERATION
+            }
+        }
+        for task_id in ('first_task', 'second_task'):
+            call_resources = coordinator.resource_dict_to_call_resources(existing_resources)
+            coordinator.set_call_request_id_on_call_resources(task_id, call_resources)
+            self.insert_call_resources(call_resources)
+
+        resources = {
+            dispatch_constants.RESOURCE_UPDATE_OPERATION: {
+                dispatch_constants.RESOURCE_REPOSITORY_TYPE: [repo_id]
+            }
+        }
+        response, blockers, reasons, call_resources = self.coordinator._find_conflicts(resources)
+
+        self.assertTrue(response is dispatch_constants.CALL_POSTPONED_RESPONSE)
+        self.assertEqual(blockers, set(['first_task', 'second_task']))
+        self.assertEqual(len(reasons), 1)
+
+    def test_no_database_query(self):
+        repo_id = 'my_repo'
+        existing_resources = {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {
+                repo_id: dispatch_constants.RESOURCE_UPDATE_OPERATION
+            }
+        }
+        call_resources = coordinator.resource_dict_to_call_resources(existing_resources)
+        coordinator.set_call_request_id_on_call_resources('existing_task', call_resources)
+        self.insert_call_resources(call_resources)
+
+        self.coordinator.call_resource_collection = mock.Mock()
+        resources = {
+            dispatch_constants.RESOURCE_UPDATE_OPERATION: {
+                dispatch_constants.RESOURCE_REPOSITORY_TYPE: [repo_id]
+            }
+        }
+        response, blockers, reasons, call_resources = self.coordinator._find_conflicts(resources)
+
+        self.assertTrue(response is dispatch_constants.CALL_POSTPONED_RESPONSE)
+        self.assertEqual(self.coordinator.call_resource_collection.find.call_count, 0)
+
+    def test_dequeue_callback_releases(self):
+        repo_id = 'my_repo'
+        existing_resources = {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {
+                repo_id: dispatch_constants.RESOURCE_DELETE_OPERATION
+            }
+        }
+        call_request = call.CallRequest(dummy_call)
+        call_resources = coordinator.resource_dict_to_call_resources(existing_resources)
+        coordinator.set_call_request_id_on_call_resources(call_request.id, call_resources)
+        self.insert_call_resources(call_resources)
+
+        coordinator.coordinator_dequeue_callback(call_request, None)
+
+        self.assertEqual(RESOURCE_LOCK_TABLE.held_operations(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id), [])
+        self.assertEqual(self.collection.find({'call_request_id': call_request.id}).count(), 0)
+
 # call execution tests ---------------------------------------------------------
 
 def dummy_call(progress, success, failure):
@@ -566,6 +635,20 @@ class CoordinatorStartTests(CoordinatorTests):
     def tearDown(self):
         super(CoordinatorStartTests, self).tearDown()
 
+    def test_start_stale_call_resources(self):
+        call_resource = {'call_request_id': 'stale-call',
+                         'resource_type': dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                         'resource_id': 'my-repo',
+                         'operation': dispatch_constants.RESOURCE_UPDATE_OPERATION}
+        self.collection.insert(dict(call_resource), safe=True)
+        RESOURCE_LOCK_TABLE.acquire([call_resource])
+
+        self.coordinator.start()
+
+        self.assertEqual(self.collection.find().count(), 0)
+        self.assertEqual(RESOURCE_LOCK_TABLE.held_operations(
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE, 'my-repo'), [])
+
     def test_start_bad_queued_call_none(self):
         self.queued_call_collection.insert({'serialized_call_request': None})
 
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server.db.model.dispatch import CallResource
+from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch.locktable import ResourceLockTable
+
+
+REPO_TYPE = dispatch_constants.RESOURCE_REPOSITORY_TYPE
+CONSUMER_TYPE = dispatch_constants.RESOURCE_CONSUMER_TYPE
+READ = dispatch_constants.RESOURCE_READ_OPERATION
+UPDATE = dispatch_constants.RESOURCE_UPDATE_OPERATION
+
+
+class ResourceLockTableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ResourceLockTable()
+
+    def test_acquire(self):
+        self.table.acquire([CallResource('call-1', REPO_TYPE, 'repo-1', READ),
+                            CallResource('call-2', REPO_TYPE, 'repo-1', UPDATE)])
+        held = sorted(self.table.held_operations(REPO_TYPE, 'repo-1'))
+        self.assertEqual(held, [('call-1', READ), ('call-2', UPDATE)])
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-2'), [])
+        self.assertEqual(self.table.held_operations(CONSUMER_TYPE, 'repo-1'), [])
+
+    def test_release(self):
+        self.table.acquire([CallResource('call-1', REPO_TYPE, 'repo-1', READ),
+                            CallResource('call-1', CONSUMER_TYPE, 'consumer-1', UPDATE),
+                            CallResource('call-2', REPO_TYPE, 'repo-1', READ)])
+        self.table.release('call-1')
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-1'), [('call-2', READ)])
+        self.assertEqual(self.table.held_operations(CONSUMER_TYPE, 'consumer-1'), [])
+
+    def test_release_unknown(self):
+        self.table.release('call-1')
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-1'), [])
+
+    def test_clear(self):
+        self.table.acquire([CallResource('call-1', REPO_TYPE, 'repo-1', READ)])
+        self.table.clear()
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-1'), [])
+
+    def test_rebuild(self):
+        self.table.acquire([CallResource('call-1', REPO_TYPE, 'repo-1', READ)])
+        collection = mock.Mock()
+        collection.find.return_value = [CallResource('call-2', REPO_TYPE, 'repo-2', UPDATE)]
+        self.table.rebuild(collection)
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-1'), [])
+        self.assertEqual(self.table.held_operations(REPO_TYPE, 'repo-2'), [('call-2', UPDATE)])
@@ -311,6 +311,70 @@ class TaskQueueControlFlowTests(TaskQueueTests):
         self.queue.dequeue(task_1)
         self.assertFalse(task_1.call_request.id in task_2.call_request.dependencies)
 
+    def test_get_ready_tasks_weight_buckets(self):
+        task_1 = self.gen_task()
+        task_1.call_request.weight = 2
+        task_2 = self.gen_task()
+        task_2.call_request.weight = 0
+        task_3 = self.gen_task()
+        task_3.call_request.weight = 1
+        for t in (task_1, task_2, task_3):
+            self.queue.enqueue(t)
+        task_list = self.queue._get_ready_tasks()
+        self.assertEqual(task_list, [task_1, task_2])
+
+    def test_get_ready_tasks_unblocked_order(self):
+        task_1 = self.gen_async_task()
+        task_2 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        task_3 = self.gen_task()
+        for t in (task_1, task_2, task_3):
+            self.queue.enqueue(t)
+        self.queue._run_ready_task(task_1)
+        self.wait_for_task_to_start(task_1)
+        task_1._succeeded()
+        self.wait_for_task_to_complete(task_1)
+        # task_2 became ready after task_3 did
+        task_list = self.queue._get_ready_tasks()
+        self.assertEqual(task_list, [task_3, task_2])
+
+    def test_dispatch_on_enqueue(self):
+        self.queue.dispatch_interval = 60
+        self.queue.start()
+        try:
+            task = self.gen_task()
+            self.queue.enqueue(task)
+            self.wait_for_task_to_complete(task)
+        finally:
+            self.queue.stop()
+
+    def test_dispatch_on_complete(self):
+        self.queue.start()
+        try:
+            task_1 = self.gen_async_task()
+            task_1.call_request.weight = 2
+            task_2 = self.gen_task()
+            self.queue.enqueue(task_1)
+            self.wait_for_task_to_start(task_1)
+            self.queue.enqueue(task_2)
+            self.assertTrue(task_2 in self.queue.waiting_tasks())
+            task_1._succeeded()
+            self.wait_for_task_to_complete(task_2)
+        finally:
+            self.queue.stop()
+
+    def test_worker_pool_bounded(self):
+        queue = TaskQueue(1, worker_pool_size=4)
+        tasks = [self.gen_task() for i in range(8)]
+        for t in tasks:
+            t.call_request.weight = 0
+            queue.enqueue(t)
+        for t in queue._get_ready_tasks():
+            queue._run_ready_task(t)
+        for t in tasks:
+            self.wait_for_task_to_complete(t)
+        self.assertTrue(queue._TaskQueue__worker_pool.worker_count() <= 4)
+
 # task queue query tests -------------------------------------------------------
 
 class TaskQueueQueryTests(TaskQueueTests):
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import threading
+import unittest
+
+from pulp.server.dispatch.workerpool import WorkerPool
+
+
+class WorkerPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        done = threading.Event()
+        self.pool.submit(done.set)
+        done.wait(1.0)
+        self.assertTrue(done.isSet())
+
+    def test_submit_args(self):
+        results = []
+        done = threading.Event()
+
+        def call(*args, **kwargs):
+            results.append((args, kwargs))
+            done.set()
+
+        self.pool.submit(call, 1, 2, key='value')
+        done.wait(1.0)
+        self.assertEqual(results, [((1, 2), {'key': 'value'})])
+
+    def test_workers_reused(self):
+        # a worker only becomes idle again after its call returns, so a
+        # second worker may be started, but never more than the pool bound
+        thread_names = set()
+
+        def call(done):
+            thread_names.add(threading.current_thread().getName())
+            done.set()
+
+        for i in range(10):
+            done = threading.Event()
+            self.pool.submit(call, done)
+            done.wait(1.0)
+            self.assertTrue(done.isSet())
+        self.assertTrue(len(thread_names) <= self.pool.max_workers)
+        self.assertTrue(self.pool.worker_count() <= self.pool.max_workers)
+
+    def test_worker_names_unique(self):
+        thread_names = []
+        for i in range(3):
+            done = threading.Event()
+
+            def call():
+                thread_names.append(threading.current_thread().getName())
+                done.set()
+
+            self.pool.submit(call)
+            done.wait(1.0)
+            self.pool.shutdown()
+        self.assertEqual(len(set(thread_names)), 3)
+
+    def test_bounded(self):
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def call():
+            started.release()
+            release.wait(1.0)
+
+        for i in range(5):
+            self.pool.submit(call)
+        started.acquire()
+        started.acquire()
+        self.assertEqual(self.pool.worker_count(), 2)
+        self.assertEqual(self.pool.queued_count(), 3)
+        release.set()
+
+    def test_exception(self):
+        def error():
+            raise Exception()
+
+        done = threading.Event()
+        self.pool.submit(error)
+        self.pool.submit(done.set)
+        done.wait(1.0)
+        self.assertTrue(done.isSet())
+
+    def test_shutdown(self):
+        results = []
+        for i in range(5):
+            self.pool.submit(results.append, i)
+        self.pool.shutdown()
+        self.assertEqual(sorted(results), range(5))
+        self.assertEqual(self.pool.worker_count(), 0)
@@ -13,7 +13,6 @@
 
 import smtplib
 import unittest
-import dummy_threading
 try:
     from email.parser import Parser
 except ImportError:
@@ -25,10 +24,22 @@ import mock
 from pulp.server.compat import json
 from pulp.server.config import config
 from pulp.server.event import data, mail
+from pulp.server.event.listeners import LISTENER_INDEX
 from pulp.server.managers import factory
 
 
+def deliver_now(description, call, *args, **kwargs):
+    # deliver in the calling thread instead of the delivery pool
+    call(*args, **kwargs)
+
+
 class TestSendEmail(unittest.TestCase):
+    def setUp(self):
+        mail._CONNECTIONS.clear()
+
+    def tearDown(self):
+        mail._CONNECTIONS.clear()
+
     @mock.patch('smtplib.SMTP')
     def test_basic(self, mock_smtp):
         # send a message
@@ -54,7 +65,9 @@ class TestSendEmail(unittest.TestCase):
     @mock.patch('logging.Logger.error')
     def test_connect_failure(self, mock_error, mock_smtp):
         mock_smtp.side_effect = smtplib.SMTPConnectError(123, 'aww crap')
-        mail._send_email('hello', 'stuff', 'someone@some.domain')
+        # raised so that the delivery is retried
+        self.assertRaises(smtplib.SMTPConnectError, mail._send_email,
+                          'hello', 'stuff', 'someone@some.domain')
         self.assertTrue(mock_error.called)
 
     @mock.patch('smtplib.SMTP')
@@ -64,9 +77,34 @@ class TestSendEmail(unittest.TestCase):
         mail._send_email('hello', 'stuff', 'someone@some.domain')
         self.assertTrue(mock_error.called)
 
+    @mock.patch('smtplib.SMTP')
+    def test_connection_reused(self, mock_smtp):
+        mail._send_email('hello', 'stuff', 'someone@some.domain')
+        mail._send_email('hello', 'stuff', 'someone.else@some.domain')
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        self.assertEqual(mock_smtp.return_value.sendmail.call_count, 2)
+
+    @mock.patch('smtplib.SMTP')
+    def test_reused_connection_disconnected(self, mock_smtp):
+        stale_connection = mock.Mock()
+        stale_connection.sendmail.side_effect = smtplib.SMTPServerDisconnected()
+        mail._CONNECTIONS.checkin((config.get('email', 'host'), config.getint('email', 'port')),
+                                  stale_connection)
+
+        mail._send_email('hello', 'stuff', 'someone@some.domain')
+
+        self.assertEqual(stale_connection.quit.call_count, 1)
+        self.assertEqual(mock_smtp.call_count, 1)
+        self.assertEqual(mock_smtp.return_value.sendmail.call_count, 1)
+
 
 class TestHandleEvent(unittest.TestCase):
+    def tearDown(self):
+        mail._CONNECTIONS.clear()
+
     def setUp(self):
+        mail._CONNECTIONS.clear()
         self.notifier_config = {
             'subject': 'hello',
             'addresses': ['user1@some.domain', 'user2@some.domain']
@@ -75,24 +113,25 @@ class TestHandleEvent(unittest.TestCase):
         self.event.payload = 'stuff'
         self.event.data.return_value = self.event.payload
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
+    # don't actually deliver in another thread
+    @mock.patch('pulp.server.event.delivery.deliver', new=deliver_now)
     @mock.patch('ConfigParser.SafeConfigParser.getboolean', return_value=False)
     @mock.patch('smtplib.SMTP')
     def test_email_disabled(self, mock_smtp, mock_getbool):
         mail.handle_event(self.notifier_config, self.event)
         self.assertFalse(mock_smtp.called)
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
+    # don't actually deliver in another thread
+    @mock.patch('pulp.server.event.delivery.deliver', new=deliver_now)
     @mock.patch('ConfigParser.SafeConfigParser.getboolean', return_value=True)
     @mock.patch('smtplib.SMTP')
     def test_email_enabled(self, mock_smtp, mock_getbool):
         mail.handle_event(self.notifier_config, self.event)
 
         #verify
-        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(mock_smtp.call_count, 1)
         mock_sendmail = mock_smtp.return_value.sendmail
+        self.assertEqual(mock_sendmail.call_count, 2)
         self.assertEqual(mock_sendmail.call_args[0][0],
             config.get('email', 'from'))
         self.assertTrue(mock_sendmail.call_args[0][1] in self.notifier_config['addresses'])
@@ -114,14 +153,21 @@ class TestSystem(unittest.TestCase):
             'addresses': ['user1@some.domain', 'user2@some.domain']
         }
         self.event_doc = {
+            '_id' : 'listener-1',
             'notifier_type_id' : mail.TYPE_ID,
             'event_types' : data.TYPE_REPO_SYNC_FINISHED,
             'notifier_config' : self.notifier_config,
         }
+        LISTENER_INDEX.invalidate()
+        mail._CONNECTIONS.clear()
+
+    def tearDown(self):
+        LISTENER_INDEX.invalidate()
+        mail._CONNECTIONS.clear()
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
-    # mock qpid, because it freaks out over dummy_threading
+    # don't actually deliver in another thread
+    @mock.patch('pulp.server.event.delivery.deliver', new=deliver_now)
+    # mock qpid, so that no connection to a broker is made
     @mock.patch('pulp.server.managers.event.remote.TopicPublishManager')
     # don't actually get anything from the dispatch system
     @mock.patch('pulp.server.event.data.Event._get_call_report', return_value=None)
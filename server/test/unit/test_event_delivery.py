@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import threading
+import time
+import unittest
+
+import mock
+
+from pulp.server.event.delivery import ConnectionPool, NotificationDeliveryPool
+
+
+class NotificationDeliveryPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = NotificationDeliveryPool(2, 4, 0.1, 3, 0.01)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def wait_for(self, counter, value):
+        deadline = time.time() + 1.0
+        while self.pool.counters()[counter] < value and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_deliver(self):
+        call = mock.Mock()
+        self.assertTrue(self.pool.deliver('test', call, 1, key='value'))
+        self.wait_for('delivered', 1)
+        call.assert_called_once_with(1, key='value')
+        counters = self.pool.counters()
+        self.assertEqual(counters['queued'], 1)
+        self.assertEqual(counters['delivered'], 1)
+        self.assertEqual(counters['pending'], 0)
+
+    def test_retry(self):
+        call = mock.Mock(side_effect=[Exception(), None])
+        self.pool.deliver('test', call)
+        self.wait_for('delivered', 1)
+        self.assertEqual(call.call_count, 2)
+        counters = self.pool.counters()
+        self.assertEqual(counters['retried'], 1)
+        self.assertEqual(counters['delivered'], 1)
+        self.assertEqual(counters['failed'], 0)
+
+    def test_failed(self):
+        call = mock.Mock(side_effect=Exception())
+        self.pool.deliver('test', call)
+        self.wait_for('failed', 1)
+        self.assertEqual(call.call_count, 3)
+        counters = self.pool.counters()
+        self.assertEqual(counters['retried'], 2)
+        self.assertEqual(counters['failed'], 1)
+        self.assertEqual(counters['pending'], 0)
+
+    def test_rejected_when_full(self):
+        release = threading.Event()
+
+        def call():
+            release.wait(1.0)
+
+        for i in range(4):
+            self.assertTrue(self.pool.deliver('test', call))
+        self.assertFalse(self.pool.deliver('test', call))
+        release.set()
+        self.wait_for('delivered', 4)
+        counters = self.pool.counters()
+        self.assertEqual(counters['queued'], 4)
+        self.assertEqual(counters['rejected'], 1)
+        self.assertEqual(counters['delivered'], 4)
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.close = mock.Mock()
+        self.pool = ConnectionPool(self.close, idle_timeout=60)
+
+    def test_checkout_new(self):
+        connection, reused = self.pool.checkout('endpoint', lambda: 'connection')
+        self.assertEqual(connection, 'connection')
+        self.assertFalse(reused)
+
+    def test_checkout_reused(self):
+        self.pool.checkin('endpoint', 'connection')
+        connection, reused = self.pool.checkout('endpoint', lambda: 'new')
+        self.assertEqual(connection, 'connection')
+        self.assertTrue(reused)
+        connection, reused = self.pool.checkout('endpoint', lambda: 'new')
+        self.assertEqual(connection, 'new')
+
+    def test_checkout_other_endpoint(self):
+        self.pool.checkin('endpoint', 'connection')
+        connection, reused = self.pool.checkout('other', lambda: 'new')
+        self.assertEqual(connection, 'new')
+
+    def test_checkout_expired(self):
+        self.pool.idle_timeout = 0
+        self.pool.checkin('endpoint', 'connection')
+        time.sleep(0.01)
+        connection, reused = self.pool.checkout('endpoint', lambda: 'new')
+        self.assertEqual(connection, 'new')
+        self.close.assert_called_once_with('connection')
+
+    def test_clear(self):
+        self.pool.checkin('endpoint', 'connection')
+        self.pool.clear()
+        self.close.assert_called_once_with('connection')
+        connection, reused = self.pool.checkout('endpoint', lambda: 'new')
+        self.assertEqual(connection, 'new')
@@ -17,6 +17,7 @@ import mock
 from pulp.server.db.model.event import EventListener
 from pulp.server.event import notifiers
 from pulp.server.event import data as event_data
+from pulp.server.event.listeners import LISTENER_INDEX
 from pulp.server.managers import factory as manager_factory
 
 
@@ -32,6 +33,7 @@ class EventFireManagerTests(base.PulpAsyncServerTests):
         super(EventFireManagerTests, self).tearDown()
 
         EventListener.get_collection().remove()
+        LISTENER_INDEX.invalidate()
         notifiers.reset()
 
     # -- plumbing tests -------------------------------------------------------
@@ -84,6 +86,23 @@ class EventFireManagerTests(base.PulpAsyncServerTests):
         # Verify
         self.assertEqual(1, notifier_1.fire.call_count)
 
+    def test_do_fire_with_star_and_type(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED, '*'])
+
+        # Test
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(1, notifier_1.fire.call_count)
+
     def test_do_fire_with_exception(self):
         # Setup
         notifiers.NOTIFIER_FUNCTIONS.clear()
@@ -117,6 +136,48 @@ class EventFireManagerTests(base.PulpAsyncServerTests):
         self.assertEqual({'2' : '2'}, notifier_2.fire.call_args[0][0])
         self.assertEqual(event, notifier_2.fire.call_args[0][1])
 
+    def test_do_fire_listeners_cached(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        with mock.patch('pulp.server.db.model.event.EventListener.get_collection') as mock_get:
+            self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(0, mock_get.call_count)
+        self.assertEqual(2, notifier_1.fire.call_count)
+
+    def test_do_fire_listener_changes(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        listener = self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        self.event_manager.update(listener['_id'], event_types=[event_data.TYPE_REPO_SYNC_FINISHED])
+        self.manager._do_fire(event)
+        self.manager._do_fire(event_data.Event(event_data.TYPE_REPO_SYNC_FINISHED, 'payload'))
+        self.event_manager.delete(listener['_id'])
+        self.manager._do_fire(event_data.Event(event_data.TYPE_REPO_SYNC_FINISHED, 'payload'))
+
+        # Verify
+        self.assertEqual(2, notifier_1.fire.call_count)
+        self.assertEqual(event_data.TYPE_REPO_SYNC_FINISHED,
+                         notifier_1.fire.call_args[0][1].event_type)
+
     # -- event format tests ---------------------------------------------------
 
     def test_fire_repo_sync_started(self):
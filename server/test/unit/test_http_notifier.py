@@ -25,6 +25,14 @@ import base
 
 class TestHTTPNotifierTests(base.PulpAsyncServerTests):
 
+    def setUp(self):
+        super(TestHTTPNotifierTests, self).setUp()
+        http._CONNECTIONS.clear()
+
+    def tearDown(self):
+        super(TestHTTPNotifierTests, self).tearDown()
+        http._CONNECTIONS.clear()
+
     @mock.patch('pulp.server.event.http._create_connection')
     def test_handle_event(self, mock_create):
         # Setup
@@ -90,6 +98,42 @@ class TestHTTPNotifierTests(base.PulpAsyncServerTests):
         self.assertEqual(1, mock_create.call_count)
         self.assertEqual(1, mock_connection.request.call_count)
 
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_server_error(self, mock_create):
+        mock_connection = mock_create.return_value
+        mock_connection.getresponse.return_value.status = httplib.SERVICE_UNAVAILABLE
+
+        # raised so that the post is retried
+        self.assertRaises(http.ServerError, http._send_post,
+                          {'url' : 'https://localhost/api/'}, '{}')
+        self.assertEqual(1, mock_connection.close.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_connection_reused(self, mock_create):
+        mock_connection = mock_create.return_value
+        mock_connection.getresponse.return_value.status = httplib.OK
+        mock_connection.getresponse.return_value.will_close = False
+
+        http._send_post({'url' : 'https://localhost/api/'}, '{}')
+        http._send_post({'url' : 'https://localhost/api/'}, '{}')
+
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(2, mock_connection.request.call_count)
+        self.assertEqual(0, mock_connection.close.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_reused_connection_closed(self, mock_create):
+        stale_connection = mock.Mock()
+        stale_connection.request.side_effect = httplib.BadStatusLine('')
+        http._CONNECTIONS.checkin(('https:', 'localhost'), stale_connection)
+        mock_create.return_value.getresponse.return_value.status = httplib.OK
+
+        http._send_post({'url' : 'https://localhost/api/'}, '{}')
+
+        self.assertEqual(1, stale_connection.close.call_count)
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(1, mock_create.return_value.request.call_count)
+
     @mock.patch('pulp.server.event.http._create_connection')
     def test_handle_event_missing_url(self, mock_create):
         # Test
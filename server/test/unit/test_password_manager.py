@@ -12,9 +12,12 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import mock
+
 import base
 
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.auth import password
 
 class PasswordManagerTests(base.PulpServerTests):
     def setUp(self):
@@ -35,3 +38,48 @@ class PasswordManagerTests(base.PulpServerTests):
         password = "some password"
         hashed = self.password_manager.hash_password(password)
         self.assertTrue(self.password_manager.check_password(hashed, password))
+
+    def test_check_password_wrong(self):
+        hashed = self.password_manager.hash_password("some password")
+        self.assertFalse(self.password_manager.check_password(hashed, "other password"))
+
+    def test_check_password_unicode(self):
+        hashed = self.password_manager.hash_password(u"p\xe4ssword")
+        self.assertTrue(self.password_manager.check_password(hashed, u"p\xe4ssword"))
+
+    def test_check_password_legacy(self):
+        # entries hashed before the switch to PBKDF2 are still accepted
+        salt = self.password_manager.random_bytes(8)
+        hashed = self.password_manager.pbkdf_sha256("some password", salt, password.NUM_ITERATIONS)
+        entry = salt.encode("base64").strip() + "," + hashed.encode("base64").strip()
+
+        self.assertTrue(self.password_manager.check_password(entry, "some password"))
+        self.assertFalse(self.password_manager.check_password(entry, "other password"))
+        self.assertTrue(self.password_manager.needs_rehash(entry))
+
+    def test_needs_rehash(self):
+        hashed = self.password_manager.hash_password("some password")
+        self.assertFalse(self.password_manager.needs_rehash(hashed))
+
+    @mock.patch('pulp.server.managers.auth.password.PBKDF2_NATIVE', False)
+    def test_hash_password_no_native_pbkdf2(self):
+        hashed = self.password_manager.hash_password(u"p\xe4ssword")
+
+        self.assertFalse(hashed.startswith(password.PBKDF2_PREFIX))
+        self.assertTrue(self.password_manager.check_password(hashed, u"p\xe4ssword"))
+        self.assertFalse(self.password_manager.needs_rehash(hashed))
+
+    @mock.patch('pulp.server.managers.auth.password.PBKDF2_NATIVE', False)
+    def test_check_password_no_native_pbkdf2(self):
+        # PBKDF2 entries written by another server are still accepted
+        with mock.patch('pulp.server.managers.auth.password.PBKDF2_NATIVE', True):
+            hashed = self.password_manager.hash_password("some password")
+
+        self.assertTrue(self.password_manager.check_password(hashed, "some password"))
+        self.assertFalse(self.password_manager.needs_rehash(hashed))
+
+    def test_pure_pbkdf2_hmac(self):
+        # RFC 7914 PBKDF2-HMAC-SHA256 test vector
+        expected = '55ac046e56e3089fec1691c22544b605f94185216dde0465e68b9d57c20dacbc'
+        result = password._pure_pbkdf2_hmac('sha256', 'passwd', 'salt', 1)
+        self.assertEqual(result.encode('hex'), expected)
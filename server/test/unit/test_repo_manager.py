@@ -21,7 +21,7 @@ import base
 from pulp.common.util import encode_unicode
 from pulp.devel import mock_plugins
 from pulp.plugins.loader import api as plugin_api
-from pulp.server.db.model.repository import Repo, RepoImporter, RepoDistributor
+from pulp.server.db.model.repository import Repo, RepoImporter, RepoDistributor, RepoContentUnit
 import pulp.server.managers.repo.cud as repo_manager
 import pulp.server.managers.factory as manager_factory
 import pulp.server.managers.repo._common as common_utils
@@ -50,6 +50,7 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         Repo.get_collection().remove()
         RepoImporter.get_collection().remove()
         RepoDistributor.get_collection().remove()
+        RepoContentUnit.get_collection().remove()
 
     @mock.patch('pulp.server.db.model.repository.Repo.get_collection')
     @mock.patch('pulp.server.db.model.repository.RepoContentUnit.get_collection')
@@ -57,23 +58,28 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         # platform migration 0004 has a test for this that uses live data
 
         repo_col = mock_get_repo_col.return_value
-        find = mock_get_assoc_col.return_value.find
-        cursor = find.return_value
-        cursor.distinct.return_value = ['rpm', 'srpm']
-        cursor.count.return_value = 6
-
-        self.manager.rebuild_content_unit_counts(['repo1'])
-
-        # once to get the type_ids, then once more for each of the 2 types
-        self.assertEqual(find.call_count, 3)
-        find.assert_any_call({'repo_id': 'repo1'})
-        find.assert_any_call({'repo_id': 'repo1', 'unit_type_id': 'rpm'})
-        find.assert_any_call({'repo_id': 'repo1', 'unit_type_id': 'srpm'})
-
-        self.assertEqual(repo_col.update.call_count, 1)
+        repo_col.find.return_value = [{'id': 'repo1', 'content_unit_counts': {'rpm': 6}}]
+        aggregate = mock_get_assoc_col.return_value.aggregate
+        aggregate.return_value = {'result': [
+            {'_id': {'repo_id': 'repo1', 'unit_type_id': 'rpm'}, 'count': 6},
+            {'_id': {'repo_id': 'repo1', 'unit_type_id': 'srpm'}, 'count': 6},
+        ]}
+
+        drift = self.manager.rebuild_content_unit_counts(['repo1'])
+
+        # a single aggregation for all of the repos
+        self.assertEqual(aggregate.call_count, 1)
+        pipeline = aggregate.call_args[0][0]
+        self.assertEqual(pipeline[0], {'$match': {'repo_id': {'$in': ['repo1']}}})
+        repo_col.find.assert_called_once_with({'id': {'$in': ['repo1']}},
+                                              fields=['id', 'content_unit_counts'])
+
+        self.assertEqual(drift, {'repo1': {'stored': {'rpm': 6},
+                                           'actual': {'rpm': 6, 'srpm': 6}}})
         repo_col.update.assert_called_once_with(
             {'id': 'repo1'},
-            {'$set': {'content_unit_counts': {'rpm':6, 'srpm': 6}}},
+            {'$set': {'content_unit_counts': {'rpm':6, 'srpm': 6}},
+             '$inc': {'content_versions.srpm': 1, 'content_version': 1}},
             safe=True
         )
 
@@ -81,18 +87,45 @@ class RepoManagerTests(base.PulpAsyncServerTests):
     @mock.patch('pulp.server.db.model.repository.RepoContentUnit.get_collection')
     def test_rebuild_default_all_repos(self, mock_get_assoc_col, mock_get_repo_col):
         repo_col = mock_get_repo_col.return_value
-        repo_col.find.return_value = [{'id': 'repo1'}, {'id': 'repo2'}]
+        repo_col.find.return_value = [{'id': 'repo1', 'content_unit_counts': {'rpm': 0}},
+                                      {'id': 'repo2', 'content_unit_counts': {'rpm': 2}}]
 
         assoc_col = mock_get_assoc_col.return_value
-        # don't return any type IDs
-        assoc_col.find.return_value.distinct.return_value = []
+        # repo2 lost all of its units
+        assoc_col.aggregate.return_value = {'result': []}
+
+        drift = self.manager.rebuild_content_unit_counts()
+
+        # no $match stage restricting the aggregation to some repos
+        pipeline = assoc_col.aggregate.call_args[0][0]
+        self.assertEqual(len(pipeline), 1)
+        self.assertTrue('$group' in pipeline[0])
+        repo_col.find.assert_called_once_with({}, fields=['id', 'content_unit_counts'])
+
+        # repo1's zero count is correct and is left alone
+        self.assertEqual(drift.keys(), ['repo2'])
+        repo_col.update.assert_called_once_with(
+            {'id': 'repo2'},
+            {'$set': {'content_unit_counts': {}},
+             '$inc': {'content_versions.rpm': 1, 'content_version': 1}},
+            safe=True
+        )
+
+    @mock.patch('pulp.server.db.model.repository.Repo.get_collection')
+    @mock.patch('pulp.server.db.model.repository.RepoContentUnit.get_collection')
+    def test_rebuild_verify(self, mock_get_assoc_col, mock_get_repo_col):
+        repo_col = mock_get_repo_col.return_value
+        repo_col.find.return_value = [{'id': 'repo1', 'content_unit_counts': {'rpm': 3}},
+                                      {'id': 'repo2', 'content_unit_counts': {'rpm': 1}}]
+        mock_get_assoc_col.return_value.aggregate.return_value = {'result': [
+            {'_id': {'repo_id': 'repo1', 'unit_type_id': 'rpm'}, 'count': 3},
+            {'_id': {'repo_id': 'repo2', 'unit_type_id': 'rpm'}, 'count': 4},
+        ]}
 
-        self.manager.rebuild_content_unit_counts()
+        drift = self.manager.rebuild_content_unit_counts(verify=True)
 
-        # makes sure it found these 2 repos and tried to operate on them
-        assoc_col.find.assert_any_call({'repo_id': 'repo1'})
-        assoc_col.find.assert_any_call({'repo_id': 'repo2'})
-        self.assertEqual(assoc_col.find.call_count, 2)
+        self.assertEqual(drift, {'repo2': {'stored': {'rpm': 1}, 'actual': {'rpm': 4}}})
+        self.assertEqual(repo_col.update.call_count, 0)
 
     def test_create(self):
         """
@@ -336,6 +369,71 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         repos = list(Repo.get_collection().find({'id' : id}))
         self.assertEqual(0, len(repos))
 
+    @mock.patch('pulp.server.dispatch.context.CONTEXT')
+    @mock.patch.object(repo_manager, 'REPO_DELETE_BATCH_SIZE', 2)
+    def test_delete_repo_batched(self, mock_context):
+        """
+        Tests that a repo's associations and working directory are removed in
+        pieces with the progress reported.
+        """
+
+        # Setup
+        self.manager.create_repo('doomed')
+        self.manager.create_repo('spared')
+        for repo_id in ('doomed', 'spared'):
+            for i in range(5):
+                association = RepoContentUnit(repo_id, 'unit-%d' % i, 'mock-type',
+                                              RepoContentUnit.OWNER_TYPE_USER, 'admin')
+                RepoContentUnit.get_collection().save(association, safe=True)
+
+        repo_working_dir = common_utils.repository_working_dir('doomed')
+        for name in ('importer', 'distributor'):
+            os.makedirs(os.path.join(repo_working_dir, name, 'nested'))
+
+        # Test
+        self.manager.delete_repo('doomed')
+
+        # Verify
+        self.assertEqual(0, RepoContentUnit.get_collection().find({'repo_id' : 'doomed'}).count())
+        self.assertEqual(5, RepoContentUnit.get_collection().find({'repo_id' : 'spared'}).count())
+        self.assertEqual(None, Repo.get_collection().find_one({'id' : 'doomed'}))
+        self.assertFalse(os.path.exists(repo_working_dir))
+        self.assertEqual([], [n for n in os.listdir(os.path.dirname(repo_working_dir))
+                              if n.startswith('doomed')])
+
+        progress = mock_context.report_progress.call_args[0][0]
+        self.assertEqual(progress['associations_removed'], 5)
+        self.assertEqual(progress['directories_removed'], 2)
+        self.assertEqual(progress['directories_total'], 2)
+
+    @mock.patch('pulp.server.dispatch.context.CONTEXT')
+    def test_delete_repo_interrupted(self, mock_context):
+        """
+        Tests that the working directory moved aside by an interrupted delete
+        is removed when the delete is run again.
+        """
+
+        # Setup
+        self.manager.create_repo('doomed')
+        repo_working_dir = common_utils.repository_working_dir('doomed')
+        leftover_dir = repo_working_dir + '.deleted-1234'
+        os.makedirs(os.path.join(leftover_dir, 'importer'))
+        spared_dir = common_utils.repository_working_dir('spared') + '.deleted-1234'
+        os.makedirs(spared_dir)
+
+        # Test
+        self.manager.delete_repo('doomed')
+
+        # Verify
+        self.assertFalse(os.path.exists(repo_working_dir))
+        self.assertFalse(os.path.exists(leftover_dir))
+        self.assertTrue(os.path.exists(spared_dir))
+        os.rmdir(spared_dir)
+
+        progress = mock_context.report_progress.call_args[0][0]
+        self.assertEqual(progress['directories_removed'], 1)
+        self.assertEqual(progress['directories_total'], 1)
+
     def test_delete_repo_no_repo(self):
         """
         Tests that deleting a repo that doesn't exist raises the appropriate error.
@@ -582,7 +680,10 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         ARGS = ('repo-123', 'rpm', 7)
 
         self.manager.update_unit_count(*ARGS)
-        mock_update.assert_called_once_with({'id': 'repo-123'}, {'$inc': {'content_unit_counts.rpm': 7}}, safe=True)
+        expected_increments = {'content_unit_counts.rpm': 7,
+                               'content_versions.rpm': 1,
+                               'content_version': 1}
+        mock_update.assert_called_once_with({'id': 'repo-123'}, {'$inc': expected_increments}, safe=True)
 
     def test_update_unit_count_with_db(self):
         """
@@ -600,6 +701,27 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         self.manager.update_unit_count(REPO_ID, 'rpm', 3)
         repo = Repo.get_collection().find_one({'id' : REPO_ID})
         self.assertEqual(repo['content_unit_counts']['rpm'], 3)
+        self.assertEqual(repo['content_versions'], {'rpm': 1})
+        self.assertEqual(repo['content_version'], 1)
+
+    def test_update_content_version_with_db(self):
+        REPO_ID = 'repo-123'
+        self.manager.create_repo(REPO_ID)
+        repo = Repo.get_collection().find_one({'id' : REPO_ID})
+        self.assertEqual(repo['content_versions'], {})
+        self.assertEqual(repo['content_version'], 0)
+
+        self.manager.update_content_version(REPO_ID, ['rpm', 'erratum'])
+        self.manager.update_content_version(REPO_ID, ['rpm'])
+        repo = Repo.get_collection().find_one({'id' : REPO_ID})
+        self.assertEqual(repo['content_versions'], {'rpm': 2, 'erratum': 1})
+        self.assertEqual(repo['content_version'], 2)
+        self.assertEqual(repo['content_unit_counts'], {})
+
+    @mock.patch.object(Repo, 'get_collection')
+    def test_update_content_version_no_types(self, mock_get_collection):
+        self.manager.update_content_version('repo-123', [])
+        self.assertFalse(mock_get_collection.return_value.update.called)
 
 
 class UtilityMethodsTests(unittest.TestCase):
@@ -19,6 +19,7 @@ from pulp.devel import mock_plugins
 from pulp.plugins.conduits.mixins import ImporterConduitException
 from pulp.plugins.conduits.repo_sync import RepoSyncConduit
 from pulp.plugins.model import SyncReport
+from pulp.server.db import resource_versions
 import pulp.plugins.types.database as types_database
 import pulp.plugins.types.model as types_model
 from pulp.server.db.model.repository import Repo, RepoContentUnit
@@ -104,6 +105,60 @@ class RepoSyncConduitTests(base.PulpServerTests):
         db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_1.id)
         self.assertTrue(db_unit is not None)
 
+    def test_save_remove_units(self):
+        """
+        Tests saving and removing units in bulk through the conduit.
+        """
+
+        # Setup
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {}, '/foo/bar')
+                 for i in range(0, 3)]
+        units.append(self.conduit.init_unit(TYPE_2_DEF.id, {'key-2a' : 'a', 'key-2b' : 'b'}, {}, '/foo/bar'))
+
+        # Test - save_units
+        self.conduit.save_units(units)
+
+        #   Verify
+        associated_units = list(RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}))
+        self.assertEqual(4, len(associated_units))
+        repo = Repo.get_collection().find_one({'id' : 'repo-1'})
+        self.assertEqual(repo['content_unit_counts'], {TYPE_1_DEF.id : 3, TYPE_2_DEF.id : 1})
+
+        # Test - remove_units
+        self.conduit.remove_units(self.conduit.get_units())
+
+        #   Verify
+        associated_units = list(RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}))
+        self.assertEqual(0, len(associated_units))
+        repo = Repo.get_collection().find_one({'id' : 'repo-1'})
+        self.assertEqual(repo['content_unit_counts'], {TYPE_1_DEF.id : 0, TYPE_2_DEF.id : 0})
+
+        report = self.conduit.build_success_report('summary', 'details')
+        self.assertEqual(4, report.added_count)
+        self.assertEqual(4, report.removed_count)
+
+    def test_save_units_records_changes_once(self):
+        """
+        Tests that saving units does not change the resource versions until
+        the changes made through the conduit are recorded.
+        """
+
+        # Setup
+        resources = [resource_versions.CONTENT_UNITS, resource_versions.repository('repo-1')]
+        versions = resource_versions.get_versions(resources)
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {}, '/foo/bar')
+                 for i in range(0, 3)]
+
+        # Test
+        for unit in units:
+            self.conduit.save_unit(unit)
+        self.assertEqual(resource_versions.get_versions(resources), versions)
+
+        self.conduit._record_changes()
+
+        # Verify
+        self.assertNotEqual(resource_versions.get_versions(resources)[0], versions[0])
+
     def test_build_reports(self):
         """
         Tests that the conduit correctly inserts the count values into the report.
@@ -153,3 +208,12 @@ class RepoSyncConduitTests(base.PulpServerTests):
 
         # Test
         self.assertRaises(ImporterConduitException, self.conduit.remove_unit, None)
+
+    def test_remove_units_with_error(self):
+        # Setup
+        self.conduit._association_manager = mock.Mock()
+        self.conduit._association_manager.unassociate_all_by_ids.side_effect = Exception()
+        unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_1'}, {}, '/foo/bar')
+
+        # Test
+        self.assertRaises(ImporterConduitException, self.conduit.remove_units, [unit])
@@ -448,6 +448,47 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
 
         mock_call.assert_called_once_with(self.repo_id, 'type-1', 2)
 
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_existing(self, mock_call):
+        """
+        Tests that existing associations are neither duplicated nor counted.
+        """
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'foo', OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'bar', OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        self.manager.associate_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'baz'], OWNER_TYPE_USER, 'admin')
+
+        # Only baz is new to the repo; bar gains a second association
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', 1)
+
+        unit_coll = RepoContentUnit.get_collection()
+        spec = {'repo_id' : self.repo_id, 'owner_id' : 'admin'}
+        associated = sorted(a['unit_id'] for a in unit_coll.find(spec))
+        self.assertEqual(associated, ['bar', 'baz', 'foo'])
+        self.assertEqual(4, unit_coll.find({'repo_id' : self.repo_id}).count())
+
+    @mock.patch('pulp.server.managers.repo.unit_association.ASSOCIATION_BATCH_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_batches(self, mock_call):
+        """
+        Tests that units spanning several batches are all associated and the
+        count is only updated once.
+        """
+        IDS = ['unit-%d' % i for i in range(5)]
+
+        self.manager.associate_all_by_ids(
+            self.repo_id, 'type-1', IDS, OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', 5)
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(5, unit_coll.find({'repo_id' : self.repo_id}).count())
+
+    def test_associate_all_invalid_owner_type(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.associate_all_by_ids,
+                          self.repo_id, 'type-1', ['unit-1'], 'bad-owner', 'irrelevant')
+
     def test_unassociate_all(self):
         """
         Tests unassociating multiple units in a single call.
@@ -508,6 +549,20 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
             self.repo_id, 'type-1', 'unit-1', OWNER_TYPE_USER, 'admin1')
         self.assertEqual(mock_call.call_count, 1) # only once for the associates
 
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_unassociate_all_non_unique(self, mock_call):
+        self.manager.associate_all_by_ids(self.repo_id, self.unit_type_id, [self.unit_id, self.unit_id_2],
+                                          OWNER_TYPE_USER, 'admin1')
+        self.manager.associate_unit_by_id(self.repo_id, self.unit_type_id, self.unit_id,
+                                          OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        self.manager.unassociate_all_by_ids(self.repo_id, self.unit_type_id, [self.unit_id, self.unit_id_2],
+                                            OWNER_TYPE_USER, 'admin1')
+
+        # unit_id is still associated by admin2, so only unit_id_2 is counted
+        mock_call.assert_called_once_with(self.repo_id, self.unit_type_id, -1)
+
     @mock.patch('pymongo.cursor.Cursor.count', return_value=1)
     def test_association_exists_true(self, mock_count):
         self.assertTrue(self.manager.association_exists(self.repo_id, 'unit-1', 'type-1'))
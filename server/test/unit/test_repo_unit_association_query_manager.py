@@ -22,6 +22,7 @@ from pulp.common import dateutils
 from pulp.plugins.types import database, model
 from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.exceptions import InvalidValue
 import pulp.server.managers.repo.unit_association as association_manager
 from pulp.server.managers.repo.unit_association import OWNER_TYPE_USER, OWNER_TYPE_IMPORTER
 import pulp.server.managers.repo.unit_association_query as association_query_manager
@@ -611,6 +612,102 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         for u in units:
             self.assertTrue(u['metadata']['key_1'] != 'aardvark')
 
+    # -- keyset pagination tests ----------------------------------------------
+
+    def _all_pages(self, get_page, *args, **kwargs):
+        pages = []
+        page_token = None
+        while True:
+            units, page_token = get_page(*args, page_token=page_token, **kwargs)
+            pages.append(units)
+            if page_token is None:
+                return pages
+
+    def test_get_units_page(self):
+        # Test
+        criteria = UnitAssociationCriteria(limit=4)
+        units, page_token = self.manager.get_units_across_types_page('repo-1', criteria)
+
+        # Verify
+        self.assertEqual(4, len(units))
+        self.assertTrue(page_token is not None)
+        for u in units:
+            self._assert_unit_integrity(u)
+
+    def test_get_units_page_all_pages(self):
+        # Test
+        criteria = UnitAssociationCriteria(limit=3)
+        pages = self._all_pages(self.manager.get_units_across_types_page, 'repo-1', criteria)
+
+        # Verify
+        units = [u for page in pages for u in page]
+        self.assertEqual(self.repo_1_count, len(units))
+        self.assertEqual(len(units), len(set(u['_id'] for u in units)))
+        self._assert_default_sort(units)
+
+        # The same order as the default association sort
+        sort = [('unit_type_id', association_query_manager.SORT_ASCENDING),
+                ('created', association_query_manager.SORT_ASCENDING)]
+        criteria = UnitAssociationCriteria(association_sort=sort)
+        expected = self.manager.get_units_across_types('repo-1', criteria)
+        self.assertEqual([(u['unit_type_id'], u['created']) for u in expected],
+                         [(u['unit_type_id'], u['created']) for u in units])
+
+    def test_get_units_page_descending_sort(self):
+        # Test
+        sort = [('created', association_query_manager.SORT_DESCENDING)]
+        criteria = UnitAssociationCriteria(association_sort=sort, limit=2)
+        pages = self._all_pages(self.manager.get_units_across_types_page, 'repo-1', criteria)
+
+        # Verify
+        units = [u for page in pages for u in page]
+        self.assertEqual(self.repo_1_count, len(units))
+        for i in range(0, len(units) - 1):
+            self.assertTrue(units[i]['created'] >= units[i+1]['created'])
+
+    def test_get_units_page_remove_duplicates(self):
+        # Test
+        criteria = UnitAssociationCriteria(remove_duplicates=True, limit=1)
+        pages = self._all_pages(self.manager.get_units_across_types_page, 'repo-1', criteria)
+
+        # Verify
+        units = [u for page in pages for u in page]
+        self.assertEqual(self.repo_1_count_no_dupes, len(units))
+        non_user_gamma_units = [u for u in units if u['unit_type_id'] == 'gamma' and u['owner_type'] != OWNER_TYPE_USER]
+        self.assertEqual(0, len(non_user_gamma_units))
+
+    def test_get_units_by_type_page_unit_filters(self):
+        # Test
+        criteria = UnitAssociationCriteria(unit_filters={'md_2': 0}, limit=1)
+        pages = self._all_pages(self.manager.get_units_by_type_page, 'repo-1', 'beta', criteria)
+
+        # Verify
+        units = [u for page in pages for u in page]
+        self.assertEqual(2, len(units))
+        for u in units:
+            self.assertEqual('beta', u['unit_type_id'])
+            self.assertEqual(0, u['metadata']['md_2'])
+
+    def test_get_units_page_no_count_queries(self):
+        # Setup
+        self.manager._associated_units_cursors_with_skip = mock.Mock()
+        self.manager._associated_units_cursors_with_limit = mock.Mock()
+
+        # Test
+        self._all_pages(self.manager.get_units_across_types_page, 'repo-1', UnitAssociationCriteria(limit=2))
+
+        # Verify
+        self.assertEqual(0, self.manager._associated_units_cursors_with_skip.call_count)
+        self.assertEqual(0, self.manager._associated_units_cursors_with_limit.call_count)
+
+    def test_get_units_page_invalid(self):
+        self.assertRaises(InvalidValue, self.manager.get_units_page, 'repo-1',
+                          UnitAssociationCriteria(skip=1))
+        self.assertRaises(InvalidValue, self.manager.get_units_page, 'repo-1',
+                          UnitAssociationCriteria(unit_sort=[('md_1', 1)]))
+        self.assertRaises(InvalidValue, self.manager.get_units_page, 'repo-1',
+                          page_token='not a token')
+
     def test_criteria_str(self):
         # Setup
         c1 = UnitAssociationCriteria()
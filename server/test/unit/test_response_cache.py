@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import base
+
+from pulp.server.compat import json
+from pulp.server.db import resource_versions
+from pulp.server.db.model.repository import Repo
+from pulp.server.managers import factory as manager_factory
+from pulp.server.webservices.response_cache import ResponseCache, RESPONSE_CACHE
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(max_entries=2, max_body_size=10)
+
+    def test_entity_tag(self):
+        etag = self.cache.entity_tag(['repositories'], ['1'], '/v2/repositories/')
+        self.assertEqual(etag, self.cache.entity_tag(['repositories'], ['1'], '/v2/repositories/'))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertNotEqual(etag, self.cache.entity_tag(['repositories'], ['2'], '/v2/repositories/'))
+        self.assertNotEqual(etag, self.cache.entity_tag(['repositories'], [None], '/v2/repositories/'))
+        self.assertNotEqual(etag, self.cache.entity_tag(['repositories'], ['1'],
+                                                        '/v2/repositories/?details=true'))
+
+    def test_get_put(self):
+        self.assertEqual(self.cache.get('"a"'), None)
+        self.cache.put('"a"', '[]')
+        self.assertEqual(self.cache.get('"a"'), '[]')
+        self.assertEqual(self.cache.statistics(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+    def test_least_recently_used(self):
+        self.cache.put('"a"', '1')
+        self.cache.put('"b"', '2')
+        self.cache.get('"a"')
+        self.cache.put('"c"', '3')
+        self.assertEqual(self.cache.get('"a"'), '1')
+        self.assertEqual(self.cache.get('"b"'), None)
+        self.assertEqual(self.cache.get('"c"'), '3')
+
+    def test_max_body_size(self):
+        self.cache.put('"a"', '[' + '1,' * 10 + '1]')
+        self.assertEqual(self.cache.get('"a"'), None)
+
+    def test_disabled(self):
+        self.cache.max_entries = 0
+        self.cache.put('"a"', '[]')
+        self.assertEqual(self.cache.get('"a"'), None)
+        self.assertEqual(list(self.cache.put_chunks('"b"', ['[', ']'])), ['[', ']'])
+        self.assertEqual(self.cache.get('"b"'), None)
+
+    def test_put_chunks(self):
+        chunks = self.cache.put_chunks('"a"', iter(['[1', ',2', ']']))
+        self.assertEqual(self.cache.get('"a"'), None)
+        self.assertEqual(list(chunks), ['[1', ',2', ']'])
+        self.assertEqual(self.cache.get('"a"'), '[1,2]')
+
+    def test_put_chunks_too_large(self):
+        body = ['[1', ',2', ',3', ',4', ',5', ',6', ']']
+        self.assertEqual(list(self.cache.put_chunks('"a"', body)), body)
+        self.assertEqual(self.cache.get('"a"'), None)
+
+    def test_clear(self):
+        self.cache.put('"a"', '[]')
+        self.cache.clear()
+        self.assertEqual(self.cache.get('"a"'), None)
+
+
+class ConditionalRequestTests(base.PulpWebserviceTests):
+
+    def setUp(self):
+        super(ConditionalRequestTests, self).setUp()
+        self.repo_manager = manager_factory.repo_manager()
+
+    def clean(self):
+        super(ConditionalRequestTests, self).clean()
+        Repo.get_collection().remove(safe=True)
+
+    def _get(self, uri, etag=None):
+        headers = dict(base.PulpWebserviceTests.HEADERS)
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        return base.PulpWebserviceTests.TEST_APP.get('http://localhost' + uri, headers=headers,
+                                                      expect_errors=True)
+
+    def test_not_modified(self):
+        self.repo_manager.create_repo('repo-1')
+
+        response = self._get('/v2/repositories/')
+        self.assertEqual(response.status, 200)
+        etag = response.header('ETag')
+
+        response = self._get('/v2/repositories/', etag)
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.body, '')
+        self.assertEqual(response.header('ETag'), etag)
+
+        # a different representation of the resource has another tag
+        response = self._get('/v2/repositories/?details=true', etag)
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.header('ETag'), etag)
+
+    def test_modified(self):
+        response = self._get('/v2/repositories/')
+        etag = response.header('ETag')
+
+        self.repo_manager.create_repo('repo-1')
+
+        response = self._get('/v2/repositories/', etag)
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.header('ETag'), etag)
+        self.assertEqual([r['id'] for r in json.loads(response.body)], ['repo-1'])
+
+    def test_cached(self):
+        self.repo_manager.create_repo('repo-1')
+        hits = RESPONSE_CACHE.statistics()['hits']
+
+        first = self._get('/v2/repositories/repo-1/')
+        second = self._get('/v2/repositories/repo-1/')
+
+        self.assertEqual(second.status, 200)
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(second.header('ETag'), first.header('ETag'))
+        self.assertEqual(RESPONSE_CACHE.statistics()['hits'], hits + 1)
+
+    def test_cached_streamed(self):
+        self.repo_manager.create_repo('repo-1')
+        hits = RESPONSE_CACHE.statistics()['hits']
+
+        first = self._get('/v2/repositories/')
+        second = self._get('/v2/repositories/')
+
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(RESPONSE_CACHE.statistics()['hits'], hits + 1)
+
+    def test_update_changes_tag(self):
+        self.repo_manager.create_repo('repo-1')
+        etag = self._get('/v2/repositories/repo-1/').header('ETag')
+
+        self.repo_manager.update_repo('repo-1', {'display_name': 'updated'})
+
+        response = self._get('/v2/repositories/repo-1/', etag)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(response.body)['display_name'], 'updated')
+
+    def test_other_repo_update_keeps_tag(self):
+        self.repo_manager.create_repo('repo-1')
+        self.repo_manager.create_repo('repo-2')
+        etag = self._get('/v2/repositories/repo-1/').header('ETag')
+        list_etag = self._get('/v2/repositories/').header('ETag')
+
+        self.repo_manager.update_repo('repo-2', {'display_name': 'updated'})
+
+        self.assertEqual(self._get('/v2/repositories/repo-1/', etag).status, 304)
+        self.assertEqual(self._get('/v2/repositories/', list_etag).status, 200)
+
+    def test_missing_not_cached(self):
+        response = self._get('/v2/repositories/missing/')
+
+        self.assertEqual(response.status, 404)
+        self.assertRaises(KeyError, response.header, 'ETag')
+        self.assertEqual(RESPONSE_CACHE.statistics()['entries'], 0)
+
+
+class ResourceVersionsTests(base.PulpServerTests):
+
+    def test_bump(self):
+        versions = resource_versions.get_versions([resource_versions.REPOSITORIES,
+                                                   resource_versions.CONTENT_UNITS])
+
+        resource_versions.bump(resource_versions.REPOSITORIES)
+
+        bumped = resource_versions.get_versions([resource_versions.REPOSITORIES,
+                                                 resource_versions.CONTENT_UNITS])
+        self.assertNotEqual(bumped[0], versions[0])
+        self.assertNotEqual(bumped[0], None)
+        self.assertEqual(bumped[1], versions[1])
+
+    def test_bump_repository(self):
+        resources = [resource_versions.REPOSITORIES, resource_versions.repository('repo-1'),
+                     resource_versions.repository('repo-2')]
+        versions = resource_versions.get_versions(resources)
+
+        resource_versions.bump_repository('repo-1')
+
+        bumped = resource_versions.get_versions(resources)
+        self.assertNotEqual(bumped[0], versions[0])
+        self.assertNotEqual(bumped[1], versions[1])
+        self.assertEqual(bumped[2], versions[2])
+
+    def test_bump_all(self):
+        resource_versions.bump_repository('repo-1')
+        resources = list(resource_versions.ALL_RESOURCES) + [resource_versions.repository('repo-1')]
+        versions = resource_versions.get_versions(resources)
+
+        resource_versions.bump_all()
+
+        bumped = resource_versions.get_versions(resources)
+        for old, new in zip(versions, bumped):
+            self.assertNotEqual(old, new)
+            self.assertNotEqual(new, None)
+
+    def test_unknown_resource(self):
+        self.assertEqual(resource_versions.get_versions(['unknown']), [None])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+This module contains tests for the pulp.server.db.indexes module.
+"""
+
+import mock
+
+from base import PulpServerTests
+from pulp.server.db import connection, indexes
+from pulp.server.db.model.repository import Repo
+
+
+class IndexesTests(PulpServerTests):
+
+    def tearDown(self):
+        super(IndexesTests, self).tearDown()
+        connection.get_collection(indexes.INDEX_VERSIONS_COLLECTION).remove(safe=True)
+        Repo.get_collection().drop_indexes()
+        Repo.ensure_indexes()
+
+    def test_get_collection_cached(self):
+        self.assertTrue(Repo.get_collection() is Repo.get_collection())
+
+    def test_get_collection_no_ensure_index(self):
+        with mock.patch.object(Repo.get_collection(), 'ensure_index') as mock_ensure_index:
+            Repo.get_collection().find_one()
+            self.assertEqual(mock_ensure_index.call_count, 0)
+
+    def test_model_collections(self):
+        collections = indexes.model_collections()
+        self.assertEqual(collections[Repo.collection_name], [Repo])
+
+    def test_ensure_indexes_only_changed(self):
+        connection.get_collection(indexes.INDEX_VERSIONS_COLLECTION).remove(safe=True)
+        ensured = indexes.ensure_indexes()
+        self.assertTrue(Repo.collection_name in ensured)
+
+        # the recorded definitions are up to date
+        with mock.patch('pulp.server.db.model.base.Model.ensure_indexes') as mock_ensure_indexes:
+            self.assertEqual(indexes.ensure_indexes(), [])
+            self.assertEqual(mock_ensure_indexes.call_count, 0)
+
+        # forcing ensures everything
+        self.assertEqual(sorted(indexes.ensure_indexes(force=True)),
+                         sorted(indexes.model_collections().keys()))
+
+    def test_index_report(self):
+        collection = Repo.get_collection()
+        collection.drop_indexes()
+        collection.ensure_index('notes')
+
+        report = indexes.index_report()
+
+        self.assertEqual(report[Repo.collection_name],
+                         {'missing': ['id (unique)'], 'extraneous': ['notes_1']})
+
+        collection.drop_index('notes_1')
+        indexes.ensure_indexes(force=True)
+        self.assertFalse(Repo.collection_name in indexes.index_report())
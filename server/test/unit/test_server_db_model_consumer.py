@@ -159,6 +159,22 @@ class TestRepoProfileApplicability(PulpServerTests):
         # Our applicability object should now have the correct _id attribute
         self.assertEqual(applicability._id, document['_id'])
 
+    def test_save_content_versions(self):
+        """
+        Test that the content versions are saved and loaded with the object.
+        """
+        content_versions = {'type_id': 3}
+        applicability = consumer.RepoProfileApplicability(
+            profile_hash='hash', repo_id='repo_id', profile=['a', 'profile'],
+            applicability={'type_id': ['package a']}, content_versions=content_versions)
+
+        applicability.save()
+
+        document = self.collection.find_one()
+        self.assertEqual(document['content_versions'], content_versions)
+        loaded = consumer.RepoProfileApplicability(**dict(document))
+        self.assertEqual(loaded.content_versions, content_versions)
+
 class TestUnitProfile(unittest.TestCase):
     """
     Test the UnitProfile class.
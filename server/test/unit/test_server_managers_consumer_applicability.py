@@ -20,6 +20,7 @@ from pulp.server.db.model.consumer import (Bind, Consumer, RepoProfileApplicabil
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.repository import Repo, RepoDistributor
 from pulp.server.managers import factory as factory
+from pulp.server.managers.consumer import applicability as applicability_module
 from pulp.server.managers.consumer.applicability import (
     _add_consumers_to_applicability_map, _add_profiles_to_consumer_map_and_get_hashes,
     _add_repo_ids_to_consumer_map, _format_report, _get_applicability_map,
@@ -202,6 +203,64 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         applicability_list = list(RepoProfileApplicability.get_collection().find())
         self.assertEqual(len(applicability_list), 0)
 
+    def test_regenerate_applicability_for_consumers_existing_applicability_skipped(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        # Test
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 0)
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(len(applicability_list), 2)
+
+    def test_regenerate_applicability_for_consumers_profiler_cached(self):
+        # Setup
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        # Test
+        manager = factory.applicability_regeneration_manager()
+        # wrap the mock plugin lookup installed by setUp, not the real one
+        with mock.patch.object(plugins, 'get_profiler_by_type',
+                               wraps=plugins.get_profiler_by_type) as mock_get_profiler:
+            manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        self.assertEqual(mock_get_profiler.call_count, 1)
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(len(applicability_list), 4)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.multiprocessing.Pool')
+    @mock.patch('pulp.server.config.config.getint', return_value=2)
+    def test_regenerate_applicability_for_consumers_process_pool(self, mock_getint, mock_pool):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        applicability = {'rpm': ['rpm-1']}
+        pool = mock_pool.return_value
+        pool.apply_async.return_value.get.return_value = applicability
+        # Test
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        self.assertEqual(mock_pool.call_count, 1)
+        self.assertEqual(mock_pool.call_args[0][0], 2)
+        self.assertEqual(pool.apply_async.call_count, 2)
+        for call in pool.apply_async.call_args_list:
+            self.assertEqual(call[0][0], applicability_module._calculate_applicable_units_in_worker)
+            self.assertEqual(call[0][1][:2], ('rpm', self.PROFILE1))
+        pool.close.assert_called_once_with()
+        pool.join.assert_called_once_with()
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 0)
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(len(applicability_list), 2)
+        for a in applicability_list:
+            self.assertEqual(a['applicability'], applicability)
+
     # Applicability regeneration with repo criteria
 
     def test_regenerate_applicability_for_repos_with_different_consumer_profiles(self):
@@ -262,6 +321,82 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         applicability_list = list(RepoProfileApplicability.get_collection().find())
         self.assertEqual(applicability_list, [])
 
+    def test_regenerate_applicability_for_repos_stores_content_versions(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        factory.repo_manager().update_unit_count(self.REPO_IDS[0], 'rpm', 1)
+        # Test
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        applicability = RepoProfileApplicability.get_collection().find_one({'repo_id': self.REPO_IDS[0]})
+        self.assertEqual(applicability['content_versions'], {'rpm': 1, 'erratum': 0})
+        applicability = RepoProfileApplicability.get_collection().find_one({'repo_id': self.REPO_IDS[1]})
+        self.assertEqual(applicability['content_versions'], {'rpm': 0, 'erratum': 0})
+
+    def test_regenerate_applicability_for_repos_unchanged_repos_skipped(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 0)
+        for repo in Repo.get_collection().find():
+            self.assertEqual(repo['applicability_content_version'], 0)
+
+    def test_regenerate_applicability_for_repos_changed_content(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        factory.repo_manager().update_unit_count(self.REPO_IDS[0], 'erratum', 1)
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 1)
+        self.assertEqual(profiler.calculate_applicable_units.call_args[0][1], self.REPO_IDS[0])
+        applicability = RepoProfileApplicability.get_collection().find_one({'repo_id': self.REPO_IDS[0]})
+        self.assertEqual(applicability['content_versions'], {'rpm': 0, 'erratum': 1})
+
+    def test_regenerate_applicability_for_repos_changed_unrelated_content(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        factory.repo_manager().update_unit_count(self.REPO_IDS[0], 'puppet_module', 1)
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 0)
+        repo = Repo.get_collection().find_one({'id': self.REPO_IDS[0]})
+        self.assertEqual(repo['applicability_content_version'], 1)
+
+    def test_regenerate_applicability_for_repos_not_incremental(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA, incremental=False)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 2)
+
     def test_regenerate_applicability_for_repos_profiler_notfound(self):
         # Setup
         self.populate_consumers()
@@ -18,7 +18,7 @@ import pymongo
 
 from pulp.plugins.profiler import Profiler
 from pulp.server.db.model.consumer import Consumer, UnitProfile
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import ChangedResource, InvalidValue, MissingResource
 from pulp.server.managers import factory
 from pulp.server.managers.consumer.cud import ConsumerManager
 from pulp.server.managers.consumer.profile import ProfileManager
@@ -141,6 +141,87 @@ class ProfileManagerTests(base.PulpAsyncServerTests):
         expected_hash = UnitProfile.calculate_hash(self.PROFILE_2)
         self.assertEqual(profiles[0]['profile_hash'], expected_hash)
 
+    def test_update_unchanged(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        # Test
+        with mock.patch.object(UnitProfile.get_collection(), 'save') as mock_save:
+            profile = manager.update(self.CONSUMER_ID, self.TYPE_1, dict(self.PROFILE_1))
+        # Verify
+        self.assertEqual(mock_save.call_count, 0)
+        self.assertEqual(profile['profile'], self.PROFILE_1)
+
+    def test_update_delta(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        p = manager.update(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1, self.PROFILE_3])
+        # Test
+        p = manager.update_delta(self.CONSUMER_ID, self.TYPE_1, p['profile_hash'],
+                                 [self.PROFILE_2], [self.PROFILE_1])
+        # Verify
+        expected = [self.PROFILE_3, self.PROFILE_2]
+        self.assertEqual(p['profile_hash'], UnitProfile.calculate_hash(expected))
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], expected)
+        self.assertEqual(profile['profile_hash'], p['profile_hash'])
+
+    def test_update_delta_empty(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        p = manager.update(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1])
+        # Test
+        with mock.patch.object(UnitProfile.get_collection(), 'save') as mock_save:
+            profile = manager.update_delta(self.CONSUMER_ID, self.TYPE_1, p['profile_hash'])
+        # Verify
+        self.assertEqual(mock_save.call_count, 0)
+        self.assertEqual(profile['profile'], [self.PROFILE_1])
+
+    def test_update_delta_changed(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1])
+        # Test
+        base_hash = UnitProfile.calculate_hash([self.PROFILE_2])
+        self.assertRaises(ChangedResource, manager.update_delta, self.CONSUMER_ID, self.TYPE_1,
+                          base_hash, [self.PROFILE_3], [])
+        # Verify
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], [self.PROFILE_1])
+
+    def test_update_delta_removed_missing(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        p = manager.update(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_1])
+        # Test
+        self.assertRaises(ChangedResource, manager.update_delta, self.CONSUMER_ID, self.TYPE_1,
+                          p['profile_hash'], [self.PROFILE_3], [self.PROFILE_2])
+        # Verify
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], [self.PROFILE_1])
+
+    def test_update_delta_not_supported(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        p = manager.update(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        # Test
+        self.assertRaises(InvalidValue, manager.update_delta, self.CONSUMER_ID, self.TYPE_1,
+                          p['profile_hash'], [self.PROFILE_3], [])
+
+    def test_update_delta_missing(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        # Test
+        self.assertRaises(MissingResource, manager.update_delta, self.CONSUMER_ID, self.TYPE_1,
+                          'hash', [self.PROFILE_3], [])
+
     def test_update_calls_profiler_update_profile(self):
         """
         Assert that the update() method calls the profiler update_profile() method.
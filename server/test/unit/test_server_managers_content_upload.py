@@ -9,6 +9,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
 import os
 import shutil
 
@@ -107,6 +108,52 @@ class ContentUploadManagerTests(base.PulpServerTests):
         except MissingResource, e:
             self.assertEqual(e.resources['upload_request'], 'foo')
 
+    def test_save_data_checksum(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc', hashlib.sha256('abc').hexdigest())
+        self.assertRaises(PulpDataException, self.upload_manager.save_data, upload_id, 3, 'def',
+                          hashlib.sha256('xyz').hexdigest())
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), 'abc')
+        self.assertEqual(self.upload_manager.received_ranges(upload_id), [[0, 3]])
+
+    def test_received_ranges(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        self.assertEqual(self.upload_manager.received_ranges(upload_id), [])
+
+        self.upload_manager.save_data(upload_id, 6, 'ghi')
+        self.upload_manager.save_data(upload_id, 12, 'mno')
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+
+        # Verify
+        self.assertEqual(self.upload_manager.received_ranges(upload_id), [[0, 3], [6, 9], [12, 15]])
+        self.upload_manager.save_data(upload_id, 3, 'def')
+        self.assertEqual(self.upload_manager.received_ranges(upload_id), [[0, 9], [12, 15]])
+        self.assertRaises(MissingResource, self.upload_manager.received_ranges, 'foo')
+
+    def test_verify_upload(self):
+
+        # Setup
+        write_us = [(3, 'def'), (9, 'jkl'), (0, 'abc'), (6, 'ghi')]
+        expected = hashlib.sha256('abcdefghijkl').hexdigest()
+        upload_id = self.upload_manager.initialize_upload()
+
+        # Test
+        for offset, data in write_us[:3]:
+            self.upload_manager.save_data(upload_id, offset, data)
+        self.assertRaises(PulpDataException, self.upload_manager.verify_upload, upload_id, 12, expected)
+
+        offset, data = write_us[3]
+        self.upload_manager.save_data(upload_id, offset, data)
+        self.upload_manager.verify_upload(upload_id, 12, expected)
+        self.assertRaises(PulpDataException, self.upload_manager.verify_upload, upload_id, 12,
+                          hashlib.sha256('abcdefghijkm').hexdigest())
+
     def test_delete_upload(self):
 
         # Setup
@@ -121,6 +168,7 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         # Verify
         self.assertTrue(not os.path.exists(uploaded_filename))
+        self.assertTrue(not os.path.exists(self.upload_manager._segments_file_path(upload_id)))
 
     def test_list_upload_ids(self):
 
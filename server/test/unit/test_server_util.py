@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+from pulp.server import util
+
+
+class BatchesTests(unittest.TestCase):
+
+    def test_batches(self):
+        self.assertEqual(list(util.batches(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_batches_exact(self):
+        self.assertEqual(list(util.batches(range(4), 2)), [[0, 1], [2, 3]])
+
+    def test_batches_empty(self):
+        self.assertEqual(list(util.batches([], 2)), [])
+
+    def test_batches_lazy(self):
+        items = iter(range(5))
+        batches = util.batches(items, 2)
+        self.assertEqual(batches.next(), [0, 1])
+        self.assertEqual(items.next(), 2)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+from bson.objectid import ObjectId
+
+from pulp.server.compat import json
+from pulp.server.webservices.controllers import base
+
+
+class TestJSONArrayChunks(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(list(base._json_array_chunks([])), ['[]'])
+
+    def test_chunks(self):
+        items = [{'id': i} for i in range(5)]
+
+        chunks = list(base._json_array_chunks(iter(items), chunk_items=2))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(json.loads(''.join(chunks)), items)
+
+    def test_exact_chunks(self):
+        items = range(4)
+
+        chunks = list(base._json_array_chunks(items, chunk_items=2))
+
+        self.assertEqual(chunks, ['[0,1', ',2,3', ']'])
+        self.assertEqual(json.loads(''.join(chunks)), items)
+
+    def test_bson_types(self):
+        object_id = ObjectId()
+
+        body = ''.join(base._json_array_chunks([{'_id': object_id}]))
+
+        self.assertEqual(json.loads(body), [{'_id': {'$oid': str(object_id)}}])
+
+    def test_lazy(self):
+        # nothing is read from the items until the first chunk is requested
+        items = mock.MagicMock()
+
+        base._json_array_chunks(items)
+
+        self.assertEqual(items.__iter__.call_count, 0)
+
+
+class TestOkStream(unittest.TestCase):
+
+    @mock.patch('pulp.server.webservices.http.header')
+    @mock.patch('web.ctx')
+    def test_ok_stream(self, mock_ctx, mock_header):
+        controller = base.JSONController()
+
+        body = controller.ok_stream(iter([{'id': 'repo-1'}, {'id': 'repo-2'}]))
+
+        self.assertEqual(mock_ctx.status, '200 OK')
+        mock_header.assert_called_once_with('Content-Type', 'application/json')
+        self.assertEqual(json.loads(''.join(body)), [{'id': 'repo-1'}, {'id': 'repo-2'}])
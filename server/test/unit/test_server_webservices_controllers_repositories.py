@@ -33,6 +33,7 @@ from pulp.server.itineraries.repository import (
     repo_delete_itinerary, distributor_delete_itinerary, distributor_update_itinerary,
     bind_itinerary, unbind_itinerary)
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.consumer.applicability import ApplicabilityRegenerationManager
 from pulp.server.managers.repo.distributor import RepoDistributorManager
 from pulp.server.managers.repo.importer import RepoImporterManager
 from pulp.server.webservices.controllers import repositories
@@ -1733,6 +1734,60 @@ class TestRepoApplicabilityRegeneration(base.PulpWebserviceTests):
         self.assertNotEqual(body['state'], dispatch_constants.CALL_REJECTED_RESPONSE)
         self.assertTrue('pulp:action:applicability_regeneration' in body['tags'])
 
+    def populate_applicability(self):
+        self.populate()
+        self.populate_bindings()
+        consumer_criteria = Criteria(filters={'id': {'$in': self.CONSUMER_IDS}})
+        manager = manager_factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(consumer_criteria)
+
+    def _regenerate(self, request_body):
+        # wait for the regeneration task instead of returning once it is queued
+        coordinator = dispatch_factory.coordinator()
+        with mock.patch.object(coordinator, 'execute_call_asynchronously',
+                               side_effect=coordinator.execute_call_synchronously) as execute:
+            status, body = self.post(self.PATH, request_body)
+        self.assertEquals(status, 202)
+        return execute.call_args[0][0]
+
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_existing_repo_content_types',
+                       return_value=['rpm', 'erratum'])
+    def test_regenerate_applicability_unchanged_skipped(self, mock_content_types):
+        # Setup
+        yum_profiler, cfg = plugin_api.get_profiler_by_type('rpm')
+        yum_profiler.metadata = mock.Mock(return_value={'types': ['rpm', 'erratum']})
+        self.populate_applicability()
+        self.assertEqual(yum_profiler.calculate_applicable_units.call_count, 2)
+        yum_profiler.calculate_applicable_units.reset_mock()
+        request_body = dict(repo_criteria={'filters':self.REPO_FILTER})
+        # Test
+        call_request = self._regenerate(request_body)
+        # Verify
+        self.assertEqual(call_request.kwargs, {'incremental': True})
+        self.assertEqual(yum_profiler.calculate_applicable_units.call_count, 0)
+
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_existing_repo_content_types',
+                       return_value=['rpm', 'erratum'])
+    def test_regenerate_applicability_not_incremental(self, mock_content_types):
+        # Setup
+        yum_profiler, cfg = plugin_api.get_profiler_by_type('rpm')
+        yum_profiler.metadata = mock.Mock(return_value={'types': ['rpm', 'erratum']})
+        self.populate_applicability()
+        yum_profiler.calculate_applicable_units.reset_mock()
+        request_body = dict(repo_criteria={'filters':self.REPO_FILTER}, incremental=False)
+        # Test
+        call_request = self._regenerate(request_body)
+        # Verify
+        self.assertEqual(call_request.kwargs, {'incremental': False})
+        self.assertEqual(yum_profiler.calculate_applicable_units.call_count, 2)
+
+    def test_regenerate_applicability_invalid_incremental(self):
+        # Test
+        request_body = dict(repo_criteria={'filters':self.REPO_FILTER}, incremental='no')
+        status, body = self.post(self.PATH, request_body)
+        # Verify
+        self.assertEquals(status, 400)
+
     def test_regenerate_applicability_no_consumer(self):
         # Test
         request_body = dict(repo_criteria={'filters':self.REPO_FILTER})
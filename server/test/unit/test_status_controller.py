@@ -22,3 +22,22 @@ class StatusControllerTests(base.PulpWebserviceTests):
 
         self.assertEqual(status, 200)
         self.assertTrue('api_version' in body)
+        self.assertFalse('authorization_cache' in body)
+        self.assertFalse('credential_cache' in body)
+        self.assertFalse('notification_delivery' in body)
+
+    def test_get_caches(self):
+
+        status, body = self.get('/v2/status/caches/')
+
+        self.assertEqual(status, 200)
+        self.assertTrue('hits' in body['authorization_cache'])
+        self.assertTrue('hits' in body['credential_cache'])
+        self.assertTrue('delivered' in body['notification_delivery'])
+        self.assertTrue('pending' in body['notification_delivery'])
+
+    def test_get_caches_unauthenticated(self):
+
+        response = self.TEST_APP.get('http://localhost/v2/status/caches/', expect_errors=True)
+
+        self.assertEqual(response.status, 401)
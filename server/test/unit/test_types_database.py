@@ -13,6 +13,7 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import base
+import mock
 
 import pulp.plugins.types.database as types_db
 from pulp.plugins.types.model import TypeDefinition
@@ -260,6 +261,74 @@ class TypesDatabaseTests(base.PulpServerTests):
         # Verify
         self.assertTrue(indexes is None)
 
+    # -- type cache tests ------------------------------------------------------
+
+    def test_type_definition_cached(self):
+        """
+        Tests a found type definition is not looked up in the database again.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db.type_definition(DEF_1.id)
+
+        # Test
+        with mock.patch.object(ContentType, 'get_collection') as mock_get_collection:
+            type_def = types_db.type_definition(DEF_1.id)
+            unit_key = types_db.type_units_unit_key(DEF_1.id)
+
+        # Verify
+        self.assertEqual(0, mock_get_collection.call_count)
+        self.assertEqual(DEF_1.id, type_def['id'])
+        self.assertEqual(DEF_1.unit_key, unit_key)
+
+    def test_type_definition_cache_invalidated_by_update(self):
+        """
+        Tests changes made by update_database are seen by cached lookups.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        self.assertEqual(DEF_1.unit_key, types_db.type_units_unit_key(DEF_1.id))
+        changed = TypeDefinition(DEF_1.id, DEF_1.display_name, DEF_1.description,
+                                 ['single_2'], DEF_1.search_indexes, [])
+
+        # Test
+        types_db.update_database([changed])
+
+        # Verify
+        self.assertEqual(['single_2'], types_db.type_units_unit_key(DEF_1.id))
+
+    def test_type_definition_missing_not_cached(self):
+        """
+        Tests a type added after it was looked up and not found is found.
+        """
+
+        # Setup
+        self.assertTrue(types_db.type_definition(DEF_1.id) is None)
+
+        # Test
+        ContentType.get_collection().save({'id': DEF_1.id, 'unit_key': DEF_1.unit_key}, safe=True)
+
+        # Verify
+        self.assertEqual(DEF_1.unit_key, types_db.type_units_unit_key(DEF_1.id))
+
+    def test_type_units_collection_cached(self):
+        """
+        Tests the collection of a type is only wrapped once.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+
+        # Test
+        collection_1 = types_db.type_units_collection(DEF_1.id)
+        collection_2 = types_db.type_units_collection(DEF_1.id)
+
+        # Verify
+        self.assertTrue(collection_1 is collection_2)
+        self.assertEqual(types_db.unit_collection_name(DEF_1.id), collection_1.name)
+
     # -- utility method tests ------------------------------------------------
 
     def test_create_or_update_type_collection(self):
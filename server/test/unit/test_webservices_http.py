@@ -39,3 +39,11 @@ class TestHTTP(unittest.TestCase):
         self.assertEqual(mock_path.call_count, 0)
         self.assertEqual(ret, '/base/uri/repo1/')
 
+    @mock.patch.object(http, 'request_info', return_value='"a", W/"b" ,"c"')
+    def test_if_none_match(self, mock_request_info):
+        self.assertEqual(http.if_none_match(), ['"a"', '"b"', '"c"'])
+        mock_request_info.assert_called_once_with('HTTP_IF_NONE_MATCH')
+
+    @mock.patch.object(http, 'request_info', return_value=None)
+    def test_if_none_match_missing(self, mock_request_info):
+        self.assertEqual(http.if_none_match(), [])